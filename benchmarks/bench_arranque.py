@@ -0,0 +1,145 @@
+# benchmarks/bench_arranque.py
+"""
+Benchmark del arranque: cuánto cuesta importar lo que necesita cada ventana.
+
+Para cada objetivo ("login": lo que carga la ventana de login; "chat": el
+módulo IcoChat completo; y cada módulo pesado que se precarga en segundo
+plano) lanza un intérprete nuevo con `-X importtime`, mide el tiempo de la
+importación y resume qué módulos cuestan más (tiempo acumulado, incluidos
+los que importan). También comprueba que importar no escribe nada en data/.
+
+Los módulos opcionales que no estén instalados se marcan como tales.
+
+Uso:
+    python benchmarks/bench_arranque.py [--repeticiones 5] [--top 15] [--json resultados.json]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+RAIZ = Path(__file__).resolve().parent.parent
+SCR = RAIZ / "scr"
+DATA = RAIZ / "data"
+
+sys.path.insert(0, str(SCR))
+
+from precarga import MODULOS_DIFERIDOS  # noqa: E402
+
+# Lo que importa cada ventana antes de mostrarse
+OBJETIVOS = {
+    "login": "login",
+    "chat": "IcoChat",
+}
+
+# Además de los precargados, PIL (solo para generar la caché de iconos) y
+# pygame (lo usa el motor de audio, ver audio.MotorAudio)
+MODULOS_OPCIONALES = (*MODULOS_DIFERIDOS, "PIL.Image", "pygame")
+
+
+def _estado_data() -> Dict[str, Tuple[int, int]]:
+    """Archivos de data/ con su tamaño y fecha de modificación."""
+    if not DATA.exists():
+        return {}
+    return {
+        str(ruta.relative_to(DATA)): (ruta.stat().st_size, ruta.stat().st_mtime_ns)
+        for ruta in DATA.rglob("*") if ruta.is_file() and "__pycache__" not in ruta.parts
+    }
+
+
+def _importtime(modulo: str) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """
+    Importa `modulo` en un intérprete nuevo.
+
+    Returns:
+        Tuple[float, List[Tuple[str, int, int]]]: Segundos de la importación y, por
+        módulo, (nombre, µs propios, µs acumulados) según -X importtime.
+    """
+    codigo = (
+        "import sys, time; sys.path.insert(0, sys.argv[1]); t = time.perf_counter(); "
+        f"import {modulo}; print(time.perf_counter() - t)"
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo, str(SCR)],
+        capture_output=True, text=True, cwd=RAIZ, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if resultado.returncode != 0:
+        ultima = resultado.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"No se pudo importar {modulo}: {ultima[0]}")
+    modulos = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos.append((nombre.strip(), int(propio), int(acumulado)))
+    return float(resultado.stdout.strip().splitlines()[-1]), modulos
+
+
+def medir(modulo: str, repeticiones: int, top: int) -> Dict[str, Any]:
+    """Importa `modulo` varias veces y resume los tiempos."""
+    antes = _estado_data()
+    tiempos = []
+    modulos: List[Tuple[str, int, int]] = []
+    for _ in range(repeticiones):
+        segundos, modulos = _importtime(modulo)
+        tiempos.append(segundos)
+    # Los más caros de la última repetición, por tiempo acumulado
+    caros = sorted(modulos, key=lambda m: m[2], reverse=True)[:top]
+    return {
+        "modulo": modulo,
+        "ms_mediana": round(statistics.median(tiempos) * 1000, 1),
+        "ms_min": round(min(tiempos) * 1000, 1),
+        "modulos_importados": len(modulos),
+        "escribe_en_data": _estado_data() != antes,
+        "mas_caros": [{"modulo": n, "ms_propio": round(p / 1000, 2), "ms_acumulado": round(a / 1000, 2)}
+                      for n, p, a in caros],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Coste de importación de cada ventana y de los módulos diferidos.")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Intérpretes nuevos por objetivo.")
+    parser.add_argument("--top", type=int, default=15, help="Módulos más caros que se muestran por objetivo.")
+    parser.add_argument("--json", type=Path, help="Guardar los resultados en este archivo JSON.")
+    args = parser.parse_args()
+
+    resultados: List[Dict[str, Any]] = []
+    for objetivo, modulo in OBJETIVOS.items():
+        resultados.append({"objetivo": objetivo, **medir(modulo, args.repeticiones, args.top)})
+    for modulo in MODULOS_OPCIONALES:
+        instalado: Optional[bool]
+        try:
+            instalado = importlib.util.find_spec(modulo) is not None
+        except ModuleNotFoundError:
+            instalado = False
+        if instalado:
+            resultados.append({"objetivo": "diferido", **medir(modulo, args.repeticiones, args.top)})
+        else:
+            resultados.append({"objetivo": "diferido", "modulo": modulo, "instalado": False})
+
+    print(f"{'objetivo':<10}{'módulo':<16}{'mediana ms':>11}{'mín ms':>9}{'módulos':>9}  escribe en data/")
+    for r in resultados:
+        if r.get("instalado") is False:
+            print(f"{r['objetivo']:<10}{r['modulo']:<16}{'no instalado':>11}")
+            continue
+        print(
+            f"{r['objetivo']:<10}{r['modulo']:<16}{r['ms_mediana']:>11}{r['ms_min']:>9}"
+            f"{r['modulos_importados']:>9}  {'sí' if r['escribe_en_data'] else 'no'}"
+        )
+    for r in resultados:
+        if r.get("mas_caros"):
+            print(f"\n{r['objetivo']} ({r['modulo']}): módulos más caros")
+            for m in r["mas_caros"]:
+                print(f"  {m['ms_acumulado']:>9.2f} ms acumulado {m['ms_propio']:>8.2f} ms propio  {m['modulo']}")
+    if args.json:
+        args.json.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,574 @@
+# benchmarks/bench_carga.py
+"""
+Generador de carga: muchos usuarios de IcoChat simulados a la vez.
+
+Cada usuario simulado habla el mismo protocolo que la aplicación
+(connect_to_server y send_message): inicia sesión con "CREDENTIALS:", se
+presenta con su nombre y envía cada mensaje como "MENSAJE:{id, texto}",
+esperando su "RECIBIDO:<id>". Los mensajes llegan con una tasa media
+configurable (llegadas de Poisson). Además, a otra tasa, cada usuario
+consulta la lista de archivos (LISTA_ARCHIVOS), descarga un archivo
+(DESCARGA, con los bloques verificados con CRC32) o sube uno (SUBIDA),
+según la mezcla elegida.
+
+Por defecto se arranca el servidor de referencia
+(herramientas/servidor_referencia.py) en otro proceso, con sus archivos en
+una carpeta temporal; con --host y --puerto se mide otro servidor. Los
+usuarios se reparten entre varios procesos (--procesos), cada uno con su
+propio bucle asyncio, para que el generador no sea el cuello de botella.
+
+Se mide:
+  - la latencia de entrega de extremo a extremo: desde que un usuario envía
+    un mensaje hasta que lo recibe cada uno de los demás (el texto lleva la
+    hora de time.monotonic, común a todos los procesos de la máquina);
+  - la latencia de la confirmación (RECIBIDO) y de cada operación de archivos;
+  - mensajes, entregas y bytes por segundo, entregas perdidas y errores.
+
+Las latencias se guardan en histogramas con un 1 % de resolución, así que
+la memoria no crece con la duración de la prueba. El informe se puede
+guardar en JSON y en CSV (una fila "métrica,valor" por dato) para
+comparar versiones.
+
+Uso:
+    python benchmarks/bench_carga.py [--usuarios 200] [--duracion 30] [--mensajes-s 0.5] \\
+        [--operaciones-s 0.02] [--mezcla lista=6,descarga=3,subida=1] [--json resultados.json] [--csv resultados.csv]
+"""
+
+import argparse
+import asyncio
+import collections
+import csv
+import datetime
+import json
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Counter, Dict, List, Optional, Tuple
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / "scr"))
+sys.path.insert(0, str(RAIZ / "herramientas"))
+
+from protocolo import (  # noqa: E402
+    CABECERA_BLOQUE, CANAL_CHAT, FLAG_BLOQUE, DecodificadorFrames, ErrorProtocolo, Frame, TipoFrame,
+    TAMANO_LECTURA, codificar_bloque, codificar_control, codificar_frame
+)
+
+# Bloques de las subidas simuladas
+TAMANO_BLOQUE = 256 * 1024
+
+# Tiempo tras la prueba para que lleguen los últimos mensajes y terminen las operaciones
+ESPERA_FINAL_S = 3.0
+
+# Conexiones que abre a la vez cada proceso al preparar la prueba
+CONEXIONES_SIMULTANEAS = 50
+
+OPERACIONES = ("lista", "descarga", "subida")
+
+
+class Histograma:
+    """
+    Histograma de latencias con cubetas logarítmicas (cada una un 1 % más
+    ancha que la anterior). Se puede fusionar con los de otros procesos.
+    """
+
+    BASE = 1.01
+
+    def __init__(self) -> None:
+        self.cubetas: Counter[int] = collections.Counter()
+        self.n = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def agregar(self, segundos: float) -> None:
+        microsegundos = max(segundos * 1e6, 1.0)
+        self.cubetas[int(math.log(microsegundos, self.BASE))] += 1
+        self.n += 1
+        self.suma += segundos
+        self.maximo = max(self.maximo, segundos)
+
+    def fusionar(self, otro: "Histograma") -> None:
+        self.cubetas.update(otro.cubetas)
+        self.n += otro.n
+        self.suma += otro.suma
+        self.maximo = max(self.maximo, otro.maximo)
+
+    def percentil(self, p: float) -> float:
+        """Percentil `p` (entre 0 y 1) en milisegundos."""
+        if not self.n:
+            return 0.0
+        objetivo = p * self.n
+        acumulado = 0
+        for cubeta in sorted(self.cubetas):
+            acumulado += self.cubetas[cubeta]
+            if acumulado >= objetivo:
+                return min(self.BASE ** (cubeta + 0.5) / 1000, self.maximo * 1000)
+        return self.maximo * 1000
+
+    def resumen(self) -> Dict[str, float]:
+        return {
+            "n": self.n,
+            "media_ms": round(self.suma / self.n * 1000, 2) if self.n else 0.0,
+            "p50_ms": round(self.percentil(0.50), 2),
+            "p90_ms": round(self.percentil(0.90), 2),
+            "p99_ms": round(self.percentil(0.99), 2),
+            "p999_ms": round(self.percentil(0.999), 2),
+            "max_ms": round(self.maximo * 1000, 2),
+        }
+
+
+class Metricas:
+    """Latencias y contadores de un proceso; se fusionan al terminar."""
+
+    def __init__(self) -> None:
+        self.latencias: Dict[str, Histograma] = collections.defaultdict(Histograma)
+        self.contadores: Counter[str] = collections.Counter()
+        self.errores: Counter[str] = collections.Counter()
+
+    def fusionar(self, otras: "Metricas") -> None:
+        for nombre, histograma in otras.latencias.items():
+            self.latencias[nombre].fusionar(histograma)
+        self.contadores.update(otras.contadores)
+        self.errores.update(otras.errores)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"latencias": dict(self.latencias), "contadores": self.contadores, "errores": self.errores}
+
+    def __setstate__(self, estado: Dict[str, Any]) -> None:
+        self.__init__()
+        self.latencias.update(estado["latencias"])
+        self.contadores, self.errores = estado["contadores"], estado["errores"]
+
+
+class UsuarioSimulado:
+    """Un usuario del chat sobre su propia conexión, en el bucle del proceso."""
+
+    def __init__(self, nombre: str, args: argparse.Namespace, metricas: Metricas, compartido: Dict[str, Any]) -> None:
+        self.nombre = nombre
+        self.args = args
+        self.metricas = metricas
+        self.compartido = compartido  # Datos de las subidas y archivos conocidos por el proceso
+        self.azar = random.Random(f"{args.semilla}-{nombre}")
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._canales: Dict[int, asyncio.Queue] = {}
+        self._siguiente_canal = 1
+        self._subidas = 0
+        self._relleno = "x" * max(0, args.tamano_mensaje - 20)
+        self.conectado = False
+
+    # ----------------------------
+    # Conexión
+    # ----------------------------
+    async def conectar(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.args.host, self.args.puerto), self.args.timeout
+        )
+        self.conectado = True
+        asyncio.get_running_loop().create_task(self._leer())
+        if not self.args.sin_sesion:
+            credenciales = json.dumps({"email": f"{self.nombre}@carga.local", "password": "carga"})
+            respuesta = json.loads((await self._peticion(f"CREDENTIALS:{credenciales}")).texto())
+            if respuesta.get("Resp") != 1:
+                raise ConnectionError(f"Inicio de sesión rechazado: {respuesta.get('Mens')}")
+        self._writer.write(codificar_control(self.nombre))
+
+    async def cerrar(self) -> None:
+        self.conectado = False  # Un cierre propio no cuenta como desconexión
+        if self._writer:
+            self._writer.close()
+
+    async def _leer(self) -> None:
+        decodificador = DecodificadorFrames()
+        try:
+            while datos := await self._reader.read(TAMANO_LECTURA):
+                ahora = time.monotonic_ns()
+                for frame in decodificador.alimentar(datos):
+                    self._repartir(frame, ahora)
+        except (ConnectionError, ErrorProtocolo) as e:
+            self.metricas.errores[f"conexion:{type(e).__name__}"] += 1
+        finally:
+            if self.conectado:
+                self.conectado = False
+                self.metricas.contadores["desconexiones"] += 1
+            for cola in self._canales.values():
+                cola.put_nowait(ConnectionError("Conexión cerrada."))
+
+    def _repartir(self, frame: Frame, ahora: int) -> None:
+        if frame.canal == CANAL_CHAT:
+            if frame.tipo == TipoFrame.TEXTO:
+                # "<remitente>: <hora de envío en ns> <relleno>"
+                enviado = int(frame.payload.split(b": ", 1)[1].split(b" ", 1)[0])
+                self.metricas.latencias["entrega"].agregar((ahora - enviado) / 1e9)
+                self.metricas.contadores["entregas"] += 1
+            elif frame.payload == b"NOMBRE_EN_USO":
+                self.metricas.errores["nombre_en_uso"] += 1
+            return
+        cola = self._canales.get(frame.canal)
+        if cola is not None:
+            cola.put_nowait(frame)
+
+    def _abrir_canal(self) -> Tuple[int, asyncio.Queue]:
+        canal = self._siguiente_canal
+        self._siguiente_canal += 1
+        self._canales[canal] = asyncio.Queue()
+        return canal, self._canales[canal]
+
+    async def _siguiente(self, cola: asyncio.Queue) -> Frame:
+        elemento = await asyncio.wait_for(cola.get(), self.args.timeout)
+        if isinstance(elemento, Exception):
+            raise elemento
+        return elemento
+
+    async def _peticion(self, comando: str) -> Frame:
+        """Envía un comando en un canal nuevo y devuelve la primera respuesta."""
+        canal, cola = self._abrir_canal()
+        try:
+            self._writer.write(codificar_control(comando, canal))
+            return await self._siguiente(cola)
+        finally:
+            self._canales.pop(canal, None)
+
+    # ----------------------------
+    # Operaciones
+    # ----------------------------
+    async def enviar_mensaje(self) -> None:
+        id_mensaje = uuid.uuid4().hex
+        inicio = time.monotonic_ns()
+        contenido = json.dumps({"id": id_mensaje, "texto": f"{inicio} {self._relleno}"})
+        respuesta = await self._peticion(f"MENSAJE:{contenido}")
+        if respuesta.payload != f"RECIBIDO:{id_mensaje}".encode():
+            raise ErrorProtocolo(f"Respuesta inesperada: {respuesta.payload[:80]!r}")
+        self.metricas.latencias["acuse"].agregar((time.monotonic_ns() - inicio) / 1e9)
+        self.metricas.contadores["mensajes"] += 1
+
+    async def consultar_lista(self) -> None:
+        archivos = json.loads((await self._peticion("LISTA_ARCHIVOS")).texto())
+        nombres = [a["nombre"] if isinstance(a, dict) else a for a in archivos]
+        if nombres:
+            self.compartido["archivos"] = nombres
+
+    async def subir(self) -> None:
+        datos: bytes = self.compartido["datos"]
+        self._subidas += 1
+        nombre = f"carga_{self.nombre}_{self._subidas}.bin"
+        canal, cola = self._abrir_canal()
+        try:
+            peticion = {"id": uuid.uuid4().hex, "nombre": nombre, "tamano": len(datos), "bloque": TAMANO_BLOQUE}
+            self._writer.write(codificar_control(f"SUBIDA:{json.dumps(peticion)}", canal))
+            respuesta = (await self._siguiente(cola)).texto()
+            if respuesta != "DESDE:0":
+                raise ErrorProtocolo(f"Respuesta inesperada: {respuesta[:80]}")
+            for offset in range(0, len(datos), TAMANO_BLOQUE):
+                self._writer.write(codificar_bloque(canal, offset, datos[offset:offset + TAMANO_BLOQUE]))
+                await self._writer.drain()
+            self._writer.write(codificar_frame(TipoFrame.DATOS, b"", canal))
+            respuesta = (await self._siguiente(cola)).texto()
+            if respuesta != f"COMPLETO:{len(datos)}":
+                raise ErrorProtocolo(f"Respuesta inesperada: {respuesta[:80]}")
+        finally:
+            self._canales.pop(canal, None)
+        self.metricas.contadores["bytes_subidos"] += len(datos)
+        self.compartido["archivos"].append(nombre)
+
+    async def descargar(self) -> None:
+        nombre = self.azar.choice(self.compartido["archivos"])
+        canal, cola = self._abrir_canal()
+        recibidos = 0
+        try:
+            peticion = {"nombre": nombre, "desde": 0, "etag": ""}
+            self._writer.write(codificar_control(f"DESCARGA:{json.dumps(peticion)}", canal))
+            while True:
+                frame = await self._siguiente(cola)
+                if frame.tipo == TipoFrame.CONTROL:
+                    if not frame.texto().startswith("DESCARGA_INFO:"):
+                        raise ErrorProtocolo(f"Respuesta inesperada: {frame.payload[:80]!r}")
+                    continue
+                if not frame.payload:
+                    break
+                offset, crc = CABECERA_BLOQUE.unpack_from(frame.payload)
+                bloque = memoryview(frame.payload)[CABECERA_BLOQUE.size:]
+                if not frame.flags & FLAG_BLOQUE or offset != recibidos or zlib.crc32(bloque) != crc:
+                    raise ErrorProtocolo(f"Bloque no válido en el offset {offset}.")
+                recibidos += len(bloque)
+        finally:
+            self._canales.pop(canal, None)
+        self.metricas.contadores["bytes_descargados"] += recibidos
+
+    # ----------------------------
+    # Bucles de la prueba
+    # ----------------------------
+    async def _medir(self, nombre: str, operacion: Any) -> None:
+        inicio = time.perf_counter()
+        try:
+            await operacion()
+        except asyncio.TimeoutError:
+            self.metricas.errores[f"{nombre}:timeout"] += 1
+        except (ConnectionError, ErrorProtocolo, ValueError, KeyError) as e:
+            self.metricas.errores[f"{nombre}:{type(e).__name__}"] += 1
+        else:
+            if nombre != "mensaje":
+                self.metricas.latencias[nombre].agregar(time.perf_counter() - inicio)
+                self.metricas.contadores[nombre] += 1
+
+    async def _a_tasa(self, tasa: float, fin: float, elegir: Any) -> None:
+        """Lanza operaciones con llegadas de Poisson de media `tasa` por segundo hasta `fin`."""
+        if tasa <= 0:
+            return
+        en_curso = set()
+        while True:
+            espera = self.azar.expovariate(tasa)
+            if time.monotonic() + espera >= fin:
+                break
+            await asyncio.sleep(espera)
+            if not self.conectado:
+                break
+            tarea = asyncio.get_running_loop().create_task(self._medir(*elegir()))
+            en_curso.add(tarea)
+            tarea.add_done_callback(en_curso.discard)
+        if en_curso:
+            await asyncio.wait(en_curso, timeout=ESPERA_FINAL_S)
+
+    async def ejecutar(self, fin: float) -> None:
+        operaciones = {"lista": self.consultar_lista, "descarga": self.descargar, "subida": self.subir}
+        nombres = [n for n in OPERACIONES if self.args.mezcla.get(n)]
+        pesos = [self.args.mezcla[n] for n in nombres]
+
+        def operacion() -> Tuple[str, Any]:
+            nombre = self.azar.choices(nombres, pesos)[0]
+            return nombre, operaciones[nombre]
+
+        await asyncio.gather(
+            self._a_tasa(self.args.mensajes_s, fin, lambda: ("mensaje", self.enviar_mensaje)),
+            self._a_tasa(self.args.operaciones_s if nombres else 0, fin, operacion),
+        )
+
+
+async def _trabajar(indice: int, nombres: List[str], args: argparse.Namespace, barrera: Any) -> Metricas:
+    """Conecta los usuarios de un proceso, espera a los demás procesos y ejecuta la prueba."""
+    metricas = Metricas()
+    compartido: Dict[str, Any] = {
+        "datos": random.Random(indice).randbytes(args.tamano_archivo_kb * 1024),
+        "archivos": [],
+    }
+    usuarios = [UsuarioSimulado(nombre, args, metricas, compartido) for nombre in nombres]
+    limite = asyncio.Semaphore(CONEXIONES_SIMULTANEAS)
+
+    async def conectar(usuario: UsuarioSimulado) -> None:
+        async with limite:
+            try:
+                await usuario.conectar()
+            except (OSError, asyncio.TimeoutError, ErrorProtocolo, ValueError) as e:
+                metricas.errores[f"conectar:{type(e).__name__}"] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(conectar(u) for u in usuarios))
+    metricas.latencias["preparacion"].agregar(time.perf_counter() - inicio)
+    conectados = [u for u in usuarios if u.conectado]
+    metricas.contadores["conectados"] += len(conectados)
+    # Un archivo por proceso para que haya algo que descargar desde el principio
+    if conectados and args.mezcla.get("descarga"):
+        await conectados[0]._medir("subida", conectados[0].subir)
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, barrera.wait)
+    fin = time.monotonic() + args.duracion
+    # Solo cuentan las entregas y operaciones de la prueba
+    metricas.latencias.pop("entrega", None)
+    metricas.contadores["entregas"] = 0
+    for clave in ("subida", "bytes_subidos"):
+        metricas.contadores.pop(clave, None)
+    metricas.latencias.pop("subida", None)
+    await asyncio.gather(*(u.ejecutar(fin) for u in conectados))
+    await asyncio.sleep(ESPERA_FINAL_S)
+    await asyncio.gather(*(u.cerrar() for u in usuarios))
+    return metricas
+
+
+def _proceso(indice: int, nombres: List[str], args: argparse.Namespace, barrera: Any, cola: Any) -> None:
+    cola.put(asyncio.run(_trabajar(indice, nombres, args, barrera)))
+
+
+def _servidor(directorio: str, tuberia: Any) -> None:
+    """Servidor de referencia en este proceso; al recibir algo por la tubería, devuelve sus estadísticas."""
+    from servidor_referencia import ServidorReferencia, servir
+
+    async def principal() -> None:
+        servidor = ServidorReferencia(Path(directorio), iteraciones_pbkdf2=1000)
+        srv = await servir(servidor, "127.0.0.1", 0)
+        tuberia.send(srv.sockets[0].getsockname()[1])
+        await asyncio.get_running_loop().run_in_executor(None, tuberia.recv)
+        tuberia.send(servidor.estadisticas())
+
+    asyncio.run(principal())
+
+
+def _subir_limite_archivos() -> None:
+    """Sube el límite de descriptores abiertos al máximo permitido (una conexión por usuario)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    blando, duro = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if duro == resource.RLIM_INFINITY or duro > blando:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (duro if duro != resource.RLIM_INFINITY else 65536, duro))
+
+
+def _version() -> Optional[str]:
+    """Commit del repositorio, para comparar informes entre versiones."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, cwd=RAIZ, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _mezcla(texto: str) -> Dict[str, float]:
+    mezcla = {}
+    for parte in filter(None, texto.split(",")):
+        nombre, _, peso = parte.partition("=")
+        if nombre.strip() not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"Operación desconocida: {nombre} (válidas: {', '.join(OPERACIONES)})")
+        mezcla[nombre.strip()] = float(peso or 1)
+    return mezcla
+
+
+def aplanar(datos: Any, prefijo: str = "") -> List[Tuple[str, Any]]:
+    """Convierte el informe en filas (métrica, valor) con claves separadas por puntos."""
+    if isinstance(datos, dict):
+        filas = []
+        for clave, valor in datos.items():
+            filas.extend(aplanar(valor, f"{prefijo}.{clave}" if prefijo else str(clave)))
+        return filas
+    return [(prefijo, datos)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simula muchos usuarios de IcoChat y mide latencias y errores.")
+    parser.add_argument("--usuarios", type=int, default=200, help="Usuarios simulados.")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos de la prueba (sin contar la preparación).")
+    parser.add_argument("--mensajes-s", type=float, default=0.5, help="Mensajes por segundo de cada usuario (media).")
+    parser.add_argument("--tamano-mensaje", type=int, default=80, help="Bytes aproximados de cada mensaje.")
+    parser.add_argument("--operaciones-s", type=float, default=0.02,
+                        help="Operaciones de archivos por segundo de cada usuario (media).")
+    parser.add_argument("--mezcla", type=_mezcla, default=_mezcla("lista=6,descarga=3,subida=1"),
+                        help="Pesos de cada operación de archivos, p. ej. lista=6,descarga=3,subida=1.")
+    parser.add_argument("--tamano-archivo-kb", type=int, default=256, help="Tamaño de los archivos subidos.")
+    parser.add_argument("--procesos", type=int, default=max(1, min(4, (os.cpu_count() or 1))),
+                        help="Procesos entre los que se reparten los usuarios.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, help="Servidor a medir. Sin él se arranca el servidor de referencia.")
+    parser.add_argument("--sin-sesion", action="store_true", help="No iniciar sesión antes de presentarse.")
+    parser.add_argument("--timeout", type=float, default=30, help="Segundos máximos de espera de cada respuesta.")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="Guardar el informe en este archivo JSON.")
+    parser.add_argument("--csv", type=Path, help="Guardar el informe en este archivo CSV (métrica,valor).")
+    args = parser.parse_args()
+
+    _subir_limite_archivos()
+    servidor: Optional[multiprocessing.Process] = None
+    tuberia = None
+    temporal = None
+    if args.puerto is None:
+        temporal = tempfile.TemporaryDirectory(prefix="icochat_carga_")
+        tuberia, extremo = multiprocessing.Pipe()
+        servidor = multiprocessing.Process(target=_servidor, args=(temporal.name, extremo), daemon=True)
+        servidor.start()
+        args.puerto = tuberia.recv()
+
+    procesos = max(1, min(args.procesos, args.usuarios))
+    barrera = multiprocessing.Barrier(procesos + 1)
+    cola: Any = multiprocessing.Queue()
+    nombres = [f"carga{i}" for i in range(args.usuarios)]
+    trabajadores = [
+        multiprocessing.Process(target=_proceso, args=(i, nombres[i::procesos], args, barrera, cola), daemon=True)
+        for i in range(procesos)
+    ]
+    for trabajador in trabajadores:
+        trabajador.start()
+    print(f"Conectando {args.usuarios} usuarios en {procesos} procesos contra {args.host}:{args.puerto}...")
+    barrera.wait()
+    inicio = time.monotonic()
+    print(f"Prueba de {args.duracion:g} s en curso...")
+    metricas = Metricas()
+    for _ in trabajadores:
+        metricas.fusionar(cola.get())
+    for trabajador in trabajadores:
+        trabajador.join(timeout=10)
+    duracion = min(args.duracion, time.monotonic() - inicio)
+
+    estadisticas_servidor = None
+    if servidor is not None:
+        tuberia.send("fin")
+        estadisticas_servidor = tuberia.recv()
+        servidor.join(timeout=5)
+        temporal.cleanup()
+
+    contadores = metricas.contadores
+    conectados = contadores["conectados"]
+    esperadas = contadores["mensajes"] * max(0, conectados - 1)
+    resultados = {
+        "version": _version(),
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "parametros": {
+            "usuarios": args.usuarios, "duracion_s": args.duracion, "mensajes_s": args.mensajes_s,
+            "tamano_mensaje": args.tamano_mensaje, "operaciones_s": args.operaciones_s, "mezcla": args.mezcla,
+            "tamano_archivo_kb": args.tamano_archivo_kb, "procesos": procesos, "sesion": not args.sin_sesion,
+            "servidor": "referencia" if servidor is not None else f"{args.host}:{args.puerto}",
+        },
+        "conectados": conectados,
+        "desconexiones": contadores["desconexiones"],
+        "rendimiento": {
+            "mensajes_s": round(contadores["mensajes"] / duracion, 1),
+            "entregas_s": round(contadores["entregas"] / duracion, 1),
+            "operaciones_s": round(sum(contadores[n] for n in OPERACIONES) / duracion, 2),
+            "mb_subidos_s": round(contadores["bytes_subidos"] / duracion / 2 ** 20, 2),
+            "mb_descargados_s": round(contadores["bytes_descargados"] / duracion / 2 ** 20, 2),
+        },
+        "entregas": {
+            "mensajes": contadores["mensajes"],
+            "esperadas": esperadas,
+            "recibidas": contadores["entregas"],
+            "perdidas_pct": round(100 * (1 - contadores["entregas"] / esperadas), 3) if esperadas else 0.0,
+        },
+        "operaciones": {nombre: contadores[nombre] for nombre in OPERACIONES},
+        "latencias": {nombre: h.resumen() for nombre, h in sorted(metricas.latencias.items())},
+        "errores": dict(metricas.errores),
+        "tasa_errores_pct": round(
+            100 * sum(metricas.errores.values())
+            / max(1, contadores["mensajes"] + sum(contadores[n] for n in OPERACIONES) + sum(metricas.errores.values())),
+            3
+        ),
+        "servidor": estadisticas_servidor,
+    }
+
+    print(f"\n{conectados} conectados, {contadores['desconexiones']} desconexiones")
+    print(" ".join(f"{clave}={valor}" for clave, valor in resultados["rendimiento"].items()))
+    print(" ".join(f"{clave}={valor}" for clave, valor in resultados["entregas"].items()))
+    print(f"\n{'latencia':<12}{'n':>9}{'media ms':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'p99.9 ms':>10}{'máx ms':>9}")
+    for nombre, r in resultados["latencias"].items():
+        print(
+            f"{nombre:<12}{r['n']:>9}{r['media_ms']:>10}{r['p50_ms']:>9}{r['p90_ms']:>9}"
+            f"{r['p99_ms']:>9}{r['p999_ms']:>10}{r['max_ms']:>9}"
+        )
+    print(f"\nerrores: {resultados['errores'] or 'ninguno'} ({resultados['tasa_errores_pct']} %)")
+    if args.json:
+        args.json.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.csv:
+        with args.csv.open("w", newline="", encoding="utf-8") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(["metrica", "valor"])
+            escritor.writerows(aplanar(resultados))
+
+
+if __name__ == "__main__":
+    main()
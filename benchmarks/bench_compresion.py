@@ -0,0 +1,177 @@
+# benchmarks/bench_compresion.py
+"""
+Benchmark de la compresión de frames: bytes ahorrados frente a coste de CPU.
+
+Para varios tipos de contenido (registros de texto, CSV, mensajes de chat en
+JSON, datos aleatorios y datos ya comprimidos) comprime bloques del tamaño
+de los de las subidas con zlib y lzma a varios niveles y mide la fracción
+resultante, los bytes ahorrados y la velocidad de compresión y
+descompresión. También indica qué decide compresion.es_comprimible para cada
+tipo, es decir, si el cliente llegaría a comprimirlo.
+
+Uso:
+    python benchmarks/bench_compresion.py [--tamano-mb 8] [--repeticiones 3] [--json resultados.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scr"))
+
+from cliente_async import TAMANO_BLOQUE_SUBIDA  # noqa: E402
+from compresion import NIVELES, comprimir, descomprimir, entropia, es_comprimible  # noqa: E402
+
+# (algoritmo, nivel) que se comparan; los niveles por defecto del cliente están en NIVELES
+CONFIGURACIONES = [("zlib", 1), ("zlib", 6), ("zlib", 9), ("lzma", 0), ("lzma", 1), ("lzma", 6)]
+
+
+def generar_log(tamano: int, azar: random.Random) -> bytes:
+    niveles = ("INFO", "DEBUG", "WARNING", "ERROR")
+    lineas = []
+    total = 0
+    while total < tamano:
+        linea = (
+            f"2024-05-{azar.randint(1, 28):02d} {azar.randint(0, 23):02d}:{azar.randint(0, 59):02d}:"
+            f"{azar.randint(0, 59):02d} - {azar.choice(niveles)} - Transferencia {azar.getrandbits(32):08x} "
+            f"en el canal {azar.randint(1, 500)}: {azar.randint(0, 1 << 24)} bytes\n"
+        )
+        lineas.append(linea)
+        total += len(linea)
+    return "".join(lineas).encode()[:tamano]
+
+
+def generar_csv(tamano: int, azar: random.Random) -> bytes:
+    filas = ["id,usuario,archivo,tamano,fecha\n"]
+    total = len(filas[0])
+    while total < tamano:
+        fila = (
+            f"{len(filas)},usuario{azar.randint(1, 200)},documento_{azar.randint(1, 5000)}.pdf,"
+            f"{azar.randint(1000, 1 << 30)},{azar.uniform(1.6e9, 1.8e9):.3f}\n"
+        )
+        filas.append(fila)
+        total += len(fila)
+    return "".join(filas).encode()[:tamano]
+
+
+def generar_chat(tamano: int, azar: random.Random) -> bytes:
+    palabras = "hola qué tal el archivo ya está subido mañana reunión enviar revisar gracias vale".split()
+    mensajes = []
+    total = 0
+    while total < tamano:
+        mensaje = json.dumps({
+            "usuario": f"usuario{azar.randint(1, 50)}",
+            "texto": " ".join(azar.choice(palabras) for _ in range(azar.randint(3, 30))),
+            "fecha": round(azar.uniform(1.6e9, 1.8e9), 3),
+        }, ensure_ascii=False) + "\n"
+        mensajes.append(mensaje)
+        total += len(mensaje)
+    return "".join(mensajes).encode()[:tamano]
+
+
+def generar_aleatorio(tamano: int, azar: random.Random) -> bytes:
+    return os.urandom(tamano)
+
+
+def generar_comprimido(tamano: int, azar: random.Random) -> bytes:
+    # Un registro comprimido ocupa menos que el original: se genera de sobra
+    datos = b""
+    while len(datos) < tamano:
+        datos += zlib.compress(generar_log(tamano, azar), 9)
+    return datos[:tamano]
+
+
+CONTENIDOS: Dict[str, Tuple[str, Callable[[int, random.Random], bytes]]] = {
+    "registro": (".log", generar_log),
+    "csv": (".csv", generar_csv),
+    "chat_json": (".json", generar_chat),
+    "aleatorio": (".bin", generar_aleatorio),
+    "comprimido": (".bin", generar_comprimido),
+}
+
+
+def medir(datos: bytes, algoritmo: str, nivel: int, repeticiones: int) -> Dict[str, float]:
+    """Comprime y descomprime `datos` por bloques de subida y resume los resultados."""
+    bloques = [datos[i:i + TAMANO_BLOQUE_SUBIDA] for i in range(0, len(datos), TAMANO_BLOQUE_SUBIDA)]
+    t_compresion: List[float] = []
+    t_descompresion: List[float] = []
+    enviados = 0
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultados = [comprimir(bloque, algoritmo, nivel) for bloque in bloques]
+        t_compresion.append(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        for resultado in resultados:
+            if resultado:
+                descomprimir(*resultado)
+        t_descompresion.append(time.perf_counter() - inicio)
+        # Los bloques que no compensa comprimir se envían tal cual
+        enviados = sum(len(r[0]) if r else len(b) for r, b in zip(resultados, bloques))
+    mb = len(datos) / (1024 * 1024)
+    compresion = statistics.median(t_compresion)
+    descompresion = statistics.median(t_descompresion)
+    return {
+        "fraccion": round(enviados / len(datos), 3),
+        "bytes_ahorrados": len(datos) - enviados,
+        "bloques_comprimidos": sum(1 for r in resultados if r),
+        "compresion_mb_s": round(mb / compresion, 1),
+        "descompresion_mb_s": round(mb / descompresion, 1) if any(resultados) else None,
+        # Segundos de CPU por MiB ahorrado: lo que cuesta cada MiB que no viaja
+        "s_cpu_por_mb_ahorrado": round(compresion / ((len(datos) - enviados) / (1024 * 1024)), 4)
+        if enviados < len(datos) else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ahorro y coste de CPU de la compresión de frames.")
+    parser.add_argument("--tamano-mb", type=int, default=8, help="MiB de cada tipo de contenido.")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones por configuración.")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="Guardar los resultados en este archivo JSON.")
+    args = parser.parse_args()
+
+    tamano = args.tamano_mb * 1024 * 1024
+    azar = random.Random(args.semilla)
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="icochat_bench_") as tmp:
+        for contenido, (extension, generar) in CONTENIDOS.items():
+            datos = generar(tamano, azar)
+            ruta = Path(tmp) / f"{contenido}{extension}"
+            ruta.write_bytes(datos)
+            comprimible = es_comprimible(ruta)
+            bits = round(entropia(datos[:64 * 1024]), 2)
+            for algoritmo, nivel in CONFIGURACIONES:
+                resultados.append({
+                    "contenido": contenido,
+                    "entropia": bits,
+                    "es_comprimible": comprimible,
+                    "algoritmo": algoritmo,
+                    "nivel": nivel,
+                    "por_defecto": NIVELES[algoritmo] == nivel,
+                    **medir(datos, algoritmo, nivel, args.repeticiones),
+                })
+
+    print(f"{'contenido':<12}{'entropía':>9}{'comprime':>9}  {'algoritmo':<9}{'fracción':>9}"
+          f"{'MiB ahorr.':>11}{'comp MiB/s':>11}{'desc MiB/s':>11}")
+    for r in resultados:
+        marca = "*" if r["por_defecto"] else " "
+        print(
+            f"{r['contenido']:<12}{r['entropia']:>9}{'sí' if r['es_comprimible'] else 'no':>9}  "
+            f"{r['algoritmo'] + '-' + str(r['nivel']) + marca:<9}{r['fraccion']:>9}"
+            f"{r['bytes_ahorrados'] / (1024 * 1024):>11.1f}{r['compresion_mb_s']:>11}{r['descompresion_mb_s'] or '-':>11}"
+        )
+    print("* nivel que usa el cliente")
+    if args.json:
+        args.json.write_text(json.dumps(resultados, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+# benchmarks/bench_interfaz.py
+"""
+Benchmark de la interfaz del chat (ChatUI) con muchos mensajes.
+
+Para cada tamaño (1k, 10k y 100k mensajes por defecto) se crea una ChatUI
+real en un proceso nuevo y se mide:
+  - actualizar_chat: lo que cuesta añadir cada mensaje uno a uno, como
+    llegan del servidor, incluido el render que Tk hace al quedar ocioso;
+  - actualizar_chat_varios: los mismos mensajes de una vez;
+  - la memoria residente del proceso por mensaje mostrado;
+  - el scroll: _can_scroll y el manejador de la rueda del ratón del sistema
+    (cada paso incluye el render de las filas que entran en la vista), y
+    saltos a posiciones al azar, como al arrastrar la scrollbar;
+  - el reflujo al redimensionar la ventana;
+  - load_chat_history con un historial en disco de ese tamaño, y las páginas
+    anteriores que se cargan al desplazarse hasta arriba (load_older_messages).
+
+Las ventanas se abren en un servidor X virtual (Xvfb) que se arranca y se
+cierra aquí; con --display se usa uno ya abierto. El historial de cada
+prueba va en una carpeta temporal. La memoria es la del proceso cliente:
+los píxeles que guarda el servidor X no se cuentan.
+
+Uso:
+    python benchmarks/bench_interfaz.py [--tamanos 1000,10000,100000] [--pasos-rueda 200] [--json resultados.json]
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+RAIZ = Path(__file__).resolve().parent.parent
+SCR = RAIZ / "scr"
+
+# Tamaño de la pantalla virtual (ChatUI ocupa el 80 %)
+PANTALLA = "1920x1080"
+
+# Tamaños de ventana entre los que se alterna al medir el reflujo
+TAMANOS_VENTANA = ("1280x720", "800x600", "1536x864")
+
+# Mensajes de ejemplo: cortos, de varias líneas y uno largo que se parte en líneas
+TEXTOS = (
+    "hola",
+    "¿Alguien ha subido ya el informe de esta semana?",
+    "Sí, está en la carpeta compartida.\nLo revisé anoche.",
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut "
+    "aliquip ex ea commodo consequat.",
+)
+REMITENTES = ("Tú", "ana", "luis", "marta")
+
+
+def mensaje_de_prueba(i: int) -> str:
+    """Mensaje i-ésimo en el formato "Remitente: contenido" de actualizar_chat."""
+    return f"{REMITENTES[i % len(REMITENTES)]}: {i} {TEXTOS[i % len(TEXTOS)]}"
+
+
+def _rss() -> int:
+    """Memoria residente del proceso en bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        # Fuera de Linux solo está el máximo; sirve porque la memoria solo crece durante la prueba
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo if sys.platform == "darwin" else maximo * 1024
+
+
+def _resumen(tiempos: List[float]) -> Dict[str, float]:
+    """Total y percentiles, en milisegundos, de una lista de duraciones en segundos."""
+    ordenados = sorted(tiempos)
+
+    def percentil(p: float) -> float:
+        return round(ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))] * 1000, 3)
+
+    return {
+        "n": len(tiempos),
+        "total_ms": round(sum(tiempos) * 1000, 1),
+        "media_ms": round(statistics.fmean(tiempos) * 1000, 3),
+        "p50_ms": percentil(0.50),
+        "p99_ms": percentil(0.99),
+        "max_ms": round(ordenados[-1] * 1000, 3),
+    }
+
+
+def _cronometrar(funcion: Any, *args: Any) -> float:
+    inicio = time.perf_counter()
+    funcion(*args)
+    return time.perf_counter() - inicio
+
+
+def _evento_rueda(arriba: bool) -> SimpleNamespace:
+    """Evento de la rueda como lo recibe el manejador del sistema (ver ChatUI.vincular_eventos_mouse)."""
+    if platform.system() == "Windows":
+        return SimpleNamespace(delta=120 if arriba else -120)
+    if platform.system() == "Darwin":
+        return SimpleNamespace(delta=1 if arriba else -1)
+    return SimpleNamespace(num=4 if arriba else 5)
+
+
+def _manejador_rueda(app: Any) -> Any:
+    sistema = platform.system()
+    if sistema == "Windows":
+        return app._on_mousewheel_windows
+    if sistema == "Darwin":
+        return app._on_mousewheel_mac
+    return app._on_mousewheel_linux
+
+
+def _abrir_chat(IcoChat: Any) -> Any:
+    """Crea la ventana del chat como run_chat, sin conectar, y espera a que se dibuje."""
+    import tkinter as tk
+    root = tk.Tk()
+    app = IcoChat.ChatUI(root)
+    IcoChat.root, IcoChat.app = root, app
+    root.update()
+    return app
+
+
+def medir_mensajes(n: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """Añade n mensajes a una ChatUI y mide memoria, scroll y reflujo."""
+    import IcoChat
+
+    app = _abrir_chat(IcoChat)
+    root = app.root
+    mensajes = [mensaje_de_prueba(i) for i in range(n)]
+    rss_inicial = _rss()
+
+    # Uno a uno, dejando que Tk procese el render pendiente tras cada uno (como en el bucle de eventos)
+    tiempos = []
+    for mensaje in mensajes:
+        inicio = time.perf_counter()
+        app.actualizar_chat(mensaje)
+        root.update_idletasks()
+        tiempos.append(time.perf_counter() - inicio)
+    root.update()
+    rss_final = _rss()
+    resultado: Dict[str, Any] = {
+        "actualizar_chat": _resumen(tiempos),
+        "rss_inicial_mb": round(rss_inicial / 2 ** 20, 1),
+        "rss_final_mb": round(rss_final / 2 ** 20, 1),
+        "bytes_por_mensaje": round((rss_final - rss_inicial) / n, 1),
+        "filas_con_widgets": len(app.vista_mensajes._filas_montadas) + len(app.vista_mensajes._pool),
+    }
+
+    # _can_scroll se llama en cada paso de la rueda y tras cada mensaje
+    resultado["can_scroll"] = _resumen([_cronometrar(app._can_scroll) for _ in range(args.pasos_rueda)])
+
+    # Rueda del ratón desde el final hacia arriba y de vuelta, con el render de cada paso
+    manejador = _manejador_rueda(app)
+    tiempos = []
+    for arriba in (True, False):
+        evento = _evento_rueda(arriba)
+        for _ in range(args.pasos_rueda):
+            inicio = time.perf_counter()
+            manejador(evento)
+            root.update_idletasks()
+            tiempos.append(time.perf_counter() - inicio)
+    resultado["rueda"] = _resumen(tiempos)
+
+    # Saltos a cualquier punto, como al arrastrar la scrollbar (sin llegar arriba del
+    # todo, donde se pediría la página anterior del historial)
+    azar = random.Random(n)
+    tiempos = []
+    for _ in range(args.saltos):
+        inicio = time.perf_counter()
+        app.canvas_mensajes.yview_moveto(azar.uniform(0.01, 1.0))
+        root.update_idletasks()
+        tiempos.append(time.perf_counter() - inicio)
+    resultado["salto_scroll"] = _resumen(tiempos)
+
+    # Reflujo al redimensionar: geometría nueva, <Configure> y render
+    app.vista_mensajes.ir_al_final()
+    tiempos = []
+    for i in range(args.redimensiones):
+        inicio = time.perf_counter()
+        root.geometry(TAMANOS_VENTANA[i % len(TAMANOS_VENTANA)])
+        root.update()
+        tiempos.append(time.perf_counter() - inicio)
+    resultado["redimensionar"] = _resumen(tiempos)
+    root.destroy()
+
+    # Los mismos mensajes de una vez, en una ventana nueva
+    app = _abrir_chat(IcoChat)
+    inicio = time.perf_counter()
+    app.actualizar_chat_varios(mensajes)
+    app.root.update()
+    resultado["actualizar_chat_varios_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    app.root.destroy()
+    return resultado
+
+
+def medir_historial(n: int, args: argparse.Namespace, directorio: Path) -> Dict[str, Any]:
+    """Carga una ChatUI desde un historial de n mensajes y recorre sus páginas anteriores."""
+    import IcoChat
+    from historial import HistorialChat
+
+    historial = HistorialChat(directorio / "historial")
+    for i in range(n):
+        # Como save_message: los propios sin remitente, los de otros con él
+        mensaje = mensaje_de_prueba(i)
+        if mensaje.startswith("Tú: "):
+            historial.agregar(mensaje[len("Tú: "):], "self")
+        else:
+            historial.agregar(mensaje, "other")
+    historial.flush()
+    IcoChat.historial, IcoChat.historial_cursor = historial, None
+
+    app = _abrir_chat(IcoChat)
+    inicio = time.perf_counter()
+    IcoChat.load_chat_history()
+    app.root.update()
+    resultado: Dict[str, Any] = {"load_chat_history_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+
+    # Páginas anteriores, como al llegar arriba una y otra vez
+    tiempos = []
+    while len(tiempos) < args.paginas_antiguas and IcoChat.historial_cursor not in (None, 1):
+        inicio = time.perf_counter()
+        IcoChat.load_older_messages()
+        app.root.update_idletasks()
+        tiempos.append(time.perf_counter() - inicio)
+    if tiempos:
+        resultado["load_older_messages"] = _resumen(tiempos)
+    resultado["mensajes_cargados"] = len(app.vista_mensajes.mensajes)
+    app.root.destroy()
+    historial.cerrar()
+    return resultado
+
+
+def _proceso(n: int, args: argparse.Namespace, cola: Any) -> None:
+    """Mide un tamaño en un proceso nuevo, para que la memoria y Tk empiecen de cero."""
+    sys.path.insert(0, str(SCR))
+    directorio = Path(tempfile.mkdtemp(prefix="icochat_interfaz_"))
+    try:
+        cola.put({"mensajes": n, **medir_mensajes(n, args), **medir_historial(n, args, directorio)})
+    except Exception as e:
+        cola.put({"mensajes": n, "error": f"{type(e).__name__}: {e}"})
+        raise
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def iniciar_xvfb(pantalla: str) -> "tuple[subprocess.Popen, str]":
+    """
+    Arranca Xvfb en el primer display libre.
+
+    Returns:
+        tuple[subprocess.Popen, str]: El proceso y el valor de DISPLAY.
+    """
+    if not shutil.which("Xvfb"):
+        raise SystemExit("No se encontró Xvfb (paquete xvfb); instálalo o usa --display con un servidor X abierto.")
+    lectura, escritura = os.pipe()
+    proceso = subprocess.Popen(
+        ["Xvfb", "-displayfd", str(escritura), "-screen", "0", f"{pantalla}x24", "-nolisten", "tcp"],
+        pass_fds=(escritura,), stderr=subprocess.DEVNULL
+    )
+    os.close(escritura)
+    # Xvfb escribe el número de display cuando está listo para aceptar conexiones
+    with os.fdopen(lectura) as f:
+        numero = f.readline().strip()
+    if not numero:
+        proceso.kill()
+        raise SystemExit("Xvfb no arrancó.")
+    return proceso, f":{numero}"
+
+
+def _version() -> Optional[str]:
+    """Commit del repositorio, para comparar informes entre versiones."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, cwd=RAIZ, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tiempos de render, scroll y memoria de ChatUI con muchos mensajes.")
+    parser.add_argument("--tamanos", default="1000,10000,100000", help="Número de mensajes de cada prueba.")
+    parser.add_argument("--pasos-rueda", type=int, default=200, help="Pasos de la rueda en cada sentido.")
+    parser.add_argument("--saltos", type=int, default=100, help="Saltos de scroll a posiciones al azar.")
+    parser.add_argument("--redimensiones", type=int, default=12, help="Cambios de tamaño de la ventana.")
+    parser.add_argument("--paginas-antiguas", type=int, default=50,
+                        help="Páginas anteriores del historial que se cargan como máximo.")
+    parser.add_argument("--display", help="Servidor X a usar (p. ej. :0). Sin él se arranca Xvfb.")
+    parser.add_argument("--pantalla", default=PANTALLA, help="Resolución de la pantalla de Xvfb.")
+    parser.add_argument("--json", type=Path, help="Guardar los resultados en este archivo JSON.")
+    args = parser.parse_args()
+    tamanos = [int(t) for t in args.tamanos.split(",") if t.strip()]
+
+    xvfb = None
+    if args.display:
+        os.environ["DISPLAY"] = args.display
+    else:
+        xvfb, os.environ["DISPLAY"] = iniciar_xvfb(args.pantalla)
+    contexto = multiprocessing.get_context("spawn")
+    resultados: List[Dict[str, Any]] = []
+    try:
+        for n in tamanos:
+            print(f"Midiendo {n} mensajes...", flush=True)
+            cola = contexto.Queue()
+            proceso = contexto.Process(target=_proceso, args=(n, args, cola))
+            proceso.start()
+            resultados.append(cola.get())
+            proceso.join()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    print(
+        f"\n{'mensajes':>9}{'añadir p50':>11}{'p99 ms':>8}{'lote ms':>9}{'B/msg':>8}{'rueda p99':>10}"
+        f"{'salto p99':>10}{'resize p99':>11}{'historial':>10}{'pág. p99':>9}"
+    )
+    for r in resultados:
+        if "error" in r:
+            print(f"{r['mensajes']:>9}  error: {r['error']}")
+            continue
+        paginas = r.get("load_older_messages", {}).get("p99_ms", "-")
+        print(
+            f"{r['mensajes']:>9}{r['actualizar_chat']['p50_ms']:>11}{r['actualizar_chat']['p99_ms']:>8}"
+            f"{r['actualizar_chat_varios_ms']:>9}{r['bytes_por_mensaje']:>8}{r['rueda']['p99_ms']:>10}"
+            f"{r['salto_scroll']['p99_ms']:>10}{r['redimensionar']['p99_ms']:>11}"
+            f"{r['load_chat_history_ms']:>10}{paginas:>9}"
+        )
+    if args.json:
+        informe = {
+            "version": _version(),
+            "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+            "plataforma": platform.platform(),
+            "display": "xvfb" if xvfb is not None else args.display,
+            "resultados": resultados,
+        }
+        args.json.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# benchmarks/bench_latencia_chat.py
+"""
+Benchmark de la latencia del chat mientras una subida satura el enlace.
+
+Un receptor local, en otro proceso, lee de la conexión a una velocidad
+limitada (simula un enlace lento: el resto se acumula en los búferes del
+emisor), responde a la subida como el servidor y anota cuánto tarda en
+llegarle cada mensaje de chat. El cliente sube un archivo y, mientras tanto,
+envía un mensaje cada pocos milisegundos con la hora de envío.
+
+Se comparan bloques fijos de 1 MiB sin límite del búfer del núcleo (como
+antes), bloques fijos con el límite, y bloques ajustados a la velocidad con
+el límite (el comportamiento por defecto de ClienteAsync).
+
+Uso:
+    python benchmarks/bench_latencia_chat.py [--tamano-mb 32] [--mb-s 8] [--json resultados.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scr"))
+
+from cliente_async import ClienteAsync  # noqa: E402
+from protocolo import DecodificadorFrames, TipoFrame, codificar_control  # noqa: E402
+
+# Cada cuánto envía el cliente un mensaje de chat durante la subida (segundos)
+INTERVALO_MENSAJES_S = 0.02
+
+# Búfer de recepción del receptor: pequeño, para que el enlace lento se note enseguida
+BUFER_RECEPCION = 64 * 1024
+
+# Valor de TCP_NOTSENT_LOWAT que equivale a no tener límite
+SIN_LIMITE = 2 ** 31 - 1
+
+
+def _servir(bytes_por_segundo: float, tuberia) -> None:
+    servidor = socket.create_server(("127.0.0.1", 0))
+    servidor.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFER_RECEPCION)
+    tuberia.send(servidor.getsockname()[1])
+    conexion, _ = servidor.accept()
+    decodificador = DecodificadorFrames()
+    recibidos = [0]
+    latencias: List[float] = []
+
+    def contar(trozo: memoryview, restante: int, flags: int) -> None:
+        recibidos[0] += len(trozo)
+
+    inicio = time.monotonic()
+    leidos = 0
+    terminado = False
+    with conexion:
+        while not terminado:
+            # Leer como mucho lo que permite la velocidad del "enlace"
+            espera = leidos / bytes_por_segundo - (time.monotonic() - inicio)
+            if espera > 0:
+                time.sleep(espera)
+            with decodificador.obtener_buffer() as buffer:
+                n = conexion.recv_into(buffer, min(len(buffer), BUFER_RECEPCION // 4))
+            if not n:
+                break
+            leidos += n
+            for frame in decodificador.confirmar(n):
+                if frame.tipo == TipoFrame.TEXTO:
+                    latencias.append(time.monotonic() - float(frame.texto().split("=", 1)[1]))
+                elif frame.tipo == TipoFrame.CONTROL and frame.texto().startswith("SUBIDA:"):
+                    decodificador.sumideros[frame.canal] = contar
+                    conexion.sendall(codificar_control("DESDE:0", frame.canal))
+                elif frame.tipo == TipoFrame.DATOS and not frame.payload:
+                    conexion.sendall(codificar_control(f"COMPLETO:{recibidos[0]}", frame.canal))
+                    terminado = True
+    tuberia.send((latencias, recibidos[0], time.monotonic() - inicio))
+
+
+def crear_archivo(tamano_mb: int) -> Path:
+    """Crea un archivo temporal de datos aleatorios."""
+    descriptor, nombre = tempfile.mkstemp(prefix="icochat_bench_")
+    with os.fdopen(descriptor, "wb") as f:
+        for _ in range(tamano_mb):
+            f.write(os.urandom(1024 * 1024))
+    return Path(nombre)
+
+
+def medir(nombre: str, ruta: Path, bytes_por_segundo: float, adaptativos: bool, limitar: bool) -> Dict[str, float]:
+    """Sube `ruta` enviando mensajes de chat a la vez y resume sus latencias."""
+    tuberia, extremo = multiprocessing.Pipe()
+    receptor = multiprocessing.Process(target=_servir, args=(bytes_por_segundo, extremo), daemon=True)
+    receptor.start()
+    puerto = tuberia.recv()
+    cliente = ClienteAsync(
+        "127.0.0.1", puerto, lambda frame: None, compresion=(), bloques_adaptativos=adaptativos
+    )
+    try:
+        cliente.ejecutar(cliente.connect("benchmark")).result()
+        if not limitar and hasattr(socket, "TCP_NOTSENT_LOWAT"):
+            cliente._transporte.get_extra_info("socket").setsockopt(
+                socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, SIN_LIMITE
+            )
+        subida = cliente.ejecutar(cliente.upload(ruta))
+        while not subida.done():
+            try:
+                cliente.ejecutar(cliente.send_text(f"t={time.monotonic()}")).result()
+            except ConnectionError:
+                break  # El receptor cierra al terminar la subida
+            time.sleep(INTERVALO_MENSAJES_S)
+        subida.result()
+        latencias, recibidos, segundos = tuberia.recv()
+    finally:
+        cliente.cerrar()
+        receptor.join(timeout=5)
+    latencias_ms = sorted(latencia * 1000 for latencia in latencias)
+    percentil = lambda p: round(latencias_ms[min(len(latencias_ms) - 1, int(p * len(latencias_ms)))], 1)  # noqa: E731
+    return {
+        "metodo": nombre,
+        "mensajes": len(latencias_ms),
+        "latencia_ms_mediana": round(statistics.median(latencias_ms), 1),
+        "latencia_ms_p95": percentil(0.95),
+        "latencia_ms_p99": percentil(0.99),
+        "latencia_ms_max": round(latencias_ms[-1], 1),
+        "mb_por_segundo": round(recibidos / (1024 * 1024) / segundos, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latencia del chat durante una subida por un enlace lento.")
+    parser.add_argument("--tamano-mb", type=int, default=32, help="Tamaño del archivo de prueba en MiB.")
+    parser.add_argument("--mb-s", type=float, default=8, help="Velocidad del enlace simulado en MiB/s.")
+    parser.add_argument("--json", type=Path, help="Guardar los resultados en este archivo JSON.")
+    args = parser.parse_args()
+
+    bytes_por_segundo = args.mb_s * 1024 * 1024
+    ruta = crear_archivo(args.tamano_mb)
+    try:
+        resultados = [
+            medir("bloques_1mib", ruta, bytes_por_segundo, adaptativos=False, limitar=False),
+            medir("bloques_1mib_limite", ruta, bytes_por_segundo, adaptativos=False, limitar=True),
+            medir("adaptativo_limite", ruta, bytes_por_segundo, adaptativos=True, limitar=True),
+        ]
+    finally:
+        ruta.unlink()
+
+    print(f"{'método':<22}{'mensajes':>9}{'mediana ms':>12}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}{'MiB/s':>8}")
+    for r in resultados:
+        print(
+            f"{r['metodo']:<22}{r['mensajes']:>9}{r['latencia_ms_mediana']:>12}{r['latencia_ms_p95']:>9}"
+            f"{r['latencia_ms_p99']:>9}{r['latencia_ms_max']:>9}{r['mb_por_segundo']:>8}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(resultados, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# benchmarks/bench_subida.py
+"""
+Benchmark de subida de archivos contra un receptor local (loopback).
+
+Compara el bucle original (lecturas de 1024 bytes y un sendall por bloque)
+con la subida de ClienteAsync usando sendfile y usando la copia con búfer.
+El receptor descarta los bytes y se mide hasta que recibe el último. Para
+ClienteAsync el receptor decodifica los frames (sin copiar los bloques) y
+responde al saludo de la subida como lo haría el servidor.
+
+Uso:
+    python benchmarks/bench_subida.py [--tamano-mb 256] [--repeticiones 3] [--json resultados.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scr"))
+
+from cliente_async import ClienteAsync  # noqa: E402
+from protocolo import DecodificadorFrames, TipoFrame, codificar_control  # noqa: E402
+
+TAMANO_BLOQUE_ORIGINAL = 1024
+
+
+class Receptor:
+    """
+    Servidor de una sola conexión, en otro proceso para no competir por el
+    GIL con el cliente, que lee y descarta todo lo que recibe. Con
+    protocolo=True decodifica frames y responde a SUBIDA y al fin del archivo.
+    """
+
+    def __init__(self, protocolo: bool = False) -> None:
+        self._tuberia, extremo = multiprocessing.Pipe()
+        self._proceso = multiprocessing.Process(target=_servir, args=(protocolo, extremo), daemon=True)
+        self._proceso.start()
+        self.puerto = self._tuberia.recv()
+
+    def esperar(self) -> float:
+        """Espera a que termine la recepción y devuelve el instante del último byte."""
+        t_fin = self._tuberia.recv()
+        self._proceso.join()
+        return t_fin
+
+
+def _servir(protocolo: bool, tuberia) -> None:
+    servidor = socket.create_server(("127.0.0.1", 0))
+    tuberia.send(servidor.getsockname()[1])
+    conexion, _ = servidor.accept()
+    with conexion:
+        t_fin = _recibir_frames(conexion) if protocolo else _recibir(conexion)
+    servidor.close()
+    tuberia.send(t_fin)
+
+
+def _recibir(conexion: socket.socket) -> float:
+    bufer = bytearray(1024 * 1024)
+    while conexion.recv_into(bufer):
+        pass
+    return time.perf_counter()
+
+
+def _recibir_frames(conexion: socket.socket) -> float:
+    decodificador = DecodificadorFrames(1024 * 1024)
+    recibidos = [0]
+    t_fin = 0.0
+
+    def contar(trozo: memoryview, restante: int, flags: int) -> None:
+        recibidos[0] += len(trozo)
+
+    while True:
+        with decodificador.obtener_buffer() as bufer:
+            leidos = conexion.recv_into(bufer)
+        if not leidos:
+            return t_fin
+        for frame in decodificador.iterar_frames(leidos):
+            if frame.tipo == TipoFrame.CONTROL and frame.texto().startswith("SUBIDA:"):
+                decodificador.sumideros[frame.canal] = contar
+                conexion.sendall(codificar_control("DESDE:0", frame.canal))
+            elif frame.tipo == TipoFrame.DATOS and not frame.payload:
+                t_fin = time.perf_counter()
+                conexion.sendall(codificar_control(f"COMPLETO:{recibidos[0]}", frame.canal))
+
+
+def subir_bucle_original(ruta: Path) -> float:
+    """Subida como la hacía IcoChat: read(1024) + sendall por bloque."""
+    receptor = Receptor()
+    inicio = time.perf_counter()
+    with socket.create_connection(("127.0.0.1", receptor.puerto)) as sock:
+        with ruta.open("rb") as f:
+            while True:
+                bloque = f.read(TAMANO_BLOQUE_ORIGINAL)
+                if not bloque:
+                    break
+                sock.sendall(bloque)
+    return receptor.esperar() - inicio
+
+
+def subir_cliente_async(ruta: Path, usar_sendfile: bool) -> float:
+    """Subida con ClienteAsync.upload (bloques de 1 MiB con su CRC32)."""
+    receptor = Receptor(protocolo=True)
+    cliente = ClienteAsync("127.0.0.1", receptor.puerto, lambda frame: None, usar_sendfile=usar_sendfile)
+    try:
+        cliente.ejecutar(cliente.connect("benchmark")).result()
+        inicio = time.perf_counter()
+        cliente.ejecutar(cliente.upload(ruta)).result()
+    finally:
+        cliente.cerrar()
+    return receptor.esperar() - inicio
+
+
+def crear_archivo(tamano_mb: int) -> Path:
+    """Crea un archivo temporal de datos aleatorios."""
+    descriptor, nombre = tempfile.mkstemp(prefix="icochat_bench_")
+    with os.fdopen(descriptor, "wb") as f:
+        for _ in range(tamano_mb):
+            f.write(os.urandom(1024 * 1024))
+    return Path(nombre)
+
+
+def medir(nombre: str, subir: Callable[[], float], tamano_mb: int, repeticiones: int) -> Dict[str, float]:
+    """Repite una subida y resume sus tiempos."""
+    tiempos: List[float] = [subir() for _ in range(repeticiones)]
+    mediana = statistics.median(tiempos)
+    return {
+        "metodo": nombre,
+        "tamano_mb": tamano_mb,
+        "repeticiones": repeticiones,
+        "segundos_mediana": round(mediana, 4),
+        "segundos_min": round(min(tiempos), 4),
+        "mb_por_segundo": round(tamano_mb / mediana, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de subida de archivos por loopback.")
+    parser.add_argument("--tamano-mb", type=int, default=256, help="Tamaño del archivo de prueba en MiB.")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones por método.")
+    parser.add_argument("--json", type=Path, help="Guardar los resultados en este archivo JSON.")
+    args = parser.parse_args()
+
+    ruta = crear_archivo(args.tamano_mb)
+    try:
+        resultados = [
+            medir("bucle_1024", lambda: subir_bucle_original(ruta), args.tamano_mb, args.repeticiones),
+            medir("async_bufer", lambda: subir_cliente_async(ruta, False), args.tamano_mb, args.repeticiones),
+            medir("async_sendfile", lambda: subir_cliente_async(ruta, True), args.tamano_mb, args.repeticiones),
+        ]
+    finally:
+        ruta.unlink()
+
+    base = resultados[0]["mb_por_segundo"]
+    print(f"{'método':<16}{'mediana (s)':>12}{'MiB/s':>10}{'x':>8}")
+    for r in resultados:
+        print(f"{r['metodo']:<16}{r['segundos_mediana']:>12}{r['mb_por_segundo']:>10}{r['mb_por_segundo'] / base:>8.1f}")
+    if args.json:
+        args.json.write_text(json.dumps(resultados, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# herramientas/servidor_inestable.py
+"""
+Servidor local de pruebas para las transferencias reanudables.
+
+Es el servidor de referencia (herramientas/servidor_referencia.py) con
+fallos inyectados: corta conexiones al azar, tras cada lectura y cada bloque
+de descarga enviado, y opcionalmente corrompe el CRC32 de bloques de
+descarga, para comprobar que el cliente continúa cada transferencia desde el
+último bloque verificado. El protocolo es el mismo, así que todo lo demás
+(sesión, chat, lista de archivos, compresión) se comporta igual.
+
+Uso:
+    # Servidor en un puerto fijo, para apuntar el cliente a él
+    python herramientas/servidor_inestable.py --puerto 12345 --directorio /tmp/icochat_servidor
+
+    # Demostración autocontenida: sube y descarga un archivo con reintentos
+    # y comprueba que llega intacto
+    python herramientas/servidor_inestable.py --demo --tamano-mb 64 --prob-corte 0.05
+
+    # Lo mismo con un archivo de texto, que viaja comprimido
+    python herramientas/servidor_inestable.py --demo --comprimible
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scr"))
+
+from servidor_referencia import Conexion, ServidorReferencia, iniciar_en_hilo  # noqa: E402
+from protocolo import CABECERA, CABECERA_BLOQUE, FLAG_BLOQUE, ErrorProtocolo, TipoFrame  # noqa: E402
+from cliente_async import ClienteAsync  # noqa: E402
+from transferencias import RegistroTransferencias  # noqa: E402
+
+MAX_INTENTOS = 200
+
+# Posición del CRC32 en un frame de bloque: cabecera del frame, offset y CRC
+POSICION_CRC = CABECERA.size + CABECERA_BLOQUE.size - 4
+
+
+class ConexionInestable(Conexion):
+    """Conexión del servidor de referencia que se corta y corrompe bloques al azar."""
+
+    servidor: "ServidorInestable"
+
+    def buffer_updated(self, nbytes: int) -> None:
+        super().buffer_updated(nbytes)
+        self.servidor.cortar(self)
+
+    async def enviar_region(self, cabecera: bytes, archivo: BinaryIO, offset: int, cantidad: int) -> None:
+        await super().enviar_region(self.servidor.corromper(cabecera), archivo, offset, cantidad)
+        if self.servidor.cortar(self):
+            raise ConnectionError("Corte simulado")
+
+    async def enviar_frame(self, datos: bytes) -> None:
+        corrompido = self.servidor.corromper(datos)
+        await super().enviar_frame(corrompido)
+        if datos[0] == TipoFrame.DATOS and self.servidor.cortar(self):
+            raise ConnectionError("Corte simulado")
+
+
+class ServidorInestable(ServidorReferencia):
+    """Servidor de referencia que corta conexiones y corrompe bloques al azar."""
+
+    def __init__(
+        self,
+        directorio: Path,
+        prob_corte: float,
+        prob_corrupcion: float,
+        semilla: Optional[int] = None,
+        compresion: bool = True
+    ) -> None:
+        """
+        Args:
+            directorio (Path): Carpeta donde se guardan los archivos subidos.
+            prob_corte (float): Probabilidad de cortar la conexión tras cada lectura
+                y cada bloque de descarga enviado.
+            prob_corrupcion (float): Probabilidad de corromper el CRC32 de un bloque de descarga.
+            semilla (Optional[int], optional): Semilla del azar, para repetir una prueba. Defaults to None.
+            compresion (bool, optional): Aceptar la compresión que ofrezcan los clientes. Defaults to True.
+        """
+        super().__init__(directorio, compresion)
+        self.prob_corte = prob_corte
+        self.prob_corrupcion = prob_corrupcion
+        self.azar = random.Random(semilla)
+        self.cortes = 0
+        self.corrupciones = 0
+
+    def nueva_conexion(self) -> Conexion:
+        return ConexionInestable(self)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {**super().estadisticas(), "cortes": self.cortes, "bloques_corrompidos": self.corrupciones}
+
+    def cortar(self, conexion: Conexion) -> bool:
+        """Corta la conexión de golpe con probabilidad prob_corte."""
+        if conexion.transporte.is_closing() or self.azar.random() >= self.prob_corte:
+            return False
+        self.cortes += 1
+        conexion.transporte.abort()
+        return True
+
+    def corromper(self, datos: bytes) -> bytes:
+        """Con probabilidad prob_corrupcion, altera el CRC32 de un frame de bloque (o de su cabecera)."""
+        tipo, flags = datos[0], datos[1]
+        if (tipo != TipoFrame.DATOS or not flags & FLAG_BLOQUE or len(datos) < POSICION_CRC + 4
+                or self.azar.random() >= self.prob_corrupcion):
+            return datos
+        self.corrupciones += 1
+        alterado = bytearray(datos)
+        alterado[POSICION_CRC] ^= 0xFF
+        return bytes(alterado)
+
+
+def con_reintentos(puerto: int, registro: RegistroTransferencias, operacion: Callable[[ClienteAsync], Any]) -> int:
+    """Repite una transferencia, reconectando, hasta que termina. Devuelve los intentos."""
+    for intento in range(1, MAX_INTENTOS + 1):
+        cliente = ClienteAsync("127.0.0.1", puerto, lambda frame: None, registro=registro)
+        try:
+            cliente.ejecutar(cliente.connect("prueba")).result()
+            cliente.ejecutar(operacion(cliente)).result()
+            return intento
+        except (ConnectionError, ErrorProtocolo, TimeoutError, asyncio.TimeoutError) as e:
+            print(f"  intento {intento}: {type(e).__name__}: {e}")
+        finally:
+            cliente.cerrar()
+    raise RuntimeError(f"La transferencia no terminó en {MAX_INTENTOS} intentos")
+
+
+def sha256(ruta: Path) -> str:
+    resumen = hashlib.sha256()
+    with ruta.open("rb") as f:
+        while bloque := f.read(1024 * 1024):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def demo(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory(prefix="icochat_reanudable_") as tmp:
+        tmp = Path(tmp)
+        origen = tmp / ("origen.log" if args.comprimible else "origen.bin")
+        with origen.open("wb") as f:
+            for i in range(args.tamano_mb):
+                if args.comprimible:
+                    # Líneas de registro: se comprimen bien, pero no son repetitivas
+                    lineas = "".join(
+                        f"{i:04d}.{n:06d} INFO bloque {random.getrandbits(32):08x}\n" for n in range(25000)
+                    )
+                    f.write(lineas.encode()[:1024 * 1024])
+                else:
+                    f.write(os.urandom(1024 * 1024))
+        servidor = ServidorInestable(
+            tmp / "servidor", args.prob_corte, args.prob_corrupcion, args.semilla, not args.sin_compresion
+        )
+        puerto = iniciar_en_hilo(servidor)
+        registro = RegistroTransferencias(tmp / "estado")
+
+        inicio = time.perf_counter()
+        print(f"Subiendo {args.tamano_mb} MiB...")
+        intentos_subida = con_reintentos(puerto, registro, lambda c: c.upload(origen))
+        print(f"Descargando {args.tamano_mb} MiB...")
+        destino = tmp / "descargado.bin"
+        intentos_descarga = con_reintentos(puerto, registro, lambda c: c.download(origen.name, destino))
+        duracion = time.perf_counter() - inicio
+
+        iguales = sha256(origen) == sha256(destino) == sha256(tmp / "servidor" / origen.name)
+        estadisticas = servidor.estadisticas()
+        print(json.dumps({
+            "tamano_mb": args.tamano_mb,
+            "intentos_subida": intentos_subida,
+            "intentos_descarga": intentos_descarga,
+            "cortes": estadisticas["cortes"],
+            "bloques_corrompidos": estadisticas["bloques_corrompidos"],
+            "bloques_rechazados": estadisticas["bloques_rechazados"],
+            "estados_pendientes": len(registro.pendientes()),
+            "segundos": round(duracion, 2),
+            "archivos_iguales": iguales,
+        }, indent=2))
+        if not iguales:
+            sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor de referencia que corta conexiones al azar.")
+    parser.add_argument("--puerto", type=int, default=12345)
+    parser.add_argument("--directorio", type=Path, default=Path(tempfile.gettempdir()) / "icochat_servidor")
+    parser.add_argument("--prob-corte", type=float, default=0.02,
+                        help="Probabilidad de corte tras cada lectura y cada bloque enviado.")
+    parser.add_argument("--prob-corrupcion", type=float, default=0.01, help="Probabilidad de corromper un bloque enviado.")
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--demo", action="store_true", help="Subir y descargar un archivo contra el servidor y verificarlo.")
+    parser.add_argument("--tamano-mb", type=int, default=64, help="Tamaño del archivo de la demostración.")
+    parser.add_argument("--comprimible", action="store_true", help="Usar en la demostración un archivo de texto.")
+    parser.add_argument("--sin-compresion", action="store_true", help="No aceptar compresión de los clientes.")
+    args = parser.parse_args()
+
+    if args.demo:
+        demo(args)
+        return
+    servidor = ServidorInestable(
+        args.directorio, args.prob_corte, args.prob_corrupcion, args.semilla, not args.sin_compresion
+    )
+    iniciar_en_hilo(servidor, args.puerto)
+    print(f"Servidor inestable en 127.0.0.1:{args.puerto} ({args.directorio}). Ctrl+C para salir.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,936 @@
+# herramientas/servidor_referencia.py
+"""
+Servidor de referencia de IcoChat, para pruebas, benchmarks y uso local.
+
+Implementa el protocolo completo que habla el cliente:
+
+- Saludo con el nombre de usuario (CONTROL sin ":" en el canal del chat),
+  con "NOMBRE_EN_USO" si otro usuario conectado ya lo tiene. Cualquier otro
+  comando que no se conozca se responde con "ERROR:comando desconocido".
+- "CREDENTIALS:{email, password}" y "SESION:<token>": cuentas en memoria,
+  contraseñas con PBKDF2; por defecto el primer inicio de sesión de un correo
+  lo registra.
+- Chat: cada "nombre: texto" se codifica una sola vez y el mismo frame se
+  escribe en todas las conexiones. "MENSAJE:{id, texto}" se confirma con
+  "RECIBIDO:<id>" y no se difunde dos veces.
+- Archivos en disco: subidas reanudables (SUBIDA, bloques con offset y
+  CRC32, que se escriben en otro hilo según llegan sin acumular el frame), descargas
+  reanudables (DESCARGA) y la antigua "DESCARGAR_ARCHIVO:<nombre>", que
+  responde con "ARCHIVO:<nombre>". Los datos se envían con sendfile, salvo
+  los bloques que viajan comprimidos.
+- Lista de archivos versionada ("LISTA_ARCHIVOS", "LISTA_ARCHIVOS:<versión>"
+  y "SUSCRIBIR_ARCHIVOS:<versión>", con los cambios enviados a los suscritos).
+- Compresión negociada ("COMPRESION:zlib,lzma") y "CANCELAR".
+
+Todo corre en un único bucle asyncio; el disco (escritura de las subidas,
+CRC32 de las descargas, hash de las contraseñas) se usa desde otros hilos.
+A las conexiones que no leen lo que se les envía se les corta la conexión
+en lugar de acumular sus datos, y a las que suben más rápido de lo que se
+escribe en disco se les deja de leer.
+
+Uso:
+    python herramientas/servidor_referencia.py [--host 127.0.0.1] [--puerto 12345] [--directorio /tmp/icochat_archivos]
+
+Con un puerto distinto de 12345 o en otra máquina, el cliente se apunta con
+data/server_config.json.
+"""
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Deque, Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scr"))
+
+from protocolo import (  # noqa: E402
+    CABECERA, CABECERA_BLOQUE, CANAL_CHAT, FLAG_BLOQUE, FLAGS_COMPRESION, DecodificadorFrames, ErrorProtocolo,
+    Frame, TipoFrame, codificar_control, codificar_frame, codificar_texto
+)
+from compresion import Descompresor, comprimir, descomprimir, elegir_algoritmo, es_comprimible  # noqa: E402
+
+logger = logging.getLogger("servidor_referencia")
+
+# Tamaño de los bloques de las descargas (cada uno con su CRC32)
+TAMANO_BLOQUE_DESCARGA = 1024 * 1024
+
+# Bytes pendientes de enviar a una conexión a partir de los cuales se
+# considera que no lee y se corta
+MAX_PENDIENTE_POR_CONEXION = 8 * 1024 * 1024
+
+# Bytes de subidas recibidos por una conexión y aún no escritos en disco a
+# partir de los cuales se deja de leer de ella (se vuelve a leer con la mitad)
+MAX_PENDIENTE_DISCO = 8 * 1024 * 1024
+
+# Ids de mensaje recordados por usuario para descartar reenvíos
+MAX_IDS_RECORDADOS = 10000
+
+# Cambios de la lista de archivos que se guardan para enviar solo los cambios
+MAX_CAMBIOS_LISTA = 1000
+
+# Iteraciones de PBKDF2 para las contraseñas
+ITERACIONES_PBKDF2 = 100_000
+
+# Conexiones que pueden esperar a ser aceptadas
+BACKLOG = 4096
+
+EXTENSION_PARCIAL = ".parcial"
+
+
+def info_archivo(ruta: Path) -> Dict[str, Any]:
+    """Entrada de la lista de archivos para `ruta`."""
+    info = ruta.stat()
+    return {"nombre": ruta.name, "tamano": info.st_size, "fecha": info.st_mtime}
+
+
+def nombre_valido(nombre: Any) -> bool:
+    """Indica si `nombre` es un nombre de archivo sin rutas."""
+    return (
+        isinstance(nombre, str) and nombre not in ("", ".", "..") and Path(nombre).name == nombre
+        and not nombre.endswith(EXTENSION_PARCIAL)
+    )
+
+
+def crcs_por_bloques(ruta: Path, tamano_bloque: int = TAMANO_BLOQUE_DESCARGA) -> List[int]:
+    """CRC32 de cada bloque de `ruta` (se ejecuta en otro hilo)."""
+    crcs = []
+    with ruta.open("rb") as f:
+        while bloque := f.read(tamano_bloque):
+            crcs.append(zlib.crc32(bloque))
+    return crcs
+
+
+def leer_bloque(archivo: BinaryIO, offset: int, cantidad: int) -> bytes:
+    """Lee `cantidad` bytes de `archivo` desde `offset` (se ejecuta en otro hilo)."""
+    archivo.seek(offset)
+    return archivo.read(cantidad)
+
+
+def abrir_parcial(parcial: Path, tamano: int) -> BinaryIO:
+    """
+    Abre el archivo parcial de una subida para continuarlo; si es más largo
+    que la subida, lo vacía (se ejecuta en otro hilo).
+    """
+    archivo = parcial.open("ab")
+    if archivo.tell() > tamano:
+        archivo.truncate(0)
+        archivo.seek(0)
+    return archivo
+
+
+def cerrar_parcial(archivo: BinaryIO, tamano: int) -> None:
+    """Recorta el archivo parcial a `tamano` bytes y lo cierra (se ejecuta en otro hilo)."""
+    try:
+        archivo.truncate(tamano)
+    finally:
+        archivo.close()
+
+
+def mover_subida(parcial: Path, destino: Path) -> Dict[str, Any]:
+    """Pone una subida completa en su nombre definitivo (se ejecuta en otro hilo)."""
+    os.replace(parcial, destino)
+    return info_archivo(destino)
+
+
+class SubidaEnCurso:
+    """
+    Subida reanudable que llega por un canal. Es el sumidero del canal en el
+    decodificador: los datos de cada bloque se descomprimen si vienen
+    comprimidos y se les calcula el CRC32 según llegan, y una tarea los
+    escribe en el archivo parcial desde otro hilo, en orden. Al terminar el
+    bloque se comprueban el offset y el CRC; si no cuadran, la subida se
+    rechaza. Al cerrarla, lo pendiente termina de escribirse y el archivo se
+    trunca al final del último bloque bueno (ver `cerrada`).
+    """
+
+    def __init__(
+        self, conexion: "Conexion", canal: int, peticion: Dict[str, Any], parcial: Path, archivo: BinaryIO
+    ) -> None:
+        self.conexion = conexion
+        self.canal = canal
+        self.id: str = peticion["id"]
+        self.nombre: str = peticion["nombre"]
+        self.tamano: int = peticion["tamano"]
+        self.parcial = parcial
+        self.archivo = archivo
+        self.offset = archivo.tell()  # Final del último bloque bueno
+        self.rechazada = False
+        # Escritura en disco: trozos por escribir y bytes ya escritos en el archivo
+        self._por_escribir: List[bytes] = []
+        self._escritos = self.offset
+        self._hay_trabajo = asyncio.Event()
+        self._cerrando = False
+        # Termina con True cuando todo lo recibido está en disco y el archivo cerrado
+        self.cerrada: asyncio.Task = asyncio.get_running_loop().create_task(self._escribir_en_disco())
+        # Bloque que se está recibiendo
+        self._cabecera = bytearray()
+        self._crc_esperado = 0
+        self._offset_bloque = 0
+        self._crc = 0
+        self._recibidos = 0
+        self._descompresor: Optional[Descompresor] = None
+
+    def escribir(self, trozo: memoryview, restante: int, flags: int) -> None:
+        if len(self._cabecera) < CABECERA_BLOQUE.size:
+            falta = CABECERA_BLOQUE.size - len(self._cabecera)
+            self._cabecera += trozo[:falta]
+            trozo = trozo[falta:]
+            if len(self._cabecera) == CABECERA_BLOQUE.size:
+                self._offset_bloque, self._crc_esperado = CABECERA_BLOQUE.unpack(self._cabecera)
+                if not flags & FLAG_BLOQUE or self._offset_bloque != self.offset:
+                    self._rechazar()
+                elif flags & FLAGS_COMPRESION:
+                    self._descompresor = Descompresor(flags)
+        if trozo and not self.rechazada:
+            try:
+                # El trozo es una vista del buffer del decodificador: copiarlo antes de encolarlo
+                datos = self._descompresor.descomprimir(trozo) if self._descompresor else bytes(trozo)
+            except ErrorProtocolo:
+                self._rechazar()
+            else:
+                self._crc = zlib.crc32(datos, self._crc)
+                self._recibidos += len(datos)
+                self._por_escribir.append(datos)
+                self._hay_trabajo.set()
+                self.conexion.por_escribir(len(datos))
+        if not restante:
+            self._terminar_bloque()
+
+    def _terminar_bloque(self) -> None:
+        if not self.rechazada:
+            try:
+                if len(self._cabecera) < CABECERA_BLOQUE.size:
+                    raise ErrorProtocolo("Bloque sin cabecera.")
+                if self._descompresor:
+                    self._descompresor.terminar()
+                if self._crc != self._crc_esperado or self.offset + self._recibidos > self.tamano:
+                    raise ErrorProtocolo("CRC32 u offset incorrecto.")
+            except ErrorProtocolo:
+                self._rechazar()
+            else:
+                self.offset += self._recibidos
+                self.conexion.servidor.bytes_subidos += self._recibidos
+        if self.rechazada:
+            self.conexion.quitar_subida(self.canal)
+        self._cabecera = bytearray()
+        self._crc = self._recibidos = 0
+        self._descompresor = None
+
+    def _rechazar(self) -> None:
+        """Descarta el bloque actual: el cliente reanudará desde el último bueno."""
+        if self.rechazada:
+            return
+        self.rechazada = True
+        self.conexion.servidor.bloques_rechazados += 1
+        self.conexion.enviar(codificar_control(f"ERROR_BLOQUE:{self._offset_bloque}", self.canal))
+
+    def cerrar(self) -> None:
+        """Deja de aceptar datos; `cerrada` termina cuando el archivo queda recortado y cerrado."""
+        self._cerrando = True
+        self._hay_trabajo.set()
+
+    async def _escribir_en_disco(self) -> bool:
+        """Escribe en orden lo recibido hasta que se cierra la subida. Devuelve False si falló el disco."""
+        loop = asyncio.get_running_loop()
+        correcta = True
+        try:
+            while True:
+                await self._hay_trabajo.wait()
+                self._hay_trabajo.clear()
+                trozos, self._por_escribir = self._por_escribir, []
+                if trozos:
+                    cantidad = sum(map(len, trozos))
+                    try:
+                        await loop.run_in_executor(None, self.archivo.writelines, trozos)
+                    finally:
+                        self.conexion.escrito(cantidad)
+                    self._escritos += cantidad
+                if self._cerrando and not self._por_escribir:
+                    break
+        except OSError as e:
+            logger.error("No se pudo escribir la subida de %s: %s", self.nombre, e)
+            correcta = False
+            self.rechazada = True
+            if self.conexion.subida(self.canal) is self:
+                # Si ya había terminado, el error lo da guardar_subida()
+                self.conexion.enviar(codificar_control(f"ERROR:no se pudo escribir {self.nombre[:80]}", self.canal))
+                self.conexion.quitar_subida(self.canal)
+        finally:
+            # Lo que pase del último bloque bueno no se ha comprobado: fuera
+            await loop.run_in_executor(None, cerrar_parcial, self.archivo, min(self.offset, self._escritos))
+            if self.conexion.servidor.parciales.get(self.parcial) is self:
+                del self.conexion.servidor.parciales[self.parcial]
+        return correcta
+
+
+class Conexion(asyncio.BufferedProtocol):
+    """
+    Una conexión de cliente. Los datos se leen con recv_into directamente
+    sobre el buffer del decodificador de frames.
+
+    Las descargas envían sus bloques de uno en uno (con sendfile, que exige
+    que el transporte no tenga nada más por enviar): lo que se quiera enviar
+    mientras tanto, como los mensajes del chat, espera en `_pendientes` y se
+    envía entre bloque y bloque.
+    """
+
+    def __init__(self, servidor: "ServidorReferencia") -> None:
+        self.servidor = servidor
+        self.transporte: Optional[asyncio.Transport] = None
+        self.usuario: Optional[str] = None
+        self.email: Optional[str] = None  # Cuenta con la que se inició sesión
+        self.compresion: Optional[str] = None
+        self._decodificador = DecodificadorFrames()
+        self._vista: Optional[memoryview] = None
+        self._subidas: Dict[int, SubidaEnCurso] = {}
+        self._completas: Dict[int, int] = {}  # Canal -> tamaño de una subida que ya estaba completa
+        self._tareas: Dict[int, asyncio.Task] = {}  # Descargas en curso por canal
+        self._cerrojo_bloques = asyncio.Lock()
+        self._en_sendfile = False
+        self._pendientes: List[bytes] = []
+        self._bytes_pendientes = 0
+        self._escritura_pausada = False
+        self._esperando_escritura: List[asyncio.Future] = []
+        self._bytes_a_disco = 0  # Datos de subidas recibidos y aún sin escribir
+        self._lectura_pausada = False
+
+    # ----------------------------
+    # Eventos del transporte
+    # ----------------------------
+    def connection_made(self, transporte: asyncio.BaseTransport) -> None:
+        self.transporte = transporte  # type: ignore[assignment]
+        self.servidor.conexiones.add(self)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._vista is not None:
+            self._vista.release()
+        self._vista = self._decodificador.obtener_buffer()
+        return self._vista
+
+    def buffer_updated(self, nbytes: int) -> None:
+        # Liberar la vista antes de que el decodificador pueda compactar su buffer
+        self._vista.release()
+        self._vista = None
+        try:
+            for frame in self._decodificador.iterar_frames(nbytes):
+                self._procesar(frame)
+        except (ErrorProtocolo, UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Conexión de %s cerrada por un error de protocolo: %s", self.usuario or "anónimo", e)
+            self.transporte.abort()
+
+    def eof_received(self) -> bool:
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.servidor.desconectar(self)
+        for subida in self._subidas.values():
+            subida.cerrar()
+        self._subidas.clear()
+        for tarea in self._tareas.values():
+            tarea.cancel()
+        self._despertar_escritores(ConnectionError("Conexión cerrada."))
+
+    def pause_writing(self) -> None:
+        self._escritura_pausada = True
+
+    def resume_writing(self) -> None:
+        self._escritura_pausada = False
+        self._despertar_escritores()
+
+    def por_escribir(self, cantidad: int) -> None:
+        """Cuenta datos de subidas pendientes de escribir; si son muchos, deja de leer."""
+        self._bytes_a_disco += cantidad
+        if not self._lectura_pausada and self._bytes_a_disco > MAX_PENDIENTE_DISCO:
+            self._lectura_pausada = True
+            self.transporte.pause_reading()
+
+    def escrito(self, cantidad: int) -> None:
+        """Descuenta datos ya escritos en disco y vuelve a leer cuando baja a la mitad del límite."""
+        self._bytes_a_disco -= cantidad
+        if self._lectura_pausada and self._bytes_a_disco <= MAX_PENDIENTE_DISCO // 2:
+            self._lectura_pausada = False
+            self.transporte.resume_reading()
+
+    # ----------------------------
+    # Envío
+    # ----------------------------
+    def enviar(self, *partes: bytes) -> None:
+        """Envía uno o varios trozos de un frame; los trozos pueden ser compartidos con otras conexiones."""
+        if self.transporte is None or self.transporte.is_closing():
+            return
+        if self._en_sendfile:
+            self._pendientes.extend(partes)
+            self._bytes_pendientes += sum(map(len, partes))
+            pendiente = self._bytes_pendientes
+        else:
+            if len(partes) > 1:
+                self.transporte.writelines(partes)
+            else:
+                self.transporte.write(partes[0])
+            pendiente = self.transporte.get_write_buffer_size()
+        if pendiente > MAX_PENDIENTE_POR_CONEXION:
+            logger.warning(
+                "%s no lee lo que se le envía; se corta la conexión.", self.usuario or "Conexión anónima"
+            )
+            self.servidor.conexiones_lentas += 1
+            self.transporte.abort()
+
+    async def drain(self) -> None:
+        """Espera a que el búfer de envío del transporte baje del límite."""
+        if self.transporte.is_closing():
+            raise ConnectionError("Conexión cerrada.")
+        if self._escritura_pausada:
+            espera = asyncio.get_running_loop().create_future()
+            self._esperando_escritura.append(espera)
+            await espera
+
+    def _despertar_escritores(self, error: Optional[BaseException] = None) -> None:
+        for espera in self._esperando_escritura:
+            if not espera.done():
+                if error:
+                    espera.set_exception(error)
+                else:
+                    espera.set_result(None)
+        self._esperando_escritura.clear()
+
+    async def enviar_region(self, cabecera: bytes, archivo: BinaryIO, offset: int, cantidad: int) -> None:
+        """Envía un frame cuyo payload son `cantidad` bytes de `archivo` desde `offset`."""
+        loop = asyncio.get_running_loop()
+        async with self._cerrojo_bloques:
+            self.enviar(cabecera)
+            await self.drain()
+            enviados = 0
+            if self.servidor.usar_sendfile:
+                self._en_sendfile = True
+                try:
+                    enviados = await loop.sendfile(self.transporte, archivo, offset, cantidad, fallback=False)
+                except (NotImplementedError, asyncio.SendfileNotAvailableError) as e:
+                    logger.info("sendfile no disponible, se usa copia con búfer: %s", e)
+                    self.servidor.usar_sendfile = False
+                except (OSError, RuntimeError) as e:
+                    raise ConnectionError(f"Error enviando el archivo: {e}") from e
+                finally:
+                    self._en_sendfile = False
+                    pendientes, self._pendientes, self._bytes_pendientes = self._pendientes, [], 0
+                    if pendientes:
+                        self.enviar(*pendientes)
+            if not self.servidor.usar_sendfile:
+                archivo.seek(offset)
+                while enviados < cantidad:
+                    datos = archivo.read(min(cantidad - enviados, TAMANO_BLOQUE_DESCARGA))
+                    if not datos:
+                        break
+                    self.enviar(datos)
+                    await self.drain()
+                    enviados += len(datos)
+            if enviados != cantidad:
+                # La cabecera ya anunció otra longitud: el flujo queda inservible
+                self.transporte.abort()
+                raise ConnectionError("El archivo cambió de tamaño durante el envío.")
+            self.servidor.bytes_descargados += enviados
+
+    async def enviar_frame(self, datos: bytes) -> None:
+        """Envía un frame completo en orden con los bloques de las descargas."""
+        async with self._cerrojo_bloques:
+            self.enviar(datos)
+            await self.drain()
+
+    # ----------------------------
+    # Frames recibidos
+    # ----------------------------
+    def _procesar(self, frame: Frame) -> None:
+        if frame.tipo != TipoFrame.DATOS and frame.flags & FLAGS_COMPRESION:
+            frame = frame._replace(payload=descomprimir(frame.payload, frame.flags))
+        if frame.tipo == TipoFrame.CONTROL:
+            self._comando(frame.texto(), frame.canal)
+        elif frame.tipo == TipoFrame.TEXTO:
+            if self.usuario:
+                self.servidor.difundir(f"{self.usuario}: {frame.texto()}", excepto=self)
+        elif frame.tipo == TipoFrame.DATOS and not frame.payload:
+            self._terminar_subida(frame.canal)
+        # Los frames DATOS de una subida llegan a su sumidero; los demás son
+        # restos de una subida ya rechazada o cancelada
+
+    def _comando(self, comando: str, canal: int) -> None:
+        servidor = self.servidor
+        nombre, separador, valor = comando.partition(":")
+        if not separador:
+            if comando == "LISTA_ARCHIVOS":
+                self.enviar(codificar_control(json.dumps(servidor.lista()), canal))
+            elif comando == "CANCELAR":
+                self._cancelar(canal)
+            elif canal == CANAL_CHAT:
+                servidor.presentar(self, comando)
+            else:
+                self._comando_desconocido(comando, canal)
+        elif nombre == "MENSAJE":
+            mensaje = json.loads(valor)
+            servidor.recibir_mensaje(self, str(mensaje["id"]), mensaje["texto"])
+            self.enviar(codificar_control(f"RECIBIDO:{mensaje['id']}", canal))
+        elif nombre == "COMPRESION":
+            algoritmo = elegir_algoritmo(valor.split(",")) if servidor.compresion else None
+            self.compresion = algoritmo
+            self.enviar(codificar_control(f"COMPRESION:{algoritmo or ''}", canal))
+        elif nombre == "CREDENTIALS":
+            self._tarea(canal, servidor.iniciar_sesion(self, json.loads(valor), canal))
+        elif nombre == "SESION":
+            self.enviar(codificar_control(json.dumps(servidor.reanudar_sesion(self, valor)), canal))
+        elif nombre == "SUBIDA":
+            self._pedir_subida(json.loads(valor), canal)
+        elif nombre == "DESCARGA":
+            peticion = json.loads(valor)
+            self._tarea(canal, servidor.enviar_archivo(
+                self, canal, peticion["nombre"], peticion.get("desde", 0), peticion.get("etag", ""), True
+            ))
+        elif nombre == "DESCARGAR_ARCHIVO":
+            self._tarea(canal, servidor.enviar_archivo(self, canal, valor, 0, "", False))
+        elif nombre == "SUSCRIBIR_ARCHIVOS":
+            servidor.suscribir(self, canal)
+            self.enviar(codificar_control(servidor.cambios_desde(int(valor)), canal))
+        elif nombre == "LISTA_ARCHIVOS":
+            self.enviar(codificar_control(servidor.cambios_desde(int(valor)), canal))
+        else:
+            self._comando_desconocido(nombre, canal)
+
+    def _comando_desconocido(self, nombre: str, canal: int) -> None:
+        """
+        Rechaza un comando que no existe. Solo un CONTROL sin ":" en el canal
+        del chat es un saludo; "X:..." nunca cambia el nombre de usuario.
+        """
+        logger.info("Comando desconocido de %s en el canal %d: %.40r", self.usuario or "anónimo", canal, nombre)
+        self.enviar(codificar_control(f"ERROR:comando desconocido {nombre[:40]}", canal))
+
+    def _tarea(self, canal: int, corrutina: Any) -> None:
+        """Atiende una petición larga en su propia tarea, cancelable con CANCELAR."""
+        tarea = asyncio.get_running_loop().create_task(corrutina)
+        self._tareas[canal] = tarea
+
+        def terminar(t: asyncio.Task) -> None:
+            if self._tareas.get(canal) is t:
+                del self._tareas[canal]
+            if not t.cancelled() and t.exception() and not isinstance(t.exception(), ConnectionError):
+                logger.error("Error atendiendo el canal %s: %r", canal, t.exception())
+
+        tarea.add_done_callback(terminar)
+
+    def _cancelar(self, canal: int) -> None:
+        self.servidor.desuscribir(self, canal)
+        self.quitar_subida(canal)
+        tarea = self._tareas.pop(canal, None)
+        if tarea:
+            tarea.cancel()
+
+    # ----------------------------
+    # Subidas
+    # ----------------------------
+    def _pedir_subida(self, peticion: Dict[str, Any], canal: int) -> None:
+        if not nombre_valido(peticion.get("nombre")) or not isinstance(peticion.get("tamano"), int):
+            self.enviar(codificar_control(f"ERROR:subida no válida {str(peticion.get('nombre'))[:80]}", canal))
+            return
+        completa = self.servidor.subidas_completas.get(str(peticion["id"]))
+        if completa is not None:
+            self._completas[canal] = completa
+            self.enviar(codificar_control(f"DESDE:{completa}", canal))
+            return
+        self.quitar_subida(canal)
+        self._tarea(canal, self._empezar_subida({**peticion, "id": str(peticion["id"])}, canal))
+
+    async def _empezar_subida(self, peticion: Dict[str, Any], canal: int) -> None:
+        """Abre el archivo parcial en otro hilo y responde DESDE con lo que ya hay de él."""
+        servidor = self.servidor
+        parcial = servidor.directorio / f"{hashlib.sha256(peticion['id'].encode()).hexdigest()[:32]}{EXTENSION_PARCIAL}"
+        anterior = servidor.parciales.get(parcial)
+        if anterior is not None:
+            # La misma subida vuelve a empezar (p. ej. por otra conexión): la
+            # anterior ya no sirve, pero hay que esperar a que cierre el archivo
+            if anterior.conexion.subida(anterior.canal) is anterior:
+                anterior.conexion.quitar_subida(anterior.canal)
+            await asyncio.shield(anterior.cerrada)
+        archivo = await asyncio.get_running_loop().run_in_executor(None, abrir_parcial, parcial, peticion["tamano"])
+        subida = SubidaEnCurso(self, canal, peticion, parcial, archivo)
+        servidor.parciales[parcial] = subida
+        self._subidas[canal] = subida
+        self._decodificador.sumideros[canal] = subida.escribir
+        self.enviar(codificar_control(f"DESDE:{subida.offset}", canal))
+
+    def subida(self, canal: int) -> Optional[SubidaEnCurso]:
+        """Subida en curso en `canal`, si la hay."""
+        return self._subidas.get(canal)
+
+    def quitar_subida(self, canal: int) -> None:
+        subida = self._subidas.pop(canal, None)
+        if subida:
+            self._decodificador.sumideros.pop(canal, None)
+            subida.cerrar()
+
+    def _terminar_subida(self, canal: int) -> None:
+        if canal in self._completas:
+            self.enviar(codificar_control(f"COMPLETO:{self._completas.pop(canal)}", canal))
+            return
+        subida = self._subidas.get(canal)
+        if subida is None:
+            return
+        self.quitar_subida(canal)
+        if subida.offset != subida.tamano:
+            self.enviar(codificar_control(f"ERROR:faltan datos en {subida.nombre}", canal))
+            return
+        self._tarea(canal, self.servidor.guardar_subida(self, canal, subida))
+
+
+class ServidorReferencia:
+    """Estado compartido por todas las conexiones: usuarios, cuentas y archivos."""
+
+    def __init__(
+        self,
+        directorio: Path,
+        compresion: bool = True,
+        registro_abierto: bool = True,
+        iteraciones_pbkdf2: int = ITERACIONES_PBKDF2
+    ) -> None:
+        """
+        Args:
+            directorio (Path): Carpeta donde se guardan los archivos subidos.
+            compresion (bool, optional): Aceptar la compresión que ofrezcan los clientes. Defaults to True.
+            registro_abierto (bool, optional): Crear la cuenta en el primer inicio de sesión
+                de un correo desconocido. Defaults to True.
+            iteraciones_pbkdf2 (int, optional): Coste del hash de las contraseñas. Defaults to ITERACIONES_PBKDF2.
+        """
+        self.directorio = directorio
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.compresion = compresion
+        self.registro_abierto = registro_abierto
+        self.iteraciones_pbkdf2 = iteraciones_pbkdf2
+        self.usar_sendfile = True
+
+        self.conexiones: Set[Conexion] = set()
+        self.usuarios: Dict[str, Conexion] = {}  # Nombre en el chat -> conexión
+        self.cuentas: Dict[str, Tuple[bytes, bytes]] = {}  # Correo -> (sal, hash)
+        self.sesiones: Dict[str, str] = {}  # Token -> correo
+        self._ids_mensajes: Dict[str, "collections.OrderedDict[str, None]"] = {}
+        self.subidas_completas: Dict[str, int] = {}  # Id de subida -> tamaño
+        self.parciales: Dict[Path, SubidaEnCurso] = {}  # Archivo parcial -> subida que lo tiene abierto
+
+        # Lista de archivos en memoria, versionada: cada cambio sube la versión
+        # y se guarda como (versión, agregados, eliminados)
+        self.archivos: Dict[str, Dict[str, Any]] = {
+            ruta.name: info_archivo(ruta) for ruta in sorted(directorio.iterdir())
+            if ruta.is_file() and ruta.suffix != EXTENSION_PARCIAL
+        }
+        self.version = 0
+        self._cambios: Deque[Tuple[int, List[Dict[str, Any]], List[str]]] = collections.deque(maxlen=MAX_CAMBIOS_LISTA)
+        self._suscriptores: Dict[Conexion, Set[int]] = {}
+        self._crcs: Dict[Tuple[str, int, int], List[int]] = {}  # (nombre, tamaño, mtime_ns) -> CRC32 por bloque
+
+        # Estadísticas
+        self.mensajes_recibidos = 0
+        self.mensajes_duplicados = 0
+        self.difusiones = 0
+        self.frames_difundidos = 0
+        self.bytes_subidos = 0
+        self.bytes_descargados = 0
+        self.bloques_rechazados = 0
+        self.conexiones_lentas = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "conexiones": len(self.conexiones),
+            "usuarios": len(self.usuarios),
+            "mensajes_recibidos": self.mensajes_recibidos,
+            "mensajes_duplicados": self.mensajes_duplicados,
+            "difusiones": self.difusiones,
+            "frames_difundidos": self.frames_difundidos,
+            "bytes_subidos": self.bytes_subidos,
+            "bytes_descargados": self.bytes_descargados,
+            "bloques_rechazados": self.bloques_rechazados,
+            "conexiones_lentas": self.conexiones_lentas,
+            "archivos": len(self.archivos),
+        }
+
+    def nueva_conexion(self) -> Conexion:
+        """Protocolo para cada conexión aceptada (las pruebas lo sustituyen para inyectar fallos)."""
+        return Conexion(self)
+
+    def desconectar(self, conexion: Conexion) -> None:
+        self.conexiones.discard(conexion)
+        self._suscriptores.pop(conexion, None)
+        if conexion.usuario and self.usuarios.get(conexion.usuario) is conexion:
+            del self.usuarios[conexion.usuario]
+
+    # ----------------------------
+    # Usuarios y sesiones
+    # ----------------------------
+    def presentar(self, conexion: Conexion, usuario: str) -> None:
+        """Asigna el nombre de usuario del chat; responde NOMBRE_EN_USO si lo tiene otro."""
+        usuario = usuario.strip()
+        if not usuario:
+            return
+        actual = self.usuarios.get(usuario)
+        if actual is not None and actual is not conexion:
+            if conexion.email and actual.email == conexion.email:
+                # La misma cuenta al reconectar: la conexión anterior ya no sirve
+                actual.transporte.abort()
+            else:
+                conexion.enviar(codificar_control("NOMBRE_EN_USO"))
+                return
+        if conexion.usuario and self.usuarios.get(conexion.usuario) is conexion:
+            del self.usuarios[conexion.usuario]
+        conexion.usuario = usuario
+        self.usuarios[usuario] = conexion
+
+    async def iniciar_sesion(self, conexion: Conexion, credenciales: Dict[str, Any], canal: int) -> None:
+        """Responde a CREDENTIALS; el hash de la contraseña se calcula en otro hilo."""
+        email, password = credenciales.get("email"), credenciales.get("password")
+        respuesta: Dict[str, Any] = {"status": "received", "Resp": 0}
+        cuenta = self.cuentas.get(email) if isinstance(email, str) else None
+        if not email or not isinstance(password, str) or not password:
+            respuesta["Mens"] = "Faltan el correo o la contraseña."
+        elif cuenta is None and not self.registro_abierto:
+            respuesta["Mens"] = "El correo no está registrado."
+        else:
+            sal = cuenta[0] if cuenta else os.urandom(16)
+            resumen = await asyncio.get_running_loop().run_in_executor(
+                None, hashlib.pbkdf2_hmac, "sha256", password.encode("utf-8"), sal, self.iteraciones_pbkdf2
+            )
+            cuenta = self.cuentas.setdefault(email, (sal, resumen))
+            if hmac.compare_digest(cuenta[1], resumen):
+                token = secrets.token_hex(16)
+                self.sesiones[token] = conexion.email = email
+                respuesta.update(Resp=1, Mens="Bienvenido.", Token=token)
+            else:
+                respuesta["Mens"] = "Correo o contraseña incorrectos."
+        conexion.enviar(codificar_control(json.dumps(respuesta), canal))
+
+    def reanudar_sesion(self, conexion: Conexion, token: str) -> Dict[str, Any]:
+        """Respuesta a SESION:<token>."""
+        email = self.sesiones.get(token)
+        if email is None:
+            return {"status": "received", "Resp": 0, "Mens": "Sesión caducada."}
+        conexion.email = email
+        return {"status": "received", "Resp": 1, "Mens": ""}
+
+    # ----------------------------
+    # Chat
+    # ----------------------------
+    def recibir_mensaje(self, conexion: Conexion, id_mensaje: str, texto: str) -> None:
+        """Difunde un MENSAJE salvo que ya se hubiera recibido (reenvío tras reconectar)."""
+        if not conexion.usuario:
+            return
+        recientes = self._ids_mensajes.setdefault(conexion.email or conexion.usuario, collections.OrderedDict())
+        if id_mensaje in recientes:
+            self.mensajes_duplicados += 1
+            return
+        recientes[id_mensaje] = None
+        if len(recientes) > MAX_IDS_RECORDADOS:
+            recientes.popitem(last=False)
+        self.mensajes_recibidos += 1
+        self.difundir(f"{conexion.usuario}: {texto}", excepto=conexion)
+
+    def difundir(self, texto: str, excepto: Optional[Conexion] = None) -> None:
+        """Envía un mensaje de chat a todos los usuarios: el frame se codifica una sola vez."""
+        frame = codificar_texto(texto)
+        self.difusiones += 1
+        for conexion in list(self.usuarios.values()):
+            if conexion is not excepto:
+                conexion.enviar(frame)
+                self.frames_difundidos += 1
+
+    # ----------------------------
+    # Lista de archivos
+    # ----------------------------
+    def lista(self) -> List[Dict[str, Any]]:
+        return list(self.archivos.values())
+
+    def cambios_desde(self, version: int) -> str:
+        """
+        Respuesta a una consulta de la lista: sin cambios, los cambios desde
+        `version` o la lista completa (siempre si `version` es 0 o ya no se
+        guardan los cambios desde ella).
+        """
+        if version and version == self.version:
+            return f"SIN_CAMBIOS:{self.version}"
+        if 0 < version < self.version and self._cambios and self._cambios[0][0] <= version + 1:
+            agregados: Dict[str, Dict[str, Any]] = {}
+            eliminados: Set[str] = set()
+            for _, mas, menos in (c for c in self._cambios if c[0] > version):
+                for nombre in menos:
+                    agregados.pop(nombre, None)
+                eliminados = (eliminados | set(menos)) - {info["nombre"] for info in mas}
+                agregados.update((info["nombre"], info) for info in mas)
+            return "ARCHIVOS_DELTA:" + json.dumps({
+                "desde": version, "version": self.version,
+                "agregados": list(agregados.values()), "eliminados": sorted(eliminados)
+            })
+        return "ARCHIVOS:" + json.dumps({"version": self.version, "archivos": self.lista()})
+
+    def suscribir(self, conexion: Conexion, canal: int) -> None:
+        self._suscriptores.setdefault(conexion, set()).add(canal)
+
+    def desuscribir(self, conexion: Conexion, canal: int) -> None:
+        canales = self._suscriptores.get(conexion)
+        if canales:
+            canales.discard(canal)
+
+    def cambiar_lista(self, agregados: List[Dict[str, Any]], eliminados: List[str]) -> None:
+        """Registra un cambio de la lista y lo envía a los suscritos (el payload se codifica una vez)."""
+        for nombre in eliminados:
+            self.archivos.pop(nombre, None)
+        for info in agregados:
+            self.archivos[info["nombre"]] = info
+        desde = self.version
+        self.version += 1
+        self._cambios.append((self.version, agregados, eliminados))
+        payload = ("ARCHIVOS_DELTA:" + json.dumps({
+            "desde": desde, "version": self.version, "agregados": agregados, "eliminados": eliminados
+        })).encode("utf-8")
+        for conexion, canales in list(self._suscriptores.items()):
+            for canal in canales:
+                conexion.enviar(CABECERA.pack(TipoFrame.CONTROL, 0, canal, len(payload)), payload)
+
+    # ----------------------------
+    # Archivos
+    # ----------------------------
+    async def guardar_subida(self, conexion: Conexion, canal: int, subida: SubidaEnCurso) -> None:
+        """
+        Cuando la subida completa está en disco, la mueve a su nombre
+        definitivo, la añade a la lista y responde COMPLETO.
+        """
+        if not await asyncio.shield(subida.cerrada):
+            conexion.enviar(codificar_control(f"ERROR:no se pudo escribir {subida.nombre[:80]}", canal))
+            return
+        info = await asyncio.get_running_loop().run_in_executor(
+            None, mover_subida, subida.parcial, self.directorio / subida.nombre
+        )
+        self.subidas_completas[subida.id] = subida.tamano
+        self.cambiar_lista([info], [])
+        conexion.enviar(codificar_control(f"COMPLETO:{subida.tamano}", canal))
+
+    async def _crcs_de(self, ruta: Path, info: os.stat_result) -> List[int]:
+        """CRC32 de los bloques de `ruta`, calculados una vez por versión del archivo."""
+        clave = (ruta.name, info.st_size, info.st_mtime_ns)
+        crcs = self._crcs.get(clave)
+        if crcs is None:
+            crcs = await asyncio.get_running_loop().run_in_executor(None, crcs_por_bloques, ruta)
+            for anterior in [c for c in self._crcs if c[0] == ruta.name]:
+                del self._crcs[anterior]
+            self._crcs[clave] = crcs
+        return crcs
+
+    async def enviar_archivo(
+        self, conexion: Conexion, canal: int, nombre: str, desde: int, etag: str, por_bloques: bool
+    ) -> None:
+        """
+        Envía un archivo por `canal`. Por bloques (DESCARGA): DESCARGA_INFO y
+        bloques con offset y CRC32, desde `desde` si el archivo no ha cambiado
+        (mismo `etag`). Si no (DESCARGAR_ARCHIVO): ARCHIVO, TAMANO y el
+        contenido en frames DATOS sin cabecera de bloque. Siempre termina con
+        un frame DATOS vacío.
+        """
+        loop = asyncio.get_running_loop()
+        ruta = self.directorio / nombre
+        if not nombre_valido(nombre) or not ruta.is_file():
+            await conexion.enviar_frame(codificar_control(f"ERROR:no existe {nombre[:80]}", canal))
+            return
+        with ruta.open("rb") as f:
+            info = os.fstat(f.fileno())
+            if not por_bloques:
+                await conexion.enviar_frame(codificar_control(f"ARCHIVO:{nombre}", canal))
+                await conexion.enviar_frame(codificar_control(f"TAMANO:{info.st_size}", canal))
+                for offset in range(0, info.st_size, TAMANO_BLOQUE_DESCARGA):
+                    cantidad = min(TAMANO_BLOQUE_DESCARGA, info.st_size - offset)
+                    await conexion.enviar_region(CABECERA.pack(TipoFrame.DATOS, 0, canal, cantidad), f, offset, cantidad)
+                await conexion.enviar_frame(codificar_frame(TipoFrame.DATOS, b"", canal))
+                return
+
+            etag_actual = f"{info.st_size}-{info.st_mtime_ns}"
+            offset = desde if etag == etag_actual and 0 <= desde <= info.st_size else 0
+            # Se reanuda desde el inicio de un bloque: los CRC32 son por bloques fijos
+            offset -= offset % TAMANO_BLOQUE_DESCARGA
+            await conexion.enviar_frame(codificar_control(
+                "DESCARGA_INFO:" + json.dumps({"tamano": info.st_size, "etag": etag_actual, "desde": offset}), canal
+            ))
+            algoritmo = conexion.compresion
+            if algoritmo and not await loop.run_in_executor(None, es_comprimible, ruta):
+                algoritmo = None
+            crcs = [] if algoritmo else await self._crcs_de(ruta, info)
+            while offset < info.st_size:
+                cantidad = min(TAMANO_BLOQUE_DESCARGA, info.st_size - offset)
+                if algoritmo:
+                    datos = await loop.run_in_executor(None, leer_bloque, f, offset, cantidad)
+                    crc = zlib.crc32(datos)
+                    resultado = await loop.run_in_executor(None, comprimir, datos, algoritmo)
+                    payload, flags = resultado if resultado else (datos, 0)
+                    await conexion.enviar_frame(codificar_frame(
+                        TipoFrame.DATOS, CABECERA_BLOQUE.pack(offset, crc) + payload, canal, FLAG_BLOQUE | flags
+                    ))
+                    self.bytes_descargados += cantidad
+                else:
+                    cabecera = (
+                        CABECERA.pack(TipoFrame.DATOS, FLAG_BLOQUE, canal, CABECERA_BLOQUE.size + cantidad)
+                        + CABECERA_BLOQUE.pack(offset, crcs[offset // TAMANO_BLOQUE_DESCARGA])
+                    )
+                    await conexion.enviar_region(cabecera, f, offset, cantidad)
+                offset += cantidad
+            await conexion.enviar_frame(codificar_frame(TipoFrame.DATOS, b"", canal))
+
+
+async def servir(servidor: ServidorReferencia, host: str = "127.0.0.1", puerto: int = 12345) -> asyncio.AbstractServer:
+    """Empieza a aceptar conexiones en el bucle actual."""
+    return await asyncio.get_running_loop().create_server(
+        servidor.nueva_conexion, host, puerto, backlog=BACKLOG
+    )
+
+
+def iniciar_en_hilo(servidor: ServidorReferencia, puerto: int = 0, host: str = "127.0.0.1") -> int:
+    """Arranca el servidor en un hilo propio y devuelve el puerto."""
+    listo = threading.Event()
+    resultado: Dict[str, int] = {}
+
+    def correr() -> None:
+        loop = asyncio.new_event_loop()
+        srv = loop.run_until_complete(servir(servidor, host, puerto))
+        resultado["puerto"] = srv.sockets[0].getsockname()[1]
+        listo.set()
+        loop.run_forever()
+
+    threading.Thread(target=correr, name="servidor-referencia", daemon=True).start()
+    listo.wait()
+    return resultado["puerto"]
+
+
+async def _principal(args: argparse.Namespace) -> None:
+    servidor = ServidorReferencia(args.directorio, not args.sin_compresion)
+    srv = await servir(servidor, args.host, args.puerto)
+    logger.info("Servidor de referencia en %s:%s (%s). Ctrl+C para salir.", args.host, args.puerto, args.directorio)
+    async with srv:
+        while True:
+            await asyncio.sleep(args.intervalo_estadisticas)
+            logger.info("Estadísticas: %s", servidor.estadisticas())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor de referencia del protocolo de IcoChat.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=12345)
+    parser.add_argument("--directorio", type=Path, default=Path(tempfile.gettempdir()) / "icochat_archivos")
+    parser.add_argument("--sin-compresion", action="store_true", help="No aceptar compresión de los clientes.")
+    parser.add_argument("--intervalo-estadisticas", type=float, default=60.0, help="Segundos entre informes.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        asyncio.run(_principal(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
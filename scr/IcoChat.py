@@ -1,68 +1,71 @@
 # icoappchat.py
 
+import concurrent.futures
 import json
 import logging
-import socket
+import os
+import shutil
+import tempfile
 import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
-import pygame
 import tkinter as tk
 from tkinter import simpledialog, messagebox, filedialog, ttk
-from playsound import playsound
 
-import Archi
+import archi as Archi
 from login import run_login
-from config import DATA_DIR, ASSETS_DIR
+from config import DATA_DIR, preparar_directorios
+from registro import configurar_logging
+from precarga import precargar
+from audio import motor_audio
+from notificaciones import DespachadorNotificaciones
+from iconos import cargar_icono
+from historial import HistorialChat, TAMANO_PAGINA
+from busqueda import IndiceBusqueda
+from eventos import ColaEventos, Evento
+from vista_mensajes import Mensaje, VistaMensajes
+from protocolo import Frame, TipoFrame
+from cliente_async import ClienteAsync, EstadoConexion, esperar_en_tk
+from transferencias import RegistroTransferencias
+from bandeja_salida import BandejaSalida
+from gestor_transferencias import (
+    MAX_TRANSFERENCIAS_SIMULTANEAS, FaseTransferencia, GestorTransferencias, Transferencia
+)
+from panel_transferencias import PanelTransferencias, abrir_panel
+from lista_archivos import ListaArchivos
 
 import platform
-from PIL import Image, ImageTk
-import customtkinter as ctk
 
-# Configuración de logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# customtkinter, pygame y el sistema de notificaciones se importan donde
+# se usan (y antes, en segundo plano, durante el login: ver main), para que
+# la ventana de login solo tenga que cargar Tk. PIL solo hace falta la
+# primera vez que se redimensiona un icono (ver iconos.CacheIconos).
+
 logger = logging.getLogger(__name__)
+# Eventos frecuentes, con su propia categoría (ver registro.NIVELES_POR_CATEGORIA)
+log_mensajes = logging.getLogger("IcoChat.mensajes")
+log_interfaz = logging.getLogger("IcoChat.interfaz")
+log_transferencias = logging.getLogger("IcoChat.transferencias")
 
 # -------------------------
-# IMPORTACIONES CONDICIONALES DE NOTIFICACIONES
+# NOTIFICACIONES
 # -------------------------
-from tkinter import messagebox
-
-mostrar_notificacion = None
+# Las muestra un hilo propio, que agrupa las ráfagas y limita el sonido (se crea en main)
+notificaciones: Optional[DespachadorNotificaciones] = None
 
-def seleccionar_notificacion_funcion():
-    """
-    Selecciona y asigna la función de notificación adecuada según el sistema operativo.
+def mostrar_notificacion(titulo: str, mensaje: str, clave: Optional[str] = None, sonido: bool = False) -> None:
     """
-    global mostrar_notificacion
-    sistema_operativo = platform.system()
-    
-    if sistema_operativo == 'Windows':
-        try:
-            from NotiWin import mostrar_notificacionWin
-            mostrar_notificacion = mostrar_notificacionWin
-            logging.info("Usando NotiWin para notificaciones en Windows.")
-        except ImportError as e:
-            logging.error(f"No se pudo importar NotiWin: {e}")
-            # Fallback a una función genérica
-            mostrar_notificacion = lambda titulo, mensaje, duracion=5, icon_path=None: messagebox.showinfo(titulo, mensaje)
-    elif sistema_operativo == 'Linux':
-        try:
-            from noti3 import mostrar_notificacion as mostrar_notificacion_linux
-            mostrar_notificacion = mostrar_notificacion_linux
-            logging.info("Usando noti3 para notificaciones en Linux.")
-        except ImportError as e:
-            logging.error(f"No se pudo importar noti3: {e}")
-            # Fallback a una función genérica
-            mostrar_notificacion = lambda titulo, mensaje, duracion=5, icon_path=None: messagebox.showinfo(titulo, mensaje)
-    else:
-        # Función genérica para otros sistemas operativos
-        mostrar_notificacion = lambda titulo, mensaje, duracion=5, icon_path=None: messagebox.showinfo(titulo, mensaje)
-        logging.info("Usando función de notificación genérica para el sistema operativo actual.")
+    Pide mostrar una notificación del sistema sin esperar a que se muestre.
 
-# Llama a la función para seleccionar la función de notificación adecuada al inicio
-seleccionar_notificacion_funcion()
+    Args:
+        titulo (str): Título de la notificación.
+        mensaje (str): Texto de la notificación.
+        clave (Optional[str], optional): Las notificaciones con la misma clave se agrupan.
+        sonido (bool, optional): Si debe sonar. Defaults to False.
+    """
+    if notificaciones:
+        notificaciones.notificar(titulo, mensaje, clave, sonido)
 
 # -------------------------
 # CONFIGURACIÓN DE SERVIDOR
@@ -79,30 +82,55 @@ def load_server_config() -> Dict[str, Any]:
         try:
             with SERVER_CONFIG_FILE.open("r", encoding="utf-8") as file:
                 config = json.load(file)
-                logging.info("Configuración del servidor cargada desde server_config.json.")
+                logger.info("Configuración del servidor cargada desde server_config.json.")
                 return config
         except (json.JSONDecodeError, IOError) as e:
-            logging.error(f"Error cargando la configuración del servidor: {e}")
+            logger.error("Error cargando la configuración del servidor: %s", e)
     else:
         # Crear archivo de configuración por defecto
         try:
             with SERVER_CONFIG_FILE.open("w", encoding="utf-8") as file:
                 json.dump(default_config, file, ensure_ascii=False, indent=4)
-            logging.info("Archivo server_config.json creado con configuración por defecto.")
+            logger.info("Archivo server_config.json creado con configuración por defecto.")
         except IOError as e:
-            logging.error(f"Error creando server_config.json: {e}")
+            logger.error("Error creando server_config.json: %s", e)
     return default_config
 
-SERVER_CONFIG = load_server_config()
+SERVER_CONFIG: Dict[str, Any] = {}  # Se carga al arrancar (ver main)
+
+# Cada cuánto se actualiza la barra de progreso de las transferencias (ms)
+INTERVALO_PROGRESO_MS = 250
+
+# Espera máxima a que el historial vuelque los mensajes recientes antes de
+# releer su final (al volver desde un mensaje antiguo), en segundos
+TIMEOUT_VOLCADO_VISTA_S = 0.5
 
 # -------------------------
 # VARIABLES GLOBALES (CHAT)
 # -------------------------
-client_socket: Optional[socket.socket] = None
+cliente: Optional[ClienteAsync] = None  # Núcleo de red (se crea en el login)
+gestor: Optional[GestorTransferencias] = None  # Cola de subidas y descargas sobre el cliente
+lista_archivos = ListaArchivos()  # Copia local de la lista de archivos del servidor
+seguimiento_archivos: Optional[concurrent.futures.Future] = None  # Tarea que la mantiene al día
+estado_conexion = EstadoConexion.DESCONECTADO  # Último estado mostrado en la interfaz
+mensajes_descartados: int = 0  # Mensajes perdidos en la cola de eventos ya recargados del historial
 unread_messages_count: int = 0
 last_sender: Optional[str] = None
 username: str = ""  # Variable para almacenar el nombre de usuario
 
+# Eventos del hilo de red hacia la interfaz (se vacía en el bucle de Tk)
+cola_eventos = ColaEventos()
+
+# Historial de chat de solo anexado (se abre en run_chat)
+historial: Optional[HistorialChat] = None
+historial_cursor: Optional[int] = None  # Id del mensaje más antiguo mostrado
+# Id del mensaje más reciente mostrado si la vista es una parte intermedia del
+# historial (tras saltar a un resultado de búsqueda); None si llega al final
+historial_cursor_reciente: Optional[int] = None
+
+# Índice de búsqueda sobre el historial (se abre en run_chat)
+indice_busqueda: Optional[IndiceBusqueda] = None
+
 # Guardamos la instancia de la interfaz para poder llamarla
 app = None  
 root: Optional[tk.Tk] = None
@@ -111,97 +139,197 @@ root: Optional[tk.Tk] = None
 # FUNCIONES DE AUDIO/LOGIN
 # -------------------------
 def play_notification_sound() -> None:
-    """Reproduce el sonido de notificación."""
-    try:
-        sound_path = ASSETS_DIR / "notificacion.mp3"
-        playsound(str(sound_path))
-    except Exception as e:
-        logging.error(f"Error reproduciendo el sonido de notificación: {e}")
+    """Reproduce el sonido de notificación, ya cargado en memoria, sin esperar a que termine."""
+    motor_audio().reproducir()
 
 # -------------------------
 # MANEJO DE MENSAJES
 # -------------------------
-def receive_messages(client_socket: socket.socket) -> None:
+def procesar_frame(frame: Frame) -> None:
     """
-    Recibe mensajes del servidor y actualiza la interfaz de chat
-    usando app.actualizar_chat(...).
+    Procesa un frame completo recibido del servidor. Se ejecuta en el hilo
+    de red: no toca Tk, solo publica eventos para la interfaz.
+
+    Args:
+        frame (Frame): El frame recibido.
     """
-    global unread_messages_count, username
-    while True:
-        try:
-            message = client_socket.recv(1024).decode('utf-8')
-            if message:
-                if message == "NOMBRE_EN_USO":
-                    new_name = simpledialog.askstring(
-                        "Nombre en uso",
-                        "El nombre ya está en uso. Ingresa otro nombre:"
-                    )
-                    if new_name:
-                        client_socket.sendall(new_name.encode('utf-8'))
-                        username = new_name  # Actualizar el nombre de usuario
-                elif message.startswith("ARCHIVO"):
-                    archivo_nombre = message.split(":", 1)[1]
-                    recibir_archivo(archivo_nombre, client_socket)
-                else:
-                    logging.info(f"Mensaje recibido: {message}")
-
-                    # Parsear remitente y contenido
-                    if ": " in message:
-                        remitente, contenido = message.split(": ", 1)
-                    else:
-                        remitente, contenido = "Desconocido", message
-
-                    # Ignorar mensajes propios ecoados
-                    if remitente == username:
-                        continue
-
-                    # Guardar y mostrar mensajes de otros usuarios
-                    save_message(message, sender="other")
-                    
-                    if app:
-                        app.actualizar_chat(message)
-                    else:
-                        logging.warning("No hay instancia de app para actualizar el chat.")
-
-                    # Notificación si la ventana no está en foco
-                    if root and not root.focus_get():
-                        unread_messages_count += 1
-                        mostrar_notificacion("Nuevo mensaje", f"Tienes {unread_messages_count} mensajes nuevos.")
-                        play_notification_sound()
-            else:
-                logging.warning("Servidor desconectado.")
-                break
-        except Exception as e:
-            logging.error(f"Error recibiendo mensaje: {e}")
-            break
+    if frame.tipo == TipoFrame.CONTROL:
+        comando = frame.texto()
+        if comando == "NOMBRE_EN_USO":
+            cola_eventos.publicar("nombre_en_uso")
+        elif comando.startswith("ARCHIVO:"):
+            archivo_nombre = comando.split(":", 1)[1]
+            recibir_archivo(archivo_nombre, frame.canal)
+        else:
+            log_mensajes.warning("Mensaje de control desconocido: %.80s", comando)
+    elif frame.tipo == TipoFrame.TEXTO:
+        message = frame.texto()
+        log_mensajes.info("Mensaje recibido (%d caracteres).", len(message))
+        log_mensajes.debug("Texto recibido: %s", message)
+
+        # Parsear remitente y contenido
+        if ": " in message:
+            remitente, contenido = message.split(": ", 1)
+        else:
+            remitente, contenido = "Desconocido", message
+
+        # Ignorar mensajes propios ecoados
+        if remitente == username:
+            return
+
+        # Guardar y mostrar mensajes de otros usuarios
+        id_mensaje = save_message(message, sender="other")
+        cola_eventos.publicar("mensaje", (message, id_mensaje))
+    else:
+        log_mensajes.warning("Frame de tipo desconocido: %s", frame.tipo)
 
-def recibir_archivo(archivo_nombre: str, client_socket: socket.socket) -> None:
+def recibir_archivo(archivo_nombre: str, canal: int) -> None:
     """
-    Recibe un archivo del servidor y actualiza el chat con app.actualizar_chat().
+    Prepara la recepción de un archivo anunciado por el servidor. El contenido
+    llega después en frames DATOS por el mismo canal y el cliente lo escribe
+    directamente en un archivo temporal hasta que el usuario elige dónde
+    guardarlo.
+    """
+    try:
+        descriptor, ruta_temporal = tempfile.mkstemp(dir=DATA_DIR, prefix="recibiendo_")
+        os.close(descriptor)
+        descarga = cliente.aceptar_archivo(canal, Path(ruta_temporal))
+    except (IOError, OSError, ConnectionError) as e:
+        log_transferencias.error("Error recibiendo archivo: %s", e)
+        cola_eventos.publicar("error_archivo", f"No se pudo descargar el archivo: {e}")
+        return
+
+    def al_terminar(hecho) -> None:
+        if hecho.cancelled():
+            return
+        if hecho.exception():
+            log_transferencias.error("Error recibiendo archivo: %s", hecho.exception())
+            cola_eventos.publicar("error_archivo", f"No se pudo descargar el archivo: {hecho.exception()}")
+        else:
+            cola_eventos.publicar("archivo_recibido", (archivo_nombre, ruta_temporal))
+
+    descarga.hecho.add_done_callback(al_terminar)
+
+def guardar_archivo_recibido(archivo_nombre: str, ruta_temporal: str) -> None:
+    """
+    Pregunta dónde guardar un archivo ya recibido y lo mueve allí.
+    Se ejecuta en el hilo de Tk.
     """
     try:
         save_path = filedialog.asksaveasfilename(
             initialfile=archivo_nombre,
             title="Guardar archivo como"
         )
-        if save_path:
-            with open(save_path, 'wb') as f:
-                while True:
-                    bytes_read = client_socket.recv(1024)
-                    if not bytes_read:
-                        break
-                    f.write(bytes_read)
-            if app:
-                app.actualizar_chat(f"Se ha recibido el archivo: {archivo_nombre}")
-            messagebox.showinfo("Éxito", f"Archivo '{archivo_nombre}' descargado exitosamente!")
-            # Usar la función de notificación adecuada
-            mostrar_notificacion("Archivo recibido", f"Archivo '{archivo_nombre}' descargado exitosamente.")
+        if not save_path:
+            Path(ruta_temporal).unlink(missing_ok=True)
+            return
+        shutil.move(ruta_temporal, save_path)
+        if app and historial_cursor_reciente is None:
+            app.actualizar_chat(f"Se ha recibido el archivo: {archivo_nombre}")
+        messagebox.showinfo("Éxito", f"Archivo '{archivo_nombre}' descargado exitosamente!")
+        # Usar la función de notificación adecuada
+        mostrar_notificacion("Archivo recibido", f"Archivo '{archivo_nombre}' descargado exitosamente.")
     except Exception as e:
-        logging.error(f"Error recibiendo archivo: {e}")
+        log_transferencias.error("Error recibiendo archivo: %s", e)
         messagebox.showerror("Error", f"No se pudo descargar el archivo: {e}")
         # Usar la función de notificación adecuada
         mostrar_notificacion("Error", f"No se pudo descargar el archivo: {e}.")
 
+def procesar_eventos(eventos: List[Evento]) -> None:
+    """
+    Procesa en el hilo de Tk un lote de eventos publicados por el hilo de red.
+    Todos los mensajes del lote se muestran con un único layout y scroll; el
+    resto se procesa de uno en uno, de modo que un evento que falla no impide
+    procesar los demás.
+    """
+    global unread_messages_count, mensajes_descartados
+    mensajes = [evento.datos for evento in eventos if evento.tipo == "mensaje"]
+    # Los mensajes ya están en el historial: si la cola perdió alguno, se relee su final
+    perdidos = cola_eventos.descartados["mensaje"] - mensajes_descartados
+    if perdidos:
+        mensajes_descartados += perdidos
+        log_mensajes.warning("Se perdieron %d mensajes en la cola de eventos; se recarga el historial.", perdidos)
+        if app and historial_cursor_reciente is None:
+            volver_al_final()
+    elif mensajes:
+        if app:
+            # Si se está viendo una parte antigua del historial, los mensajes nuevos
+            # se cargan desde el historial al desplazarse hasta el final
+            if historial_cursor_reciente is None:
+                app.actualizar_chat_varios([m for m, _ in mensajes], [i for _, i in mensajes])
+        else:
+            logger.warning("No hay instancia de app para actualizar el chat.")
+
+    if mensajes or perdidos:
+        # Notificación si la ventana no está en foco
+        if root and not root.focus_get():
+            unread_messages_count += len(mensajes) + perdidos
+            mostrar_notificacion(
+                "Nuevo mensaje", f"Tienes {unread_messages_count} mensajes nuevos.", clave="mensajes", sonido=True
+            )
+
+    for evento in eventos:
+        if evento.tipo == "mensaje":
+            continue
+        try:
+            procesar_evento(evento)
+        except Exception:
+            logger.exception("Error procesando el evento '%s' de la interfaz.", evento.tipo)
+
+def procesar_evento(evento: Evento) -> None:
+    """Procesa en el hilo de Tk un evento del hilo de red que no es un mensaje."""
+    global username, estado_conexion
+    if evento.tipo == "nombre_en_uso":
+        new_name = simpledialog.askstring(
+            "Nombre en uso",
+            "El nombre ya está en uso. Ingresa otro nombre:"
+        )
+        if new_name and cliente:
+            cliente.ejecutar(cliente.presentarse(new_name))
+            username = new_name  # Actualizar el nombre de usuario
+    elif evento.tipo == "archivo_recibido":
+        guardar_archivo_recibido(*evento.datos)
+    elif evento.tipo == "error_archivo":
+        messagebox.showerror("Error", evento.datos)
+        mostrar_notificacion("Error", evento.datos)
+    elif evento.tipo == "transferencia_terminada":
+        transferencia_terminada(evento.datos)
+    elif evento.tipo == "aviso":
+        messagebox.showinfo(*evento.datos)
+    elif evento.tipo == "desconectado":
+        logger.warning("Conexión con el servidor perdida.")
+    elif evento.tipo == "estado_conexion":
+        anterior, estado_conexion = estado_conexion, evento.datos
+        if app:
+            app.mostrar_estado_conexion(estado_conexion, cliente.mensajes_pendientes())
+        if estado_conexion is EstadoConexion.CONECTADO and anterior is EstadoConexion.RECONECTANDO:
+            reanudar_tras_reconexion()
+        elif estado_conexion is EstadoConexion.SESION_CADUCADA:
+            messagebox.showwarning(
+                "Sesión caducada",
+                "La sesión ha caducado. Vuelve a iniciar IcoChat para iniciar sesión de nuevo."
+            )
+
+def transferencia_terminada(transferencia: Transferencia) -> None:
+    """
+    Avisa del fin de una transferencia del gestor. Se ejecuta en el hilo de
+    Tk; los errores se notifican sin ventanas modales, para no bloquear la
+    interfaz cuando fallan varias a la vez (el detalle queda en el panel).
+    """
+    accion = "subida" if transferencia.tipo == "subida" else "descarga"
+    if transferencia.fase is FaseTransferencia.FALLIDA:
+        mostrar_notificacion("Error", f"Falló la {accion} de '{transferencia.nombre}': {transferencia.error}.")
+        return
+    if transferencia.tipo == "subida":
+        id_mensaje = save_message(f"Tú: has subido el archivo: {transferencia.nombre}", sender="self")
+        if app and historial_cursor_reciente is None:
+            app.actualizar_chat(f"Tú: has subido el archivo: {transferencia.nombre}", id_mensaje)
+        mostrar_notificacion("Archivo Subido", f"Archivo '{transferencia.nombre}' subido exitosamente.")
+        log_transferencias.info("Archivo '%s' subido al servidor.", transferencia.nombre)
+    else:
+        mostrar_notificacion("Archivo descargado", f"Archivo '{transferencia.nombre}' descargado exitosamente.")
+        log_transferencias.info("Archivo '%s' descargado en %s.", transferencia.nombre, transferencia.ruta)
+
 # -------------------------
 # USUARIO Y LOGIN
 # -------------------------
@@ -214,7 +342,7 @@ def load_user_name() -> str:
                 data = json.load(file)
                 return data.get("user_name", "")
         except (json.JSONDecodeError, IOError) as e:
-            logging.error(f"Error cargando el nombre de usuario: {e}")
+            logger.error("Error cargando el nombre de usuario: %s", e)
     return ""
 
 def save_user_name(user_name: str) -> None:
@@ -223,16 +351,36 @@ def save_user_name(user_name: str) -> None:
     try:
         with (DATA_DIR / "user_name.json").open("w", encoding="utf-8") as file:
             json.dump(data, file, ensure_ascii=False, indent=4)
-        logging.info("Nombre de usuario guardado en user_name.json.")
+        logger.info("Nombre de usuario guardado en user_name.json.")
     except IOError as e:
-        logging.error(f"Error guardando el nombre de usuario: {e}")
+        logger.error("Error guardando el nombre de usuario: %s", e)
 
 # -------------------------
 # CONEXIÓN AL SERVIDOR
 # -------------------------
+def crear_cliente() -> ClienteAsync:
+    """
+    Crea el núcleo de red asíncrono. El login inicia sesión con él y el chat
+    sigue usando la misma conexión. Se crea sin reconexión automática: se
+    activa en connect_to_server si el login obtuvo un token de sesión.
+    """
+    return ClienteAsync(
+        SERVER_CONFIG["server_ip"],
+        SERVER_CONFIG["server_port"],
+        al_recibir=procesar_frame,
+        al_desconectar=lambda: cola_eventos.publicar("desconectado"),
+        registro=RegistroTransferencias(),
+        bandeja=BandejaSalida(),
+        al_cambiar_estado=lambda estado: cola_eventos.publicar("estado_conexion", estado)
+    )
+
 def connect_to_server() -> None:
-    """Establece la conexión con el servidor y comienza a recibir mensajes."""
-    global client_socket, username
+    """
+    Se presenta en el chat con la conexión autenticada en el login (o, si se
+    perdió entretanto, reconecta con el token de sesión) y carga el historial
+    sin esperar a que termine.
+    """
+    global cliente, gestor, username
 
     # Carga/solicita el nombre de usuario
     user_name = load_user_name()
@@ -247,65 +395,185 @@ def connect_to_server() -> None:
     else:
         username = user_name  # Asignar el nombre de usuario
 
-    try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.connect((SERVER_CONFIG["server_ip"], SERVER_CONFIG["server_port"]))
-        client_socket.sendall(user_name.encode('utf-8'))
-        logging.info("Conectado al servidor.")
-    except socket.error as e:
+    if cliente is None:
+        cliente = crear_cliente()
+    # Tras un corte solo se puede volver a entrar con el token de sesión del login
+    if cliente.token_sesion:
+        cliente.activar_reconexion()
+    gestor = GestorTransferencias(
+        cliente,
+        max_simultaneas=SERVER_CONFIG.get("max_transferencias", MAX_TRANSFERENCIAS_SIMULTANEAS),
+        al_terminar=lambda transferencia: cola_eventos.publicar("transferencia_terminada", transferencia)
+    )
+
+    def al_error(e: BaseException) -> None:
         messagebox.showerror("Error de conexión", f"No se pudo conectar al servidor: {e}")
-        logging.error(f"Error de conexión: {e}")
-        return
+        logger.error("Error de conexión: %s", e)
 
-    # Hilo para recibir mensajes
-    threading.Thread(target=receive_messages, args=(client_socket,), daemon=True).start()
+    if cliente.conectado:
+        futuro = cliente.ejecutar(cliente.presentarse(user_name))
+    else:
+        futuro = cliente.ejecutar(cliente.connect(user_name))
+    esperar_en_tk(
+        root, futuro,
+        al_exito=lambda _: reanudar_transferencias(), al_error=al_error
+    )
     load_chat_history()
 
+def reanudar_transferencias() -> None:
+    """Pone en la cola del gestor las subidas y descargas que quedaron cortadas."""
+    # Si el gestor ya tiene la transferencia, se continúa esa misma (y su fila del panel)
+    en_gestor = {
+        (t.tipo, t.nombre, str(t.ruta)): t for t in gestor.transferencias()
+        if t.fase not in (FaseTransferencia.COMPLETADA, FaseTransferencia.CANCELADA)
+    }
+    for estado in cliente.transferencias_pendientes():
+        transferencia = en_gestor.get((estado.tipo, estado.nombre, estado.ruta))
+        if transferencia is not None and transferencia.fase is not FaseTransferencia.FALLIDA:
+            continue  # En cola, en curso o pausada por el usuario
+        accion = "subida" if estado.tipo == "subida" else "descarga"
+        log_transferencias.info(
+            "Reanudando la %s de %s (%d bytes verificados).", accion, estado.nombre, estado.offset
+        )
+        # Si vuelve a fallar, el estado se conserva para la próxima conexión
+        if transferencia is not None:
+            gestor.reanudar(transferencia)
+        else:
+            gestor.continuar(estado)
+
+def reanudar_tras_reconexion() -> None:
+    """
+    Tras una reconexión automática, continúa las transferencias cortadas y
+    vuelve a seguir la lista de archivos si se estaba siguiendo.
+    """
+    global seguimiento_archivos
+    logger.info("Reconectado al servidor.")
+    reanudar_transferencias()
+    if seguimiento_archivos is not None and seguimiento_archivos.done():
+        seguimiento_archivos = cliente.ejecutar(cliente.seguir_archivos(lista_archivos))
+
 # -------------------------
 # HISTORIAL DE CHAT
 # -------------------------
+def formatear_entrada(entry: Dict[str, Any]) -> Optional[str]:
+    """Convierte un registro del historial al formato "Remitente: contenido"."""
+    if not (isinstance(entry, dict) and "message" in entry and "sender" in entry):
+        return None
+    if entry["sender"] == "self":
+        # El mensaje es tuyo, dirección=right
+        return f"Tú: {entry['message']}"
+    return entry["message"]
+
 def load_chat_history() -> None:
-    """Carga el historial de chat desde un archivo local."""
-    historial_file = DATA_DIR / "historial_chat.json"
-    if historial_file.exists():
-        try:
-            with historial_file.open("r", encoding="utf-8") as file:
-                messages = json.load(file)
-                if isinstance(messages, list):
-                    # Recupera y muestra mensajes usando app.actualizar_chat(...)
-                    for entry in messages:
-                        if isinstance(entry, dict) and "message" in entry and "sender" in entry:
-                            if app:
-                                if entry["sender"] == "self":
-                                    # El mensaje es tuyo, dirección=right
-                                    remitente = "Tú"
-                                    contenido = entry["message"]
-                                    app.actualizar_chat(f"{remitente}: {contenido}")
-                                else:
-                                    app.actualizar_chat(entry["message"])
-            logging.info("Historial de chat cargado desde historial_chat.json.")
-        except json.JSONDecodeError:
-            logging.error("Error al decodificar el archivo historial_chat.json")
-
-def save_message(message: str, sender: str = "other") -> None:
-    """Guarda un mensaje en el historial de chat."""
-    messages = []
-    historial_file = DATA_DIR / "historial_chat.json"
-    if historial_file.exists():
-        try:
-            with historial_file.open("r", encoding="utf-8") as file:
-                messages = json.load(file)
-                if not isinstance(messages, list):
-                    messages = []
-        except json.JSONDecodeError:
-            messages = []
-    messages.append({"message": message, "sender": sender})
-    try:
-        with historial_file.open("w", encoding="utf-8") as file:
-            json.dump(messages, file, ensure_ascii=False, indent=4)
-        logging.info("Mensaje guardado en historial_chat.json.")
-    except IOError as e:
-        logging.error(f"Error guardando el historial de chat: {e}")
+    """
+    Muestra la página más reciente del historial en lugar del contenido del
+    chat. Las páginas anteriores se cargan al desplazarse hasta arriba (ver
+    load_older_messages).
+    """
+    global historial_cursor, historial_cursor_reciente
+    if not historial or not app:
+        return
+    pagina = historial.leer_pagina()
+    historial_cursor = pagina[0].get("id") if pagina else None
+    historial_cursor_reciente = None
+    mensajes, ids = _entradas_a_mensajes(pagina)
+    app.reemplazar_mensajes(mensajes, ids)
+    app.vista_mensajes.ir_al_final()
+    logger.info("Historial de chat cargado: %d mensajes recientes.", len(mensajes))
+
+def volver_al_final() -> None:
+    """Vuelve de una parte antigua del historial a sus mensajes más recientes."""
+    if not historial:
+        return
+    # Los mensajes recibidos mientras tanto pueden no estar aún en disco
+    if not historial.flush(TIMEOUT_VOLCADO_VISTA_S):
+        log_interfaz.warning("El historial no terminó de volcarse; pueden faltar los últimos mensajes.")
+    load_chat_history()
+
+def load_older_messages() -> None:
+    """Carga la página del historial anterior al mensaje más antiguo mostrado."""
+    global historial_cursor
+    if not historial or not app or historial_cursor is None or historial_cursor <= 1:
+        return
+    pagina = historial.leer_pagina(antes_de=historial_cursor)
+    if not pagina:
+        historial_cursor = None  # No quedan mensajes más antiguos
+        return
+    historial_cursor = pagina[0].get("id")
+    mensajes, ids = _entradas_a_mensajes(pagina)
+    app.anteponer_mensajes(mensajes, ids)
+    log_interfaz.debug("Cargados %d mensajes antiguos del historial.", len(mensajes))
+
+def load_newer_messages() -> None:
+    """
+    Carga la página del historial posterior al mensaje más reciente mostrado,
+    cuando la vista es una parte intermedia del historial.
+    """
+    global historial_cursor_reciente
+    if not historial or not app or historial_cursor_reciente is None:
+        return
+    pagina = _pagina_posterior(historial_cursor_reciente)
+    ultimo_leido = pagina[-1]["id"] if pagina else historial_cursor_reciente
+    if len(pagina) < TAMANO_PAGINA and historial.ultimo_id() > ultimo_leido:
+        # Se ha llegado al final de lo volcado: esperar a los mensajes recibidos entretanto
+        historial.flush(TIMEOUT_VOLCADO_VISTA_S)
+        pagina = _pagina_posterior(historial_cursor_reciente)
+    if pagina:
+        mensajes, ids = _entradas_a_mensajes(pagina)
+        app.agregar_mensajes(mensajes, ids)
+        historial_cursor_reciente = pagina[-1]["id"]
+        log_interfaz.debug("Cargados %d mensajes recientes del historial.", len(mensajes))
+    if historial_cursor_reciente >= historial.ultimo_id():
+        historial_cursor_reciente = None  # La vista vuelve a seguir los mensajes nuevos
+
+def _pagina_posterior(despues_de: int) -> List[Dict[str, Any]]:
+    """Lee hasta TAMANO_PAGINA registros del historial con id mayor que `despues_de`."""
+    # Los ids son consecutivos: la página que acaba justo antes de este límite empieza tras `despues_de`
+    pagina = historial.leer_pagina(antes_de=despues_de + TAMANO_PAGINA + 1)
+    return [entry for entry in pagina if entry.get("id", 0) > despues_de]
+
+def _entradas_a_mensajes(pagina: List[Dict[str, Any]]) -> "tuple[List[str], List[Optional[int]]]":
+    """Convierte una página del historial en mensajes para la interfaz y sus ids."""
+    mensajes, ids = [], []
+    for entry in pagina:
+        mensaje = formatear_entrada(entry)
+        if mensaje is not None:
+            mensajes.append(mensaje)
+            ids.append(entry.get("id"))
+    return mensajes, ids
+
+def go_to_message(id_mensaje: int) -> None:
+    """
+    Muestra un mensaje del historial en el chat. Si no está cargado, el chat
+    pasa a mostrar la página del historial que lo rodea; desde ella se cargan
+    las anteriores o las posteriores al desplazarse.
+    """
+    global historial_cursor, historial_cursor_reciente
+    if not app or app.vista_mensajes.ir_a_id(id_mensaje):
+        return
+    pagina = historial.leer_pagina(antes_de=id_mensaje + TAMANO_PAGINA // 2 + 1) if historial else []
+    if not any(entry.get("id") == id_mensaje for entry in pagina):
+        messagebox.showinfo("Buscar", "El mensaje ya no está en el historial.")
+        return
+    historial_cursor = pagina[0].get("id")
+    historial_cursor_reciente = pagina[-1]["id"] if pagina[-1]["id"] < historial.ultimo_id() else None
+    mensajes, ids = _entradas_a_mensajes(pagina)
+    app.reemplazar_mensajes(mensajes, ids)
+    app.vista_mensajes.ir_a_id(id_mensaje)
+    log_interfaz.debug("Cargada la página del historial alrededor del mensaje %d.", id_mensaje)
+
+def save_message(message: str, sender: str = "other") -> Optional[int]:
+    """
+    Guarda un mensaje en el historial de chat. La escritura a disco (y su
+    indexado para búsquedas) se hace en segundo plano, agrupada con otros mensajes.
+
+    Returns:
+        Optional[int]: Id del mensaje en el historial, o None si no se guardó.
+    """
+    if historial:
+        return historial.agregar(message, sender)
+    logger.warning("Historial no inicializado, mensaje no guardado.")
+    return None
 
 # -------------------------
 # ACCIONES
@@ -314,47 +582,36 @@ def reset_notifications(event: Optional[tk.Event] = None) -> None:
     """Resetea el contador de mensajes no leídos."""
     global unread_messages_count
     unread_messages_count = 0
-    logging.info("Contador de mensajes no leídos reseteado.")
+    log_interfaz.debug("Contador de mensajes no leídos reseteado.")
 
 def show_uploaded_files() -> None:
-    """Muestra la ventana de archivos subidos."""
-    if client_socket:
-        Archi.mostrar_archivos(client_socket)
+    """
+    Muestra la ventana de archivos subidos. La lista se sigue con una única
+    suscripción por conexión, compartida por todas las ventanas abiertas.
+    """
+    global seguimiento_archivos
+    if cliente and cliente.conectado:
+        if seguimiento_archivos is None or seguimiento_archivos.done():
+            seguimiento_archivos = cliente.ejecutar(cliente.seguir_archivos(lista_archivos))
+        Archi.mostrar_archivos(lista_archivos, gestor)
     else:
         messagebox.showwarning("No conectado", "Debes estar conectado para ver archivos subidos.")
 
 def subir_archivo() -> None:
-    """Permite al usuario seleccionar y subir un archivo al servidor."""
-    global client_socket
-    if not client_socket:
+    """Permite al usuario seleccionar uno o varios archivos y los pone en la cola de subidas."""
+    if not cliente or not cliente.conectado:
         messagebox.showwarning("No conectado", "Debes estar conectado al servidor para subir archivos.")
         return
 
-    file_path = filedialog.askopenfilename(
-        title="Seleccionar archivo",
+    file_paths = filedialog.askopenfilenames(
+        title="Seleccionar archivos",
         filetypes=[("Todos los archivos", "*.*")]
     )
-    if file_path:
-        file_path = Path(file_path)
-        file_name = file_path.name
-        try:
-            client_socket.sendall(f"ARCHIVO:{file_name}".encode('utf-8'))
-            with file_path.open('rb') as f:
-                for bytes_read in iter(lambda: f.read(1024), b''):
-                    client_socket.sendall(bytes_read)
-            if app:
-                # Insertar mensaje en la interfaz
-                app.actualizar_chat(f"Tú: has subido el archivo: {file_name}")
-            save_message(f"Tú: has subido el archivo: {file_name}", sender="self")
-            messagebox.showinfo("Éxito", f"Archivo '{file_name}' subido exitosamente!")
-            # Usar la función de notificación adecuada
-            mostrar_notificacion("Archivo Subido", f"Archivo '{file_name}' subido exitosamente.")
-            logging.info(f"Archivo '{file_name}' subido al servidor.")
-        except Exception as e:
-            logging.error(f"Error subiendo archivo: {e}")
-            messagebox.showerror("Error", f"No se pudo subir el archivo: {e}")
-            # Usar la función de notificación adecuada
-            mostrar_notificacion("Error", f"No se pudo subir el archivo: {e}.")
+    # Las subidas corren en el bucle de red; el avance se ve en la barra de
+    # acciones y en el panel de transferencias
+    for file_path in file_paths:
+        gestor.subir(Path(file_path))
+        log_transferencias.info("Subida de '%s' añadida a la cola.", Path(file_path).name)
 
 # -------------------------
 # ENVÍO DE MENSAJES
@@ -363,28 +620,37 @@ def send_message(event: Optional[tk.Event] = None) -> None:
     """
     Envía el mensaje escrito por el usuario al servidor,
     y muestra el mensaje con app.actualizar_chat(...).
+    Sin conexión, el mensaje queda en la bandeja de salida y se envía al reconectar.
     """
-    global client_socket, username
-    if not client_socket:
+    if not cliente:
         messagebox.showwarning("No conectado", "Debes estar conectado al servidor para enviar mensajes.")
         return
 
     texto = app.entrada_mensaje.get().strip()  # Obtenemos el texto del Entry en la interfaz
     if texto:
-        try:
-            client_socket.sendall(texto.encode('utf-8'))
-            # Insertar en la interfaz
-            app.actualizar_chat(f"Tú: {texto}")
-            # Guardar en el historial
-            save_message(texto, sender="self")  # Guardar solo el mensaje sin "Tú: "
-            # Limpiar el campo
-            app.entrada_mensaje.delete(0, tk.END)
-            logging.info(f"Mensaje enviado al servidor: {texto}")
-        except Exception as e:
-            logging.error(f"Error enviando mensaje: {e}")
+        def al_error(e: BaseException) -> None:
+            log_mensajes.error("Error enviando mensaje: %s", e)
             messagebox.showerror("Error", f"No se pudo enviar el mensaje: {e}")
             # Usar la función de notificación adecuada
             mostrar_notificacion("Error", f"No se pudo enviar el mensaje: {e}.")
+
+        esperar_en_tk(
+            root, cliente.ejecutar(cliente.enviar_chat(texto)),
+            al_exito=lambda _: app.mostrar_estado_conexion(estado_conexion, cliente.mensajes_pendientes()),
+            al_error=al_error
+        )
+        # Guardar en el historial
+        id_mensaje = save_message(texto, sender="self")  # Guardar solo el mensaje sin "Tú: "
+        # Insertar en la interfaz; si se estaba viendo una parte antigua del
+        # historial, volver al final para ver el mensaje enviado
+        if historial_cursor_reciente is None:
+            app.actualizar_chat(f"Tú: {texto}", id_mensaje)
+        else:
+            volver_al_final()
+        # Limpiar el campo
+        app.entrada_mensaje.delete(0, tk.END)
+        log_mensajes.info("Mensaje enviado al servidor (%d caracteres).", len(texto))
+        log_mensajes.debug("Texto enviado: %s", texto)
     else:
         messagebox.showwarning("Mensaje vacío", "No puedes enviar un mensaje vacío.")
 
@@ -424,8 +690,13 @@ class ChatUI:
         self.configurar_fondo()
 
         self.root.bind('<Return>', self.enviar_mensaje_evento)
+        self.root.bind('<Control-f>', self.abrir_busqueda)
+        self.root.bind('<Control-t>', self.abrir_transferencias)
         self.vincular_eventos_mouse()
 
+        self.panel_transferencias: Optional[PanelTransferencias] = None
+        self.actualizar_progreso_transferencias()
+
     def configurar_estilos(self):
         """Configura los estilos de los widgets."""
         style = ttk.Style()
@@ -454,22 +725,17 @@ class ChatUI:
             imagen = self.redimensionar_imagen(ruta, self.tamano_icono)
             if imagen:
                 self.imagenes[clave] = imagen
-                logger.info(f"Imagen cargada: {clave} desde {ruta}")
+                logger.info("Imagen cargada: %s desde %s", clave, ruta)
             else:
-                logger.error(f"Fallo al cargar la imagen: {ruta}")
+                logger.error("Fallo al cargar la imagen: %s", ruta)
 
-    def redimensionar_imagen(self, ruta_imagen: Path, tamaño: tuple[int, int]) -> Optional[ImageTk.PhotoImage]:
-        """Redimensiona una imagen y la convierte a PhotoImage."""
-        try:
-            with Image.open(ruta_imagen) as imagen:
-                imagen = imagen.convert("RGBA")
-                imagen_redimensionada = imagen.resize(tamaño, Image.Resampling.LANCZOS)
-                return ImageTk.PhotoImage(imagen_redimensionada)
-        except FileNotFoundError:
-            logger.error(f"No se encontró la imagen: {ruta_imagen}")
-        except Exception as e:
-            logger.error(f"Error al redimensionar la imagen {ruta_imagen}: {e}")
-        return None
+    def redimensionar_imagen(self, ruta_imagen: Path, tamaño: tuple[int, int]) -> Optional[tk.PhotoImage]:
+        """
+        Devuelve la imagen redimensionada como PhotoImage. Sale de la caché de
+        iconos: solo se redimensiona la primera vez para cada tamaño, y la
+        misma PhotoImage se comparte con las demás ventanas.
+        """
+        return cargar_icono(ruta_imagen, tamaño, self.root)
 
     def configurar_fondo(self):
         """Configura el color de fondo de la ventana principal."""
@@ -514,10 +780,36 @@ class ChatUI:
         )
         self.label_titulo.pack(pady=5)
 
+        # Estado de la conexión y mensajes pendientes de enviar
+        self.label_estado = tk.Label(
+            self.frame_titulo,
+            text=EstadoConexion.DESCONECTADO.value,
+            font=("Arial", 9),
+            bg="#3D3D3D",
+            fg="#F04747",
+            anchor="center"
+        )
+        self.label_estado.pack(pady=(0, 5))
+
         self.linea_separadora = tk.Frame(self.root, height=2, bg="white")
         self.linea_separadora.pack(fill=tk.X, padx=200)  # Ajusta el padding para que no ocupe toda la anchura
         logger.info("Título configurado.")
 
+    def mostrar_estado_conexion(self, estado: EstadoConexion, pendientes: int = 0) -> None:
+        """
+        Muestra el estado de la conexión bajo el título.
+
+        Args:
+            estado (EstadoConexion): Estado de la conexión.
+            pendientes (int, optional): Mensajes en la bandeja de salida; solo se muestran
+                sin conexión, ya que conectado se envían enseguida. Defaults to 0.
+        """
+        colores = {EstadoConexion.CONECTADO: "#43B581", EstadoConexion.RECONECTANDO: "#FF8C00"}
+        texto = estado.value
+        if pendientes and estado is not EstadoConexion.CONECTADO:
+            texto += f" · {pendientes} mensaje{'s' if pendientes != 1 else ''} pendiente{'s' if pendientes != 1 else ''}"
+        self.label_estado.config(text=texto, fg=colores.get(estado, "#F04747"))
+
     def configurar_area_mensajes(self):
         """Configura el área donde se muestran los mensajes del chat."""
         self.frame_mensajes = tk.Frame(self.root, bg="#2D2D2D")
@@ -536,15 +828,15 @@ class ChatUI:
             command=self.canvas_mensajes.yview,
             style="Custom.Vertical.TScrollbar"
         )
-        self.canvas_mensajes.configure(yscrollcommand=self.scrollbar.set)
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        self.frame_contenedor = tk.Frame(self.canvas_mensajes, bg="#2D2D2D")
-        self.canvas_mensajes.create_window((0, 0), window=self.frame_contenedor, anchor='nw')
-
-        self.frame_contenedor.bind(
-            "<Configure>",
-            lambda e: self.canvas_mensajes.configure(scrollregion=self.canvas_mensajes.bbox("all"))
+        # Lista virtualizada: solo las filas cercanas a la zona visible tienen widgets
+        self.vista_mensajes = VistaMensajes(
+            self.canvas_mensajes,
+            self.fuente_dinamica,
+            yscrollcommand=self.scrollbar.set,
+            al_llegar_arriba=load_older_messages,
+            al_llegar_abajo=load_newer_messages
         )
 
         self.scrollbar_visible = False
@@ -605,7 +897,23 @@ class ChatUI:
         )
         self.boton_archivo.pack(side=tk.LEFT, padx=5, pady=0)
 
+        self.boton_transferencias = tk.Button(
+            self.frame_iconos,
+            text="⇅",
+            font=self.fuente_dinamica,
+            command=self.abrir_transferencias,
+            bg="#1D1D1D",
+            fg="white",
+            borderwidth=0,
+            highlightthickness=0,
+            relief=tk.FLAT,
+            activebackground="#1D1D1D",
+            activeforeground="white"
+        )
+        self.boton_transferencias.pack(side=tk.LEFT, padx=5, pady=0)
+
         # Campo de entrada con customtkinter
+        import customtkinter as ctk
         self.entrada_mensaje = ctk.CTkEntry(
             self.barra_acciones,
             placeholder_text="Empieza a escribir...",
@@ -635,6 +943,17 @@ class ChatUI:
         # Posicionar el botón de enviar un poco más a la derecha con padding
         self.boton_enviar.pack(side=tk.RIGHT, padx=(0, 20), pady=10)
 
+        # Progreso conjunto de las transferencias; solo se muestra mientras hay
+        # alguna en curso y al pulsarla se abre el panel de transferencias
+        self.barra_progreso = ttk.Progressbar(
+            self.barra_acciones,
+            orient=tk.HORIZONTAL,
+            mode="determinate",
+            length=120,
+            maximum=100
+        )
+        self.barra_progreso.bind('<Button-1>', self.abrir_transferencias)
+
     # ------------------------------
     # Funciones de botones/acciones
     # ------------------------------
@@ -646,7 +965,7 @@ class ChatUI:
         )
         if ruta_foto:
             messagebox.showinfo("Foto Seleccionada", f"Has seleccionado: {ruta_foto}")
-            logger.info(f"Foto seleccionada: {ruta_foto}")
+            logger.info("Foto seleccionada: %s", ruta_foto)
 
     def activar_mencion(self):
         """Activa una mención en el campo de entrada."""
@@ -657,60 +976,186 @@ class ChatUI:
         """Sube un archivo al servidor."""
         subir_archivo()  # Llamada a la función global definida antes de la clase
 
+    def abrir_transferencias(self, event=None):
+        """Abre el panel de transferencias (o lo trae al frente si ya está abierto)."""
+        if not gestor:
+            messagebox.showwarning("No conectado", "Debes estar conectado para ver las transferencias.")
+            return
+        self.panel_transferencias = abrir_panel(self.root, gestor, self.panel_transferencias)
+
+    def actualizar_progreso_transferencias(self):
+        """Refleja en la barra de acciones el progreso conjunto de las transferencias en curso."""
+        if gestor:
+            transferidos, total = gestor.progreso_total()
+            if total == 0 and not transferidos:
+                self.ocultar_progreso()
+            else:
+                self.mostrar_progreso(transferidos, total)
+        self.root.after(INTERVALO_PROGRESO_MS, self.actualizar_progreso_transferencias)
+
+    def mostrar_progreso(self, transferidos: int, total: Optional[int]):
+        """
+        Muestra el avance de las transferencias en la barra de acciones.
+
+        Args:
+            transferidos (int): Bytes transferidos hasta ahora.
+            total (Optional[int]): Tamaño total, None si se desconoce.
+        """
+        if not self.barra_progreso.winfo_ismapped():
+            self.barra_progreso.pack(side=tk.RIGHT, padx=(0, 10), pady=10, after=self.boton_enviar)
+        if total:
+            self.barra_progreso.configure(mode="determinate", value=transferidos * 100 / total)
+        else:
+            self.barra_progreso.configure(mode="indeterminate")
+            self.barra_progreso.step()
+
+    def ocultar_progreso(self):
+        """Oculta la barra de progreso de transferencias."""
+        if self.barra_progreso.winfo_ismapped():
+            self.barra_progreso.pack_forget()
+
     # ----------------------------
     # Manejo de mensajes en el chat
     # ----------------------------
-    def actualizar_chat(self, mensaje: str):
+    def actualizar_chat(self, mensaje: str, id_mensaje: Optional[int] = None):
         """
-        Renderiza un mensaje en el frame_contenedor con el nombre del remitente en naranja y en negrita para otros usuarios.
+        Añade un mensaje a la lista virtualizada, con el nombre del remitente en naranja y en negrita para otros usuarios.
 
         Args:
             mensaje (str): El mensaje a mostrar, esperado en formato "Remitente: contenido".
+            id_mensaje (Optional[int], optional): Id del mensaje en el historial.
+        """
+        self.actualizar_chat_varios([mensaje], [id_mensaje])
+
+    def actualizar_chat_varios(self, mensajes: List[str], ids: Optional[List[Optional[int]]] = None):
+        """
+        Añade varios mensajes con un único layout y un único scroll al final.
+
+        Args:
+            mensajes (List[str]): Mensajes en formato "Remitente: contenido".
+            ids (Optional[List[Optional[int]]], optional): Ids de los mensajes en el historial.
+        """
+        ids = ids or [None] * len(mensajes)
+        self.vista_mensajes.agregar_varios([self._a_fila(m, i) for m, i in zip(mensajes, ids)])
+
+        # Mantener la vista pegada al último mensaje
+        self.vista_mensajes.ir_al_final()
+        self.actualizar_scrollbar_visibility()
+
+    def agregar_mensajes(self, mensajes: List[str], ids: Optional[List[Optional[int]]] = None):
         """
-        frame_mensaje = tk.Frame(self.frame_contenedor, bg="#2D2D2D")
+        Añade mensajes al final del chat sin mover la vista.
 
-        # Dividir el mensaje en remitente y contenido
+        Args:
+            mensajes (List[str]): Mensajes en formato "Remitente: contenido".
+            ids (Optional[List[Optional[int]]], optional): Ids de los mensajes en el historial.
+        """
+        ids = ids or [None] * len(mensajes)
+        self.vista_mensajes.agregar_varios([self._a_fila(m, i) for m, i in zip(mensajes, ids)])
+        self.actualizar_scrollbar_visibility()
+
+    def reemplazar_mensajes(self, mensajes: List[str], ids: Optional[List[Optional[int]]] = None):
+        """
+        Sustituye todos los mensajes del chat (p. ej. por otra página del historial).
+
+        Args:
+            mensajes (List[str]): Mensajes en formato "Remitente: contenido".
+            ids (Optional[List[Optional[int]]], optional): Ids de los mensajes en el historial.
+        """
+        ids = ids or [None] * len(mensajes)
+        self.vista_mensajes.reemplazar([self._a_fila(m, i) for m, i in zip(mensajes, ids)])
+        self.actualizar_scrollbar_visibility()
+
+    def anteponer_mensajes(self, mensajes: List[str], ids: Optional[List[Optional[int]]] = None):
+        """
+        Añade mensajes antiguos al principio del chat sin mover la vista.
+
+        Args:
+            mensajes (List[str]): Mensajes en formato "Remitente: contenido", del más antiguo al más reciente.
+            ids (Optional[List[Optional[int]]], optional): Ids de los mensajes en el historial.
+        """
+        ids = ids or [None] * len(mensajes)
+        self.vista_mensajes.anteponer_varios([self._a_fila(m, i) for m, i in zip(mensajes, ids)])
+        self.actualizar_scrollbar_visibility()
+
+    @staticmethod
+    def _a_fila(mensaje: str, id_mensaje: Optional[int] = None) -> Mensaje:
+        """Divide un mensaje "Remitente: contenido" en una fila de la vista."""
         if ": " in mensaje:
             remitente, contenido = mensaje.split(": ", 1)
         else:
             remitente, contenido = "Desconocido", mensaje  # En caso de formato inesperado
+        return Mensaje(remitente, contenido, id_mensaje)
 
-        # Determinar colores
-        if remitente == "Tú":
-            fg_remitente = "white"
-        else:
-            fg_remitente = "#FFA500"  # Naranja
+    # ----------------------------
+    # Búsqueda en el historial
+    # ----------------------------
+    def abrir_busqueda(self, event=None):
+        """Abre la ventana de búsqueda en el historial del chat."""
+        if not indice_busqueda:
+            messagebox.showwarning("Buscar", "El índice de búsqueda no está disponible.")
+            return
 
-        # Etiqueta para el remitente
-        etiqueta_remitente = tk.Label(
-            frame_mensaje,
-            text=f"{remitente}: ",
+        ventana = tk.Toplevel(self.root)
+        ventana.title("Buscar en el chat")
+        ventana.geometry("600x400")
+        ventana.configure(bg="#2D2D2D")
+
+        frame_filtros = tk.Frame(ventana, bg="#2D2D2D")
+        frame_filtros.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
+
+        consulta = tk.StringVar()
+        remitente = tk.StringVar()
+        frase = tk.BooleanVar(value=False)
+
+        entrada_consulta = tk.Entry(frame_filtros, textvariable=consulta, font=self.fuente_dinamica)
+        entrada_consulta.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Label(frame_filtros, text="De:", bg="#2D2D2D", fg="white").pack(side=tk.LEFT, padx=(10, 2))
+        tk.Entry(frame_filtros, textvariable=remitente, width=12).pack(side=tk.LEFT)
+        tk.Checkbutton(
+            frame_filtros,
+            text="Frase exacta",
+            variable=frase,
             bg="#2D2D2D",
-            fg=fg_remitente,
-            font=(self.fuente_dinamica[0], self.fuente_dinamica[1], "bold"),
-            anchor='w'
-        )
-        etiqueta_remitente.pack(side=tk.LEFT, padx=(10, 5), pady=2)
+            fg="white",
+            selectcolor="#2D2D2D",
+            activebackground="#2D2D2D",
+            activeforeground="white"
+        ).pack(side=tk.LEFT, padx=5)
 
-        # Etiqueta para el contenido del mensaje
-        etiqueta_contenido = tk.Label(
-            frame_mensaje,
-            text=contenido,
-            bg="#2D2D2D",
+        lista_resultados = tk.Listbox(
+            ventana,
+            bg="#3D3D3D",
             fg="white",
             font=self.fuente_dinamica,
-            wraplength=500,  # Ajustado al nuevo ancho del campo de entrada
-            justify='left'
+            activestyle="none",
+            highlightthickness=0
         )
-        etiqueta_contenido.pack(side=tk.LEFT, padx=(0, 10), pady=2, fill=tk.BOTH, expand=True)
-
-        # Empaquetar el marco del mensaje a la izquierda
-        frame_mensaje.pack(pady=2, anchor='w')  # Siempre a la izquierda
-
-        # Actualizar el canvas para mostrar el nuevo mensaje
-        self.canvas_mensajes.update_idletasks()
-        self.canvas_mensajes.yview_moveto(1.0)
-        self.actualizar_scrollbar_visibility()
+        lista_resultados.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        resultados = []
+
+        def buscar(event=None):
+            resultados[:] = indice_busqueda.buscar(
+                consulta.get(),
+                remitente=remitente.get().strip() or None,
+                frase=frase.get()
+            )
+            lista_resultados.delete(0, tk.END)
+            for resultado in resultados:
+                lista_resultados.insert(tk.END, f"{resultado.remitente}: {resultado.fragmento}")
+            logger.debug("Búsqueda '%s': %d resultados.", consulta.get(), len(resultados))
+
+        def ir_al_resultado(event=None):
+            seleccion = lista_resultados.curselection()
+            if seleccion:
+                go_to_message(resultados[seleccion[0]].id_mensaje)
+
+        entrada_consulta.bind('<Return>', buscar)
+        lista_resultados.bind('<Double-Button-1>', ir_al_resultado)
+        lista_resultados.bind('<Return>', ir_al_resultado)
+        entrada_consulta.focus_set()
+        # Evitar que <Return> en esta ventana envíe el mensaje del chat
+        ventana.bind('<Return>', lambda e: "break")
 
     def enviar_mensaje_evento(self, event):
         """Cuando presione Enter se envía el mensaje."""
@@ -731,19 +1176,15 @@ class ChatUI:
         if can_scroll and not getattr(self, 'scrollbar_visible', False):
             self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
             self.scrollbar_visible = True
-            logger.info("Scrollbar mostrada.")
+            log_interfaz.debug("Scrollbar mostrada.")
         elif not can_scroll and getattr(self, 'scrollbar_visible', False):
             self.scrollbar.pack_forget()
             self.scrollbar_visible = False
-            logger.info("Scrollbar oculta.")
+            log_interfaz.debug("Scrollbar oculta.")
 
     def _can_scroll(self) -> bool:
         """Determina si el contenido del canvas requiere scrollbar."""
-        self.canvas_mensajes.update_idletasks()
-        bbox = self.canvas_mensajes.bbox("all")
-        if not bbox:
-            return False
-        content_height = bbox[3] - bbox[1]
+        content_height = self.vista_mensajes.altura_total()
         visible_height = self.canvas_mensajes.winfo_height()
         return content_height > visible_height
 
@@ -757,7 +1198,7 @@ class ChatUI:
         else:
             self.canvas_mensajes.bind_all("<Button-4>", self._on_mousewheel_linux)
             self.canvas_mensajes.bind_all("<Button-5>", self._on_mousewheel_linux)
-        logger.info(f"Eventos de mouse vinculados para: {sistema}")
+        logger.info("Eventos de mouse vinculados para: %s", sistema)
 
     def _on_mousewheel_windows(self, event):
         """Maneja el scroll del mouse en Windows."""
@@ -784,25 +1225,49 @@ class ChatUI:
     def cerrar_aplicacion(self):
         """Cierra la aplicación correctamente."""
         logger.info("Cerrando la aplicación.")
-        global client_socket
-        if client_socket:
-            try:
-                client_socket.close()
-                logging.info("Socket cerrado correctamente.")
-            except Exception as e:
-                logging.error(f"Error cerrando el socket: {e}")
+        cola_eventos.detener()
+        if cliente:
+            cliente.cerrar()
+            logger.info("Conexión cerrada correctamente.")
+        if historial:
+            historial.cerrar()
+        if indice_busqueda:
+            indice_busqueda.cerrar()
+        if notificaciones:
+            notificaciones.cerrar(timeout=1)
         self.root.destroy()
 
 # -------------------------
 # EJECUCIÓN DEL CHAT
 # -------------------------
-def run_chat() -> None:
+def run_chat(sesion: Optional[ClienteAsync] = None) -> None:
     """
     Inicializa y ejecuta la interfaz de chat con la clase ChatUI.
+
+    Args:
+        sesion (Optional[ClienteAsync], optional): Cliente autenticado en el login.
+            Defaults to None (se crea uno nuevo).
     """
-    global root, app
+    global root, app, historial, indice_busqueda, cliente
+
+    cliente = sesion
+
+    # Abrir el historial y migrar una única vez el antiguo historial_chat.json
+    historial = HistorialChat()
+    historial.migrar_json()
+
+    # Índice de búsqueda: se actualiza con cada lote volcado del historial y,
+    # si se ha quedado atrás (p. ej. tras la migración), se pone al día en segundo plano
+    indice_busqueda = IndiceBusqueda()
+    historial.suscribir(indice_busqueda.indexar)
+    if indice_busqueda.ultimo_indexado() < historial.ultimo_id():
+        threading.Thread(
+            target=indice_busqueda.reconstruir,
+            args=(historial.leer_todos(),),
+            name="reindexado-busqueda",
+            daemon=True
+        ).start()
 
-    pygame.init()
     root = tk.Tk()
     # Creamos la interfaz
     app = ChatUI(root)
@@ -810,6 +1275,9 @@ def run_chat() -> None:
     # Vinculamos el evento <Map> para resetear notificaciones
     root.bind("<Map>", reset_notifications)
 
+    # Vaciar los eventos del hilo de red desde el bucle de Tk
+    cola_eventos.iniciar(root, procesar_eventos)
+
     # Conexión al servidor
     connect_to_server()
 
@@ -821,12 +1289,27 @@ def main() -> None:
     """
     Punto de entrada principal de la aplicación.
     Ejecuta el proceso de login y, si es exitoso, inicia el chat.
+    Mientras el usuario escribe sus credenciales, un hilo carga en segundo
+    plano los módulos que solo necesita el chat.
     """
-    success = run_login()
-    if success:
-        run_chat()
+    global SERVER_CONFIG, notificaciones
+    preparar_directorios()
+    configurar_logging()
+    SERVER_CONFIG = load_server_config()
+    # Al terminar, el mismo hilo abre el mezclador y decodifica el sonido de notificación
+    precargar(al_terminar=motor_audio().precalentar)
+    # El hilo de notificaciones carga ya el sistema de notificaciones. Sin uno propio, los
+    # avisos se muestran como diálogos de Tk desde el bucle de eventos.
+    notificaciones = DespachadorNotificaciones(
+        alternativa=lambda titulo, mensaje: cola_eventos.publicar("aviso", (titulo, mensaje), descartable=True),
+        reproducir=play_notification_sound
+    )
+
+    sesion = run_login(crear_cliente)
+    if sesion:
+        run_chat(sesion)
     else:
-        logging.info("No se abrió el chat, finaliza la app.")
+        logger.info("No se abrió el chat, finaliza la app.")
 
 if __name__ == "__main__":
     main()  
@@ -8,6 +8,8 @@ from win10toast import ToastNotifier
 
 from config import ASSETS_DIR  # Importamos ASSETS_DIR desde config.py
 
+logger = logging.getLogger(__name__)
+
 class NotificadorWin:
     """
     Clase para manejar las notificaciones de Windows.
@@ -18,7 +20,7 @@ class NotificadorWin:
         Inicializa una instancia del notificador de Windows.
         """
         self.notificador = ToastNotifier()
-        logging.info("ToastNotifier inicializado para notificaciones de Windows.")
+        logger.info("ToastNotifier inicializado para notificaciones de Windows.")
 
     def mostrar_notificacion(
         self, 
@@ -40,7 +42,7 @@ class NotificadorWin:
         if icon_path:
             icon_full_path = ASSETS_DIR / Path(icon_path).name
             if not icon_full_path.exists():
-                logging.warning(f"Icono proporcionado no encontrado en ASSETS_DIR: {icon_full_path}")
+                logger.warning("Icono proporcionado no encontrado en ASSETS_DIR: %s", icon_full_path)
                 icon_full_path = None
             else:
                 icon_path = str(icon_full_path)
@@ -55,9 +57,10 @@ class NotificadorWin:
                 icon_path=icon_path, 
                 threaded=True  # Permite que la notificación no bloquee el hilo principal
             )
-            logging.info(f"Notificación mostrada: '{titulo}' - '{mensaje}'")
+            # El texto puede ser el de un mensaje: solo en DEBUG
+            logger.debug("Notificación mostrada: '%s' - '%s'", titulo, mensaje)
         except Exception as e:
-            logging.error(f"Error mostrando notificación '{titulo}': {e}")
+            logger.error("Error mostrando notificación '%s': %s", titulo, e)
 
 # Instancia única del notificador
 notificador_win = NotificadorWin()
@@ -0,0 +1,132 @@
+# src/audio.py
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, List, Optional
+
+from config import SONIDO_NOTIFICACION
+
+logger = logging.getLogger(__name__)
+
+# Sonidos que pueden sonar a la vez; si todos los canales están ocupados, el
+# nuevo no suena (una ráfaga de avisos no se convierte en un estruendo)
+MAX_SONIDOS_SIMULTANEOS = 2
+
+# Formato del mezclador. Un búfer pequeño reduce el retraso hasta que suena.
+FRECUENCIA_HZ = 44100
+MUESTRAS_BUFER = 512
+
+
+class MotorAudio:
+    """
+    Reproduce un sonido corto sin leerlo ni decodificarlo cada vez.
+
+    precalentar() abre el mezclador de pygame, reserva MAX_SONIDOS_SIMULTANEOS
+    canales y decodifica el archivo una sola vez; el PCM queda en memoria.
+    Después reproducir() solo busca un canal libre y le pasa ese búfer, sin
+    esperar a que termine de sonar.
+
+    Si pygame no está instalado, no hay dispositivo de audio o el archivo no
+    se puede cargar, el motor queda en silencio: reproducir() no hace nada.
+    """
+
+    def __init__(
+        self,
+        ruta: Path = SONIDO_NOTIFICACION,
+        max_simultaneos: int = MAX_SONIDOS_SIMULTANEOS,
+        volumen: float = 1.0
+    ) -> None:
+        """
+        Args:
+            ruta (Path, optional): Archivo de audio. Defaults to SONIDO_NOTIFICACION.
+            max_simultaneos (int, optional): Sonidos que pueden solaparse. Defaults to MAX_SONIDOS_SIMULTANEOS.
+            volumen (float, optional): Volumen entre 0 y 1. Defaults to 1.0.
+        """
+        self.ruta = ruta
+        self.max_simultaneos = max_simultaneos
+        self.volumen = volumen
+        self._lock = threading.Lock()
+        self._precalentado = False
+        self._sonido: Optional[Any] = None  # pygame.mixer.Sound, con el PCM ya decodificado
+        self._canales: List[Any] = []
+        self.reproducidos = 0
+        self.omitidos = 0  # Sonidos que no sonaron por tener todos los canales ocupados
+
+    @property
+    def disponible(self) -> bool:
+        """Indica si el motor puede sonar (tras precalentar)."""
+        return self._sonido is not None
+
+    def precalentar(self) -> bool:
+        """
+        Abre el mezclador y decodifica el sonido. Solo trabaja la primera vez;
+        conviene llamarlo en segundo plano al arrancar (ver precarga.precargar).
+
+        Returns:
+            bool: Si el motor puede sonar.
+        """
+        with self._lock:
+            if not self._precalentado:
+                self._precalentado = True
+                self._abrir()
+            return self.disponible
+
+    def reproducir(self) -> bool:
+        """
+        Reproduce el sonido en un canal libre, sin esperar a que termine.
+
+        Returns:
+            bool: Si empezó a sonar.
+        """
+        if not self._precalentado:
+            self.precalentar()
+        if self._sonido is None:
+            return False
+        with self._lock:
+            for canal in self._canales:
+                if not canal.get_busy():
+                    canal.play(self._sonido)
+                    self.reproducidos += 1
+                    return True
+        self.omitidos += 1
+        return False
+
+    def _abrir(self) -> None:
+        if not self.ruta.exists():
+            logger.warning("No existe el archivo de audio %s; las notificaciones no sonarán.", self.ruta)
+            return
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        try:
+            import pygame
+        except ImportError:
+            logger.warning("pygame no está instalado; las notificaciones no sonarán.")
+            return
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init(frequency=FRECUENCIA_HZ, buffer=MUESTRAS_BUFER)
+            if pygame.mixer.get_num_channels() < self.max_simultaneos:
+                pygame.mixer.set_num_channels(self.max_simultaneos)
+            # Los canales reservados no los usa nadie más (p. ej. Sound.play() sin canal)
+            pygame.mixer.set_reserved(self.max_simultaneos)
+            sonido = pygame.mixer.Sound(str(self.ruta))
+            sonido.set_volume(self.volumen)
+        except pygame.error as e:
+            logger.warning("No hay audio disponible, las notificaciones no sonarán: %s", e)
+            return
+        self._canales = [pygame.mixer.Channel(i) for i in range(self.max_simultaneos)]
+        self._sonido = sonido
+        logger.info("Sonido %s cargado en memoria (%.2f s).", self.ruta.name, sonido.get_length())
+
+
+# Motor compartido por toda la aplicación
+_motor: Optional[MotorAudio] = None
+
+
+def motor_audio() -> MotorAudio:
+    """Devuelve el motor de audio compartido, creándolo la primera vez."""
+    global _motor
+    if _motor is None:
+        _motor = MotorAudio()
+    return _motor
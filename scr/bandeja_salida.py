@@ -0,0 +1,102 @@
+# src/bandeja_salida.py
+
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+from config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Mensajes de chat pendientes de confirmar por el servidor, un archivo JSON por mensaje
+BANDEJA_DIR = DATA_DIR / "bandeja_salida"
+
+
+class MensajePendiente(NamedTuple):
+    """
+    Mensaje de chat escrito por el usuario que el servidor aún no ha confirmado.
+    """
+    id: str           # Identificador único; el servidor lo usa para descartar duplicados
+    secuencia: int    # Orden de envío
+    texto: str
+    fecha: float      # Momento en que se escribió (epoch)
+
+
+class BandejaSalida:
+    """
+    Bandeja de salida persistente del chat. Cada mensaje se guarda antes de
+    enviarlo y se borra cuando el servidor confirma que lo ha recibido, de
+    modo que los mensajes escritos sin conexión (o durante un corte) se
+    envían, en orden, al reconectar, incluso tras cerrar la aplicación.
+
+    Cada mensaje se escribe de forma atómica (archivo temporal + os.replace)
+    en un archivo cuyo nombre empieza por su secuencia, así que el orden de
+    los nombres es el orden de envío. La carpeta solo se lee al abrir la
+    bandeja: después, los mensajes pendientes se llevan también en memoria.
+    """
+
+    def __init__(self, directorio: Path = BANDEJA_DIR) -> None:
+        self.directorio = directorio
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        # Id -> mensaje, en orden de envío
+        self._mensajes: Dict[str, MensajePendiente] = {m.id: m for m in self._cargar()}
+        self._siguiente = max((m.secuencia for m in self._mensajes.values()), default=0) + 1
+
+    def __len__(self) -> int:
+        return len(self._mensajes)
+
+    def agregar(self, texto: str) -> MensajePendiente:
+        """
+        Guarda un mensaje nuevo al final de la bandeja.
+
+        Raises:
+            OSError: Si no se pudo guardar en disco (el mensaje no queda en la bandeja).
+        """
+        mensaje = MensajePendiente(uuid.uuid4().hex, self._siguiente, texto, time.time())
+        ruta = self._ruta(mensaje.secuencia, mensaje.id)
+        temporal = ruta.with_suffix(".tmp")
+        try:
+            temporal.write_text(json.dumps(mensaje._asdict(), ensure_ascii=False), encoding="utf-8")
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.error("No se pudo guardar el mensaje en la bandeja de salida: %s", e)
+            temporal.unlink(missing_ok=True)
+            raise
+        self._siguiente += 1
+        self._mensajes[mensaje.id] = mensaje
+        return mensaje
+
+    def confirmar(self, id_mensaje: str) -> bool:
+        """
+        Borra un mensaje que el servidor ya ha recibido.
+
+        Returns:
+            bool: False si no estaba en la bandeja (p. ej. una confirmación repetida).
+        """
+        mensaje = self._mensajes.pop(id_mensaje, None)
+        if mensaje is None:
+            return False
+        self._ruta(mensaje.secuencia, mensaje.id).unlink(missing_ok=True)
+        return True
+
+    def pendientes(self) -> List[MensajePendiente]:
+        """Devuelve los mensajes sin confirmar, en orden de envío."""
+        return list(self._mensajes.values())
+
+    def _cargar(self) -> List[MensajePendiente]:
+        """Lee los mensajes guardados en la carpeta, en orden de envío."""
+        mensajes = []
+        for ruta in sorted(self.directorio.glob("*.json")):
+            try:
+                mensajes.append(MensajePendiente(**json.loads(ruta.read_text(encoding="utf-8"))))
+            except (OSError, json.JSONDecodeError, TypeError) as e:
+                logger.error("Mensaje ilegible en la bandeja de salida (%s), se descarta: %s", ruta.name, e)
+                ruta.unlink(missing_ok=True)
+        return mensajes
+
+    def _ruta(self, secuencia: int, id_mensaje: str) -> Path:
+        return self.directorio / f"{secuencia:012d}-{id_mensaje}.json"
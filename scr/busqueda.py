@@ -0,0 +1,199 @@
+# src/busqueda.py
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Base de datos del índice de búsqueda
+INDICE_DB = DATA_DIR / "busqueda.db"
+
+# Registros por transacción al reconstruir el índice
+TAMANO_LOTE_REINDEXADO = 5000
+
+# Resultados máximos por búsqueda
+MAX_RESULTADOS = 200
+
+
+class ResultadoBusqueda(NamedTuple):
+    """
+    Mensaje encontrado por una búsqueda.
+    """
+    id_mensaje: int
+    remitente: str
+    contenido: str
+    fragmento: str  # Contenido con los términos encontrados marcados con [ ]
+
+
+def remitente_y_contenido(registro: Dict[str, Any]) -> Tuple[str, str]:
+    """Obtiene el remitente y el contenido de un registro del historial."""
+    mensaje = registro.get("message", "")
+    if registro.get("sender") == "self":
+        return "Tú", mensaje
+    if ": " in mensaje:
+        remitente, contenido = mensaje.split(": ", 1)
+        return remitente, contenido
+    return "Desconocido", mensaje
+
+
+def _citar(termino: str) -> str:
+    """Cita un término para usarlo literalmente en una consulta FTS5."""
+    return '"' + termino.replace('"', '""') + '"'
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido incremental (SQLite FTS5) sobre el historial de chat.
+
+    Se actualiza por lotes desde el hilo escritor del historial y se consulta
+    desde la interfaz; una única conexión protegida por un lock sirve a ambos.
+    """
+
+    def __init__(self, ruta: Path = INDICE_DB) -> None:
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(str(ruta), check_same_thread=False)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+            self._conexion.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS mensajes USING fts5("
+                "remitente UNINDEXED, contenido, tokenize='unicode61 remove_diacritics 2')"
+            )
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS estado (clave TEXT PRIMARY KEY, valor INTEGER)"
+            )
+
+    def ultimo_indexado(self) -> int:
+        """Id del último mensaje añadido al índice."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT valor FROM estado WHERE clave = 'ultimo_id'"
+            ).fetchone()
+        return fila[0] if fila else 0
+
+    def indexar(self, registros: Iterable[Dict[str, Any]]) -> None:
+        """
+        Añade un lote de registros del historial al índice en una transacción.
+        Los registros ya indexados se sustituyen, sin duplicarse.
+
+        Args:
+            registros (Iterable[Dict[str, Any]]): Registros con "id", "message" y "sender".
+        """
+        self._indexar(registros, contiguo=False)
+
+    def _indexar(self, registros: Iterable[Dict[str, Any]], contiguo: bool) -> None:
+        """
+        Indexa un lote. El último id indexado solo avanza si no queda un hueco
+        por debajo del lote: si `contiguo` (los lotes de reconstruir(), que van
+        en orden) o si el lote empieza justo después de él. Así, los mensajes
+        nuevos que llegan antes de que termine una reconstrucción no hacen
+        que se salte lo que falta por indexar.
+        """
+        filas = []
+        for registro in registros:
+            remitente, contenido = remitente_y_contenido(registro)
+            filas.append((registro["id"], remitente, contenido))
+        if not filas:
+            return
+        with self._lock, self._conexion:
+            # FTS5 no aplica OR IGNORE a los rowid repetidos: se borran antes de insertarlos
+            self._conexion.executemany("DELETE FROM mensajes WHERE rowid = ?", [(fila[0],) for fila in filas])
+            self._conexion.executemany(
+                "INSERT INTO mensajes(rowid, remitente, contenido) VALUES (?, ?, ?)",
+                filas
+            )
+            if not contiguo:
+                fila = self._conexion.execute("SELECT valor FROM estado WHERE clave = 'ultimo_id'").fetchone()
+                if min(f[0] for f in filas) > (fila[0] if fila else 0) + 1:
+                    return
+            self._conexion.execute(
+                "INSERT INTO estado(clave, valor) VALUES ('ultimo_id', ?) "
+                "ON CONFLICT(clave) DO UPDATE SET valor = max(valor, excluded.valor)",
+                (max(fila[0] for fila in filas),)
+            )
+
+    def reconstruir(self, registros: Iterable[Dict[str, Any]]) -> int:
+        """
+        Indexa en streaming los registros recibidos, en transacciones de
+        TAMANO_LOTE_REINDEXADO, sin cargar el historial completo en memoria.
+        Cada lote confirmado avanza el último id indexado, así que si se
+        interrumpe, la siguiente reconstrucción continúa desde ahí.
+
+        Args:
+            registros (Iterable[Dict[str, Any]]): Registros del historial (p. ej. HistorialChat.leer_todos()),
+                en orden de id.
+
+        Returns:
+            int: Número de registros indexados.
+        """
+        desde = self.ultimo_indexado()
+        lote: List[Dict[str, Any]] = []
+        total = 0
+        for registro in registros:
+            if not isinstance(registro, dict) or registro.get("id", 0) <= desde:
+                continue
+            lote.append(registro)
+            if len(lote) >= TAMANO_LOTE_REINDEXADO:
+                self._indexar(lote, contiguo=True)
+                total += len(lote)
+                lote = []
+        self._indexar(lote, contiguo=True)
+        total += len(lote)
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT INTO estado(clave, valor) SELECT 'ultimo_id', coalesce(max(rowid), 0) FROM mensajes WHERE true "
+                "ON CONFLICT(clave) DO UPDATE SET valor = max(valor, excluded.valor)"
+            )
+        logger.info("Índice de búsqueda actualizado con %d mensajes.", total)
+        return total
+
+    def buscar(
+        self,
+        consulta: str,
+        remitente: Optional[str] = None,
+        frase: bool = False,
+        limite: int = MAX_RESULTADOS
+    ) -> List[ResultadoBusqueda]:
+        """
+        Busca mensajes por contenido, del más reciente al más antiguo.
+
+        Args:
+            consulta (str): Palabras a buscar (todas deben aparecer) o frase exacta.
+            remitente (Optional[str], optional): Limita los resultados a un remitente.
+            frase (bool, optional): Si es True, busca la consulta como frase exacta.
+            limite (int, optional): Número máximo de resultados. Defaults to MAX_RESULTADOS.
+
+        Returns:
+            List[ResultadoBusqueda]: Mensajes encontrados.
+        """
+        terminos = consulta.split()
+        if not terminos:
+            return []
+        expresion = _citar(" ".join(terminos)) if frase else " ".join(map(_citar, terminos))
+        sql = (
+            "SELECT rowid, remitente, contenido, snippet(mensajes, 1, '[', ']', '…', 12) "
+            "FROM mensajes WHERE mensajes MATCH ?"
+        )
+        parametros: List[Any] = [expresion]
+        if remitente:
+            sql += " AND remitente = ?"
+            parametros.append(remitente)
+        sql += " ORDER BY rowid DESC LIMIT ?"
+        parametros.append(limite)
+        try:
+            with self._lock:
+                filas = self._conexion.execute(sql, parametros).fetchall()
+        except sqlite3.Error as e:
+            logger.error("Error buscando en el historial: %s", e)
+            return []
+        return [ResultadoBusqueda(*fila) for fila in filas]
+
+    def cerrar(self) -> None:
+        """Cierra la conexión con la base de datos."""
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,1480 @@
+# src/cliente_async.py
+
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import tkinter as tk
+import uuid
+import zlib
+from enum import Enum
+from pathlib import Path
+from typing import Any, Awaitable, BinaryIO, Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from bandeja_salida import BandejaSalida
+from cola_equitativa import ColaEquitativa
+from compresion import (
+    ALGORITMOS, UMBRAL_COMPRESION, UMBRAL_COMPRESION_EN_HILO, Descompresor, comprimir, descomprimir,
+    es_comprimible, leer_bloque_comprimido
+)
+from protocolo import (
+    CABECERA, CABECERA_BLOQUE, CANAL_CHAT, FLAG_BLOQUE, FLAGS_COMPRESION, DecodificadorFrames, ErrorProtocolo,
+    Frame, TipoFrame, codificar_frame
+)
+from lista_archivos import ListaArchivos, ListaDesincronizada
+from transferencias import EXTENSION_PARCIAL, EstadoTransferencia, RegistroTransferencias, crc32_archivo
+
+logger = logging.getLogger(__name__)
+
+# Tiempos de espera (segundos)
+TIMEOUT_CONEXION = 10
+TIMEOUT_RESPUESTA = 30
+
+# Tiempo máximo para acordar la compresión con el servidor; si no responde,
+# la conexión sigue sin comprimir
+TIMEOUT_NEGOCIACION = 5
+
+# Espera antes de cada intento de reconexión: se dobla en cada intento hasta
+# RECONEXION_ESPERA_MAXIMA_S y se elige al azar entre la mitad y el total,
+# para que los clientes cortados a la vez no reconecten todos a la vez
+RECONEXION_ESPERA_INICIAL_S = 0.5
+RECONEXION_ESPERA_MAXIMA_S = 30
+
+# Frames DATOS de cada transferencia que pueden esperar en cola antes de
+# frenarla. Las transferencias se turnan para enviar (ver ColaEquitativa).
+MAX_FRAMES_DATOS_POR_CANAL = 4
+
+# Bytes de archivo por frame DATOS al subir, como máximo (1 MiB). Cada bloque
+# se envía con sendfile; entre bloques pueden colarse los frames de chat y control.
+TAMANO_BLOQUE_SUBIDA = 1024 * 1024
+
+# Un mensaje de chat puede tener que esperar a que termine de enviarse el
+# bloque en curso. Para que esa espera no pase de LATENCIA_MAXIMA_BLOQUE_S, el
+# tamaño de los bloques se ajusta a la velocidad de envío medida, sin bajar
+# de TAMANO_BLOQUE_MINIMO.
+LATENCIA_MAXIMA_BLOQUE_S = 0.02
+TAMANO_BLOQUE_MINIMO = 16 * 1024
+
+# Peso de cada nueva medida en la media de la velocidad de envío cuando
+# sube; si baja, se toma la nueva medida sin más
+PESO_MEDIDA_VELOCIDAD = 0.3
+
+# Bytes ya escritos en el socket pero sin enviar que puede acumular el
+# núcleo (TCP_NOTSENT_LOWAT, donde existe). Sin este límite el núcleo puede
+# guardar megas de archivo por delante de un mensaje de chat.
+LIMITE_SIN_ENVIAR = 64 * 1024
+
+# Bloques de una subida cuyo CRC32 se calcula por adelantado, en paralelo
+BLOQUES_CRC_ADELANTADOS = 4
+
+# Búfer de escritura a disco de las descargas: los trozos recibidos se
+# acumulan y se escriben en bloques de 1 MiB
+TAMANO_BLOQUE_ESCRITURA = 1024 * 1024
+
+# Cada cuánto se guarda, como máximo, el avance de una descarga reanudable (segundos)
+INTERVALO_GUARDADO_S = 0.5
+
+# Cada cuánto se pregunta si ha cambiado la lista de archivos cuando el
+# servidor no admite suscripciones (segundos)
+INTERVALO_SONDEO_LISTA_S = 5
+
+# Cada cuánto comprueba Tk si ha terminado una operación de red
+INTERVALO_SONDEO_MS = 50
+
+# Función de progreso: recibe los bytes transferidos y el total (None si se desconoce)
+Progreso = Callable[[int, Optional[int]], None]
+
+# Mensaje de cancelación con el que se pausa una transferencia: upload() y
+# download() conservan su estado para continuarla después
+MOTIVO_PAUSA = "pausa"
+
+
+class ErrorAutenticacion(Exception):
+    """El servidor rechazó las credenciales o el token de sesión."""
+
+
+class EstadoConexion(Enum):
+    """Situación de la conexión con el servidor."""
+    CONECTADO = "Conectado"
+    RECONECTANDO = "Reconectando…"
+    DESCONECTADO = "Sin conexión"
+    SESION_CADUCADA = "Sesión caducada"
+
+
+def es_pausa(error: BaseException) -> bool:
+    """Indica si una cancelación es una pausa (tarea cancelada con MOTIVO_PAUSA)."""
+    return isinstance(error, asyncio.CancelledError) and error.args[:1] == (MOTIVO_PAUSA,)
+
+
+class RegionArchivo(NamedTuple):
+    """
+    Frame DATOS cuyo payload es un tramo de un archivo abierto. El escritor
+    envía la cabecera y después el tramo directamente desde el archivo.
+    """
+    cabecera: bytes
+    archivo: BinaryIO
+    offset: int
+    cantidad: int
+    hecho: asyncio.Future  # Se resuelve cuando el tramo está escrito
+
+
+def _no_negativo(valor: Any) -> int:
+    """
+    Valida un tamaño u offset recibido del servidor.
+
+    Raises:
+        TypeError: Si no es un entero.
+        ValueError: Si es negativo.
+    """
+    if not isinstance(valor, int) or isinstance(valor, bool):
+        raise TypeError(f"Se esperaba un entero: {valor!r}")
+    if valor < 0:
+        raise ValueError(f"Valor negativo: {valor}")
+    return valor
+
+
+class DescargaArchivo:
+    """
+    Recepción de un archivo por un canal. El decodificador entrega el payload
+    de los frames DATOS directamente desde su buffer de recepción y se escribe
+    a disco sin copias intermedias, así que la memoria usada no depende del
+    tamaño del archivo.
+
+    El servidor puede anunciar el tamaño antes de los datos (CONTROL
+    "TAMANO:<bytes>" o "DESCARGA_INFO:{json}"); en ese caso se exige recibir
+    exactamente ese número de bytes. Un frame DATOS vacío marca el final.
+
+    En modo por bloques (descargas reanudables) cada frame DATOS empieza con
+    una CABECERA_BLOQUE; cada bloque se comprueba con su CRC32 y, si falla la
+    descarga, el archivo se trunca al último bloque verificado en lugar de
+    borrarse.
+
+    Los frames con un flag de compresión se descomprimen según llegan; los
+    offsets, los CRC32 y los bytes recibidos se cuentan sobre los datos sin
+    comprimir.
+    """
+
+    def __init__(
+        self,
+        destino: Path,
+        hecho: asyncio.Future,
+        progreso: Optional[Progreso] = None,
+        desde: int = 0,
+        por_bloques: bool = False,
+        al_verificar: Optional[Callable[["DescargaArchivo"], None]] = None
+    ) -> None:
+        self.destino = destino
+        self.hecho = hecho
+        self.progreso = progreso
+        self.por_bloques = por_bloques
+        self.al_verificar = al_verificar
+        self.recibidos = desde
+        self.verificados = desde  # Bytes desde el inicio comprobados con su CRC32
+        self.total: Optional[int] = None
+        self.etag = ""
+        self.t_ultimo = time.monotonic()  # Último frame recibido, para el timeout
+        if desde:
+            self._archivo = open(destino, 'r+b', buffering=TAMANO_BLOQUE_ESCRITURA)
+            self._archivo.truncate(desde)
+            self._archivo.seek(desde)
+        else:
+            self._archivo = open(destino, 'wb', buffering=TAMANO_BLOQUE_ESCRITURA)
+        self._cabecera_bloque = bytearray()
+        self._crc_esperado = 0
+        self._crc = 0
+        self._descompresor: Optional[Descompresor] = None
+
+    def escribir(self, trozo: memoryview, restante: int, flags: int) -> None:
+        """Sumidero del decodificador: escribe un trozo de payload en el archivo."""
+        if self.hecho.done():
+            return  # Descarga ya fallida o cancelada: se descarta el resto
+        self.t_ultimo = time.monotonic()
+        if self.por_bloques and len(self._cabecera_bloque) < CABECERA_BLOQUE.size:
+            # La cabecera del bloque puede llegar partida entre dos lecturas
+            falta = CABECERA_BLOQUE.size - len(self._cabecera_bloque)
+            self._cabecera_bloque += trozo[:falta]
+            trozo = trozo[falta:]
+            if len(self._cabecera_bloque) < CABECERA_BLOQUE.size:
+                return
+            offset, self._crc_esperado = CABECERA_BLOQUE.unpack(self._cabecera_bloque)
+            if offset != self.recibidos:
+                self.fallar(ErrorProtocolo(f"Bloque fuera de orden: offset {offset}, esperado {self.recibidos}."))
+                return
+            self._crc = 0
+
+        if flags & FLAGS_COMPRESION:
+            # Payload comprimido: se descomprime según llega, frame a frame
+            try:
+                if self._descompresor is None:
+                    self._descompresor = Descompresor(flags)
+                trozo = self._descompresor.descomprimir(trozo)
+                if not restante:
+                    self._descompresor.terminar()
+                    self._descompresor = None
+            except ErrorProtocolo as e:
+                self.fallar(e)
+                return
+
+        self.recibidos += len(trozo)
+        if self.total is not None and self.recibidos > self.total:
+            self.fallar(ErrorProtocolo(f"El servidor envió más de los {self.total} bytes anunciados."))
+            return
+        try:
+            self._archivo.write(trozo)
+        except OSError as e:
+            self.fallar(e)
+            return
+        if self.por_bloques:
+            self._crc = zlib.crc32(trozo, self._crc)
+            if not restante:
+                self._cerrar_bloque()
+        if self.progreso:
+            self.progreso(self.recibidos, self.total)
+
+    def _cerrar_bloque(self) -> None:
+        """Comprueba el CRC32 del bloque recién recibido."""
+        self._cabecera_bloque.clear()
+        if self._crc != self._crc_esperado:
+            self.fallar(ErrorProtocolo(f"CRC32 incorrecto en el bloque que acaba en {self.recibidos}."))
+            return
+        self.verificados = self.recibidos
+        if self.al_verificar:
+            self.al_verificar(self)
+
+    def procesar(self, frame: Frame) -> None:
+        """Procesa un frame del canal que no es payload: tamaño anunciado, fin o error."""
+        if self.hecho.done():
+            return
+        self.t_ultimo = time.monotonic()
+        comando = frame.texto() if frame.tipo == TipoFrame.CONTROL else ""
+        if frame.tipo == TipoFrame.DATOS:
+            # Frame DATOS vacío: fin del archivo
+            if self.total is not None and self.recibidos != self.total:
+                self.fallar(ErrorProtocolo(f"Recibidos {self.recibidos} de {self.total} bytes anunciados."))
+                return
+            try:
+                self._archivo.close()
+            except OSError as e:
+                self.fallar(e)
+                return
+            self.hecho.set_result(self.recibidos)
+        elif comando.startswith("TAMANO:"):
+            try:
+                self.total = _no_negativo(int(comando.split(":", 1)[1]))
+            except ValueError:
+                self.fallar(ErrorProtocolo(f"Tamaño anunciado no válido: {comando[:80]!r}"))
+                return
+            if self.progreso:
+                self.progreso(self.recibidos, self.total)
+        elif comando.startswith("DESCARGA_INFO:"):
+            try:
+                info = json.loads(comando.split(":", 1)[1])
+                total, etag, desde = _no_negativo(info["tamano"]), str(info["etag"]), _no_negativo(info["desde"])
+            except (ValueError, KeyError, TypeError):
+                self.fallar(ErrorProtocolo(f"Información de descarga no válida: {comando[:80]!r}"))
+                return
+            self.total, self.etag = total, etag
+            if desde != self.recibidos:
+                # El archivo cambió en el servidor: se empieza de nuevo
+                try:
+                    self._archivo.seek(desde)
+                    self._archivo.truncate(desde)
+                except OSError as e:
+                    self.fallar(e)
+                    return
+                self.recibidos = self.verificados = desde
+            if self.progreso:
+                self.progreso(self.recibidos, self.total)
+        else:
+            self.fallar(ErrorProtocolo(f"Respuesta inesperada del servidor: {frame.payload[:80]!r}"))
+
+    def fallar(self, error: BaseException) -> None:
+        """
+        Aborta la descarga. En modo por bloques el archivo se trunca al último
+        bloque verificado para poder continuar; si no, se borra.
+        """
+        if self.hecho.done():
+            return
+        try:
+            if self.por_bloques:
+                self._archivo.flush()
+                self._archivo.truncate(self.verificados)
+            self._archivo.close()
+        except OSError as e:
+            logger.error("Error cerrando la descarga incompleta: %s", e)
+        if not self.por_bloques:
+            self.destino.unlink(missing_ok=True)
+        if isinstance(error, asyncio.CancelledError):
+            self.hecho.cancel()
+        else:
+            self.hecho.set_exception(error)
+
+
+class _ProtocoloCliente(asyncio.BufferedProtocol):
+    """
+    Protocolo de la conexión con el servidor. Los datos se leen con recv_into
+    directamente sobre el buffer del decodificador de frames.
+    """
+
+    def __init__(self, cliente: "ClienteAsync") -> None:
+        self._cliente = cliente
+        self._vista: Optional[memoryview] = None
+        self._escritura_pausada = False
+        self._esperando_escritura: List[asyncio.Future] = []
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._vista is not None:
+            self._vista.release()
+        self._vista = self._cliente._decodificador.obtener_buffer()
+        return self._vista
+
+    def buffer_updated(self, nbytes: int) -> None:
+        # Liberar la vista antes de que el decodificador pueda compactar su buffer
+        self._vista.release()
+        self._vista = None
+        self._cliente._datos_recibidos(nbytes)
+
+    def eof_received(self) -> bool:
+        logger.warning("Servidor desconectado.")
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if exc:
+            logger.error("Error recibiendo mensaje: %s", exc)
+        self._despertar_escritores(exc or ConnectionError("Conexión cerrada."))
+        self._cliente._perder_conexion()
+
+    def pause_writing(self) -> None:
+        self._escritura_pausada = True
+
+    def resume_writing(self) -> None:
+        self._escritura_pausada = False
+        self._despertar_escritores()
+
+    async def drain(self) -> None:
+        """Espera a que el búfer de envío del transporte baje del límite."""
+        if self._cliente._transporte.is_closing():
+            raise ConnectionError("Conexión cerrada.")
+        if self._escritura_pausada:
+            espera = asyncio.get_running_loop().create_future()
+            self._esperando_escritura.append(espera)
+            await espera
+
+    def _despertar_escritores(self, error: Optional[BaseException] = None) -> None:
+        for espera in self._esperando_escritura:
+            if not espera.done():
+                if error:
+                    espera.set_exception(error)
+                else:
+                    espera.set_result(None)
+        self._esperando_escritura.clear()
+
+
+class EstadoProgreso:
+    """
+    Último progreso conocido de una transferencia. Se pasa como callback de
+    progreso (se actualiza desde el hilo de red) y se consulta desde Tk.
+    """
+
+    def __init__(self) -> None:
+        self.transferidos = 0
+        self.total: Optional[int] = None
+
+    def __call__(self, transferidos: int, total: Optional[int]) -> None:
+        self.transferidos = transferidos
+        self.total = total
+
+
+class ClienteAsync:
+    """
+    Núcleo de red de IcoChat sobre asyncio.
+
+    Mantiene una única conexión con el servidor en un bucle de eventos propio,
+    en su hilo. El chat y las transferencias comparten la conexión: cada
+    petición usa su propio canal de frames, los frames de chat y de control se
+    envían antes que los bloques de archivo y las subidas esperan cuando hay
+    demasiados bloques pendientes de escribir.
+
+    Las operaciones son corrutinas; desde Tk se lanzan con ejecutar(), que
+    devuelve un concurrent.futures.Future cancelable.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        puerto: int,
+        al_recibir: Callable[[Frame], None],
+        al_desconectar: Optional[Callable[[], None]] = None,
+        usar_sendfile: bool = True,
+        registro: Optional[RegistroTransferencias] = None,
+        compresion: Sequence[str] = tuple(ALGORITMOS),
+        bloques_adaptativos: bool = True,
+        bandeja: Optional[BandejaSalida] = None,
+        reconectar: bool = False,
+        al_cambiar_estado: Optional[Callable[[EstadoConexion], None]] = None
+    ) -> None:
+        """
+        Args:
+            host (str): Dirección del servidor.
+            puerto (int): Puerto del servidor.
+            al_recibir (Callable[[Frame], None]): Recibe los frames que no son respuesta
+                a una petición (chat, avisos del servidor). Se llama desde el hilo de red.
+            al_desconectar (Optional[Callable], optional): Se llama al perder la conexión.
+            usar_sendfile (bool, optional): Si es False, las subidas usan siempre la copia
+                con búfer en lugar de sendfile. Defaults to True.
+            registro (Optional[RegistroTransferencias], optional): Dónde guardar el estado de
+                las transferencias para continuarlas tras un corte. Si es None, una transferencia
+                cortada empieza de cero.
+            compresion (Sequence[str], optional): Algoritmos de compresión que se ofrecen al
+                servidor al conectar, por orden de preferencia ("zlib", "lzma"). Vacío para no
+                comprimir. Defaults to todos.
+            bloques_adaptativos (bool, optional): Si es False, las subidas usan siempre bloques de
+                TAMANO_BLOQUE_SUBIDA en lugar de ajustarlos a la velocidad de envío. Defaults to True.
+            bandeja (Optional[BandejaSalida], optional): Bandeja de salida persistente para
+                enviar_chat(). Si es None, los mensajes se envían directamente y se pierden sin conexión.
+            reconectar (bool, optional): Si es True, tras un corte se reconecta solo, con espera
+                exponencial. Defaults to False.
+            al_cambiar_estado (Optional[Callable], optional): Recibe cada nuevo EstadoConexion.
+                Se llama desde el hilo de red.
+        """
+        self.host = host
+        self.puerto = puerto
+        self._al_recibir = al_recibir
+        self._al_desconectar = al_desconectar
+        self._usar_sendfile = usar_sendfile
+        self._bufer_subida: Optional[bytearray] = None
+        self._region_en_curso: Optional[RegionArchivo] = None
+        self._registro = registro
+        self._compresion_ofrecida = tuple(compresion)
+        self.compresion: Optional[str] = None  # Algoritmo acordado con el servidor
+        self._bloques_adaptativos = bloques_adaptativos
+        self._velocidad_envio: Optional[float] = None  # Bytes/s de los frames DATOS, media móvil
+        self._bloque_anterior = TAMANO_BLOQUE_MINIMO
+        self.usuario: Optional[str] = None  # Nombre con el que se presenta la sesión en el chat
+        self.token_sesion: Optional[str] = None  # Token emitido por el servidor al iniciar sesión
+        self.estado = EstadoConexion.DESCONECTADO
+        self._al_cambiar_estado = al_cambiar_estado
+        self._reconectar = reconectar
+        self._tarea_reconexion: Optional[asyncio.Future] = None
+        self._cerrando = False
+        self._bandeja = bandeja
+        self._tarea_bandeja: Optional[asyncio.Task] = None
+        self._hay_mensajes = asyncio.Event()
+        self._orden_bandeja = asyncio.Lock()  # Los mensajes se guardan en la bandeja de uno en uno, en orden
+        self._acuses: Optional[bool] = None  # Si el servidor confirma los mensajes (None: aún no se sabe)
+
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, name="red-asyncio", daemon=True)
+        self._hilo.start()
+
+        self._transporte: Optional[asyncio.Transport] = None
+        self._protocolo: Optional[_ProtocoloCliente] = None
+        self._decodificador = DecodificadorFrames()
+        self._tareas: List[asyncio.Task] = []
+        self._canales: Dict[int, asyncio.Queue] = {}
+        self._descargas: Dict[int, DescargaArchivo] = {}
+        self._contador_canales = itertools.count(1)
+        self.conectado = False
+
+    # ----------------------------
+    # Uso desde otros hilos
+    # ----------------------------
+    def ejecutar(self, corrutina: Awaitable[Any]) -> concurrent.futures.Future:
+        """
+        Lanza una corrutina en el bucle de red sin bloquear al que llama.
+
+        Returns:
+            concurrent.futures.Future: Resultado de la operación (cancelable).
+        """
+        return asyncio.run_coroutine_threadsafe(corrutina, self._loop)
+
+    def programar(self, funcion: Callable[..., None], *args: Any) -> None:
+        """Llama a una función en el hilo de red, sin esperarla."""
+        self._loop.call_soon_threadsafe(funcion, *args)
+
+    def activar_reconexion(self) -> None:
+        """
+        Activa la reconexión automática tras un corte (ver el argumento
+        `reconectar`), p. ej. una vez iniciada la sesión y emitido su token.
+        """
+        self._reconectar = True
+
+    def cerrar(self) -> None:
+        """Cierra la conexión y detiene el bucle de red."""
+        if self._loop.is_closed():
+            return
+        try:
+            self.ejecutar(self._cerrar()).result(timeout=5)
+        except Exception as e:
+            logger.error("Error cerrando la conexión: %s", e)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join(timeout=5)
+        self._loop.close()
+
+    # ----------------------------
+    # Operaciones
+    # ----------------------------
+    async def connect(self, usuario: Optional[str] = None, timeout: float = TIMEOUT_CONEXION) -> None:
+        """
+        Abre la conexión y arranca la tarea de escritura. La lectura la hace
+        el protocolo según llegan los datos. La compresión se acuerda con el
+        servidor en segundo plano; hasta entonces los frames se envían sin
+        comprimir.
+
+        Si la sesión ya se inició antes (p. ej. al reconectar), se autentica
+        con el token de sesión en lugar de la contraseña y se vuelve a
+        presentar con el último nombre de usuario.
+
+        Args:
+            usuario (Optional[str], optional): Nombre con el que presentarse en el chat.
+                Defaults to el de la sesión, si lo hay.
+            timeout (float, optional): Tiempo máximo para conectar. Defaults to TIMEOUT_CONEXION.
+
+        Raises:
+            ErrorAutenticacion: El servidor no acepta el token de sesión; hay que
+                volver a iniciar sesión con iniciar_sesion(). Si pasa al reconectar,
+                la conexión se cierra y el estado pasa a SESION_CADUCADA.
+        """
+        self._decodificador = DecodificadorFrames()
+        self._cola_prioritaria: asyncio.Queue = asyncio.Queue()
+        self._cola_datos = ColaEquitativa(
+            CABECERA.size + CABECERA_BLOQUE.size + TAMANO_BLOQUE_SUBIDA, MAX_FRAMES_DATOS_POR_CANAL
+        )
+        self._hay_envios = asyncio.Event()
+        self._orden_mensajes = asyncio.Lock()
+        self.compresion = None
+        self._acuses = None
+        self._transporte, self._protocolo = await asyncio.wait_for(
+            self._loop.create_connection(lambda: _ProtocoloCliente(self), self.host, self.puerto),
+            timeout
+        )
+        self._limitar_sin_enviar()
+        self._tareas = [asyncio.create_task(self._escritor(), name="red-escritor")]
+        self.conectado = True
+        if self._compresion_ofrecida:
+            self._tareas.append(asyncio.create_task(self._negociar_compresion(), name="red-compresion"))
+        logger.info("Conectado al servidor.")
+        if self.token_sesion:
+            try:
+                await self._autenticar(f"SESION:{self.token_sesion}", TIMEOUT_RESPUESTA)
+            except ErrorAutenticacion:
+                self.token_sesion = None
+                raise
+            logger.info("Sesión reanudada con el token.")
+        if usuario or self.usuario:
+            await self.presentarse(usuario or self.usuario)
+        self._cambiar_estado(EstadoConexion.CONECTADO)
+
+    async def iniciar_sesion(self, email: str, password: str, timeout: float = TIMEOUT_RESPUESTA) -> str:
+        """
+        Autentica la conexión con correo y contraseña, conectando antes si
+        hace falta. La conexión queda abierta para el chat; si el servidor
+        emite un token de sesión, se guarda para reconectar sin la contraseña.
+
+        Args:
+            email (str): Correo del usuario.
+            password (str): Contraseña.
+            timeout (float, optional): Tiempo máximo de espera de la respuesta. Defaults to TIMEOUT_RESPUESTA.
+
+        Returns:
+            str: Mensaje del servidor.
+
+        Raises:
+            ErrorAutenticacion: Credenciales incorrectas.
+        """
+        if not self.conectado:
+            # Un token anterior no sirve para otra cuenta
+            self.token_sesion = None
+            await self.connect()
+        credenciales = json.dumps({"email": email, "password": password})
+        respuesta = await self._autenticar(f"CREDENTIALS:{credenciales}", timeout)
+        self.token_sesion = respuesta.get("Token") or None
+        if self.token_sesion is None:
+            logger.info("El servidor no emite tokens de sesión; al reconectar habrá que iniciar sesión otra vez.")
+        return respuesta.get("Mens", "")
+
+    async def presentarse(self, usuario: str) -> None:
+        """
+        Envía el nombre de usuario con el que se participa en el chat y
+        empieza a vaciar la bandeja de salida.
+        """
+        self.usuario = usuario
+        await self.send_control(usuario)
+        if self._bandeja is not None and (self._tarea_bandeja is None or self._tarea_bandeja.done()):
+            self._tarea_bandeja = asyncio.create_task(self._vaciar_bandeja(), name="red-bandeja")
+            self._tareas.append(self._tarea_bandeja)
+            self._hay_mensajes.set()
+
+    async def enviar_chat(self, texto: str) -> None:
+        """
+        Envía un mensaje de chat a través de la bandeja de salida: se guarda
+        en disco (en otro hilo, para no detener el bucle de red) y se envía en
+        cuanto haya conexión, en orden con los demás. Sin bandeja, equivale a
+        send_text().
+
+        Raises:
+            OSError: Si no se pudo guardar en la bandeja; el mensaje no se enviará.
+        """
+        if self._bandeja is None:
+            await self.send_text(texto)
+            return
+        async with self._orden_bandeja:
+            await self._loop.run_in_executor(None, self._bandeja.agregar, texto)
+        self._hay_mensajes.set()
+
+    def mensajes_pendientes(self) -> int:
+        """Mensajes de la bandeja de salida que el servidor aún no ha confirmado."""
+        return len(self._bandeja) if self._bandeja is not None else 0
+
+    async def send_text(self, texto: str) -> None:
+        """Envía un mensaje de chat."""
+        await self._enviar_mensaje(TipoFrame.TEXTO, texto.encode('utf-8'), CANAL_CHAT)
+
+    async def send_control(self, comando: str, canal: int = CANAL_CHAT) -> None:
+        """Envía un mensaje de control."""
+        await self._enviar_mensaje(TipoFrame.CONTROL, comando.encode('utf-8'), canal)
+
+    async def list_files(self, timeout: float = TIMEOUT_RESPUESTA) -> List[Union[str, Dict[str, Any]]]:
+        """
+        Pide al servidor la lista de archivos subidos.
+
+        Returns:
+            List[Union[str, Dict[str, Any]]]: Una entrada por archivo, tal como
+                la envía el servidor: {"nombre", "tamano", "fecha"} o, en
+                servidores antiguos, solo el nombre. info_archivo() las convierte
+                en InfoArchivo.
+        """
+        canal, cola = self._abrir_canal()
+        try:
+            await self.send_control("LISTA_ARCHIVOS", canal)
+            frame = await self._siguiente_frame(cola, timeout)
+            return json.loads(frame.texto())
+        finally:
+            self._cerrar_canal(canal)
+
+    async def seguir_archivos(
+        self,
+        lista: ListaArchivos,
+        intervalo_sondeo: float = INTERVALO_SONDEO_LISTA_S,
+        timeout: float = TIMEOUT_RESPUESTA
+    ) -> None:
+        """
+        Mantiene `lista` al día hasta que se cancela la tarea o se pierde la
+        conexión.
+
+        Se suscribe a los cambios ("SUSCRIBIR_ARCHIVOS:<versión>"): el servidor
+        responde con la lista completa, con los cambios desde esa versión o
+        con SIN_CAMBIOS, y después envía por el mismo canal solo los cambios.
+        Si el servidor no admite suscripciones, pregunta cada intervalo_sondeo
+        segundos si la lista ha cambiado ("LISTA_ARCHIVOS:<versión>") y, si
+        tampoco admite eso, pide la lista completa.
+        """
+        while True:
+            canal, cola = self._abrir_canal()
+            try:
+                await self.send_control(f"SUSCRIBIR_ARCHIVOS:{lista.version}", canal)
+                try:
+                    frame = await self._siguiente_frame(cola, timeout)
+                    lista.aplicar(frame.texto())
+                except (asyncio.TimeoutError, ValueError, UnicodeDecodeError) as e:
+                    logger.info("Sin suscripción a la lista de archivos (%s): se consultará periódicamente.", e)
+                    break
+                while True:
+                    lista.aplicar((await self._siguiente_frame(cola, None)).texto())
+            except ListaDesincronizada as e:
+                # Se perdió algún cambio: volver a suscribirse pidiendo la lista completa
+                logger.warning("Lista de archivos desincronizada, se pide completa: %s", e)
+                lista.reemplazar([], 0)
+            finally:
+                await self._cancelar_en_servidor(canal)
+                self._cerrar_canal(canal)
+
+        condicional = True
+        while True:
+            if condicional:
+                try:
+                    await self._consultar_archivos(lista, timeout)
+                except (asyncio.TimeoutError, ValueError, UnicodeDecodeError):
+                    condicional = False
+            if not condicional:
+                lista.reemplazar(await self.list_files(timeout))
+            await asyncio.sleep(intervalo_sondeo)
+
+    async def _consultar_archivos(self, lista: ListaArchivos, timeout: float) -> None:
+        """Pregunta si la lista de archivos ha cambiado desde la versión local y aplica la respuesta."""
+        canal, cola = self._abrir_canal()
+        try:
+            await self.send_control(f"LISTA_ARCHIVOS:{lista.version}", canal)
+            frame = await self._siguiente_frame(cola, timeout)
+            try:
+                lista.aplicar(frame.texto())
+            except ListaDesincronizada:
+                lista.reemplazar([], 0)
+        finally:
+            self._cerrar_canal(canal)
+
+    async def upload(
+        self,
+        ruta: Path,
+        progreso: Optional[Progreso] = None,
+        timeout: float = TIMEOUT_RESPUESTA
+    ) -> int:
+        """
+        Sube un archivo por su propio canal en bloques de hasta
+        TAMANO_BLOQUE_SUBIDA (menores si el enlace es lento, para no retrasar
+        el chat), cada uno con su offset y su CRC32. El payload de cada bloque
+        se envía sin pasar por Python (sendfile) cuando el sistema lo permite
+        y, si no, con un único búfer grande reutilizado.
+
+        Si se acordó compresión con el servidor y el archivo no está ya
+        comprimido (ver compresion.es_comprimible), los bloques se comprimen
+        en otros hilos y se envían comprimidos los que ganan con ello.
+
+        Si una subida anterior del mismo archivo se cortó, el servidor responde
+        hasta dónde la tiene verificada y se continúa desde ahí. Cancelar la
+        tarea con MOTIVO_PAUSA conserva el estado para continuarla más tarde.
+
+        Args:
+            ruta (Path): Archivo a subir.
+            progreso (Optional[Progreso], optional): Callback de progreso (desde el hilo de red).
+            timeout (float, optional): Tiempo máximo de espera de cada respuesta del servidor.
+
+        Returns:
+            int: Tamaño del archivo subido.
+        """
+        canal, cola = self._abrir_canal()
+        estado: Optional[EstadoTransferencia] = None
+        try:
+            with ruta.open('rb') as f:
+                info = os.fstat(f.fileno())
+                total = info.st_size
+                estado = self._estado_transferencia(
+                    "subida", ruta.name, ruta, total, f"{total}:{info.st_mtime_ns}"
+                )
+                algoritmo = self.compresion
+                if algoritmo and not await self._loop.run_in_executor(None, es_comprimible, ruta):
+                    algoritmo = None
+                peticion = {"id": estado.id, "nombre": ruta.name, "tamano": total, "bloque": TAMANO_BLOQUE_SUBIDA}
+                await self.send_control(f"SUBIDA:{json.dumps(peticion)}", canal)
+                try:
+                    enviados = int(await self._esperar_control(cola, "DESDE", timeout))
+                except ErrorProtocolo:
+                    # El servidor rechaza la subida: no tiene sentido reintentarla
+                    self._olvidar_transferencia(estado)
+                    raise
+                if not 0 <= enviados <= total:
+                    raise ErrorProtocolo(f"Offset de reanudación no válido: {enviados}")
+                if enviados:
+                    logger.info("Reanudando la subida de %s desde %s bytes.", ruta.name, enviados)
+                if progreso:
+                    progreso(enviados, total)
+                # Los CRC32 de los próximos bloques (y, si toca, su versión
+                # comprimida) se calculan en otros hilos mientras se envía el actual
+                crcs: Deque["tuple[int, asyncio.Future]"] = collections.deque()
+                por_calcular = enviados
+                while enviados < total:
+                    self._comprobar_rechazo(cola)
+                    while por_calcular < total and len(crcs) < BLOQUES_CRC_ADELANTADOS:
+                        cantidad = min(self._tamano_bloque(), total - por_calcular)
+                        if algoritmo:
+                            calculo = self._loop.run_in_executor(
+                                None, leer_bloque_comprimido, ruta, por_calcular, cantidad, algoritmo
+                            )
+                        else:
+                            calculo = self._loop.run_in_executor(None, crc32_archivo, ruta, por_calcular, cantidad)
+                        crcs.append((cantidad, calculo))
+                        por_calcular += cantidad
+                    cantidad, calculo = crcs.popleft()
+                    if algoritmo:
+                        crc, comprimido, flag = await calculo
+                    else:
+                        crc, comprimido, flag = await calculo, None, 0
+                    if comprimido is not None:
+                        longitud = CABECERA_BLOQUE.size + len(comprimido)
+                        await self._enviar(
+                            CABECERA.pack(TipoFrame.DATOS, FLAG_BLOQUE | flag, canal, longitud)
+                            + CABECERA_BLOQUE.pack(enviados, crc) + comprimido,
+                            canal=canal
+                        )
+                        enviados += cantidad
+                        if progreso:
+                            progreso(enviados, total)
+                        continue
+                    cabecera = (
+                        CABECERA.pack(TipoFrame.DATOS, FLAG_BLOQUE, canal, CABECERA_BLOQUE.size + cantidad)
+                        + CABECERA_BLOQUE.pack(enviados, crc)
+                    )
+                    hecho = self._loop.create_future()
+                    await self._enviar(RegionArchivo(cabecera, f, enviados, cantidad, hecho), canal=canal)
+                    try:
+                        await asyncio.shield(hecho)
+                    except asyncio.CancelledError:
+                        # Si el tramo aún espera en la cola se retira; si el escritor
+                        # ya lo está leyendo, hay que esperar a que termine antes de
+                        # cerrar el archivo
+                        self._descartar_datos(canal)
+                        await asyncio.wait([hecho])
+                        raise
+                    enviados += cantidad
+                    if progreso:
+                        progreso(enviados, total)
+            # Frame DATOS vacío: fin del archivo; el servidor confirma que lo tiene completo
+            await self._enviar(codificar_frame(TipoFrame.DATOS, b"", canal), canal=canal)
+            await self._esperar_control(cola, "COMPLETO", timeout)
+            self._olvidar_transferencia(estado)
+            return total
+        except asyncio.CancelledError as e:
+            # Cancelada por el usuario: no se continuará más adelante, salvo
+            # que sea una pausa
+            if estado and not es_pausa(e):
+                self._olvidar_transferencia(estado)
+            self._descartar_datos(canal)
+            await self._cancelar_en_servidor(canal)
+            raise
+        finally:
+            self._cerrar_canal(canal)
+
+    async def download(
+        self,
+        nombre: str,
+        destino: Path,
+        progreso: Optional[Progreso] = None,
+        timeout: float = TIMEOUT_RESPUESTA
+    ) -> int:
+        """
+        Descarga un archivo del servidor a `destino` en bloques verificados con
+        CRC32, escribiéndolo según llega en `destino` + EXTENSION_PARCIAL. Si
+        una descarga anterior del mismo archivo se cortó, se continúa desde el
+        último bloque verificado (salvo que el archivo haya cambiado en el
+        servidor). Cancelar la tarea con MOTIVO_PAUSA conserva lo recibido.
+
+        Args:
+            nombre (str): Nombre del archivo en el servidor.
+            destino (Path): Ruta local donde guardarlo.
+            progreso (Optional[Progreso], optional): Callback de progreso (desde el hilo de red).
+            timeout (float, optional): Tiempo máximo sin recibir datos.
+
+        Returns:
+            int: Tamaño del archivo descargado.
+        """
+        parcial = destino.with_name(destino.name + EXTENSION_PARCIAL)
+        estado = self._estado_transferencia("descarga", nombre, destino, None, "")
+        desde = estado.offset if parcial.exists() and parcial.stat().st_size >= estado.offset else 0
+        if desde:
+            logger.info("Reanudando la descarga de %s desde %s bytes.", nombre, desde)
+
+        guardado = [time.monotonic()]
+
+        def guardar_avance(descarga: DescargaArchivo) -> None:
+            guardado[0] = time.monotonic()
+            self._guardar_transferencia(
+                estado._replace(offset=descarga.verificados, tamano=descarga.total, firma=descarga.etag)
+            )
+
+        def al_verificar(descarga: DescargaArchivo) -> None:
+            # Guardar el avance como mucho cada INTERVALO_GUARDADO_S
+            if time.monotonic() - guardado[0] >= INTERVALO_GUARDADO_S:
+                guardar_avance(descarga)
+
+        canal = next(self._contador_canales)
+        descarga = self.aceptar_archivo(canal, parcial, progreso, desde, True, al_verificar)
+        try:
+            peticion = {"nombre": nombre, "desde": desde, "etag": estado.firma}
+            await self.send_control(f"DESCARGA:{json.dumps(peticion)}", canal)
+            while not descarga.hecho.done():
+                await asyncio.wait([descarga.hecho], timeout=timeout)
+                if not descarga.hecho.done() and time.monotonic() - descarga.t_ultimo >= timeout:
+                    raise asyncio.TimeoutError(f"El servidor dejó de enviar '{nombre}'.")
+            try:
+                recibidos = descarga.hecho.result()
+            except Exception as e:
+                if isinstance(e, ErrorProtocolo) and descarga.total is None:
+                    # El servidor rechazó la descarga (p. ej. el archivo ya no existe)
+                    parcial.unlink(missing_ok=True)
+                    self._olvidar_transferencia(estado)
+                else:
+                    guardar_avance(descarga)
+                if not isinstance(e, ConnectionError):
+                    await self._cancelar_en_servidor(canal)
+                raise
+            os.replace(parcial, destino)
+            self._olvidar_transferencia(estado)
+            return recibidos
+        except asyncio.TimeoutError:
+            descarga.fallar(asyncio.CancelledError())
+            guardar_avance(descarga)
+            await self._cancelar_en_servidor(canal)
+            raise
+        except asyncio.CancelledError as e:
+            descarga.fallar(asyncio.CancelledError())
+            if es_pausa(e):
+                guardar_avance(descarga)
+            else:
+                # Cancelada por el usuario: se descarta lo recibido
+                parcial.unlink(missing_ok=True)
+                self._olvidar_transferencia(estado)
+            await self._cancelar_en_servidor(canal)
+            raise
+        finally:
+            self._quitar_descarga(canal)
+
+    def transferencias_pendientes(self) -> List[EstadoTransferencia]:
+        """Transferencias cortadas que se pueden continuar con reanudar()."""
+        return self._registro.pendientes() if self._registro else []
+
+    async def reanudar(self, estado: EstadoTransferencia, progreso: Optional[Progreso] = None) -> int:
+        """
+        Continúa una transferencia cortada (ver transferencias_pendientes).
+
+        Returns:
+            int: Tamaño del archivo transferido.
+        """
+        if estado.tipo == "subida":
+            ruta = Path(estado.ruta)
+            if not ruta.is_file():
+                self._olvidar_transferencia(estado)
+                raise FileNotFoundError(f"El archivo a subir ya no existe: {ruta}")
+            return await self.upload(ruta, progreso)
+        return await self.download(estado.nombre, Path(estado.ruta), progreso)
+
+    def descartar_transferencia(self, tipo: str, nombre: str, ruta: Path) -> None:
+        """
+        Olvida una transferencia pausada o cortada que no se va a continuar y,
+        si es una descarga, borra lo recibido.
+        """
+        if tipo == "descarga":
+            ruta.with_name(ruta.name + EXTENSION_PARCIAL).unlink(missing_ok=True)
+        if self._registro:
+            estado = self._registro.buscar(tipo, nombre, ruta)
+            if estado:
+                self._registro.borrar(estado)
+
+    def aceptar_archivo(
+        self,
+        canal: int,
+        destino: Path,
+        progreso: Optional[Progreso] = None,
+        desde: int = 0,
+        por_bloques: bool = False,
+        al_verificar: Optional[Callable[[DescargaArchivo], None]] = None
+    ) -> DescargaArchivo:
+        """
+        Empieza a recibir en `destino` el archivo que llega por un canal. Debe
+        llamarse desde el hilo de red (p. ej. desde al_recibir al llegar
+        "ARCHIVO:<nombre>"), antes de que se procese el siguiente frame.
+        Los argumentos desde, por_bloques y al_verificar son los de DescargaArchivo.
+
+        Returns:
+            DescargaArchivo: Descarga en curso; su futuro `hecho` da los bytes recibidos.
+        """
+        if not self.conectado:
+            raise ConnectionError("No hay conexión con el servidor.")
+        descarga = DescargaArchivo(
+            destino, self._loop.create_future(), progreso, desde, por_bloques, al_verificar
+        )
+        self._descargas[canal] = descarga
+        self._decodificador.sumideros[canal] = descarga.escribir
+        descarga.hecho.add_done_callback(lambda _: self._quitar_descarga(canal))
+        return descarga
+
+    # ----------------------------
+    # Canales y envío
+    # ----------------------------
+    def _abrir_canal(self) -> "tuple[int, asyncio.Queue]":
+        """Reserva un canal para una petición y la cola donde llegan sus respuestas."""
+        if not self.conectado:
+            raise ConnectionError("No hay conexión con el servidor.")
+        canal = next(self._contador_canales)
+        cola: asyncio.Queue = asyncio.Queue()
+        self._canales[canal] = cola
+        return canal, cola
+
+    def _cerrar_canal(self, canal: int) -> None:
+        self._canales.pop(canal, None)
+
+    def _quitar_descarga(self, canal: int) -> None:
+        self._descargas.pop(canal, None)
+        self._decodificador.sumideros.pop(canal, None)
+
+    async def _siguiente_frame(self, cola: asyncio.Queue, timeout: Optional[float]) -> Frame:
+        """Espera el siguiente frame de un canal; propaga la pérdida de conexión."""
+        elemento = await asyncio.wait_for(cola.get(), timeout)
+        if isinstance(elemento, Exception):
+            raise elemento
+        return elemento
+
+    async def _esperar_control(self, cola: asyncio.Queue, comando: str, timeout: float) -> str:
+        """
+        Espera la respuesta "<comando>:<valor>" del servidor en un canal y
+        devuelve el valor; cualquier otra respuesta es un error.
+        """
+        frame = await self._siguiente_frame(cola, timeout)
+        texto = frame.texto() if frame.tipo == TipoFrame.CONTROL else ""
+        if not texto.startswith(f"{comando}:"):
+            raise ErrorProtocolo(f"Respuesta inesperada del servidor: {frame.payload[:80]!r}")
+        return texto.split(":", 1)[1]
+
+    def _comprobar_rechazo(self, cola: asyncio.Queue) -> None:
+        """Lanza un error si el servidor ha rechazado un bloque de una subida en curso."""
+        if cola.empty():
+            return
+        elemento = cola.get_nowait()
+        if isinstance(elemento, Exception):
+            raise elemento
+        raise ErrorProtocolo(f"El servidor rechazó la subida: {elemento.payload[:80]!r}")
+
+    def _estado_transferencia(
+        self, tipo: str, nombre: str, ruta: Path, tamano: Optional[int], firma: str
+    ) -> EstadoTransferencia:
+        """
+        Devuelve el estado guardado de la misma transferencia o uno nuevo. Una
+        subida cuyo archivo local ha cambiado empieza de cero.
+        """
+        if self._registro is None:
+            return EstadoTransferencia(uuid.uuid4().hex, tipo, nombre, str(ruta), tamano, 0, firma)
+        estado = self._registro.buscar(tipo, nombre, ruta)
+        if estado and (tipo == "descarga" or estado.firma == firma):
+            return estado
+        if estado:
+            self._registro.borrar(estado)
+        return self._registro.nuevo(tipo, nombre, ruta, tamano, firma)
+
+    def _guardar_transferencia(self, estado: EstadoTransferencia) -> None:
+        if self._registro:
+            self._registro.guardar(estado)
+
+    def _olvidar_transferencia(self, estado: EstadoTransferencia) -> None:
+        if self._registro:
+            self._registro.borrar(estado)
+
+    async def _cancelar_en_servidor(self, canal: int) -> None:
+        """Avisa al servidor de que se abandona la transferencia de un canal."""
+        if self.conectado:
+            try:
+                await self.send_control("CANCELAR", canal)
+            except ConnectionError:
+                pass
+
+    async def _negociar_compresion(self) -> None:
+        """
+        Ofrece al servidor los algoritmos de compresión ("COMPRESION:zlib,lzma")
+        y guarda el que elija ("COMPRESION:<algoritmo>", vacío si ninguno).
+        Un servidor que no responde a tiempo se trata como sin compresión.
+        """
+        canal, cola = self._abrir_canal()
+        try:
+            await self.send_control(f"COMPRESION:{','.join(self._compresion_ofrecida)}", canal)
+            algoritmo = await self._esperar_control(cola, "COMPRESION", TIMEOUT_NEGOCIACION)
+        except ConnectionError:
+            return
+        except (asyncio.TimeoutError, ErrorProtocolo, UnicodeDecodeError) as e:
+            logger.info("El servidor no admite compresión (%r).", e)
+            return
+        finally:
+            self._cerrar_canal(canal)
+        if algoritmo in self._compresion_ofrecida:
+            self.compresion = algoritmo
+            logger.info("Compresión acordada con el servidor: %s.", algoritmo)
+
+    async def _autenticar(self, comando: str, timeout: float) -> Dict[str, Any]:
+        """
+        Envía un comando de autenticación ("CREDENTIALS:" o "SESION:") en su
+        propio canal y devuelve la respuesta JSON del servidor
+        ({"status": "received", "Resp": 1, "Mens": ..., "Token": ...}).
+        """
+        canal, cola = self._abrir_canal()
+        try:
+            await self.send_control(comando, canal)
+            frame = await self._siguiente_frame(cola, timeout)
+        finally:
+            self._cerrar_canal(canal)
+        try:
+            respuesta = json.loads(frame.texto())
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ErrorProtocolo(f"Respuesta de autenticación no válida: {frame.payload[:80]!r}") from e
+        if not isinstance(respuesta, dict) or respuesta.get("status") != "received":
+            raise ErrorProtocolo(f"Respuesta de autenticación inesperada: {frame.payload[:80]!r}")
+        if respuesta.get("Resp") != 1:
+            raise ErrorAutenticacion(respuesta.get("Mens") or "Credenciales incorrectas.")
+        return respuesta
+
+    async def _vaciar_bandeja(self) -> None:
+        """
+        Envía los mensajes de la bandeja de salida, en orden, cada vez que
+        llega alguno. Cada uno viaja como "MENSAJE:{"id": ..., "texto": ...}"
+        y se borra de la bandeja al llegar "RECIBIDO:<id>". El servidor
+        descarta los id repetidos, así que reenviar tras un corte los mensajes
+        sin confirmar no los duplica.
+
+        Si el servidor no confirma a tiempo el primer mensaje de la conexión,
+        no admite confirmaciones: a partir de ahí los mensajes se envían como
+        texto y se borran en cuanto se escriben.
+        """
+        while True:
+            await self._hay_mensajes.wait()
+            self._hay_mensajes.clear()
+            pendientes = self._bandeja.pendientes()
+            if not pendientes:
+                continue
+            if self._acuses is False:
+                for mensaje in pendientes:
+                    await self.send_text(mensaje.texto)
+                    self._bandeja.confirmar(mensaje.id)
+                continue
+            canal, cola = self._abrir_canal()
+            try:
+                for mensaje in pendientes:
+                    contenido = json.dumps({"id": mensaje.id, "texto": mensaje.texto}, ensure_ascii=False)
+                    await self.send_control(f"MENSAJE:{contenido}", canal)
+                por_confirmar = {mensaje.id for mensaje in pendientes}
+                while por_confirmar:
+                    timeout = TIMEOUT_RESPUESTA if self._acuses else TIMEOUT_NEGOCIACION
+                    id_mensaje = await self._esperar_control(cola, "RECIBIDO", timeout)
+                    self._acuses = True
+                    por_confirmar.discard(id_mensaje)
+                    self._bandeja.confirmar(id_mensaje)
+            except ConnectionError:
+                return  # Los mensajes sin confirmar se reenvían al reconectar
+            except asyncio.TimeoutError:
+                if self._acuses is None:
+                    logger.info("El servidor no confirma los mensajes; se envían como texto.")
+                    self._acuses = False
+                    self._hay_mensajes.set()
+                else:
+                    logger.warning("El servidor no confirmó algunos mensajes; se reenviarán al reconectar.")
+            except (ErrorProtocolo, UnicodeDecodeError) as e:
+                logger.warning("Respuesta inesperada al enviar mensajes: %s", e)
+            finally:
+                self._cerrar_canal(canal)
+
+    async def _bucle_reconexion(self) -> None:
+        """
+        Reintenta la conexión tras un corte, con espera exponencial y
+        aleatoria, hasta lograrlo o hasta que el servidor rechace la sesión.
+        connect() reanuda la sesión con el token y la bandeja de salida se
+        vacía al presentarse de nuevo.
+        """
+        for intento in itertools.count():
+            espera = min(RECONEXION_ESPERA_MAXIMA_S, RECONEXION_ESPERA_INICIAL_S * 2 ** min(intento, 16))
+            espera = random.uniform(espera / 2, espera)
+            logger.info("Reconectando en %.1f s (intento %s).", espera, intento + 1)
+            await asyncio.sleep(espera)
+            try:
+                await self.connect()
+                return
+            except ErrorAutenticacion as e:
+                logger.warning("El servidor rechazó la sesión al reconectar: %s", e)
+                # Sin sesión la conexión no sirve: cerrarla sin volver a reintentar.
+                # iniciar_sesion() abrirá otra.
+                self._perder_conexion(EstadoConexion.SESION_CADUCADA)
+                return
+            except (OSError, asyncio.TimeoutError, ErrorProtocolo) as e:
+                logger.warning("No se pudo reconectar: %r", e)
+                if self.conectado:
+                    self._perder_conexion()
+
+    def _cambiar_estado(self, estado: EstadoConexion) -> None:
+        if estado is self.estado:
+            return
+        self.estado = estado
+        if self._al_cambiar_estado:
+            self._al_cambiar_estado(estado)
+
+    async def _enviar_mensaje(self, tipo: int, payload: bytes, canal: int) -> None:
+        """
+        Encola un frame de chat o de control, comprimido si se acordó
+        compresión, supera UMBRAL_COMPRESION y compensa. Los payloads grandes
+        se comprimen en otro hilo; el cerrojo mantiene el orden de los mensajes.
+        """
+        async with self._orden_mensajes:
+            flags = 0
+            if self.compresion and len(payload) >= UMBRAL_COMPRESION:
+                if len(payload) >= UMBRAL_COMPRESION_EN_HILO:
+                    resultado = await self._loop.run_in_executor(None, comprimir, payload, self.compresion)
+                else:
+                    resultado = comprimir(payload, self.compresion)
+                if resultado:
+                    payload, flags = resultado
+            await self._enviar(codificar_frame(tipo, payload, canal, flags), prioritario=True)
+
+    async def _enviar(
+        self, frame: "bytes | RegionArchivo", prioritario: bool = False, canal: int = CANAL_CHAT
+    ) -> None:
+        """
+        Encola un frame para el escritor. Los prioritarios (chat y control) no
+        esperan; los bloques de archivo van a la cola de su canal y esperan si
+        está llena.
+        """
+        if not self.conectado:
+            raise ConnectionError("No hay conexión con el servidor.")
+        if prioritario:
+            self._cola_prioritaria.put_nowait(frame)
+        else:
+            tamano = len(frame.cabecera) + frame.cantidad if isinstance(frame, RegionArchivo) else len(frame)
+            await self._cola_datos.poner(canal, frame, tamano)
+        self._hay_envios.set()
+
+    def _descartar_datos(self, canal: int) -> None:
+        """Retira de la cola los bloques de un canal que aún no se han empezado a enviar."""
+        for frame in self._cola_datos.descartar(canal):
+            if isinstance(frame, RegionArchivo):
+                frame.hecho.cancel()
+
+    def _tamano_bloque(self) -> int:
+        """
+        Tamaño del próximo bloque de subida: el que se envía en
+        LATENCIA_MAXIMA_BLOQUE_S a la velocidad medida, entre
+        TAMANO_BLOQUE_MINIMO y TAMANO_BLOQUE_SUBIDA. Como mucho dobla el
+        anterior: los primeros bloques caben enteros en los búferes y su
+        velocidad aparente es mucho mayor que la del enlace.
+        """
+        if not self._bloques_adaptativos:
+            return TAMANO_BLOQUE_SUBIDA
+        if self._velocidad_envio is None:
+            return TAMANO_BLOQUE_MINIMO
+        bloques = int(self._velocidad_envio * LATENCIA_MAXIMA_BLOQUE_S) // TAMANO_BLOQUE_MINIMO
+        tamano = min(max(bloques, 1) * TAMANO_BLOQUE_MINIMO, 2 * self._bloque_anterior, TAMANO_BLOQUE_SUBIDA)
+        self._bloque_anterior = tamano
+        return tamano
+
+    def _medir_envio(self, nbytes: int, segundos: float) -> None:
+        """Actualiza la velocidad de envío con lo que tardó en escribirse un frame DATOS."""
+        velocidad = nbytes / max(segundos, 1e-6)
+        if self._velocidad_envio is None or velocidad < self._velocidad_envio:
+            self._velocidad_envio = velocidad
+        else:
+            self._velocidad_envio += PESO_MEDIDA_VELOCIDAD * (velocidad - self._velocidad_envio)
+
+    def _limitar_sin_enviar(self) -> None:
+        """
+        Limita los bytes sin enviar que acumula el núcleo en el socket, para
+        que el escritor, y no el búfer del sistema, decida qué sale antes.
+        """
+        if not hasattr(socket, "TCP_NOTSENT_LOWAT"):
+            return
+        try:
+            self._transporte.get_extra_info("socket").setsockopt(
+                socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, LIMITE_SIN_ENVIAR
+            )
+        except OSError as e:
+            logger.info("No se pudo limitar el búfer de envío del socket: %s", e)
+
+    async def _escritor(self) -> None:
+        """
+        Escribe los frames pendientes dando prioridad al chat y al control;
+        los bloques de archivo de las distintas transferencias se turnan.
+        """
+        try:
+            while True:
+                if not self._cola_prioritaria.empty():
+                    self._transporte.write(self._cola_prioritaria.get_nowait())
+                    await self._protocolo.drain()
+                    continue
+                if self._cola_datos.vacia():
+                    self._hay_envios.clear()
+                    await self._hay_envios.wait()
+                    continue
+                frame = self._cola_datos.sacar()
+                inicio = time.monotonic()
+                if isinstance(frame, RegionArchivo):
+                    if not await self._escribir_region(frame):
+                        continue
+                    nbytes = len(frame.cabecera) + frame.cantidad
+                else:
+                    self._transporte.write(frame)
+                    await self._protocolo.drain()
+                    nbytes = len(frame)
+                if nbytes >= TAMANO_BLOQUE_MINIMO:
+                    # Los frames pequeños (fin de archivo) no dan una medida fiable
+                    self._medir_envio(nbytes, time.monotonic() - inicio)
+        except (ConnectionError, OSError) as e:
+            logger.error("Error enviando datos al servidor: %s", e)
+            self._perder_conexion()
+
+    async def _escribir_region(self, region: RegionArchivo) -> bool:
+        """
+        Escribe un frame DATOS leyendo su payload del archivo: con sendfile
+        (copia en el núcleo) si está disponible y, si no, con un búfer grande.
+
+        Returns:
+            bool: False si la subida se canceló antes de empezar el tramo.
+        """
+        if region.hecho.done():
+            # Subida cancelada antes de empezar el tramo: no se ha escrito nada
+            return False
+        self._region_en_curso = region
+        try:
+            self._transporte.write(region.cabecera)
+            await self._protocolo.drain()
+            enviados = 0
+            if self._usar_sendfile:
+                try:
+                    enviados = await self._loop.sendfile(
+                        self._transporte, region.archivo, region.offset, region.cantidad, fallback=False
+                    )
+                except (NotImplementedError, asyncio.SendfileNotAvailableError) as e:
+                    logger.info("sendfile no disponible, se usa copia con búfer: %s", e)
+                    self._usar_sendfile = False
+            if not self._usar_sendfile:
+                enviados = await self._copiar_region(region)
+            if enviados != region.cantidad:
+                # La cabecera ya anunció otra longitud: el flujo queda inservible
+                raise OSError("El archivo cambió de tamaño durante la subida.")
+        except BaseException as e:
+            if not region.hecho.done():
+                region.hecho.set_exception(ConnectionError(f"Error enviando el archivo: {e}"))
+            raise
+        else:
+            if not region.hecho.done():
+                region.hecho.set_result(enviados)
+            return True
+        finally:
+            self._region_en_curso = None
+
+    async def _copiar_region(self, region: RegionArchivo) -> int:
+        """Envía un tramo de archivo por bloques leídos en un búfer reutilizado."""
+        if self._bufer_subida is None:
+            self._bufer_subida = bytearray(TAMANO_BLOQUE_SUBIDA)
+        vista = memoryview(self._bufer_subida)
+        region.archivo.seek(region.offset)
+        enviados = 0
+        while enviados < region.cantidad:
+            leidos = region.archivo.readinto(vista[:region.cantidad - enviados])
+            if not leidos:
+                break
+            # El transporte copia lo que no puede enviar en el acto: el búfer se puede reutilizar
+            self._transporte.write(vista[:leidos])
+            await self._protocolo.drain()
+            enviados += leidos
+        vista.release()
+        return enviados
+
+    def _datos_recibidos(self, n: int) -> None:
+        """Decodifica los bytes recién recibidos y reparte los frames completos."""
+        try:
+            for frame in self._decodificador.iterar_frames(n):
+                if frame.flags & FLAGS_COMPRESION:
+                    frame = Frame(
+                        frame.tipo, frame.flags & ~FLAGS_COMPRESION, frame.canal,
+                        descomprimir(frame.payload, frame.flags)
+                    )
+                self._repartir(frame)
+        except ErrorProtocolo as e:
+            logger.error("Error recibiendo mensaje: %s", e)
+            self._transporte.close()
+
+    def _repartir(self, frame: Frame) -> None:
+        """Entrega un frame a su descarga, a la petición que lo espera o a al_recibir."""
+        if frame.canal != CANAL_CHAT:
+            descarga = self._descargas.get(frame.canal)
+            if descarga is not None:
+                descarga.procesar(frame)
+                return
+            cola = self._canales.get(frame.canal)
+            if cola is not None:
+                cola.put_nowait(frame)
+                return
+            if frame.tipo == TipoFrame.DATOS:
+                # Restos de una transferencia ya terminada o abandonada
+                return
+        try:
+            self._al_recibir(frame)
+        except Exception as e:
+            logger.error("Error procesando frame recibido: %s", e)
+
+    def _perder_conexion(self, estado: Optional[EstadoConexion] = None) -> None:
+        """
+        Marca la conexión como perdida y despierta a las peticiones en curso.
+        Si se indica estado, pasa a él sin lanzar la reconexión.
+        """
+        if not self.conectado:
+            return
+        self.conectado = False
+        error = ConnectionError("Conexión con el servidor perdida.")
+        for cola in self._canales.values():
+            cola.put_nowait(error)
+        for descarga in list(self._descargas.values()):
+            descarga.fallar(error)
+        # Despertar a las subidas que esperan un tramo que ya no se escribirá
+        regiones = [self._region_en_curso, *self._cola_datos.vaciar(error)]
+        for region in regiones:
+            if isinstance(region, RegionArchivo) and not region.hecho.done():
+                region.hecho.set_exception(error)
+        for tarea in self._tareas:
+            if tarea is not asyncio.current_task():
+                tarea.cancel()
+        if self._transporte:
+            self._transporte.close()
+        if self._al_desconectar:
+            self._al_desconectar()
+        if self._cerrando:
+            return
+        if estado is not None:
+            self._cambiar_estado(estado)
+        elif self._reconectar:
+            self._cambiar_estado(EstadoConexion.RECONECTANDO)
+            if self._tarea_reconexion is None or self._tarea_reconexion.done():
+                self._tarea_reconexion = asyncio.ensure_future(self._bucle_reconexion())
+        else:
+            self._cambiar_estado(EstadoConexion.DESCONECTADO)
+
+    async def _cerrar(self) -> None:
+        self._cerrando = True
+        if self._tarea_reconexion is not None:
+            self._tarea_reconexion.cancel()
+        if self._transporte:
+            self._al_desconectar = None  # Cierre voluntario: no avisar
+            self._perder_conexion()
+        # Esperar a que terminen las tareas canceladas (la de la bandeja
+        # espera un evento) antes de que se detenga el bucle
+        tareas = [tarea for tarea in (*self._tareas, self._tarea_reconexion) if tarea is not None]
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        # Dar una vuelta al bucle para que el transporte termine de cerrarse
+        await asyncio.sleep(0)
+
+
+def esperar_en_tk(
+    widget: tk.Misc,
+    futuro: concurrent.futures.Future,
+    al_exito: Optional[Callable[[Any], None]] = None,
+    al_error: Optional[Callable[[BaseException], None]] = None,
+    intervalo_ms: int = INTERVALO_SONDEO_MS,
+    progreso: Optional[EstadoProgreso] = None,
+    al_progreso: Optional[Progreso] = None
+) -> None:
+    """
+    Llama a al_exito o al_error en el hilo de Tk cuando termina una operación
+    lanzada con ClienteAsync.ejecutar, sin bloquear el bucle de Tk. Si se
+    indican progreso y al_progreso, mientras espera le pasa a al_progreso el
+    último progreso conocido.
+    """
+    def comprobar() -> None:
+        if not futuro.done():
+            if progreso is not None and al_progreso:
+                al_progreso(progreso.transferidos, progreso.total)
+            try:
+                widget.after(intervalo_ms, comprobar)
+            except tk.TclError:
+                # La ventana se cerró antes de terminar: nadie espera ya el resultado
+                pass
+            return
+        if futuro.cancelled():
+            return
+        error = futuro.exception()
+        if error is None:
+            if al_exito:
+                al_exito(futuro.result())
+        elif al_error:
+            al_error(error)
+        else:
+            logger.error("Error en operación de red: %s", error)
+    comprobar()
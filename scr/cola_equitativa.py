@@ -0,0 +1,114 @@
+# src/cola_equitativa.py
+
+import asyncio
+import collections
+from typing import Any, Deque, Dict, List, Tuple
+
+
+class ColaEquitativa:
+    """
+    Frames pendientes de envío, en una cola por canal, que se reparten con
+    déficit round robin (DRR): en cada vuelta, cada canal con frames puede
+    enviar hasta `cupo` bytes (más lo que le sobró de la anterior). Así
+    varias transferencias a la vez avanzan al mismo ritmo en bytes aunque
+    usen bloques de distinto tamaño, y ninguna espera a que otra termine.
+
+    Dentro de un canal los frames salen en el orden en que se pusieron. Cada
+    canal puede tener como mucho `max_por_canal` frames esperando: poner()
+    espera a que haya sitio, lo que frena a quien produce demasiado rápido.
+    """
+
+    def __init__(self, cupo: int, max_por_canal: int) -> None:
+        """
+        Args:
+            cupo (int): Bytes por vuelta y canal; debe ser al menos el tamaño del mayor frame.
+            max_por_canal (int): Frames que pueden esperar en cada canal.
+        """
+        self.cupo = cupo
+        self.max_por_canal = max(1, max_por_canal)
+        self._colas: Dict[int, Deque[Tuple[Any, int]]] = {}
+        self._deficit: Dict[int, int] = {}
+        self._turno: Deque[int] = collections.deque()  # Canales con frames; el primero tiene el turno
+        self._esperando: Dict[int, List[asyncio.Future]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(cola) for cola in self._colas.values())
+
+    def vacia(self) -> bool:
+        return not self._turno
+
+    async def poner(self, canal: int, frame: Any, tamano: int) -> None:
+        """Añade un frame de `tamano` bytes a la cola de su canal, esperando si está llena."""
+        while len(self._colas.get(canal, ())) >= self.max_por_canal:
+            espera = asyncio.get_running_loop().create_future()
+            self._esperando.setdefault(canal, []).append(espera)
+            await espera
+        cola = self._colas.get(canal)
+        if cola is None:
+            cola = self._colas[canal] = collections.deque()
+            self._deficit[canal] = 0
+            self._turno.append(canal)
+        cola.append((frame, tamano))
+
+    def sacar(self) -> Any:
+        """Devuelve el siguiente frame a enviar. La cola no debe estar vacía."""
+        while True:
+            canal = self._turno[0]
+            cola = self._colas[canal]
+            frame, tamano = cola[0]
+            if tamano <= self._deficit[canal]:
+                cola.popleft()
+                self._deficit[canal] -= tamano
+                if not cola:
+                    # Un canal sin frames no acumula déficit para la próxima vez
+                    self._turno.popleft()
+                    del self._colas[canal], self._deficit[canal]
+                self._despertar(canal)
+                return frame
+            # Turno agotado: pasa al siguiente canal, que suma su cupo
+            self._turno.rotate(-1)
+            self._deficit[self._turno[0]] += self.cupo
+
+    def descartar(self, canal: int) -> List[Any]:
+        """
+        Quita los frames pendientes de un canal (p. ej. de una transferencia cancelada).
+
+        Returns:
+            List[Any]: Frames quitados.
+        """
+        cola = self._colas.pop(canal, None)
+        if cola is None:
+            return []
+        del self._deficit[canal]
+        self._turno.remove(canal)
+        return [frame for frame, _ in cola]
+
+    def vaciar(self, error: BaseException) -> List[Any]:
+        """
+        Quita todos los frames pendientes y despierta con `error` a quien
+        espera para poner más.
+
+        Returns:
+            List[Any]: Frames que no se llegaron a enviar.
+        """
+        frames = [frame for cola in self._colas.values() for frame, _ in cola]
+        self._colas.clear()
+        self._deficit.clear()
+        self._turno.clear()
+        for esperas in self._esperando.values():
+            for espera in esperas:
+                if not espera.done():
+                    espera.set_exception(error)
+        self._esperando.clear()
+        return frames
+
+    def _despertar(self, canal: int) -> None:
+        """Deja poner un frame más en un canal que estaba lleno."""
+        esperas = self._esperando.get(canal)
+        while esperas:
+            espera = esperas.pop(0)
+            if not espera.done():
+                espera.set_result(None)
+                break
+        if not esperas:
+            self._esperando.pop(canal, None)
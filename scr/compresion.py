@@ -0,0 +1,166 @@
+# src/compresion.py
+
+import lzma
+import math
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from protocolo import FLAG_LZMA, FLAG_ZLIB, MAX_PAYLOAD, ErrorProtocolo
+
+# Algoritmos admitidos, en orden de preferencia, con su flag de frame
+ALGORITMOS: Dict[str, int] = {"zlib": FLAG_ZLIB, "lzma": FLAG_LZMA}
+
+# Nivel con el que comprime cada algoritmo (zlib 1-9, preset de lzma 0-9).
+# Ver benchmarks/bench_compresion.py para el ahorro frente al coste de CPU.
+NIVELES: Dict[str, int] = {"zlib": 6, "lzma": 1}
+
+# Solo se comprimen los frames de chat y control de al menos este tamaño
+UMBRAL_COMPRESION = 1024
+
+# Frames a partir de este tamaño se comprimen en un hilo aparte, para no
+# detener el bucle de red mientras tanto
+UMBRAL_COMPRESION_EN_HILO = 256 * 1024
+
+# Un payload comprimido solo se envía si ocupa como mucho esta fracción del original
+FRACCION_MAXIMA = 0.9
+
+# Extensiones de archivos cuyo contenido ya está comprimido
+EXTENSIONES_COMPRIMIDAS = frozenset({
+    ".7z", ".aac", ".apk", ".avi", ".bz2", ".docx", ".epub", ".flac", ".gif", ".gz", ".heic", ".jar",
+    ".jpeg", ".jpg", ".m4a", ".mkv", ".mov", ".mp3", ".mp4", ".odt", ".ogg", ".opus", ".png", ".pptx",
+    ".rar", ".tgz", ".webm", ".webp", ".xlsx", ".xz", ".zip", ".zst",
+})
+
+# Muestras que se leen de un archivo para estimar si merece la pena comprimirlo
+MUESTRAS_ENTROPIA = 3
+TAMANO_MUESTRA = 64 * 1024
+
+# Entropía media (bits por byte, 8 como máximo) a partir de la cual el
+# contenido se considera ya comprimido o aleatorio
+ENTROPIA_MAXIMA = 7.5
+
+
+def elegir_algoritmo(ofrecidos: Sequence[str]) -> Optional[str]:
+    """Primer algoritmo de los ofrecidos por el otro extremo que se admite aquí."""
+    for algoritmo in ofrecidos:
+        if algoritmo in ALGORITMOS:
+            return algoritmo
+    return None
+
+
+def comprimir(datos: bytes, algoritmo: str, nivel: Optional[int] = None) -> Optional[Tuple[bytes, int]]:
+    """
+    Comprime un payload.
+
+    Args:
+        datos (bytes): Datos a comprimir.
+        algoritmo (str): "zlib" o "lzma".
+        nivel (Optional[int], optional): Nivel de compresión. Defaults to NIVELES[algoritmo].
+
+    Returns:
+        Optional[Tuple[bytes, int]]: Datos comprimidos y flag del frame, o None si
+        no ahorran al menos un (1 - FRACCION_MAXIMA) del tamaño.
+    """
+    nivel = NIVELES[algoritmo] if nivel is None else nivel
+    if algoritmo == "zlib":
+        comprimido = zlib.compress(datos, nivel)
+    else:
+        comprimido = lzma.compress(datos, preset=nivel, check=lzma.CHECK_NONE)
+    if len(comprimido) > len(datos) * FRACCION_MAXIMA:
+        return None
+    return comprimido, ALGORITMOS[algoritmo]
+
+
+class Descompresor:
+    """
+    Descompresión incremental del payload de un frame, según llegan sus
+    trozos. Limita el tamaño descomprimido para que un payload malicioso no
+    agote la memoria.
+    """
+
+    def __init__(self, flags: int, limite: int = MAX_PAYLOAD) -> None:
+        if flags & FLAG_ZLIB:
+            self._objeto = zlib.decompressobj()
+        elif flags & FLAG_LZMA:
+            self._objeto = lzma.LZMADecompressor()
+        else:
+            raise ErrorProtocolo(f"Frame sin algoritmo de compresión (flags {flags:#x}).")
+        self._restante = limite
+
+    def descomprimir(self, datos: bytes) -> bytes:
+        """Descomprime un trozo y devuelve los datos que ya se pueden usar."""
+        try:
+            salida = self._objeto.decompress(datos, self._restante + 1)
+        except (zlib.error, lzma.LZMAError) as e:
+            raise ErrorProtocolo(f"Datos comprimidos no válidos: {e}") from e
+        if len(salida) > self._restante:
+            raise ErrorProtocolo("El payload descomprimido supera el tamaño permitido.")
+        self._restante -= len(salida)
+        return salida
+
+    def terminar(self) -> None:
+        """Comprueba que el payload comprimido ha llegado completo y sin restos."""
+        if not self._objeto.eof or self._objeto.unused_data:
+            raise ErrorProtocolo("Payload comprimido incompleto o con datos de más.")
+
+
+def descomprimir(payload: bytes, flags: int, limite: int = MAX_PAYLOAD) -> bytes:
+    """Descomprime el payload completo de un frame."""
+    descompresor = Descompresor(flags, limite)
+    datos = descompresor.descomprimir(payload)
+    descompresor.terminar()
+    return datos
+
+
+def entropia(datos: bytes) -> float:
+    """Entropía de Shannon de los bytes de una muestra, en bits por byte."""
+    if not datos:
+        return 0.0
+    total = len(datos)
+    resultado = 0.0
+    for byte in range(256):
+        n = datos.count(byte)
+        if n:
+            p = n / total
+            resultado -= p * math.log2(p)
+    return resultado
+
+
+def es_comprimible(ruta: Path) -> bool:
+    """
+    Indica si merece la pena comprimir un archivo: no lo es si por su
+    extensión ya viene comprimido o si unas muestras de su contenido tienen
+    una entropía cercana a la máxima.
+    """
+    if ruta.suffix.lower() in EXTENSIONES_COMPRIMIDAS:
+        return False
+    tamano = ruta.stat().st_size
+    if tamano < UMBRAL_COMPRESION:
+        return False
+    entropias = []
+    with ruta.open('rb') as archivo:
+        for i in range(MUESTRAS_ENTROPIA):
+            # Muestras repartidas entre el principio y el final del archivo
+            archivo.seek(max(0, tamano - TAMANO_MUESTRA) * i // max(1, MUESTRAS_ENTROPIA - 1))
+            entropias.append(entropia(archivo.read(TAMANO_MUESTRA)))
+    return sum(entropias) / len(entropias) < ENTROPIA_MAXIMA
+
+
+def leer_bloque_comprimido(ruta: Path, offset: int, cantidad: int, algoritmo: str) -> Tuple[int, Optional[bytes], int]:
+    """
+    Lee un bloque de un archivo, calcula el CRC32 de sus datos y lo
+    comprime. Pensada para ejecutarse en un hilo aparte.
+
+    Returns:
+        Tuple[int, Optional[bytes], int]: CRC32 de los datos sin comprimir, datos
+        comprimidos (None si no compensa comprimirlos) y flag de compresión.
+    """
+    with ruta.open('rb') as archivo:
+        archivo.seek(offset)
+        datos = archivo.read(cantidad)
+    crc = zlib.crc32(datos)
+    resultado = comprimir(datos, algoritmo)
+    if resultado is None:
+        return crc, None, 0
+    return crc, resultado[0], resultado[1]
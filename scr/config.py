@@ -1,7 +1,6 @@
 # src/config.py
 
 from pathlib import Path
-import logging
 
 # Ruta absoluta al directorio raíz del proyecto
 BASE_DIR = Path(__file__).parent.parent.resolve()
@@ -10,25 +9,17 @@ BASE_DIR = Path(__file__).parent.parent.resolve()
 DATA_DIR = BASE_DIR / 'data'
 ASSETS_DIR = BASE_DIR / 'assets'
 
-# Asegurarse de que las carpetas existen
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+# Sonido de las notificaciones (ver audio.MotorAudio)
+SONIDO_NOTIFICACION = ASSETS_DIR / 'audio.mp3'
 
 # Configuración de logging
 LOG_FILE = DATA_DIR / "icocchat.log"
 
-# Verificar si el root logger ya tiene handlers
-if not logging.getLogger().hasHandlers():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(LOG_FILE, encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
-    logger = logging.getLogger('config')
-    logger.info("Configuración de logging inicializada.")
-else:
-    logger = logging.getLogger('config')
-    logger.info("Logging ya estaba configurado.")
+# Importar este módulo no escribe nada en disco: la aplicación llama a
+# preparar_directorios() y registro.configurar_logging() al arrancar (ver IcoChat.main).
+
+
+def preparar_directorios() -> None:
+    """Crea las carpetas de datos y recursos si no existen."""
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    ASSETS_DIR.mkdir(parents=True, exist_ok=True)
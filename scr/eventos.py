@@ -0,0 +1,190 @@
+# src/eventos.py
+
+import collections
+import logging
+import queue
+import time
+import tkinter as tk
+from typing import Any, Callable, Counter, Deque, Dict, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Capacidad de la cola. Publicar nunca espera (el hilo de red es el bucle asyncio):
+# si se llena, los eventos descartables se pierden y el resto pasa a un desborde,
+# también acotado; lo que no cabe en él se cuenta y se pierde
+MAX_EVENTOS = 10000
+MAX_DESBORDE = 10000
+
+# Cada cuánto se vacía la cola desde el bucle de Tk y cuántos eventos como máximo por pasada
+INTERVALO_DRENADO_MS = 30
+MAX_EVENTOS_POR_DRENADO = 2000
+
+# Cada cuánto se informa de las métricas de la cola
+INTERVALO_METRICAS_S = 60
+
+
+class Evento(NamedTuple):
+    """
+    Evento producido por el hilo de red para la interfaz.
+    """
+    tipo: str
+    datos: Any
+    t_encolado: float
+
+
+class ColaEventos:
+    """
+    Cola acotada y segura entre hilos para pasar eventos del hilo de red al
+    bucle principal de Tk.
+
+    El hilo de red solo llama a publicar(); el bucle de Tk vacía la cola con
+    after() y entrega cada pasada como un único lote, de modo que una ráfaga de
+    mensajes se traduce en un único layout y un único scroll.
+
+    publicar() nunca bloquea: si la interfaz no da abasto (p. ej. mientras
+    muestra un diálogo) y la cola se llena, los eventos descartables se
+    cuentan y se pierden, y el resto espera en un desborde que se entrega
+    después, en orden. Si también el desborde se llena, los eventos se cuentan
+    en `descartados` y se pierden. Tras detener() los eventos se descartan.
+    """
+
+    def __init__(self, max_eventos: int = MAX_EVENTOS, max_desborde: int = MAX_DESBORDE) -> None:
+        self._cola: "queue.Queue[Evento]" = queue.Queue(maxsize=max_eventos)
+        self._desborde: Deque[Evento] = collections.deque()
+        self._max_desborde = max_desborde
+        self._perdiendo = False  # Si se están perdiendo eventos por tener el desborde lleno
+        self._detenida = False
+        self._root = None
+        self._manejador = None
+        self._after_id = None
+        self.descartados: Counter[str] = collections.Counter()  # Eventos perdidos, por tipo
+        self._reiniciar_metricas()
+
+    def publicar(self, tipo: str, datos: Any = None, descartable: bool = False) -> None:
+        """
+        Encola un evento sin esperar. Seguro para llamar desde cualquier hilo.
+
+        Args:
+            tipo (str): Tipo de evento ("mensaje", "desconectado", ...).
+            datos (Any, optional): Datos asociados al evento.
+            descartable (bool, optional): Si se puede perder cuando la cola está llena.
+                Defaults to False.
+        """
+        if self._detenida:
+            self.descartados[tipo] += 1
+            return
+        evento = Evento(tipo, datos, time.monotonic())
+        # Mientras haya desborde, lo nuevo va detrás de él para no adelantarlo
+        if not self._desborde:
+            try:
+                self._cola.put_nowait(evento)
+                return
+            except queue.Full:
+                pass
+        if descartable:
+            self.descartados[tipo] += 1
+            return
+        if len(self._desborde) >= self._max_desborde:
+            if not self._perdiendo:
+                logger.error("Desborde de la cola de eventos lleno: se pierden eventos.")
+                self._perdiendo = True
+            self.descartados[tipo] += 1
+            return
+        if not self._desborde:
+            logger.warning("Cola de eventos llena: los eventos esperan en el desborde.")
+        self._desborde.append(evento)
+        self._desbordados += 1
+
+    def iniciar(
+        self,
+        root: tk.Misc,
+        manejador: Callable[[List[Evento]], None],
+        intervalo_ms: int = INTERVALO_DRENADO_MS
+    ) -> None:
+        """
+        Comienza a vaciar la cola periódicamente en el bucle de Tk.
+
+        Args:
+            root (tk.Misc): Widget raíz cuyo after() se usa.
+            manejador (Callable): Función que recibe cada lote de eventos.
+            intervalo_ms (int, optional): Periodo de drenado. Defaults to INTERVALO_DRENADO_MS.
+        """
+        self._root = root
+        self._manejador = manejador
+        self._intervalo_ms = intervalo_ms
+        self._after_id = root.after(intervalo_ms, self._drenar)
+
+    def detener(self) -> None:
+        """Deja de vaciar la cola; desde entonces los eventos publicados se descartan."""
+        self._detenida = True
+        if self._root and self._after_id:
+            try:
+                self._root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+        self._after_id = None
+
+    def profundidad(self) -> int:
+        """Número aproximado de eventos pendientes."""
+        return self._cola.qsize() + len(self._desborde)
+
+    def estadisticas(self) -> Dict[str, float]:
+        """
+        Devuelve las métricas acumuladas desde el último informe: profundidad
+        máxima, lotes, eventos, eventos desbordados y descartados (estos, desde
+        el principio) y latencia de drenado (media y máxima, en ms).
+        """
+        return {
+            "profundidad_actual": self.profundidad(),
+            "profundidad_maxima": self._profundidad_maxima,
+            "lotes": self._lotes,
+            "eventos": self._eventos,
+            "desbordados": self._desbordados,
+            "descartados": sum(self.descartados.values()),
+            "latencia_media_ms": (self._latencia_total / self._eventos * 1000) if self._eventos else 0.0,
+            "latencia_maxima_ms": self._latencia_maxima * 1000,
+        }
+
+    def _reiniciar_metricas(self) -> None:
+        self._profundidad_maxima = 0
+        self._lotes = 0
+        self._eventos = 0
+        self._desbordados = 0
+        self._latencia_total = 0.0
+        self._latencia_maxima = 0.0
+        self._t_informe = time.monotonic()
+
+    def _drenar(self) -> None:
+        """Saca un lote de eventos de la cola y lo entrega al manejador."""
+        self._profundidad_maxima = max(self._profundidad_maxima, self.profundidad())
+        lote: List[Evento] = []
+        while len(lote) < MAX_EVENTOS_POR_DRENADO:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        # El desborde es posterior a todo lo que había en la cola al llenarse
+        while self._desborde and len(lote) < MAX_EVENTOS_POR_DRENADO and self._cola.empty():
+            lote.append(self._desborde.popleft())
+        if not self._desborde:
+            self._perdiendo = False
+
+        if lote:
+            ahora = time.monotonic()
+            latencias = [ahora - evento.t_encolado for evento in lote]
+            self._lotes += 1
+            self._eventos += len(lote)
+            self._latencia_total += sum(latencias)
+            self._latencia_maxima = max(self._latencia_maxima, max(latencias))
+            try:
+                self._manejador(lote)
+            except Exception:
+                logger.exception("Error procesando un lote de %d eventos de la interfaz.", len(lote))
+
+        if time.monotonic() - self._t_informe >= INTERVALO_METRICAS_S:
+            logger.info("Métricas de la cola de eventos: %s", self.estadisticas())
+            self._reiniciar_metricas()
+
+        # Si quedan eventos, seguir sin esperar el intervalo completo
+        siguiente = 1 if self.profundidad() else self._intervalo_ms
+        self._after_id = self._root.after(siguiente, self._drenar)
@@ -0,0 +1,369 @@
+# src/explorador_archivos.py
+
+import bisect
+import itertools
+import logging
+import platform
+import time
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lista_archivos import InfoArchivo
+from panel_transferencias import formatear_tamano
+
+logger = logging.getLogger(__name__)
+
+# Campos por los que se puede ordenar la lista
+CAMPOS_ORDEN = ("nombre", "tamano", "fecha")
+
+# Si cambia más de 1/N de la lista de golpe, los índices se reconstruyen
+# ordenando de nuevo en lugar de insertar y quitar uno a uno
+FRACCION_RECONSTRUCCION = 16
+
+# Espera tras la última tecla antes de filtrar (ms)
+RETARDO_FILTRO_MS = 80
+
+# Alto de fila y de cabecera de la tabla hasta poder medirlos (píxeles)
+ALTO_FILA = 22
+ALTO_CABECERA = 24
+
+# Filas que avanza la rueda del ratón por paso
+FILAS_POR_PASO_RUEDA = 3
+
+TITULOS = {"nombre": "Nombre", "tamano": "Tamaño", "fecha": "Fecha"}
+
+
+def _clave(info: InfoArchivo, campo: str, minusculas: str) -> Tuple:
+    """Clave de ordenación de un archivo; termina siempre en el nombre, que la hace única."""
+    nombre = (minusculas, info.nombre)
+    if campo == "tamano":
+        return (-1 if info.tamano is None else info.tamano,) + nombre
+    if campo == "fecha":
+        return (-1.0 if info.fecha is None else info.fecha,) + nombre
+    return nombre
+
+
+def formatear_fecha(fecha: Optional[float]) -> str:
+    """Formatea la fecha de un archivo para mostrarla."""
+    return time.strftime("%d/%m/%Y %H:%M", time.localtime(fecha)) if fecha is not None else ""
+
+
+class IndiceArchivos:
+    """
+    Lista de archivos con un índice ordenado por cada campo de CAMPOS_ORDEN.
+
+    Los cambios de la lista se aplican insertando y quitando claves en los
+    índices con búsqueda binaria, sin volver a ordenar. Los filtros por
+    nombre recorren el índice del orden pedido, así que el resultado sale ya
+    ordenado; si la consulta amplía la anterior (el usuario sigue
+    escribiendo) se filtra solo el resultado anterior.
+    """
+
+    def __init__(self) -> None:
+        self.archivos: Dict[str, InfoArchivo] = {}
+        self._ordenes: Dict[str, List[Tuple]] = {campo: [] for campo in CAMPOS_ORDEN}
+        self._minusculas: Dict[str, str] = {}  # Nombre -> nombre en minúsculas, para filtrar
+        self._ultimo_filtro: Optional[Tuple[str, str, List[str]]] = None  # (campo, consulta, resultado)
+
+    def actualizar(self, archivos: Dict[str, InfoArchivo]) -> bool:
+        """
+        Sustituye la lista por `archivos` aplicando solo las diferencias.
+
+        Returns:
+            bool: True si ha cambiado algo.
+        """
+        anteriores = self.archivos
+        eliminados = anteriores.keys() - archivos.keys()
+        agregados = archivos.keys() - anteriores.keys()
+        modificados = [nombre for nombre, info in archivos.items() if nombre in anteriores and anteriores[nombre] != info]
+        if not (eliminados or agregados or modificados):
+            return False
+        if len(eliminados) + len(agregados) + len(modificados) > len(archivos) // FRACCION_RECONSTRUCCION:
+            self._reconstruir(archivos)
+        else:
+            for nombre in itertools.chain(eliminados, modificados):
+                self._quitar(anteriores[nombre])
+            for nombre in itertools.chain(agregados, modificados):
+                self._insertar(archivos[nombre])
+        self.archivos = archivos
+        self._ultimo_filtro = None
+        return True
+
+    def filtrar(self, consulta: str, campo: str) -> List[str]:
+        """
+        Nombres que contienen `consulta` (sin distinguir mayúsculas), en orden
+        ascendente de `campo`.
+        """
+        consulta = consulta.casefold()
+        if self._ultimo_filtro and self._ultimo_filtro[0] == campo and consulta.startswith(self._ultimo_filtro[1]):
+            candidatos = self._ultimo_filtro[2]
+        else:
+            candidatos = [clave[-1] for clave in self._ordenes[campo]]
+        if consulta:
+            minusculas = self._minusculas
+            resultado = [nombre for nombre in candidatos if consulta in minusculas[nombre]]
+        else:
+            resultado = candidatos
+        self._ultimo_filtro = (campo, consulta, resultado)
+        return resultado
+
+    def _reconstruir(self, archivos: Dict[str, InfoArchivo]) -> None:
+        self._minusculas = {nombre: nombre.casefold() for nombre in archivos}
+        for campo in CAMPOS_ORDEN:
+            self._ordenes[campo] = sorted(
+                _clave(info, campo, self._minusculas[info.nombre]) for info in archivos.values()
+            )
+
+    def _insertar(self, info: InfoArchivo) -> None:
+        minusculas = self._minusculas[info.nombre] = info.nombre.casefold()
+        for campo, orden in self._ordenes.items():
+            bisect.insort(orden, _clave(info, campo, minusculas))
+
+    def _quitar(self, info: InfoArchivo) -> None:
+        minusculas = self._minusculas.pop(info.nombre)
+        for campo, orden in self._ordenes.items():
+            clave = _clave(info, campo, minusculas)
+            i = bisect.bisect_left(orden, clave)
+            if i < len(orden) and orden[i] == clave:
+                del orden[i]
+
+
+class ExploradorArchivos:
+    """
+    Navegador de la lista de archivos del servidor: tabla ordenable por
+    nombre, tamaño y fecha, con filtro por nombre según se escribe.
+
+    La tabla está virtualizada: el Treeview solo tiene las filas que caben en
+    pantalla y al desplazarse se rellenan con los archivos correspondientes,
+    así que el coste de dibujar no depende del número de archivos.
+    """
+
+    def __init__(self, master: tk.Misc, al_descargar: Callable[[str], None]) -> None:
+        """
+        Args:
+            master (tk.Misc): Contenedor del explorador.
+            al_descargar (Callable[[str], None]): Se llama con el nombre del archivo a descargar.
+        """
+        self.indice = IndiceArchivos()
+        self.campo = "nombre"
+        self.descendente = False
+        self._al_descargar = al_descargar
+        self._resultado: List[str] = []       # Nombres filtrados, en orden ascendente de self.campo
+        self._primera = 0                     # Posición en el resultado de la primera fila visible
+        self._filas: List[str] = []           # Ids de las filas del Treeview
+        self._seleccionado: Optional[str] = None
+        self._filtro_pendiente: Optional[str] = None
+
+        self.frame = tk.Frame(master, bg="#2D2D2D")
+
+        frame_busqueda = tk.Frame(self.frame, bg="#2D2D2D")
+        frame_busqueda.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
+        tk.Label(frame_busqueda, text="Buscar:", bg="#2D2D2D", fg="white").pack(side=tk.LEFT, padx=(0, 5))
+        self.consulta = tk.StringVar()
+        self.entrada_consulta = tk.Entry(frame_busqueda, textvariable=self.consulta)
+        self.entrada_consulta.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.consulta.trace_add("write", lambda *_: self._programar_filtro())
+
+        frame_inferior = tk.Frame(self.frame, bg="#2D2D2D")
+        frame_inferior.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+        self.etiqueta_estado = tk.Label(frame_inferior, bg="#2D2D2D", fg="white", anchor="w")
+        self.etiqueta_estado.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(frame_inferior, text="Descargar", command=self.descargar_seleccionado).pack(side=tk.RIGHT)
+
+        ttk.Style().configure("Archivos.Treeview", rowheight=ALTO_FILA)
+        self.tabla = ttk.Treeview(
+            self.frame, columns=CAMPOS_ORDEN, show="headings", selectmode="browse", style="Archivos.Treeview"
+        )
+        for campo, ancho, ancla in (("nombre", 300, "w"), ("tamano", 90, "e"), ("fecha", 130, "w")):
+            self.tabla.heading(campo, text=TITULOS[campo], command=lambda campo=campo: self.ordenar_por(campo))
+            self.tabla.column(campo, width=ancho, anchor=ancla, stretch=campo == "nombre")
+        self.barra = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._desplazar)
+        self.barra.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tabla.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=(10, 0))
+
+        self.tabla.bind("<Configure>", lambda e: self._ajustar_filas())
+        self.tabla.bind("<<TreeviewSelect>>", self._al_seleccionar)
+        self.tabla.bind("<Double-Button-1>", lambda e: self.descargar_seleccionado())
+        self.tabla.bind("<Return>", lambda e: self.descargar_seleccionado())
+        for tecla, paso in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-pagina"), ("<Next>", "pagina")):
+            self.tabla.bind(tecla, lambda e, paso=paso: self._mover_seleccion(paso))
+        self.tabla.bind("<Home>", lambda e: self._seleccionar_posicion(0))
+        self.tabla.bind("<End>", lambda e: self._seleccionar_posicion(len(self._resultado) - 1))
+        if platform.system() in ('Windows', 'Darwin'):
+            self.tabla.bind("<MouseWheel>", self._on_mousewheel)
+        else:
+            self.tabla.bind("<Button-4>", self._on_mousewheel)
+            self.tabla.bind("<Button-5>", self._on_mousewheel)
+        self.entrada_consulta.bind("<Down>", lambda e: self._enfocar_tabla())
+
+        self._actualizar_cabeceras()
+        self._render()
+
+    # ----------------------------
+    # Datos
+    # ----------------------------
+    def actualizar(self, archivos: Dict[str, InfoArchivo]) -> None:
+        """Muestra una nueva versión de la lista de archivos, manteniendo la posición y el filtro."""
+        inicio = time.perf_counter()
+        if not self.indice.actualizar(archivos):
+            return
+        self._resultado = self.indice.filtrar(self.consulta.get(), self.campo)
+        self._render()
+        logger.debug(
+            "Lista de %s archivos actualizada en %.1f ms.", len(archivos), (time.perf_counter() - inicio) * 1000
+        )
+
+    def ordenar_por(self, campo: str) -> None:
+        """Ordena por un campo; si ya se ordenaba por él, invierte el sentido."""
+        if campo == self.campo:
+            self.descendente = not self.descendente
+        else:
+            self.campo, self.descendente = campo, False
+        self._actualizar_cabeceras()
+        self._resultado = self.indice.filtrar(self.consulta.get(), self.campo)
+        self._primera = 0
+        self._render()
+
+    def descargar_seleccionado(self) -> None:
+        if self._seleccionado and self._seleccionado in self.indice.archivos:
+            self._al_descargar(self._seleccionado)
+
+    def _programar_filtro(self) -> None:
+        """Filtra poco después de la última tecla, para no filtrar con cada pulsación."""
+        if self._filtro_pendiente:
+            self.frame.after_cancel(self._filtro_pendiente)
+        self._filtro_pendiente = self.frame.after(RETARDO_FILTRO_MS, self._filtrar)
+
+    def _filtrar(self) -> None:
+        self._filtro_pendiente = None
+        self._resultado = self.indice.filtrar(self.consulta.get(), self.campo)
+        self._primera = 0
+        self._render()
+
+    def _nombre_en(self, posicion: int) -> str:
+        """Nombre del archivo en una posición de la lista tal como se muestra."""
+        if self.descendente:
+            return self._resultado[len(self._resultado) - 1 - posicion]
+        return self._resultado[posicion]
+
+    # ----------------------------
+    # Dibujo
+    # ----------------------------
+    def _ajustar_filas(self) -> None:
+        """Crea o quita filas del Treeview para que ocupen justo el alto disponible."""
+        alto_cabecera, alto_fila = ALTO_CABECERA, ALTO_FILA
+        if self._filas:
+            caja = self.tabla.bbox(self._filas[0])
+            if caja:
+                alto_cabecera, alto_fila = caja[1], caja[3]
+        n = max(1, (self.tabla.winfo_height() - alto_cabecera) // max(1, alto_fila))
+        while len(self._filas) < n:
+            self._filas.append(self.tabla.insert("", tk.END, values=("", "", "")))
+        while len(self._filas) > n:
+            self.tabla.delete(self._filas.pop())
+        self._render()
+
+    def _render(self) -> None:
+        """Rellena las filas visibles con los archivos a partir de self._primera."""
+        total = len(self._resultado)
+        visibles = len(self._filas)
+        self._primera = max(0, min(self._primera, total - visibles))
+        fila_seleccionada = None
+        for i, fila in enumerate(self._filas):
+            posicion = self._primera + i
+            if posicion >= total:
+                self.tabla.item(fila, values=("", "", ""))
+                continue
+            info = self.indice.archivos[self._nombre_en(posicion)]
+            tamano = formatear_tamano(info.tamano) if info.tamano is not None else ""
+            self.tabla.item(fila, values=(info.nombre, tamano, formatear_fecha(info.fecha)))
+            if info.nombre == self._seleccionado:
+                fila_seleccionada = fila
+        if fila_seleccionada:
+            self.tabla.selection_set(fila_seleccionada)
+        elif self.tabla.selection():
+            self.tabla.selection_remove(self.tabla.selection())
+        if total > visibles:
+            self.barra.set(self._primera / total, (self._primera + visibles) / total)
+        else:
+            self.barra.set(0, 1)
+        texto = f"{total} archivos"
+        if total != len(self.indice.archivos):
+            texto = f"{total} de {len(self.indice.archivos)} archivos"
+        self.etiqueta_estado.configure(text=texto)
+
+    def _actualizar_cabeceras(self) -> None:
+        for campo in CAMPOS_ORDEN:
+            flecha = (" ▼" if self.descendente else " ▲") if campo == self.campo else ""
+            self.tabla.heading(campo, text=TITULOS[campo] + flecha)
+
+    # ----------------------------
+    # Desplazamiento y selección
+    # ----------------------------
+    def _desplazar(self, accion: str, cantidad: str, unidad: Optional[str] = None) -> None:
+        """Comando de la scrollbar ("moveto" o "scroll")."""
+        if accion == "moveto":
+            self._primera = int(float(cantidad) * len(self._resultado))
+        else:
+            paso = len(self._filas) if unidad == "pages" else 1
+            self._primera += int(cantidad) * paso
+        self._render()
+
+    def _on_mousewheel(self, event: tk.Event) -> str:
+        if event.num == 4:
+            pasos = -1
+        elif event.num == 5:
+            pasos = 1
+        elif platform.system() == 'Windows':
+            pasos = int(-1 * (event.delta / 120))
+        else:
+            pasos = int(-1 * event.delta)
+        self._primera += pasos * FILAS_POR_PASO_RUEDA
+        self._render()
+        return "break"
+
+    def _al_seleccionar(self, event: Optional[tk.Event] = None) -> None:
+        seleccion = self.tabla.selection()
+        if not seleccion:
+            return  # Fila desmontada al desplazarse: se conserva la selección
+        posicion = self._primera + self._filas.index(seleccion[0])
+        if posicion < len(self._resultado):
+            self._seleccionado = self._nombre_en(posicion)
+
+    def _posicion_seleccionada(self) -> int:
+        """Posición del archivo seleccionado en la lista mostrada, o -1."""
+        if self._seleccionado is None:
+            return -1
+        try:
+            posicion = self._resultado.index(self._seleccionado)
+        except ValueError:
+            return -1
+        return len(self._resultado) - 1 - posicion if self.descendente else posicion
+
+    def _mover_seleccion(self, paso) -> str:
+        if paso in ("pagina", "-pagina"):
+            paso = len(self._filas) * (1 if paso == "pagina" else -1)
+        actual = self._posicion_seleccionada()
+        self._seleccionar_posicion(actual + paso if actual >= 0 else 0)
+        return "break"
+
+    def _seleccionar_posicion(self, posicion: int) -> str:
+        """Selecciona el archivo en una posición y desplaza la tabla para que se vea."""
+        total = len(self._resultado)
+        if not total:
+            return "break"
+        posicion = min(max(posicion, 0), total - 1)
+        self._seleccionado = self._nombre_en(posicion)
+        if posicion < self._primera:
+            self._primera = posicion
+        elif posicion >= self._primera + len(self._filas):
+            self._primera = posicion - len(self._filas) + 1
+        self._render()
+        return "break"
+
+    def _enfocar_tabla(self) -> str:
+        self.tabla.focus_set()
+        if self._posicion_seleccionada() < 0:
+            self._seleccionar_posicion(self._primera)
+        return "break"
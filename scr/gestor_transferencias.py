@@ -0,0 +1,264 @@
+# src/gestor_transferencias.py
+
+import asyncio
+import heapq
+import itertools
+import logging
+from enum import Enum, IntEnum
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cliente_async import MOTIVO_PAUSA, ClienteAsync, EstadoProgreso, Progreso
+from transferencias import EstadoTransferencia
+
+logger = logging.getLogger(__name__)
+
+# Transferencias en curso a la vez, por defecto
+MAX_TRANSFERENCIAS_SIMULTANEAS = 3
+
+
+class Prioridad(IntEnum):
+    """Prioridad de una transferencia en la cola (menor valor, antes)."""
+    ALTA = 0
+    NORMAL = 1
+    BAJA = 2
+
+
+class FaseTransferencia(Enum):
+    """Situación de una transferencia en el gestor."""
+    EN_COLA = "En cola"
+    ACTIVA = "Transfiriendo"
+    PAUSADA = "Pausada"
+    COMPLETADA = "Completada"
+    FALLIDA = "Error"
+    CANCELADA = "Cancelada"
+
+
+# Fases en las que la transferencia ya no avanzará por sí sola
+FASES_FINALES = (FaseTransferencia.COMPLETADA, FaseTransferencia.FALLIDA, FaseTransferencia.CANCELADA)
+
+
+class Transferencia:
+    """
+    Subida o descarga gestionada. Sus campos los actualiza el hilo de red y
+    se pueden leer desde Tk para mostrarlos.
+    """
+
+    def __init__(
+        self,
+        id: int,
+        tipo: str,
+        nombre: str,
+        ruta: Path,
+        prioridad: Prioridad,
+        operacion: Callable[[Progreso], Awaitable[int]]
+    ) -> None:
+        self.id = id
+        self.tipo = tipo          # "subida" o "descarga"
+        self.nombre = nombre      # Nombre del archivo en el servidor
+        self.ruta = ruta          # Archivo local: origen de la subida o destino de la descarga
+        self.prioridad = prioridad
+        self.fase = FaseTransferencia.EN_COLA
+        self.progreso = EstadoProgreso()
+        self.error: Optional[BaseException] = None
+        self._operacion = operacion
+        self._tarea: Optional[asyncio.Task] = None
+        self._turno = 0  # Orden de la entrada vigente en la cola
+
+    @property
+    def terminada(self) -> bool:
+        return self.fase in FASES_FINALES
+
+
+class GestorTransferencias:
+    """
+    Cola de subidas y descargas sobre un ClienteAsync.
+
+    Las transferencias esperan en una cola por prioridad (y, a igual
+    prioridad, por orden de llegada) y se ejecutan como mucho
+    max_simultaneas a la vez, todas por la misma conexión, cada una en su
+    canal. Se pueden pausar (conservando lo transferido), reanudar, cancelar
+    y cambiar de prioridad mientras esperan.
+
+    Los métodos públicos se pueden llamar desde Tk: el estado de la cola solo
+    se modifica en el hilo de red.
+    """
+
+    def __init__(
+        self,
+        cliente: ClienteAsync,
+        max_simultaneas: int = MAX_TRANSFERENCIAS_SIMULTANEAS,
+        al_terminar: Optional[Callable[[Transferencia], None]] = None
+    ) -> None:
+        """
+        Args:
+            cliente (ClienteAsync): Conexión por la que se transfiere.
+            max_simultaneas (int, optional): Transferencias en curso a la vez.
+            al_terminar (Optional[Callable[[Transferencia], None]], optional): Se llama desde el
+                hilo de red cuando una transferencia se completa o falla.
+        """
+        self._cliente = cliente
+        self.max_simultaneas = max(1, max_simultaneas)
+        self._al_terminar = al_terminar
+        self._transferencias: Dict[int, Transferencia] = {}
+        self._cola: List[Tuple[int, int, Transferencia]] = []
+        self._activas = 0
+        self._ids = itertools.count(1)
+        self._turnos = itertools.count()
+
+    # ----------------------------
+    # Uso desde Tk
+    # ----------------------------
+    def subir(self, ruta: Path, prioridad: Prioridad = Prioridad.NORMAL) -> Transferencia:
+        """Añade a la cola la subida de un archivo."""
+        return self._agregar(
+            "subida", ruta.name, ruta, prioridad, lambda progreso: self._cliente.upload(ruta, progreso)
+        )
+
+    def descargar(self, nombre: str, destino: Path, prioridad: Prioridad = Prioridad.NORMAL) -> Transferencia:
+        """Añade a la cola la descarga de un archivo del servidor en `destino`."""
+        return self._agregar(
+            "descarga", nombre, destino, prioridad,
+            lambda progreso: self._cliente.download(nombre, destino, progreso)
+        )
+
+    def continuar(self, estado: EstadoTransferencia, prioridad: Prioridad = Prioridad.NORMAL) -> Transferencia:
+        """Añade a la cola una transferencia cortada (ver ClienteAsync.transferencias_pendientes)."""
+        return self._agregar(
+            estado.tipo, estado.nombre, Path(estado.ruta), prioridad,
+            lambda progreso: self._cliente.reanudar(estado, progreso)
+        )
+
+    def pausar(self, transferencia: Transferencia) -> None:
+        """Detiene una transferencia en cola o en curso conservando lo transferido."""
+        self._cliente.programar(self._pausar, transferencia)
+
+    def reanudar(self, transferencia: Transferencia) -> None:
+        """Vuelve a poner en cola una transferencia pausada o fallida."""
+        self._cliente.programar(self._reanudar, transferencia)
+
+    def cancelar(self, transferencia: Transferencia) -> None:
+        """Abandona una transferencia (también una fallida) y descarta lo transferido."""
+        self._cliente.programar(self._cancelar, transferencia)
+
+    def cambiar_prioridad(self, transferencia: Transferencia, prioridad: Prioridad) -> None:
+        """Cambia la prioridad de una transferencia (afecta a su turno si está en cola)."""
+        self._cliente.programar(self._cambiar_prioridad, transferencia, prioridad)
+
+    def limpiar_terminadas(self) -> None:
+        """Quita de la lista las transferencias completadas, fallidas o canceladas."""
+        self._cliente.programar(self._limpiar_terminadas)
+
+    def transferencias(self) -> List[Transferencia]:
+        """Transferencias del gestor, en orden de llegada."""
+        return list(self._transferencias.values())
+
+    def progreso_total(self) -> Tuple[int, Optional[int]]:
+        """
+        Progreso conjunto de las transferencias en curso.
+
+        Returns:
+            Tuple[int, Optional[int]]: Bytes transferidos y total (None si alguno se desconoce).
+        """
+        transferidos, total = 0, 0
+        for transferencia in self.transferencias():
+            if transferencia.fase is not FaseTransferencia.ACTIVA:
+                continue
+            transferidos += transferencia.progreso.transferidos
+            if total is not None and transferencia.progreso.total is not None:
+                total += transferencia.progreso.total
+            else:
+                total = None
+        return transferidos, total
+
+    # ----------------------------
+    # Hilo de red
+    # ----------------------------
+    def _agregar(
+        self,
+        tipo: str,
+        nombre: str,
+        ruta: Path,
+        prioridad: Prioridad,
+        operacion: Callable[[Progreso], Awaitable[int]]
+    ) -> Transferencia:
+        transferencia = Transferencia(next(self._ids), tipo, nombre, ruta, prioridad, operacion)
+        self._cliente.programar(self._registrar, transferencia)
+        return transferencia
+
+    def _registrar(self, transferencia: Transferencia) -> None:
+        self._transferencias[transferencia.id] = transferencia
+        self._encolar(transferencia)
+
+    def _encolar(self, transferencia: Transferencia) -> None:
+        transferencia.fase = FaseTransferencia.EN_COLA
+        transferencia.error = None
+        transferencia._turno = next(self._turnos)
+        heapq.heappush(self._cola, (transferencia.prioridad, transferencia._turno, transferencia))
+        self._despachar()
+
+    def _despachar(self) -> None:
+        """Arranca transferencias de la cola hasta llegar al límite."""
+        while self._activas < self.max_simultaneas and self._cola:
+            _, turno, transferencia = heapq.heappop(self._cola)
+            if transferencia.fase is not FaseTransferencia.EN_COLA or turno != transferencia._turno:
+                continue  # Entrada obsoleta: pausada, cancelada o con otra prioridad
+            self._activas += 1
+            transferencia.fase = FaseTransferencia.ACTIVA
+            transferencia._tarea = asyncio.create_task(
+                self._ejecutar(transferencia), name=f"transferencia-{transferencia.id}"
+            )
+
+    async def _ejecutar(self, transferencia: Transferencia) -> None:
+        try:
+            await transferencia._operacion(transferencia.progreso)
+            transferencia.fase = FaseTransferencia.COMPLETADA
+        except asyncio.CancelledError:
+            # Pausada o cancelada: _pausar y _cancelar ya fijaron la fase
+            pass
+        except Exception as e:
+            logger.error("Error en la %s de %s: %s", transferencia.tipo, transferencia.nombre, e)
+            transferencia.fase = FaseTransferencia.FALLIDA
+            transferencia.error = e
+        finally:
+            transferencia._tarea = None
+            self._activas -= 1
+            self._despachar()
+        if transferencia.fase in (FaseTransferencia.COMPLETADA, FaseTransferencia.FALLIDA) and self._al_terminar:
+            try:
+                self._al_terminar(transferencia)
+            except Exception as e:
+                logger.error("Error avisando del fin de una transferencia: %s", e)
+
+    def _pausar(self, transferencia: Transferencia) -> None:
+        if transferencia.fase is FaseTransferencia.EN_COLA:
+            transferencia.fase = FaseTransferencia.PAUSADA
+        elif transferencia.fase is FaseTransferencia.ACTIVA:
+            transferencia.fase = FaseTransferencia.PAUSADA
+            transferencia._tarea.cancel(MOTIVO_PAUSA)
+
+    def _reanudar(self, transferencia: Transferencia) -> None:
+        if transferencia.fase in (FaseTransferencia.PAUSADA, FaseTransferencia.FALLIDA):
+            self._encolar(transferencia)
+
+    def _cancelar(self, transferencia: Transferencia) -> None:
+        if transferencia.fase in (FaseTransferencia.COMPLETADA, FaseTransferencia.CANCELADA):
+            return
+        if transferencia.fase is FaseTransferencia.ACTIVA:
+            transferencia.fase = FaseTransferencia.CANCELADA
+            transferencia._tarea.cancel()
+            return
+        if transferencia.fase in (FaseTransferencia.PAUSADA, FaseTransferencia.FALLIDA):
+            # Puede haber un estado guardado y, si es una descarga, un archivo parcial
+            self._cliente.descartar_transferencia(transferencia.tipo, transferencia.nombre, transferencia.ruta)
+        transferencia.fase = FaseTransferencia.CANCELADA
+
+    def _cambiar_prioridad(self, transferencia: Transferencia, prioridad: Prioridad) -> None:
+        transferencia.prioridad = prioridad
+        if transferencia.fase is FaseTransferencia.EN_COLA:
+            self._encolar(transferencia)
+
+    def _limpiar_terminadas(self) -> None:
+        for id_transferencia, transferencia in list(self._transferencias.items()):
+            if transferencia.terminada:
+                del self._transferencias[id_transferencia]
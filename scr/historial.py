@@ -0,0 +1,410 @@
+# src/historial.py
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Directorio del historial segmentado y archivo JSON antiguo a migrar
+HISTORIAL_DIR = DATA_DIR / "historial"
+HISTORIAL_JSON = DATA_DIR / "historial_chat.json"
+
+# Tamaño máximo de un segmento antes de rotar (4 MiB)
+MAX_BYTES_SEGMENTO = 4 * 1024 * 1024
+
+# Escritura diferida: se vuelca cada INTERVALO_FLUSH_MS o cada MAX_REGISTROS_FLUSH registros
+INTERVALO_FLUSH_MS = 200
+MAX_REGISTROS_FLUSH = 256
+
+EXTENSION_SEGMENTO = ".jsonl"
+
+# Registros por página al cargar el historial en la interfaz
+TAMANO_PAGINA = 200
+
+# Si un volcado falla (disco lleno, permisos...), el lote se reintenta cada
+# INTERVALO_REINTENTO_S; al cerrar, solo REINTENTOS_AL_CERRAR veces
+INTERVALO_REINTENTO_S = 1.0
+REINTENTOS_AL_CERRAR = 3
+
+
+class HistorialChat:
+    """
+    Historial de chat de solo anexado, un registro JSON por línea.
+
+    Los registros se reparten en segmentos cuyo nombre es el id del primer
+    registro que contienen. Las escrituras se encolan y un hilo las vuelca en
+    grupo, de modo que guardar un mensaje no hace E/S en el hilo que lo llama.
+    """
+
+    def __init__(
+        self,
+        directorio: Path = HISTORIAL_DIR,
+        max_bytes_segmento: int = MAX_BYTES_SEGMENTO,
+        intervalo_flush_ms: int = INTERVALO_FLUSH_MS,
+        max_registros_flush: int = MAX_REGISTROS_FLUSH,
+        fsync: bool = False
+    ) -> None:
+        """
+        Abre (o crea) el historial y recupera un último registro incompleto.
+
+        Args:
+            directorio (Path, optional): Carpeta de los segmentos. Defaults to HISTORIAL_DIR.
+            max_bytes_segmento (int, optional): Tamaño a partir del cual se rota el segmento.
+            intervalo_flush_ms (int, optional): Tiempo máximo que un registro espera en memoria.
+            max_registros_flush (int, optional): Registros pendientes que fuerzan un volcado.
+            fsync (bool, optional): Si es True, hace fsync tras cada volcado. Defaults to False.
+        """
+        self.directorio = directorio
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.max_bytes_segmento = max_bytes_segmento
+        self.intervalo_flush = intervalo_flush_ms / 1000
+        self.max_registros_flush = max_registros_flush
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._pendientes: "queue.Queue[Optional[Tuple[int, str, Dict[str, Any]]]]" = queue.Queue()
+        self._volcado = threading.Condition()
+        self._observadores: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+        self._archivo = None
+        self._bytes_segmento = 0
+        self.error: Optional[OSError] = None  # Error del último volcado, si falló
+        self._fallos = 0  # Volcados fallidos desde que se abrió
+        self._siguiente_id = self._recuperar() + 1
+        self._ultimo_volcado = self._siguiente_id - 1  # Último id escrito en disco
+
+        self._hilo = threading.Thread(target=self._escritor, name="historial-escritor", daemon=True)
+        self._hilo.start()
+
+    # ----------------------------
+    # API pública
+    # ----------------------------
+    def agregar(self, mensaje: str, remitente: str = "other") -> int:
+        """
+        Añade un mensaje al historial sin bloquear en disco.
+
+        Args:
+            mensaje (str): Texto del mensaje.
+            remitente (str, optional): "self" o "other". Defaults to "other".
+
+        Returns:
+            int: Id asignado al registro.
+        """
+        with self._lock:
+            id_registro = self._siguiente_id
+            self._siguiente_id += 1
+            registro = {"id": id_registro, "message": mensaje, "sender": remitente, "ts": time.time()}
+            self._pendientes.put((id_registro, json.dumps(registro, ensure_ascii=False) + "\n", registro))
+        return id_registro
+
+    def suscribir(self, observador: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """
+        Registra una función que recibe cada lote de registros recién volcado.
+        Se llama desde el hilo escritor, justo después de escribir el lote.
+        """
+        self._observadores.append(observador)
+
+    def ultimo_id(self) -> int:
+        """Id del último registro agregado."""
+        return self._siguiente_id - 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que todos los registros agregados hasta ahora estén en disco.
+
+        Returns:
+            bool: True si se completó el volcado; False si se agotó el timeout o
+            falló un intento de volcado (ver `error`; se sigue reintentando).
+        """
+        objetivo = self._siguiente_id - 1
+        with self._volcado:
+            fallos = self._fallos
+            self._volcado.wait_for(lambda: self._ultimo_volcado >= objetivo or self._fallos != fallos, timeout)
+            return self._ultimo_volcado >= objetivo
+
+    def cerrar(self) -> None:
+        """Vuelca los registros pendientes y detiene el hilo escritor."""
+        self._pendientes.put(None)
+        self._hilo.join()
+        if self._archivo:
+            self._archivo.close()
+            self._archivo = None
+        logger.info("Historial de chat cerrado.")
+
+    def segmentos(self) -> List[Path]:
+        """Devuelve los segmentos ordenados del más antiguo al más reciente."""
+        return sorted(self.directorio.glob(f"*{EXTENSION_SEGMENTO}"))
+
+    def leer_todos(self) -> Iterator[Dict[str, Any]]:
+        """Recorre todos los registros volcados, del más antiguo al más reciente."""
+        for segmento in self.segmentos():
+            with segmento.open("r", encoding="utf-8") as archivo:
+                for linea in archivo:
+                    try:
+                        yield json.loads(linea)
+                    except json.JSONDecodeError:
+                        logger.error("Registro corrupto en %s, se omite.", segmento.name)
+
+    def leer_pagina(self, antes_de: Optional[int] = None, cantidad: int = TAMANO_PAGINA) -> List[Dict[str, Any]]:
+        """
+        Lee los `cantidad` registros más recientes con id menor que `antes_de`,
+        recorriendo los segmentos desde el final hacia atrás sin leer el resto.
+
+        Args:
+            antes_de (Optional[int], optional): Id límite (exclusivo). None para leer desde el final.
+            cantidad (int, optional): Número máximo de registros. Defaults to TAMANO_PAGINA.
+
+        Returns:
+            List[Dict[str, Any]]: Registros en orden cronológico (del más antiguo al más reciente).
+        """
+        pagina: List[Dict[str, Any]] = []
+        for segmento in reversed(self.segmentos()):
+            # Los segmentos se nombran con el id de su primer registro
+            if antes_de is not None and int(segmento.stem) >= antes_de:
+                continue
+            for linea in self._lineas_al_reves(segmento):
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    logger.error("Registro corrupto en %s, se omite.", segmento.name)
+                    continue
+                if antes_de is not None and registro.get("id", 0) >= antes_de:
+                    continue
+                pagina.append(registro)
+                if len(pagina) >= cantidad:
+                    pagina.reverse()
+                    return pagina
+        pagina.reverse()
+        return pagina
+
+    @staticmethod
+    def _lineas_al_reves(segmento: Path, tamano_bloque: int = 64 * 1024) -> Iterator[bytes]:
+        """Devuelve las líneas de un segmento de la última a la primera, leyendo por bloques."""
+        with segmento.open("rb") as archivo:
+            posicion = archivo.seek(0, os.SEEK_END)
+            resto = b""
+            while posicion > 0:
+                leer = min(tamano_bloque, posicion)
+                posicion -= leer
+                archivo.seek(posicion)
+                bloque = archivo.read(leer) + resto
+                lineas = bloque.split(b"\n")
+                # La primera línea puede estar incompleta: se completa con el bloque anterior
+                resto = lineas.pop(0)
+                for linea in reversed(lineas):
+                    if linea:
+                        yield linea
+            if resto:
+                yield resto
+
+    def migrar_json(self, historial_json: Path = HISTORIAL_JSON) -> int:
+        """
+        Migra una única vez el historial antiguo (array JSON) al historial segmentado.
+        El archivo original se renombra a .migrado para no volver a importarlo.
+
+        Returns:
+            int: Número de mensajes migrados.
+        """
+        if not historial_json.exists():
+            return 0
+        try:
+            with historial_json.open("r", encoding="utf-8") as file:
+                mensajes = json.load(file)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error("No se pudo migrar %s: %s", historial_json.name, e)
+            return 0
+
+        migrados = 0
+        if isinstance(mensajes, list):
+            for entry in mensajes:
+                if isinstance(entry, dict) and "message" in entry and "sender" in entry:
+                    self.agregar(entry["message"], entry["sender"])
+                    migrados += 1
+        self.flush()
+        historial_json.rename(historial_json.with_suffix(".json.migrado"))
+        logger.info("Migrados %d mensajes desde %s.", migrados, historial_json.name)
+        return migrados
+
+    # ----------------------------
+    # Recuperación y escritura
+    # ----------------------------
+    def _recuperar(self) -> int:
+        """
+        Trunca un último registro incompleto (escritura cortada por un cierre
+        inesperado) y devuelve el último id válido. Solo lee el final del
+        último segmento, desde el final hacia atrás.
+        """
+        segmentos = self.segmentos()
+        if not segmentos:
+            return 0
+        ultimo = segmentos[-1]
+        with ultimo.open("r+b") as archivo:
+            tamano = archivo.seek(0, os.SEEK_END)
+            fin_valido = tamano
+            # Retroceder línea a línea hasta encontrar un registro completo y válido
+            while fin_valido > 0:
+                salto = self._salto_anterior(archivo, fin_valido)
+                if salto != fin_valido - 1:
+                    fin_valido = salto + 1  # Última línea sin salto: incompleta
+                    continue
+                inicio = self._salto_anterior(archivo, salto) + 1
+                archivo.seek(inicio)
+                try:
+                    ultimo_id = json.loads(archivo.read(fin_valido - inicio))["id"]
+                    break
+                except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
+                    fin_valido = inicio
+            else:
+                ultimo_id = int(ultimo.stem) - 1
+            if fin_valido < tamano:
+                archivo.truncate(fin_valido)
+                logger.warning("Recuperado %s: descartados %d bytes incompletos.", ultimo.name, tamano - fin_valido)
+        return ultimo_id
+
+    @staticmethod
+    def _salto_anterior(archivo: BinaryIO, hasta: int, tamano_bloque: int = 64 * 1024) -> int:
+        """Posición del último salto de línea antes de `hasta`, o -1 si no hay ninguno."""
+        while hasta > 0:
+            desde = max(0, hasta - tamano_bloque)
+            archivo.seek(desde)
+            posicion = archivo.read(hasta - desde).rfind(b"\n")
+            if posicion >= 0:
+                return desde + posicion
+            hasta = desde
+        return -1
+
+    def _abrir_segmento(self, primer_id: int) -> None:
+        """Abre el segmento actual para anexar o crea uno nuevo si hay que rotar."""
+        if self._archivo and self._bytes_segmento < self.max_bytes_segmento:
+            return
+        if self._archivo:
+            self._archivo.close()
+        segmentos = self.segmentos()
+        if segmentos and segmentos[-1].stat().st_size < self.max_bytes_segmento:
+            ruta = segmentos[-1]
+        else:
+            ruta = self.directorio / f"{primer_id:012d}{EXTENSION_SEGMENTO}"
+        self._archivo = ruta.open("ab")
+        self._bytes_segmento = self._archivo.tell()
+
+    def _escritor(self) -> None:
+        """
+        Hilo que agrupa los registros pendientes y los vuelca a disco. Si un
+        volcado falla, el lote se conserva y se reintenta junto con lo que
+        llegue después.
+        """
+        terminar = False
+        lote: List[Tuple[int, str, Dict[str, Any]]] = []
+        fallos = 0
+        while not terminar or lote:
+            if not terminar:
+                nuevos, terminar = self._recoger(INTERVALO_REINTENTO_S if lote else None)
+                lote.extend(nuevos)
+            if not lote:
+                continue
+            if self._volcar(lote):
+                lote, fallos = [], 0
+                continue
+            fallos += 1
+            if terminar:
+                if fallos >= REINTENTOS_AL_CERRAR:
+                    logger.error("Historial cerrado sin poder guardar %d mensajes.", len(lote))
+                    return
+                time.sleep(INTERVALO_REINTENTO_S)
+
+    def _recoger(self, espera: Optional[float]) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], bool]:
+        """
+        Espera registros (como mucho `espera` segundos, o sin límite si es None)
+        y recoge los que lleguen durante el intervalo de volcado.
+
+        Returns:
+            Tuple[List, bool]: Registros recogidos y si se pidió cerrar.
+        """
+        try:
+            lote = [self._pendientes.get(timeout=espera)]
+        except queue.Empty:
+            return [], False
+        limite = time.monotonic() + self.intervalo_flush
+        while len(lote) < self.max_registros_flush:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._pendientes.get(timeout=restante))
+            except queue.Empty:
+                break
+        if None not in lote:
+            return lote, False
+        # Vaciar lo que quede encolado
+        while not self._pendientes.empty():
+            lote.append(self._pendientes.get_nowait())
+        return [registro for registro in lote if registro is not None], True
+
+    def _volcar(self, lote: List[Tuple[int, str, Dict[str, Any]]]) -> bool:
+        """
+        Escribe un lote de registros, rotando de segmento cuando toca. Si falla,
+        deshace lo escrito del lote para poder reintentarlo sin duplicados.
+
+        Returns:
+            bool: Si el lote quedó escrito.
+        """
+        segmentos = self.segmentos()
+        # Punto al que volver si falla: el segmento abierto o, si no hay, el último
+        if self._archivo:
+            inicio: Optional[Tuple[Path, int]] = (Path(self._archivo.name), self._archivo.tell())
+        else:
+            inicio = (segmentos[-1], segmentos[-1].stat().st_size) if segmentos else None
+        try:
+            for id_registro, linea, _ in lote:
+                datos = linea.encode("utf-8")
+                if not self._archivo or self._bytes_segmento >= self.max_bytes_segmento:
+                    self._abrir_segmento(id_registro)
+                self._archivo.write(datos)
+                self._bytes_segmento += len(datos)
+            self._archivo.flush()
+            if self.fsync:
+                os.fsync(self._archivo.fileno())
+        except OSError as e:
+            logger.error("Error guardando el historial de chat (%d mensajes pendientes): %s", len(lote), e)
+            self._deshacer(set(segmentos), inicio)
+            with self._volcado:
+                self.error = e
+                self._fallos += 1
+                self._volcado.notify_all()
+            return False
+
+        registros = [registro for _, _, registro in lote]
+        for observador in self._observadores:
+            try:
+                observador(registros)
+            except Exception as e:
+                logger.error("Error notificando el volcado del historial: %s", e)
+        with self._volcado:
+            self.error = None
+            self._ultimo_volcado = lote[-1][0]
+            self._volcado.notify_all()
+        return True
+
+    def _deshacer(self, segmentos_antes: "set[Path]", inicio: Optional[Tuple[Path, int]]) -> None:
+        """Borra los segmentos creados y recorta el que estaba abierto tras un volcado fallido."""
+        if self._archivo:
+            try:
+                self._archivo.close()
+            except OSError:
+                pass  # Lo que no se pudo escribir se descarta con el recorte
+            self._archivo = None
+        try:
+            for segmento in set(self.segmentos()) - segmentos_antes:
+                segmento.unlink()
+            if inicio:
+                os.truncate(inicio[0], inicio[1])
+        except OSError as e:
+            logger.error("No se pudo deshacer el volcado fallido del historial: %s", e)
@@ -0,0 +1,144 @@
+# src/iconos.py
+
+import hashlib
+import json
+import logging
+import os
+import tkinter as tk
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Iconos ya redimensionados, en PNG, listos para que Tk los cargue sin PIL
+CACHE_ICONOS_DIR = DATA_DIR / "cache_iconos"
+
+# Hash de cada original según su tamaño y fecha, para no volver a leerlo al arrancar
+MANIFIESTO = "manifiesto.json"
+
+
+class CacheIconos:
+    """
+    Iconos redimensionados, guardados en disco y compartidos en memoria.
+
+    La primera vez que se pide un icono a un tamaño, se redimensiona con PIL
+    (LANCZOS) y se guarda como PNG en `directorio`, con un nombre que incluye
+    el tamaño y un hash del archivo original: si el original cambia, cambia
+    el nombre y se vuelve a generar (la versión anterior se borra). Las
+    siguientes veces, también tras reiniciar la aplicación, Tk carga ese PNG
+    directamente, sin importar PIL ni redimensionar.
+
+    El hash de cada original se guarda en un manifiesto junto con su tamaño
+    y su fecha de modificación: mientras no cambien, no se vuelve a leer el
+    original para calcularlo.
+
+    Los PhotoImage se guardan en memoria y se reutilizan en todas las
+    ventanas del mismo intérprete de Tk.
+    """
+
+    def __init__(self, directorio: Path = CACHE_ICONOS_DIR) -> None:
+        self.directorio = directorio
+        self._imagenes: Dict[Tuple[str, int, int], tk.PhotoImage] = {}
+        self._manifiesto: Optional[Dict[str, List]] = None  # ruta -> [bytes, mtime_ns, hash]
+
+    def obtener(self, ruta: Path, tamano: Tuple[int, int], master: Optional[tk.Misc] = None) -> Optional[tk.PhotoImage]:
+        """
+        Devuelve el icono `ruta` redimensionado a `tamano`.
+
+        Args:
+            ruta (Path): Imagen original.
+            tamano (Tuple[int, int]): Ancho y alto en píxeles.
+            master (Optional[tk.Misc], optional): Widget cuyo intérprete de Tk usará la imagen.
+                Defaults to la raíz por defecto.
+
+        Returns:
+            Optional[tk.PhotoImage]: La imagen, o None si no se pudo cargar.
+        """
+        clave = (str(ruta.resolve()), *tamano)
+        imagen = self._imagenes.get(clave)
+        if imagen is not None and self._vigente(imagen, master):
+            return imagen
+        try:
+            cacheada = self._ruta_cacheada(ruta, tamano)
+            if not cacheada.exists():
+                self._generar(ruta, tamano, cacheada)
+            imagen = tk.PhotoImage(master=master, file=str(cacheada))
+        except FileNotFoundError:
+            logger.error("No se encontró la imagen: %s", ruta)
+            return None
+        except Exception as e:
+            logger.error("Error al cargar el icono %s a %sx%s: %s", ruta, tamano[0], tamano[1], e)
+            return None
+        self._imagenes[clave] = imagen
+        return imagen
+
+    def _ruta_cacheada(self, ruta: Path, tamano: Tuple[int, int]) -> Path:
+        """Archivo de la caché para `ruta` a `tamano`, según el contenido actual de `ruta`."""
+        datos = ruta.stat()
+        manifiesto = self._leer_manifiesto()
+        entrada = manifiesto.get(str(ruta))
+        if isinstance(entrada, list) and entrada[:2] == [datos.st_size, datos.st_mtime_ns]:
+            resumen = entrada[2]
+        else:
+            resumen = hashlib.sha256(ruta.read_bytes()).hexdigest()[:16]
+            manifiesto[str(ruta)] = [datos.st_size, datos.st_mtime_ns, resumen]
+            self._guardar_manifiesto()
+        return self.directorio / f"{ruta.stem}-{tamano[0]}x{tamano[1]}-{resumen}.png"
+
+    def _leer_manifiesto(self) -> Dict[str, List]:
+        if self._manifiesto is None:
+            try:
+                self._manifiesto = json.loads((self.directorio / MANIFIESTO).read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._manifiesto = {}
+        return self._manifiesto
+
+    def _guardar_manifiesto(self) -> None:
+        ruta = self.directorio / MANIFIESTO
+        temporal = ruta.with_suffix(".tmp")
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            temporal.write_text(json.dumps(self._manifiesto), encoding="utf-8")
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.warning("No se pudo guardar el manifiesto de la caché de iconos: %s", e)
+
+    def _generar(self, ruta: Path, tamano: Tuple[int, int], destino: Path) -> None:
+        """Redimensiona `ruta` y la guarda en `destino`, borrando las versiones anteriores."""
+        from PIL import Image
+
+        with Image.open(ruta) as imagen:
+            redimensionada = imagen.convert("RGBA").resize(tamano, Image.Resampling.LANCZOS)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        temporal = destino.with_suffix(".tmp")
+        redimensionada.save(temporal, format="PNG")
+        os.replace(temporal, destino)
+        for anterior in self.directorio.glob(f"{ruta.stem}-{tamano[0]}x{tamano[1]}-*.png"):
+            if anterior != destino:
+                anterior.unlink(missing_ok=True)
+        logger.info("Icono %s redimensionado a %sx%s y guardado en la caché.", ruta.name, tamano[0], tamano[1])
+
+    @staticmethod
+    def _vigente(imagen: tk.PhotoImage, master: Optional[tk.Misc]) -> bool:
+        """Indica si una imagen guardada sigue existiendo y es del intérprete de `master`."""
+        if master is not None and imagen.tk is not master.tk:
+            return False
+        try:
+            imagen.tk.call("image", "type", imagen.name)
+        except tk.TclError:
+            return False  # Se borró o su intérprete de Tk ya se cerró
+        return True
+
+
+# Caché compartida por todas las ventanas de la aplicación
+_cache: Optional[CacheIconos] = None
+
+
+def cargar_icono(ruta: Path, tamano: Tuple[int, int], master: Optional[tk.Misc] = None) -> Optional[tk.PhotoImage]:
+    """Devuelve un icono redimensionado de la caché compartida (ver CacheIconos.obtener)."""
+    global _cache
+    if _cache is None:
+        _cache = CacheIconos()
+    return _cache.obtener(ruta, tamano, master)
@@ -0,0 +1,97 @@
+# src/lista_archivos.py
+
+import json
+import threading
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+class InfoArchivo(NamedTuple):
+    """
+    Archivo de la lista del servidor.
+    """
+    nombre: str
+    tamano: Optional[int] = None   # Bytes, si el servidor lo indica
+    fecha: Optional[float] = None  # Fecha de subida (timestamp), si el servidor la indica
+
+
+def info_archivo(entrada: Any) -> InfoArchivo:
+    """
+    Convierte una entrada de la lista del servidor: un nombre (servidores
+    antiguos) o un objeto {"nombre", "tamano", "fecha"}.
+    """
+    if isinstance(entrada, str):
+        return InfoArchivo(entrada)
+    return InfoArchivo(entrada["nombre"], entrada.get("tamano"), entrada.get("fecha"))
+
+
+class ListaDesincronizada(Exception):
+    """Se recibió un cambio que no parte de la versión local: hay que pedir la lista completa."""
+
+
+class ListaArchivos:
+    """
+    Copia local de la lista de archivos del servidor, con su versión.
+
+    El servidor numera cada cambio de la lista. El cliente la recibe completa
+    una vez ("ARCHIVOS:{"version", "archivos"}") y después solo los cambios
+    ("ARCHIVOS_DELTA:{"desde", "version", "agregados", "eliminados"}") o
+    "SIN_CAMBIOS:<version>" cuando pregunta y no hay nada nuevo. Los archivos
+    de "archivos" y "agregados" son nombres u objetos con nombre, tamaño y
+    fecha (ver info_archivo); un archivo agregado que ya estaba se actualiza.
+    "eliminados" es una lista de nombres.
+
+    El hilo de red aplica las respuestas y la interfaz consulta la copia con
+    instantanea(); `cambios` aumenta con cada modificación, así que la
+    interfaz solo tiene que volver a dibujar cuando cambia.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._archivos: Dict[str, InfoArchivo] = {}
+        self.version = 0   # Versión del servidor (0: sin lista o servidor sin versiones)
+        self.cambios = 0   # Contador local de modificaciones
+
+    def instantanea(self) -> Tuple[int, Dict[str, InfoArchivo]]:
+        """
+        Returns:
+            Tuple[int, Dict[str, InfoArchivo]]: Contador de cambios y copia de los archivos por nombre.
+        """
+        with self._lock:
+            return self.cambios, dict(self._archivos)
+
+    def aplicar(self, respuesta: str) -> None:
+        """
+        Aplica una respuesta del servidor ("ARCHIVOS:", "ARCHIVOS_DELTA:" o "SIN_CAMBIOS:").
+
+        Raises:
+            ListaDesincronizada: Si un delta no parte de la versión local.
+            ValueError: Si la respuesta no es ninguna de las anteriores.
+        """
+        comando, _, valor = respuesta.partition(":")
+        if comando == "SIN_CAMBIOS":
+            return
+        if comando == "ARCHIVOS":
+            lista = json.loads(valor)
+            self.reemplazar(lista["archivos"], lista["version"])
+        elif comando == "ARCHIVOS_DELTA":
+            delta = json.loads(valor)
+            with self._lock:
+                if delta["desde"] != self.version:
+                    raise ListaDesincronizada(f"Delta desde la versión {delta['desde']}, local {self.version}.")
+                for nombre in delta["eliminados"]:
+                    self._archivos.pop(nombre, None)
+                for info in map(info_archivo, delta["agregados"]):
+                    self._archivos[info.nombre] = info
+                self.version = delta["version"]
+                self.cambios += 1
+        else:
+            raise ValueError(f"Respuesta inesperada a la lista de archivos: {respuesta[:80]!r}")
+
+    def reemplazar(self, archivos: Iterable[Any], version: int = 0) -> None:
+        """Sustituye la lista completa (p. ej. la de un servidor sin versiones)."""
+        nuevos = {info.nombre: info for info in map(info_archivo, archivos)}
+        with self._lock:
+            if nuevos != self._archivos:
+                self._archivos = nuevos
+                self.cambios += 1
+            self.version = version
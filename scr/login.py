@@ -1,47 +1,52 @@
 import json
 import logging
-from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
-import socket
+import asyncio
 import tkinter as tk
 from tkinter import messagebox
 
-# Ruta absoluta al directorio raíz del proyecto
-BASE_DIR = Path(__file__).parent.parent.resolve()
+from cliente_async import ClienteAsync, ErrorAutenticacion, esperar_en_tk
+from config import DATA_DIR
+from protocolo import ErrorProtocolo
 
-# Rutas a las carpetas específicas
-DATA_DIR = BASE_DIR / 'data'
-ASSETS_DIR = BASE_DIR / 'assets'
+logger = logging.getLogger(__name__)
 
-# Asegurarse de que las carpetas existen
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-ASSETS_DIR.mkdir(parents=True, exist_ok=True)
 
-# Configuración de logging
-LOG_FILE = DATA_DIR / "icocchat.log"
-
-def run_login() -> bool:
+def run_login(crear_cliente: Callable[[], ClienteAsync]) -> Optional[ClienteAsync]:
     """
-    Ejecuta la ventana de Login y retorna True si el inicio de sesión fue exitoso,
-    False si el usuario cerró la ventana sin credenciales correctas.
+    Ejecuta la ventana de Login y retorna el cliente con la sesión ya
+    autenticada, para que el chat siga usando la misma conexión, o None si el
+    usuario cerró la ventana sin credenciales correctas.
+
+    Args:
+        crear_cliente (Callable[[], ClienteAsync]): Crea el cliente con el que se inicia sesión.
 
     Returns:
-        bool: Resultado del inicio de sesión.
+        Optional[ClienteAsync]: Cliente conectado y autenticado, o None.
     """
-    app = LoginWindow()
+    app = LoginWindow(crear_cliente)
     app.root.mainloop()
-    return app.login_success
+    if app.login_success:
+        return app.cliente
+    if app.cliente is not None:
+        app.cliente.cerrar()
+    return None
 
 class LoginWindow:
     """
     Clase para manejar la ventana de inicio de sesión de IcoChat.
     """
 
-    def __init__(self):
+    def __init__(self, crear_cliente: Callable[[], ClienteAsync]):
         """
         Inicializa la ventana de inicio de sesión.
+
+        Args:
+            crear_cliente (Callable[[], ClienteAsync]): Crea el cliente con el que se inicia sesión.
         """
+        self.crear_cliente = crear_cliente
+        self.cliente: Optional[ClienteAsync] = None
         self.root = tk.Tk()
         self.root.title("Iniciar sesión - IcoChat")
         self.root.configure(bg="#2C2F33")
@@ -51,7 +56,7 @@ class LoginWindow:
         try:
             self.root.iconphoto(False, tk.PhotoImage(file="icochat.png"))
         except Exception as e:
-            logging.error(f"Error cargando el icono de la ventana: {e}")
+            logger.error("Error cargando el icono de la ventana: %s", e)
 
         # Centrar y escalar la ventana
         self.center_window(400, 300)
@@ -162,14 +167,15 @@ class LoginWindow:
         self.show_password_btn.pack(side=tk.LEFT)
 
         # Botón de inicio de sesión
-        tk.Button(
+        self.sign_in_btn = tk.Button(
             frame,
             text="Iniciar sesión",
             command=self.sign_in,
             font=("Arial", 12),
             bg="#FF8C00",
             fg="#FFFFFF"
-        ).pack(fill="x", pady=10)
+        )
+        self.sign_in_btn.pack(fill="x", pady=10)
 
         # Opciones de recordarme y olvidar contraseña
         options_frame = tk.Frame(frame, bg="#2C2F33")
@@ -214,6 +220,7 @@ class LoginWindow:
     def sign_in(self) -> None:
         """
         Maneja el proceso de inicio de sesión al hacer clic en el botón correspondiente.
+        La conexión con la que se inicia sesión es la que luego usa el chat.
         """
         email = self.email.get().strip()
         password = self.password.get().strip()
@@ -222,51 +229,58 @@ class LoginWindow:
             messagebox.showwarning("Campos vacíos", "Por favor, ingresa tu correo electrónico y contraseña.")
             return
 
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as client_socket:
-                client_socket.connect(('190.107.177.156', 12345))  # Cambia a la IP y puerto del servidor
-                logging.info("Conectado al servidor para inicio de sesión.")
-
-                login_data = {"email": email, "password": password}
-                client_socket.sendall(f"CREDENTIALS:{json.dumps(login_data)}".encode('utf-8'))
-                logging.info("Datos de inicio de sesión enviados al servidor.")
-
-                response = client_socket.recv(1024).decode('utf-8')
-                logging.info(f"Respuesta del servidor: {response}")
-
-            response_data = json.loads(response)
-            if response_data.get("status") == "received":
-                resp_val = response_data.get("Resp", 0)
-                mens_val = response_data.get("Mens", "Sin mensaje")
-
-                if resp_val == 1:
-                    # Éxito
-                    if self.remember_me.get():
-                        self.save_credentials(email, password)
-                    else:
-                        self.clear_credentials()
-
-                    self.login_success = True
-                    messagebox.showinfo("Inicio exitoso", mens_val)
-                    self.root.destroy()  # Cierra la ventana de login
-                else:
-                    self.login_success = False
-                    messagebox.showerror("Error de credenciales", mens_val)
-            else:
-                messagebox.showerror("Error", "El servidor envió una respuesta inesperada.")
-                logging.warning("Respuesta inesperada del servidor durante el inicio de sesión.")
-        except ConnectionRefusedError:
+        if self.cliente is None:
+            self.cliente = self.crear_cliente()
+        self.sign_in_btn.config(state=tk.DISABLED)
+        logger.info("Iniciando sesión en el servidor.")
+        esperar_en_tk(
+            self.root,
+            self.cliente.ejecutar(self.cliente.iniciar_sesion(email, password)),
+            al_exito=lambda mens_val: self.login_ok(email, password, mens_val),
+            al_error=self.login_error
+        )
+
+    def login_ok(self, email: str, password: str, mens_val: str) -> None:
+        """
+        Guarda o borra las credenciales según "Recordarme" y cierra la ventana
+        dejando la conexión abierta para el chat.
+
+        Args:
+            email (str): Correo electrónico del usuario.
+            password (str): Contraseña del usuario.
+            mens_val (str): Mensaje del servidor.
+        """
+        if self.remember_me.get():
+            self.save_credentials(email, password)
+        else:
+            self.clear_credentials()
+
+        self.login_success = True
+        messagebox.showinfo("Inicio exitoso", mens_val or "Sesión iniciada.")
+        self.root.destroy()  # Cierra la ventana de login
+
+    def login_error(self, error: BaseException) -> None:
+        """
+        Muestra el motivo por el que no se pudo iniciar sesión.
+
+        Args:
+            error (BaseException): Error del inicio de sesión.
+        """
+        self.sign_in_btn.config(state=tk.NORMAL)
+        if isinstance(error, ErrorAutenticacion):
+            messagebox.showerror("Error de credenciales", str(error))
+        elif isinstance(error, ConnectionRefusedError):
             messagebox.showerror("Error de conexión", "No se pudo conectar al servidor. Inténtalo de nuevo más tarde.")
-            logging.error("Conexión rechazada por el servidor.")
-        except socket.timeout:
+            logger.error("Conexión rechazada por el servidor.")
+        elif isinstance(error, (asyncio.TimeoutError, TimeoutError)):
             messagebox.showerror("Error de conexión", "Tiempo de espera agotado al intentar conectarse al servidor.")
-            logging.error("Tiempo de espera agotado al conectarse al servidor.")
-        except json.JSONDecodeError:
+            logger.error("Tiempo de espera agotado al conectarse al servidor.")
+        elif isinstance(error, ErrorProtocolo):
             messagebox.showerror("Error", "Respuesta del servidor no válida.")
-            logging.error("Error al decodificar la respuesta JSON del servidor.")
-        except Exception as e:
-            messagebox.showerror("Error de conexión", f"No se pudo conectar al servidor: {e}")
-            logging.error(f"Error inesperado durante el inicio de sesión: {e}")
+            logger.error("Respuesta no válida del servidor durante el inicio de sesión: %s", error)
+        else:
+            messagebox.showerror("Error de conexión", f"No se pudo conectar al servidor: {error}")
+            logger.error("Error inesperado durante el inicio de sesión: %s", error)
 
     def on_close(self) -> None:
         """
@@ -274,7 +288,7 @@ class LoginWindow:
         No abre el chat si login_success=False.
         """
         if not self.login_success:
-            logging.info("Ventana de login cerrada sin éxito en el inicio de sesión.")
+            logger.info("Ventana de login cerrada sin éxito en el inicio de sesión.")
         self.root.destroy()
 
     def load_credentials(self) -> str:
@@ -292,9 +306,9 @@ class LoginWindow:
                     data = json.load(file)
                     self.email.set(data.get("email", ""))
                     self.password.set(data.get("password", ""))
-                logging.info("Credenciales cargadas desde credentials.json.")
+                logger.info("Credenciales cargadas desde credentials.json.")
             except (json.JSONDecodeError, IOError) as e:
-                logging.error(f"Error cargando las credenciales: {e}")
+                logger.error("Error cargando las credenciales: %s", e)
 
     def save_credentials(self, email: str, password: str) -> None:
         """
@@ -310,9 +324,9 @@ class LoginWindow:
         try:
             with (DATA_DIR / "credentials.json").open("w", encoding="utf-8") as file:
                 json.dump(data, file, ensure_ascii=False, indent=4)
-            logging.info("credenciales guardadas en credentials.json.")
+            logger.info("credenciales guardadas en credentials.json.")
         except IOError as e:
-            logging.error(f"Error guardando las credenciales: {e}")
+            logger.error("Error guardando las credenciales: %s", e)
 
     def clear_credentials(self) -> None:
         """
@@ -322,9 +336,9 @@ class LoginWindow:
         if credentials_file.exists():
             try:
                 credentials_file.unlink()
-                logging.info("Credenciales eliminadas de credentials.json.")
+                logger.info("Credenciales eliminadas de credentials.json.")
             except IOError as e:
-                logging.error(f"Error eliminando las credenciales: {e}")
+                logger.error("Error eliminando las credenciales: %s", e)
 
     def forgot_password(self) -> None:
         """
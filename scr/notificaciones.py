@@ -0,0 +1,193 @@
+# src/notificaciones.py
+
+import logging
+import platform
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Notificaciones con la misma clave dentro de esta ventana se agrupan en una
+# sola: la primera se muestra enseguida y el resto, juntas, al acabar la ventana
+VENTANA_AGRUPACION_S = 2.0
+
+# Tiempo mínimo entre dos sonidos de notificación
+INTERVALO_MINIMO_SONIDO_S = 5.0
+
+# Notificaciones que pueden esperar al hilo; si se llena, las nuevas se descartan
+MAX_NOTIFICACIONES_PENDIENTES = 1000
+
+# Función que muestra una notificación del sistema: recibe título y mensaje
+Mostrar = Callable[[str, str], None]
+
+
+class Notificacion(NamedTuple):
+    """Notificación pendiente de mostrar."""
+    titulo: str
+    mensaje: str
+    clave: str       # Las de la misma clave se agrupan
+    sonido: bool     # Si debe sonar (respetando INTERVALO_MINIMO_SONIDO_S)
+
+
+def elegir_sistema(alternativa: Mostrar) -> Mostrar:
+    """
+    Elige la función de notificación adecuada según el sistema operativo.
+
+    Args:
+        alternativa (Mostrar): Función a usar si el sistema no tiene notificaciones
+            propias o no se pueden cargar.
+
+    Returns:
+        Mostrar: Función de notificación.
+    """
+    sistema_operativo = platform.system()
+    if sistema_operativo == 'Windows':
+        try:
+            from NotiWin import mostrar_notificacionWin
+            logger.info("Usando NotiWin para notificaciones en Windows.")
+            return mostrar_notificacionWin
+        except ImportError as e:
+            logger.error("No se pudo importar NotiWin: %s", e)
+    elif sistema_operativo == 'Linux':
+        try:
+            from noti3 import mostrar_notificacion
+            logger.info("Usando noti3 para notificaciones en Linux.")
+            return mostrar_notificacion
+        except ImportError as e:
+            logger.error("No se pudo importar noti3: %s", e)
+    else:
+        logger.info("Usando función de notificación genérica para el sistema operativo actual.")
+    return alternativa
+
+
+class DespachadorNotificaciones:
+    """
+    Muestra las notificaciones y reproduce su sonido en un hilo propio, de
+    modo que notificar() nunca bloquea al hilo de red ni al de Tk.
+
+    Las notificaciones con la misma clave se agrupan: la primera se muestra
+    al momento y las que llegan durante los VENTANA_AGRUPACION_S siguientes
+    se muestran como una sola (la última) al acabar la ventana. Así una
+    ráfaga de 50 mensajes produce dos avisos (el del primero y el que
+    cuenta los 50) en lugar de 50. El sonido suena como mucho
+    una vez cada INTERVALO_MINIMO_SONIDO_S.
+    """
+
+    def __init__(
+        self,
+        alternativa: Mostrar,
+        reproducir: Optional[Callable[[], None]] = None,
+        mostrar: Optional[Mostrar] = None,
+        ventana_s: float = VENTANA_AGRUPACION_S,
+        intervalo_sonido_s: float = INTERVALO_MINIMO_SONIDO_S,
+        max_pendientes: int = MAX_NOTIFICACIONES_PENDIENTES
+    ) -> None:
+        """
+        Args:
+            alternativa (Mostrar): Función de notificación si el sistema no tiene una propia
+                (ver elegir_sistema). Se llama desde el hilo del despachador.
+            reproducir (Optional[Callable], optional): Reproduce el sonido de notificación.
+            mostrar (Optional[Mostrar], optional): Función de notificación a usar. Defaults to
+                la que elija elegir_sistema, que se carga ya en el hilo del despachador.
+            ventana_s (float, optional): Ventana de agrupación. Defaults to VENTANA_AGRUPACION_S.
+            intervalo_sonido_s (float, optional): Tiempo mínimo entre sonidos.
+                Defaults to INTERVALO_MINIMO_SONIDO_S.
+            max_pendientes (int, optional): Capacidad de la cola. Defaults to MAX_NOTIFICACIONES_PENDIENTES.
+        """
+        self._alternativa = alternativa
+        self._reproducir = reproducir
+        self._mostrar = mostrar
+        self.ventana_s = ventana_s
+        self.intervalo_sonido_s = intervalo_sonido_s
+        self._cola: "queue.Queue[Optional[Notificacion]]" = queue.Queue(maxsize=max_pendientes)
+        self._ultimo_sonido = float("-inf")
+        self.mostradas = 0
+        self.agrupadas = 0  # Notificaciones que no se mostraron por ir en un grupo
+        self.descartadas = 0  # Notificaciones perdidas por tener la cola llena
+
+        self._hilo = threading.Thread(target=self._trabajar, name="notificaciones", daemon=True)
+        self._hilo.start()
+
+    def notificar(self, titulo: str, mensaje: str, clave: Optional[str] = None, sonido: bool = False) -> None:
+        """
+        Pide mostrar una notificación. No espera: la muestra el hilo del despachador.
+
+        Args:
+            titulo (str): Título de la notificación.
+            mensaje (str): Texto de la notificación.
+            clave (Optional[str], optional): Clave de agrupación. Defaults to el título y
+                el mensaje (solo se agrupan las notificaciones idénticas).
+            sonido (bool, optional): Si debe sonar. Defaults to False.
+        """
+        try:
+            self._cola.put_nowait(Notificacion(titulo, mensaje, clave or f"{titulo}\n{mensaje}", sonido))
+        except queue.Full:
+            self.descartadas += 1
+
+    def cerrar(self, timeout: Optional[float] = None) -> None:
+        """Muestra los grupos pendientes y detiene el hilo."""
+        try:
+            self._cola.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._hilo.join(timeout)
+
+    def _trabajar(self) -> None:
+        if self._mostrar is None:
+            self._mostrar = elegir_sistema(self._alternativa)
+        pendientes: Dict[str, Notificacion] = {}   # Agrupadas, a mostrar al acabar su ventana
+        ultima_entrega: Dict[str, float] = {}
+        ultimo_texto: Dict[str, Tuple[str, str]] = {}  # Lo último mostrado de cada clave
+        while True:
+            ahora = time.monotonic()
+            timeout = None
+            if pendientes:
+                timeout = max(0.0, min(ultima_entrega[clave] + self.ventana_s for clave in pendientes) - ahora)
+            try:
+                notificacion = self._cola.get(timeout=timeout)
+            except queue.Empty:
+                notificacion = False
+            if notificacion is None:
+                self._entregar(list(pendientes.values()))
+                return
+            ahora = time.monotonic()
+            if notificacion:
+                if notificacion.clave in pendientes:
+                    anterior = pendientes[notificacion.clave]
+                    # La más reciente sustituye a la anterior, sin perder su sonido
+                    notificacion = notificacion._replace(sonido=notificacion.sonido or anterior.sonido)
+                    self.agrupadas += 1
+                pendientes[notificacion.clave] = notificacion
+            listas = [n for clave, n in pendientes.items()
+                      if ahora - ultima_entrega.get(clave, float("-inf")) >= self.ventana_s]
+            for n in listas:
+                del pendientes[n.clave]
+                ultima_entrega[n.clave] = ahora
+            # Una repetición exacta de lo que se acaba de mostrar no se vuelve a mostrar
+            listas = [n for n in listas if ultimo_texto.get(n.clave) != (n.titulo, n.mensaje)]
+            for n in listas:
+                ultimo_texto[n.clave] = (n.titulo, n.mensaje)
+            self._entregar(listas)
+            # Olvidar las claves cuya ventana ya pasó
+            for clave in [c for c, t in ultima_entrega.items() if ahora - t >= self.ventana_s and c not in pendientes]:
+                del ultima_entrega[clave]
+                ultimo_texto.pop(clave, None)
+
+    def _entregar(self, notificaciones: List[Notificacion]) -> None:
+        sonar = False
+        for notificacion in notificaciones:
+            try:
+                self._mostrar(notificacion.titulo, notificacion.mensaje)
+                self.mostradas += 1
+            except Exception as e:
+                logger.error("Error mostrando la notificación '%s': %s", notificacion.titulo, e)
+            sonar = sonar or notificacion.sonido
+        ahora = time.monotonic()
+        if sonar and self._reproducir and ahora - self._ultimo_sonido >= self.intervalo_sonido_s:
+            self._ultimo_sonido = ahora
+            try:
+                self._reproducir()
+            except Exception as e:
+                logger.error("Error reproduciendo el sonido de notificación: %s", e)
@@ -0,0 +1,159 @@
+# src/panel_transferencias.py
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Dict, List, Optional, Tuple
+
+from gestor_transferencias import FaseTransferencia, GestorTransferencias, Prioridad, Transferencia
+
+# Cada cuánto se refresca la tabla de transferencias (ms)
+INTERVALO_REFRESCO_MS = 250
+
+COLUMNAS = ("archivo", "tipo", "estado", "progreso", "prioridad")
+
+NOMBRES_PRIORIDAD = {Prioridad.ALTA: "Alta", Prioridad.NORMAL: "Normal", Prioridad.BAJA: "Baja"}
+
+
+def formatear_tamano(n: int) -> str:
+    """Formatea un número de bytes para mostrarlo (p. ej. "12.3 MB")."""
+    for unidad in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unidad == "GB":
+            return f"{n} {unidad}" if unidad == "B" else f"{n:.1f} {unidad}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def describir_progreso(transferencia: Transferencia) -> str:
+    """Texto de la columna de progreso de una transferencia."""
+    progreso = transferencia.progreso
+    if progreso.total:
+        return (
+            f"{progreso.transferidos * 100 // progreso.total}% "
+            f"({formatear_tamano(progreso.transferidos)} de {formatear_tamano(progreso.total)})"
+        )
+    return formatear_tamano(progreso.transferidos) if progreso.transferidos else ""
+
+
+class PanelTransferencias:
+    """
+    Ventana con las subidas y descargas del gestor: su estado y progreso, y
+    botones para pausarlas, reanudarlas, cancelarlas o cambiar su prioridad.
+    Solo se reconfiguran las filas que han cambiado desde el último refresco.
+    """
+
+    def __init__(self, master: tk.Misc, gestor: GestorTransferencias) -> None:
+        self.gestor = gestor
+        self._filas: Dict[int, Tuple[str, ...]] = {}  # Id de transferencia -> valores mostrados
+        self._transferencias: Dict[int, Transferencia] = {}
+
+        self.ventana = tk.Toplevel(master)
+        self.ventana.title("Transferencias")
+        self.ventana.geometry("700x350")
+        self.ventana.configure(bg="#2D2D2D")
+
+        frame_botones = tk.Frame(self.ventana, bg="#2D2D2D")
+        frame_botones.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+        for texto, comando in (
+            ("Pausar", self.pausar),
+            ("Reanudar", self.reanudar),
+            ("Cancelar", self.cancelar),
+            ("Subir prioridad", lambda: self.cambiar_prioridad(-1)),
+            ("Bajar prioridad", lambda: self.cambiar_prioridad(1)),
+        ):
+            tk.Button(frame_botones, text=texto, command=comando).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Button(frame_botones, text="Limpiar terminadas", command=self.gestor.limpiar_terminadas).pack(side=tk.RIGHT)
+
+        self.tabla = ttk.Treeview(self.ventana, columns=COLUMNAS, show="headings", selectmode="extended")
+        for columna, titulo, ancho in (
+            ("archivo", "Archivo", 220),
+            ("tipo", "Tipo", 80),
+            ("estado", "Estado", 100),
+            ("progreso", "Progreso", 200),
+            ("prioridad", "Prioridad", 80),
+        ):
+            self.tabla.heading(columna, text=titulo)
+            self.tabla.column(columna, width=ancho, stretch=columna == "archivo")
+        barra = ttk.Scrollbar(self.ventana, orient=tk.VERTICAL, command=self.tabla.yview)
+        self.tabla.configure(yscrollcommand=barra.set)
+        barra.pack(side=tk.RIGHT, fill=tk.Y, pady=(10, 0))
+        self.tabla.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=(10, 0), pady=(10, 0))
+
+        self.ventana.bind('<Delete>', lambda e: self.cancelar())
+        self.refrescar()
+
+    def mostrar(self) -> None:
+        """Trae la ventana al frente."""
+        self.ventana.deiconify()
+        self.ventana.lift()
+        self.ventana.focus_set()
+
+    def existe(self) -> bool:
+        """Indica si la ventana sigue abierta."""
+        try:
+            return bool(self.ventana.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def refrescar(self) -> None:
+        """Actualiza la tabla con el estado del gestor y programa el siguiente refresco."""
+        if not self.existe():
+            return
+        actuales = self.gestor.transferencias()
+        ids = {transferencia.id for transferencia in actuales}
+        for id_transferencia in list(self._filas):
+            if id_transferencia not in ids:
+                self.tabla.delete(str(id_transferencia))
+                del self._filas[id_transferencia]
+                del self._transferencias[id_transferencia]
+        for transferencia in actuales:
+            valores = (
+                transferencia.nombre,
+                "Subida" if transferencia.tipo == "subida" else "Descarga",
+                transferencia.fase.value,
+                describir_progreso(transferencia),
+                NOMBRES_PRIORIDAD[transferencia.prioridad],
+            )
+            anteriores = self._filas.get(transferencia.id)
+            if anteriores is None:
+                self.tabla.insert("", tk.END, iid=str(transferencia.id), values=valores)
+                self._transferencias[transferencia.id] = transferencia
+            elif anteriores != valores:
+                self.tabla.item(str(transferencia.id), values=valores)
+            self._filas[transferencia.id] = valores
+        self.ventana.after(INTERVALO_REFRESCO_MS, self.refrescar)
+
+    def _seleccionadas(self) -> List[Transferencia]:
+        return [self._transferencias[int(iid)] for iid in self.tabla.selection() if int(iid) in self._transferencias]
+
+    def pausar(self) -> None:
+        for transferencia in self._seleccionadas():
+            self.gestor.pausar(transferencia)
+
+    def reanudar(self) -> None:
+        for transferencia in self._seleccionadas():
+            self.gestor.reanudar(transferencia)
+
+    def cancelar(self) -> None:
+        for transferencia in self._seleccionadas():
+            self.gestor.cancelar(transferencia)
+
+    def cambiar_prioridad(self, paso: int) -> None:
+        """Sube (paso -1) o baja (paso 1) la prioridad de las transferencias seleccionadas."""
+        for transferencia in self._seleccionadas():
+            if transferencia.fase is FaseTransferencia.ACTIVA or transferencia.terminada:
+                continue
+            prioridad = min(max(transferencia.prioridad + paso, Prioridad.ALTA), Prioridad.BAJA)
+            self.gestor.cambiar_prioridad(transferencia, Prioridad(prioridad))
+
+
+def abrir_panel(master: tk.Misc, gestor: GestorTransferencias, panel: Optional[PanelTransferencias] = None) -> PanelTransferencias:
+    """
+    Muestra el panel de transferencias, reutilizando el ya abierto si lo hay.
+
+    Returns:
+        PanelTransferencias: Panel mostrado.
+    """
+    if panel is not None and panel.existe():
+        panel.mostrar()
+        return panel
+    return PanelTransferencias(master, gestor)
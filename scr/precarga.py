@@ -0,0 +1,60 @@
+# src/precarga.py
+
+import importlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Módulos pesados que la ventana de login no necesita y que el chat usa
+# después (campo de entrada). PIL no está: con la caché de iconos ya
+# generada no hace falta. pygame lo carga audio.MotorAudio.precalentar.
+# Ver benchmarks/bench_arranque.py.
+MODULOS_DIFERIDOS = ("customtkinter",)
+
+
+def precargar(
+    modulos: Iterable[str] = MODULOS_DIFERIDOS,
+    al_terminar: Optional[Callable[[], None]] = None
+) -> threading.Thread:
+    """
+    Importa en un hilo aparte módulos que se usarán más tarde, mientras el
+    usuario escribe sus credenciales. Si el hilo de Tk llega a importar uno
+    que aún se está cargando, espera a que termine en lugar de cargarlo otra
+    vez (lo garantiza el bloqueo de importación de Python). Un módulo que no
+    se puede importar solo se anota: el error se verá donde se use.
+
+    Args:
+        modulos (Iterable[str], optional): Módulos a importar. Defaults to MODULOS_DIFERIDOS.
+        al_terminar (Optional[Callable], optional): Se llama en el mismo hilo al acabar,
+            p. ej. para precalentar el motor de audio.
+
+    Returns:
+        threading.Thread: Hilo de la precarga (daemon).
+    """
+    modulos = tuple(modulos)
+
+    def cargar() -> None:
+        tiempos: Dict[str, float] = {}
+        inicio = time.perf_counter()
+        for modulo in modulos:
+            t = time.perf_counter()
+            try:
+                importlib.import_module(modulo)
+            except Exception as e:
+                logger.warning("No se pudo precargar %s: %s", modulo, e)
+                continue
+            tiempos[modulo] = time.perf_counter() - t
+        if al_terminar:
+            try:
+                al_terminar()
+            except Exception as e:
+                logger.error("Error al terminar la precarga: %s", e)
+        detalle = ", ".join(f"{modulo} {segundos * 1000:.0f} ms" for modulo, segundos in tiempos.items())
+        logger.info("Precarga terminada en %.0f ms (%s).", (time.perf_counter() - inicio) * 1000, detalle)
+
+    hilo = threading.Thread(target=cargar, name="precarga", daemon=True)
+    hilo.start()
+    return hilo
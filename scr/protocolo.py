@@ -0,0 +1,272 @@
+# src/protocolo.py
+
+import socket
+import struct
+import zlib
+from enum import IntEnum
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+# Cabecera de cada frame: tipo (1 byte), flags (1 byte), canal (4 bytes) y
+# longitud del payload (4 bytes), todo en orden de red.
+CABECERA = struct.Struct("!BBII")
+TAMANO_CABECERA = CABECERA.size
+
+# Tamaño del buffer de lectura del socket (64 KiB)
+TAMANO_LECTURA = 64 * 1024
+
+# Límite de seguridad para el payload de un único frame (16 MiB)
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+# Canal por defecto para el tráfico de chat de la sesión
+CANAL_CHAT = 0
+
+# Flag de los frames DATOS de las transferencias reanudables: el payload
+# empieza con una CABECERA_BLOQUE con el offset del bloque en el archivo
+# (8 bytes) y el CRC32 de sus datos (4 bytes)
+FLAG_BLOQUE = 0x01
+CABECERA_BLOQUE = struct.Struct("!QI")
+
+# Flags de compresión: el payload (en un bloque, lo que sigue a la
+# CABECERA_BLOQUE) va comprimido con zlib o con lzma. El CRC32 de un bloque
+# es siempre el de los datos sin comprimir.
+FLAG_ZLIB = 0x02
+FLAG_LZMA = 0x04
+FLAGS_COMPRESION = FLAG_ZLIB | FLAG_LZMA
+
+
+class TipoFrame(IntEnum):
+    """
+    Tipos de frame del protocolo de IcoChat.
+    """
+    TEXTO = 1     # Mensaje de chat en texto ("Remitente: contenido")
+    CONTROL = 2   # Mensaje de control ("NOMBRE_EN_USO", "ARCHIVO:...", etc.)
+    DATOS = 3     # Bloque binario de un archivo
+
+
+class Frame(NamedTuple):
+    """
+    Frame completo recibido del servidor.
+    """
+    tipo: int
+    flags: int
+    canal: int
+    payload: bytes
+
+    def texto(self) -> str:
+        """Devuelve el payload decodificado como UTF-8."""
+        return self.payload.decode('utf-8')
+
+
+# Recibe trozos del payload de los frames DATOS de un canal, directamente
+# desde el buffer del decodificador (la vista solo es válida durante la
+# llamada), los bytes del frame que quedan por llegar tras cada trozo y los
+# flags del frame
+Sumidero = Callable[[memoryview, int, int], None]
+
+
+class ErrorProtocolo(Exception):
+    """Error de formato en el flujo de frames."""
+
+
+def codificar_frame(tipo: int, payload: bytes, canal: int = CANAL_CHAT, flags: int = 0) -> bytes:
+    """
+    Codifica un frame con su cabecera de longitud.
+
+    Args:
+        tipo (int): Tipo del frame (ver TipoFrame).
+        payload (bytes): Contenido del frame.
+        canal (int, optional): Canal al que pertenece el frame. Defaults to CANAL_CHAT.
+        flags (int, optional): Flags del frame. Defaults to 0.
+
+    Returns:
+        bytes: El frame listo para enviarse por el socket.
+    """
+    if len(payload) > MAX_PAYLOAD:
+        raise ErrorProtocolo(f"Payload demasiado grande: {len(payload)} bytes")
+    return CABECERA.pack(tipo, flags, canal, len(payload)) + payload
+
+
+def codificar_bloque(canal: int, offset: int, datos: bytes) -> bytes:
+    """
+    Codifica un bloque de una transferencia reanudable como frame DATOS con
+    FLAG_BLOQUE: el payload lleva delante el offset y el CRC32 de los datos.
+    """
+    cabecera = CABECERA_BLOQUE.pack(offset, zlib.crc32(datos))
+    return codificar_frame(TipoFrame.DATOS, cabecera + datos, canal, FLAG_BLOQUE)
+
+
+def codificar_texto(texto: str, canal: int = CANAL_CHAT) -> bytes:
+    """Codifica un mensaje de chat como frame TEXTO."""
+    return codificar_frame(TipoFrame.TEXTO, texto.encode('utf-8'), canal)
+
+
+def codificar_control(comando: str, canal: int = CANAL_CHAT) -> bytes:
+    """Codifica un mensaje de control como frame CONTROL."""
+    return codificar_frame(TipoFrame.CONTROL, comando.encode('utf-8'), canal)
+
+
+def enviar_frame(sock: socket.socket, tipo: int, payload: bytes, canal: int = CANAL_CHAT) -> None:
+    """
+    Envía un frame completo por un socket bloqueante.
+
+    Args:
+        sock (socket.socket): Socket conectado al servidor.
+        tipo (int): Tipo del frame (ver TipoFrame).
+        payload (bytes): Contenido del frame.
+        canal (int, optional): Canal al que pertenece el frame. Defaults to CANAL_CHAT.
+    """
+    sock.sendall(codificar_frame(tipo, payload, canal))
+
+
+def recibir_frame(sock: socket.socket) -> Frame:
+    """
+    Lee exactamente un frame de un socket bloqueante.
+
+    Args:
+        sock (socket.socket): Socket conectado al servidor.
+
+    Returns:
+        Frame: El frame recibido.
+
+    Raises:
+        ConnectionError: Si el servidor cierra la conexión a mitad del frame.
+    """
+    cabecera = _recibir_exacto(sock, TAMANO_CABECERA)
+    tipo, flags, canal, longitud = CABECERA.unpack(cabecera)
+    if longitud > MAX_PAYLOAD:
+        raise ErrorProtocolo(f"Frame demasiado grande: {longitud} bytes")
+    return Frame(tipo, flags, canal, bytes(_recibir_exacto(sock, longitud)))
+
+
+def _recibir_exacto(sock: socket.socket, n: int) -> bytearray:
+    """Lee exactamente `n` bytes del socket sobre un buffer preasignado."""
+    buffer = bytearray(n)
+    vista = memoryview(buffer)
+    recibidos = 0
+    while recibidos < n:
+        leidos = sock.recv_into(vista[recibidos:], n - recibidos)
+        if not leidos:
+            raise ConnectionError("El servidor cerró la conexión a mitad de un frame.")
+        recibidos += leidos
+    return buffer
+
+
+class DecodificadorFrames:
+    """
+    Decodificador incremental de frames.
+
+    Mantiene un único bytearray que crece por duplicación; los frames se
+    extraen avanzando un índice y al compactar solo se mueve el resto de un
+    frame incompleto, de modo que el coste total es lineal en los bytes
+    recibidos. Puede alimentarse con bloques ya leídos (alimentar) o leyendo
+    directamente sobre su buffer libre (obtener_buffer + confirmar), al estilo
+    recv_into.
+
+    Los frames DATOS de los canales con un sumidero registrado no se
+    acumulan: su payload se entrega al sumidero a trozos según llega, sin
+    copiarlo, de modo que el buffer no crece con el tamaño de los frames.
+    """
+
+    def __init__(self, tamano_inicial: int = TAMANO_LECTURA) -> None:
+        self._buffer = bytearray(tamano_inicial)
+        self._inicio = 0  # Primer byte aún no consumido
+        self._fin = 0     # Primer byte libre
+        self.sumideros: Dict[int, Sumidero] = {}
+        # Frame DATOS que se está entregando a un sumidero
+        self._sumidero: Optional[Sumidero] = None
+        self._restante = 0
+        self._flags = 0
+
+    def pendientes(self) -> int:
+        """Número de bytes recibidos que aún no forman un frame completo."""
+        return self._fin - self._inicio
+
+    def obtener_buffer(self, minimo: int = TAMANO_LECTURA) -> memoryview:
+        """
+        Devuelve una vista sobre el espacio libre del buffer, con al menos
+        `minimo` bytes, para leer directamente en él con recv_into.
+        La vista debe liberarse (con `with`) antes de llamar a confirmar.
+        """
+        if len(self._buffer) - self._fin < minimo:
+            self._compactar(minimo)
+        return memoryview(self._buffer)[self._fin:]
+
+    def confirmar(self, n: int) -> List[Frame]:
+        """
+        Marca como recibidos `n` bytes escritos en el buffer devuelto por
+        obtener_buffer y devuelve todos los frames completos.
+        """
+        return list(self.iterar_frames(n))
+
+    def iterar_frames(self, n: int) -> Iterator[Frame]:
+        """
+        Como confirmar, pero entrega los frames de uno en uno: quien los
+        recibe puede registrar un sumidero antes de que se decodifique el
+        siguiente frame del mismo canal.
+        """
+        self._fin += n
+        return self._extraer_frames()
+
+    def alimentar(self, datos: bytes) -> List[Frame]:
+        """
+        Añade un bloque de bytes recibido y devuelve todos los frames completos.
+
+        Args:
+            datos (bytes): Bytes leídos del socket.
+
+        Returns:
+            List[Frame]: Frames completos en orden de llegada (puede estar vacía).
+        """
+        n = len(datos)
+        with self.obtener_buffer(n) as buffer:
+            buffer[:n] = datos
+        return self.confirmar(n)
+
+    def _compactar(self, minimo: int) -> None:
+        """Descarta los bytes consumidos y amplía el buffer si hace falta."""
+        if self._inicio:
+            # Solo queda por mover el resto de un frame incompleto
+            pendientes = self._fin - self._inicio
+            self._buffer[:pendientes] = self._buffer[self._inicio:self._fin]
+            self._inicio, self._fin = 0, pendientes
+        if len(self._buffer) - self._fin < minimo:
+            nuevo_tamano = max(len(self._buffer) * 2, self._fin + minimo)
+            self._buffer.extend(bytes(nuevo_tamano - len(self._buffer)))
+
+    def _extraer_frames(self) -> Iterator[Frame]:
+        """Extrae los frames completos disponibles en el buffer."""
+        while True:
+            if self._restante:
+                # Continuar entregando el payload de un frame DATOS a su sumidero
+                n = min(self._restante, self._fin - self._inicio)
+                if not n:
+                    break
+                inicio = self._inicio
+                self._inicio += n
+                self._restante -= n
+                with memoryview(self._buffer) as vista, vista[inicio:inicio + n] as trozo:
+                    self._sumidero(trozo, self._restante, self._flags)
+                continue
+
+            if self._fin - self._inicio < TAMANO_CABECERA:
+                break
+            tipo, flags, canal, longitud = CABECERA.unpack_from(self._buffer, self._inicio)
+            if longitud > MAX_PAYLOAD:
+                raise ErrorProtocolo(f"Frame demasiado grande: {longitud} bytes")
+            sumidero = self.sumideros.get(canal) if tipo == TipoFrame.DATOS and longitud else None
+            if sumidero:
+                self._inicio += TAMANO_CABECERA
+                self._sumidero, self._restante, self._flags = sumidero, longitud, flags
+                continue
+
+            inicio_payload = self._inicio + TAMANO_CABECERA
+            fin_payload = inicio_payload + longitud
+            if fin_payload > self._fin:
+                break
+            with memoryview(self._buffer) as vista:
+                payload = bytes(vista[inicio_payload:fin_payload])
+            self._inicio = fin_payload
+            yield Frame(tipo, flags, canal, payload)
+
+        if self._inicio == self._fin:
+            self._inicio = self._fin = 0
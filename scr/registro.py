@@ -0,0 +1,210 @@
+# src/registro.py
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import LOG_FILE
+
+# Rotación del archivo de log: al llegar a este tamaño se renombra a
+# icocchat.log.1 (y así hasta COPIAS_LOG) y se empieza uno nuevo
+TAMANO_MAXIMO_LOG = 5 * 1024 * 1024
+COPIAS_LOG = 3
+
+FORMATO_LOG = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Registros que pueden esperar al hilo escritor; si se llena, los nuevos se descartan
+MAX_REGISTROS_PENDIENTES = 10000
+
+# Muestreo: de los registros por debajo de WARNING con la misma plantilla,
+# solo se escriben MAX_REGISTROS_POR_INTERVALO cada INTERVALO_MUESTREO_S
+MAX_REGISTROS_POR_INTERVALO = 20
+INTERVALO_MUESTREO_S = 10.0
+
+# Nivel de cada categoría (nombre de logger) distinto del general. Los
+# eventos frecuentes tienen su propia categoría para poder activarlos sin
+# llenar el log del resto: "IcoChat.mensajes" (cada mensaje enviado o
+# recibido; el texto solo en DEBUG) e "IcoChat.interfaz" (scrollbar, contador
+# de no leídos... en DEBUG) solo registran avisos y errores;
+# "IcoChat.transferencias" (subidas y descargas encoladas, reanudadas o
+# terminadas) y "archi" (refrescos de la lista de archivos, en DEBUG) quedan en
+# INFO aunque cambie el nivel general. Se cambian con VARIABLE_NIVELES.
+NIVELES_POR_CATEGORIA: Dict[str, int] = {
+    "IcoChat.mensajes": logging.WARNING,
+    "IcoChat.interfaz": logging.WARNING,
+    "IcoChat.transferencias": logging.INFO,
+    "archi": logging.INFO,
+    "PIL": logging.WARNING,
+}
+
+# Variable de entorno para cambiar niveles sin tocar el código, p. ej.
+# ICOCHAT_LOG="DEBUG" o ICOCHAT_LOG="IcoChat.mensajes=DEBUG,cliente_async=WARNING"
+VARIABLE_NIVELES = "ICOCHAT_LOG"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Limita cuántos registros iguales se escriben: por cada plantilla de
+    mensaje (el texto antes de sustituir los argumentos) y logger, deja pasar
+    `maximo` registros cada `intervalo_s` y descarta el resto. El primero que
+    pasa en el intervalo siguiente indica cuántos se omitieron. Los registros
+    de nivel WARNING o superior pasan siempre.
+    """
+
+    def __init__(
+        self,
+        maximo: int = MAX_REGISTROS_POR_INTERVALO,
+        intervalo_s: float = INTERVALO_MUESTREO_S,
+        nivel_sin_muestreo: int = logging.WARNING
+    ) -> None:
+        super().__init__()
+        self.maximo = maximo
+        self.intervalo_s = intervalo_s
+        self.nivel_sin_muestreo = nivel_sin_muestreo
+        self._lock = threading.Lock()
+        # (logger, plantilla) -> [inicio del intervalo, escritos, omitidos]
+        self._contadores: Dict[Tuple[str, str], List[float]] = {}
+        self._ultima_limpieza = time.monotonic()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.nivel_sin_muestreo:
+            return True
+        ahora = time.monotonic()
+        clave = (record.name, str(record.msg))
+        with self._lock:
+            if ahora - self._ultima_limpieza >= self.intervalo_s:
+                self._limpiar(ahora)
+            contador = self._contadores.get(clave)
+            if contador is None:
+                contador = self._contadores[clave] = [ahora, 0, 0]
+            elif ahora - contador[0] >= self.intervalo_s:
+                omitidos = contador[2]
+                contador[:] = [ahora, 0, 0]
+                if omitidos:
+                    record.msg = f"{record.getMessage()} (y {omitidos} registros iguales omitidos)"
+                    record.args = None
+            if contador[1] >= self.maximo:
+                contador[2] += 1
+                return False
+            contador[1] += 1
+        return True
+
+    def _limpiar(self, ahora: float) -> None:
+        """Olvida las plantillas sin registros omitidos cuyo intervalo ya pasó."""
+        self._ultima_limpieza = ahora
+        for clave in [c for c, (inicio, _, omitidos) in self._contadores.items()
+                      if ahora - inicio >= self.intervalo_s and not omitidos]:
+            del self._contadores[clave]
+
+
+class ManejadorCola(logging.handlers.QueueHandler):
+    """
+    Pasa los registros al hilo escritor sin darles formato: en el hilo que
+    registra solo se sustituyen los argumentos del mensaje (y solo si el
+    registro pasa el nivel y el muestreo). La fecha y el formato final los
+    pone el hilo escritor. Si la cola está llena, el registro se descarta.
+    """
+
+    def __init__(self, cola: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(cola)
+        self.descartados = 0
+        self._formato_excepcion = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # La traza hay que formatearla aquí: el hilo escritor ya no la tendría
+            record.exc_text = self._formato_excepcion.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+def _niveles_de_entorno() -> Tuple[Optional[int], Dict[str, int]]:
+    """Lee VARIABLE_NIVELES: un nivel general y/o pares categoría=nivel separados por comas."""
+    general: Optional[int] = None
+    niveles: Dict[str, int] = {}
+    for parte in os.environ.get(VARIABLE_NIVELES, "").split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        categoria, _, nombre = parte.rpartition("=")
+        nivel = logging.getLevelName(nombre.strip().upper())
+        if not isinstance(nivel, int):
+            logging.getLogger(__name__).warning("Nivel de log no válido en %s: %s", VARIABLE_NIVELES, parte)
+            continue
+        if categoria:
+            niveles[categoria.strip()] = nivel
+        else:
+            general = nivel
+    return general, niveles
+
+
+def configurar_logging(
+    archivo: Path = LOG_FILE,
+    nivel: int = logging.INFO,
+    niveles: Optional[Dict[str, int]] = None
+) -> None:
+    """
+    Configura el logging de la aplicación: los registros se filtran por nivel
+    y por muestreo en el hilo que registra, y un hilo aparte (QueueListener)
+    los escribe en consola y en `archivo`, que rota por tamaño. No hace nada
+    si el logger raíz ya tiene handlers.
+
+    Args:
+        archivo (Path, optional): Archivo de log. Defaults to LOG_FILE.
+        nivel (int, optional): Nivel general. Defaults to logging.INFO.
+        niveles (Optional[Dict[str, int]], optional): Nivel por categoría.
+            Defaults to NIVELES_POR_CATEGORIA. VARIABLE_NIVELES tiene prioridad.
+    """
+    global _listener
+    logger = logging.getLogger(__name__)
+    raiz = logging.getLogger()
+    # Verificar si el root logger ya tiene handlers
+    if raiz.hasHandlers():
+        logger.info("Logging ya estaba configurado.")
+        return
+
+    general, de_entorno = _niveles_de_entorno()
+    raiz.setLevel(general if general is not None else nivel)
+    for categoria, nivel_categoria in {**(NIVELES_POR_CATEGORIA if niveles is None else niveles), **de_entorno}.items():
+        logging.getLogger(categoria).setLevel(nivel_categoria)
+
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    formato = logging.Formatter(FORMATO_LOG)
+    en_archivo = logging.handlers.RotatingFileHandler(
+        archivo, maxBytes=TAMANO_MAXIMO_LOG, backupCount=COPIAS_LOG, encoding='utf-8', delay=True
+    )
+    en_consola = logging.StreamHandler()
+    for handler in (en_archivo, en_consola):
+        handler.setFormatter(formato)
+
+    en_cola = ManejadorCola(queue.Queue(maxsize=MAX_REGISTROS_PENDIENTES))
+    en_cola.addFilter(FiltroMuestreo())
+    raiz.addHandler(en_cola)
+    _listener = logging.handlers.QueueListener(en_cola.queue, en_archivo, en_consola, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener_logging)
+    logger.info("Configuración de logging inicializada.")
+
+
+def detener_logging() -> None:
+    """Escribe los registros pendientes y detiene el hilo escritor."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,111 @@
+# src/transferencias.py
+
+import json
+import logging
+import os
+import uuid
+import zlib
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Estado de las transferencias reanudables, un archivo JSON por transferencia
+TRANSFERENCIAS_DIR = DATA_DIR / "transferencias"
+
+# Extensión del archivo donde se escribe una descarga hasta completarla
+EXTENSION_PARCIAL = ".parcial"
+
+# Tamaño de lectura al calcular el CRC32 de un bloque
+TAMANO_LECTURA_CRC = 1024 * 1024
+
+
+class EstadoTransferencia(NamedTuple):
+    """
+    Estado guardado de una subida o descarga, para continuarla tras un corte.
+    """
+    id: str
+    tipo: str                # "subida" o "descarga"
+    nombre: str              # Nombre del archivo en el servidor
+    ruta: str                # Archivo local: origen de la subida o destino de la descarga
+    tamano: Optional[int]    # Tamaño total, si se conoce
+    offset: int              # Bytes ya verificados
+    firma: str               # Subida: tamaño y mtime del archivo local; descarga: etag del servidor
+
+
+class RegistroTransferencias:
+    """
+    Guarda en disco el estado de las transferencias en curso. Cada estado se
+    escribe de forma atómica (archivo temporal + os.replace), así que un
+    cierre inesperado deja el estado anterior o el nuevo, nunca uno a medias.
+    """
+
+    def __init__(self, directorio: Path = TRANSFERENCIAS_DIR) -> None:
+        self.directorio = directorio
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+    def nuevo(self, tipo: str, nombre: str, ruta: Path, tamano: Optional[int], firma: str) -> EstadoTransferencia:
+        """Crea y guarda el estado de una transferencia que empieza desde cero."""
+        estado = EstadoTransferencia(uuid.uuid4().hex, tipo, nombre, str(ruta), tamano, 0, firma)
+        self.guardar(estado)
+        return estado
+
+    def buscar(self, tipo: str, nombre: str, ruta: Path) -> Optional[EstadoTransferencia]:
+        """Devuelve el estado pendiente de la misma transferencia, si lo hay."""
+        for estado in self.pendientes():
+            if estado.tipo == tipo and estado.nombre == nombre and estado.ruta == str(ruta):
+                return estado
+        return None
+
+    def guardar(self, estado: EstadoTransferencia) -> None:
+        """Escribe el estado de una transferencia."""
+        ruta = self.directorio / f"{estado.id}.json"
+        temporal = ruta.with_suffix(".tmp")
+        try:
+            temporal.write_text(json.dumps(estado._asdict(), ensure_ascii=False), encoding="utf-8")
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.error("No se pudo guardar el estado de la transferencia %s: %s", estado.nombre, e)
+
+    def borrar(self, estado: EstadoTransferencia) -> None:
+        """Olvida una transferencia terminada o abandonada."""
+        (self.directorio / f"{estado.id}.json").unlink(missing_ok=True)
+
+    def pendientes(self) -> List[EstadoTransferencia]:
+        """Devuelve los estados de todas las transferencias sin terminar."""
+        estados = []
+        for ruta in sorted(self.directorio.glob("*.json")):
+            try:
+                estados.append(EstadoTransferencia(**json.loads(ruta.read_text(encoding="utf-8"))))
+            except (OSError, json.JSONDecodeError, TypeError) as e:
+                logger.error("Estado de transferencia ilegible en %s, se descarta: %s", ruta.name, e)
+                ruta.unlink(missing_ok=True)
+        return estados
+
+
+def crc32_archivo(ruta: Path, offset: int, cantidad: int) -> int:
+    """
+    Calcula el CRC32 de un tramo de archivo. Abre su propio descriptor, así
+    que puede llamarse desde varios hilos a la vez sobre el mismo archivo.
+
+    Args:
+        ruta (Path): Archivo.
+        offset (int): Inicio del tramo.
+        cantidad (int): Bytes del tramo.
+
+    Returns:
+        int: CRC32 del tramo.
+    """
+    bufer = bytearray(min(TAMANO_LECTURA_CRC, cantidad))
+    crc = 0
+    with ruta.open('rb') as archivo, memoryview(bufer) as vista:
+        archivo.seek(offset)
+        while cantidad > 0:
+            leidos = archivo.readinto(vista[:min(len(bufer), cantidad)])
+            if not leidos:
+                break
+            crc = zlib.crc32(vista[:leidos], crc)
+            cantidad -= leidos
+    return crc
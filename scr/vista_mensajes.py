@@ -0,0 +1,469 @@
+# src/vista_mensajes.py
+
+import bisect
+import itertools
+import logging
+import tkinter as tk
+import tkinter.font as tkfont
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Colores de la vista (mismos que el resto de ChatUI)
+COLOR_FONDO = "#2D2D2D"
+COLOR_TEXTO = "white"
+COLOR_REMITENTE_PROPIO = "white"
+COLOR_REMITENTE_OTRO = "#FFA500"  # Naranja
+
+# Ancho del contenido antes de hacer salto de línea mientras el canvas aún no
+# tiene tamaño; después se ajusta al ancho del canvas
+WRAPLENGTH = 500
+
+# Ancho mínimo del contenido, por estrecha que sea la ventana
+WRAPLENGTH_MINIMO = 100
+
+# Espacio horizontal de la fila que no ocupa el texto: padx de las etiquetas
+# (10 + 5 y 0 + 10) más el borde y el relleno interno de cada Label
+MARGEN_HORIZONTAL_FILA = 40
+
+# Espera tras el último cambio de ancho antes de recolocar el texto (ms)
+RETARDO_REAJUSTE_MS = 100
+
+# Filas extra que se mantienen montadas por encima y por debajo de la zona visible
+MARGEN_FILAS = 10
+
+# Filas alrededor de la zona visible cuya altura se vuelve a estimar al
+# cambiar el ancho; las demás se escalan y se estiman al acercarse a la vista
+MARGEN_REESTIMAR = 100
+
+# Separación vertical alrededor de cada fila (pady=2 del frame de la fila)
+PADY_FILA = 2
+
+
+# Color de fondo con el que se resalta un mensaje al saltar a él
+COLOR_RESALTADO = "#5A4A2D"
+DURACION_RESALTADO_MS = 1500
+
+
+class Mensaje(NamedTuple):
+    """
+    Mensaje del chat guardado como dato ligero, sin widgets.
+    """
+    remitente: str
+    contenido: str
+    id_mensaje: Optional[int] = None  # Id en el historial, si se conoce
+
+
+class FilaMensaje:
+    """
+    Fila reutilizable de la vista: un Frame con la etiqueta del remitente y
+    la del contenido.
+    """
+
+    def __init__(self, canvas: tk.Canvas, fuente: Tuple[str, int]) -> None:
+        self.frame = tk.Frame(canvas, bg=COLOR_FONDO)
+        self.etiqueta_remitente = tk.Label(
+            self.frame,
+            bg=COLOR_FONDO,
+            font=(fuente[0], fuente[1], "bold"),
+            anchor='w'
+        )
+        self.etiqueta_remitente.pack(side=tk.LEFT, padx=(10, 5), pady=2)
+        self.etiqueta_contenido = tk.Label(
+            self.frame,
+            bg=COLOR_FONDO,
+            fg=COLOR_TEXTO,
+            font=fuente,
+            wraplength=WRAPLENGTH,
+            justify='left'
+        )
+        self.etiqueta_contenido.pack(side=tk.LEFT, padx=(0, 10), pady=2, fill=tk.BOTH, expand=True)
+        self.item = canvas.create_window(0, 0, window=self.frame, anchor='nw', state='hidden')
+        self.indice: Optional[int] = None
+
+    def mostrar(self, mensaje: Mensaje, wraplength: int, resaltado: bool = False) -> None:
+        """Rellena la fila con los datos de un mensaje, con el texto partido a wraplength píxeles."""
+        fg_remitente = COLOR_REMITENTE_PROPIO if mensaje.remitente == "Tú" else COLOR_REMITENTE_OTRO
+        bg = COLOR_RESALTADO if resaltado else COLOR_FONDO
+        self.frame.configure(bg=bg)
+        self.etiqueta_remitente.configure(text=f"{mensaje.remitente}: ", fg=fg_remitente, bg=bg)
+        self.etiqueta_contenido.configure(text=mensaje.contenido, bg=bg, wraplength=wraplength)
+
+
+class VistaMensajes:
+    """
+    Lista virtualizada de mensajes sobre un Canvas.
+
+    Los mensajes se guardan como datos y solo las filas cercanas a la zona
+    visible tienen widgets, que se reciclan desde un pool al desplazarse.
+    La altura de cada fila se estima con las métricas de la fuente y se
+    corrige con la altura real la primera vez que la fila se muestra. El
+    texto se parte al ancho del canvas; al cambiar este, solo se vuelven a
+    estimar las filas cercanas a la zona visible. Las demás escalan su
+    altura con el ancho y se estiman cuando se acercan a la vista.
+    """
+
+    def __init__(
+        self,
+        canvas: tk.Canvas,
+        fuente: Tuple[str, int],
+        yscrollcommand: Optional[Callable[[str, str], None]] = None,
+        al_llegar_arriba: Optional[Callable[[], None]] = None,
+        al_llegar_abajo: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Args:
+            canvas (tk.Canvas): Canvas sobre el que se dibujan las filas.
+            fuente (Tuple[str, int]): Fuente del contenido de los mensajes.
+            yscrollcommand (Optional[Callable], optional): Callback de la scrollbar asociada.
+            al_llegar_arriba (Optional[Callable], optional): Se llama cuando el usuario
+                se desplaza hasta el principio, para cargar mensajes más antiguos.
+            al_llegar_abajo (Optional[Callable], optional): Se llama cuando el usuario
+                se desplaza hasta el final, para cargar mensajes más recientes si la
+                vista muestra una parte intermedia del historial.
+        """
+        self.canvas = canvas
+        self.fuente = fuente
+        self._yscrollcommand = yscrollcommand
+        self._al_llegar_arriba = al_llegar_arriba
+        self._al_llegar_abajo = al_llegar_abajo
+        self._carga_pendiente = False
+        self._font = tkfont.Font(canvas, font=fuente)
+        self._font_negrita = tkfont.Font(canvas, font=(fuente[0], fuente[1], "bold"))
+        self._alto_linea = max(self._font.metrics("linespace"), self._font_negrita.metrics("linespace"))
+
+        self.mensajes: List[Mensaje] = []
+        self._alturas: List[int] = []
+        self._offsets: List[int] = [0]  # _offsets[i] = y de la fila i; el último es la altura total
+        self._medidas: List[bool] = []  # True si la altura ya es la real
+        self._vigentes: List[bool] = []  # True si la altura se calculó con el ancho actual
+        self._filas_montadas: Dict[int, FilaMensaje] = {}
+        self._pool: List[FilaMensaje] = []
+        self._render_pendiente = False
+        self._resaltado: Optional[int] = None  # Id del mensaje resaltado
+        self._ancho: Optional[int] = None  # Ancho del canvas con el que se calcularon las alturas
+        self._reajuste_pendiente: Optional[str] = None
+
+        self.canvas.configure(yscrollcommand=self._on_yscroll)
+        self.canvas.bind("<Configure>", self._on_configure, add="+")
+
+    # ----------------------------
+    # Datos
+    # ----------------------------
+    def agregar(self, remitente: str, contenido: str) -> None:
+        """Añade un mensaje al final de la vista."""
+        self.agregar_varios([Mensaje(remitente, contenido)])
+
+    def agregar_varios(self, mensajes: List[Mensaje]) -> None:
+        """Añade varios mensajes al final de la vista con un único re-render."""
+        for mensaje in mensajes:
+            altura = self._estimar_altura(mensaje)
+            self.mensajes.append(mensaje)
+            self._alturas.append(altura)
+            self._medidas.append(False)
+            self._vigentes.append(True)
+            self._offsets.append(self._offsets[-1] + altura)
+        self._actualizar_scrollregion()
+        self.programar_render()
+
+    def anteponer_varios(self, mensajes: List[Mensaje]) -> None:
+        """
+        Añade mensajes más antiguos al principio de la vista manteniendo fija
+        la posición que el usuario está viendo.
+        """
+        if not mensajes:
+            return
+        y_visible = self.canvas.canvasy(0)
+        alturas = [self._estimar_altura(mensaje) for mensaje in mensajes]
+        self.mensajes[:0] = mensajes
+        self._alturas[:0] = alturas
+        self._medidas[:0] = [False] * len(mensajes)
+        self._vigentes[:0] = [True] * len(mensajes)
+        self._offsets = [0, *itertools.accumulate(self._alturas)]
+
+        # Los índices de las filas montadas han cambiado: devolverlas al pool
+        self._desmontar_filas()
+
+        self._actualizar_scrollregion()
+        self.canvas.yview_moveto((y_visible + sum(alturas)) / max(self.altura_total(), 1))
+        self.render()
+
+    def reemplazar(self, mensajes: List[Mensaje]) -> None:
+        """Sustituye todos los mensajes de la vista por otros (p. ej. otra página del historial)."""
+        self._desmontar_filas()
+        self.mensajes = []
+        self._alturas = []
+        self._offsets = [0]
+        self._medidas = []
+        self._vigentes = []
+        self.agregar_varios(mensajes)
+
+    def altura_total(self) -> int:
+        """Altura total del contenido en píxeles."""
+        return self._offsets[-1]
+
+    def indice_de_id(self, id_mensaje: int) -> Optional[int]:
+        """Busca la posición de un mensaje por su id en el historial."""
+        # Los ids crecen con la posición: búsqueda desde el final, donde suelen estar
+        for indice in range(len(self.mensajes) - 1, -1, -1):
+            actual = self.mensajes[indice].id_mensaje
+            if actual == id_mensaje:
+                return indice
+            if actual is not None and actual < id_mensaje:
+                break
+        return None
+
+    def ir_a_id(self, id_mensaje: int) -> bool:
+        """
+        Desplaza la vista hasta un mensaje y lo resalta brevemente.
+
+        Returns:
+            bool: False si el mensaje no está cargado en la vista.
+        """
+        indice = self.indice_de_id(id_mensaje)
+        if indice is None:
+            return False
+        # Centrar la fila en la zona visible
+        y = self._offsets[indice] - (self.canvas.winfo_height() - self._alturas[indice]) / 2
+        self.canvas.yview_moveto(max(y, 0) / max(self.altura_total(), 1))
+        self._resaltado = id_mensaje
+        self._refrescar_montadas()
+        self.canvas.after(DURACION_RESALTADO_MS, self._quitar_resaltado)
+        return True
+
+    def _quitar_resaltado(self) -> None:
+        self._resaltado = None
+        self._refrescar_montadas()
+
+    def _refrescar_montadas(self) -> None:
+        """Vuelve a pintar las filas montadas (p. ej. tras cambiar el resaltado)."""
+        self.render()
+        for indice, fila in self._filas_montadas.items():
+            self._mostrar_fila(fila, indice)
+
+    def _mostrar_fila(self, fila: FilaMensaje, indice: int) -> None:
+        mensaje = self.mensajes[indice]
+        fila.mostrar(mensaje, self._ancho_contenido(mensaje.remitente), self._resaltar(mensaje))
+
+    def _resaltar(self, mensaje: Mensaje) -> bool:
+        return self._resaltado is not None and mensaje.id_mensaje == self._resaltado
+
+    def ir_al_final(self) -> None:
+        """Desplaza la vista hasta el último mensaje."""
+        self.canvas.yview_moveto(1.0)
+        self.render()
+
+    # ----------------------------
+    # Render
+    # ----------------------------
+    def programar_render(self) -> None:
+        """Agrupa varias peticiones de render en una sola al quedar Tk ocioso."""
+        if not self._render_pendiente:
+            self._render_pendiente = True
+            self.canvas.after_idle(self.render)
+
+    def render(self) -> None:
+        """Monta las filas visibles y devuelve al pool las que han salido de la vista."""
+        self._render_pendiente = False
+        if not self.mensajes:
+            return
+        y_inicio = self.canvas.canvasy(0)
+        y_fin = y_inicio + self.canvas.winfo_height()
+        primero, ultimo = self._rango_visible(y_inicio, y_fin)
+        # Filas que se acercan a la vista con la altura escalada tras un cambio de ancho
+        if self._reestimar(primero - MARGEN_REESTIMAR, ultimo + MARGEN_REESTIMAR):
+            self._actualizar_scrollregion()
+            primero, ultimo = self._rango_visible(y_inicio, y_fin)
+
+        # Liberar filas fuera del rango
+        for indice in [i for i in self._filas_montadas if i < primero or i >= ultimo]:
+            fila = self._filas_montadas.pop(indice)
+            self.canvas.itemconfigure(fila.item, state='hidden')
+            fila.indice = None
+            self._pool.append(fila)
+
+        # Montar filas nuevas
+        nuevas = []
+        for indice in range(primero, ultimo):
+            if indice in self._filas_montadas:
+                continue
+            fila = self._pool.pop() if self._pool else FilaMensaje(self.canvas, self.fuente)
+            self._mostrar_fila(fila, indice)
+            fila.indice = indice
+            self._filas_montadas[indice] = fila
+            nuevas.append(fila)
+
+        if nuevas and self._corregir_alturas(nuevas):
+            self._actualizar_scrollregion()
+        for indice, fila in self._filas_montadas.items():
+            self.canvas.coords(fila.item, 0, self._offsets[indice] + PADY_FILA)
+            self.canvas.itemconfigure(fila.item, state='normal')
+
+    def _rango_visible(self, y_inicio: float, y_fin: float) -> Tuple[int, int]:
+        """Índices [primero, ultimo) de las filas a montar para la zona visible, con margen."""
+        primero = max(0, bisect.bisect_right(self._offsets, y_inicio) - 1 - MARGEN_FILAS)
+        ultimo = min(len(self.mensajes), bisect.bisect_left(self._offsets, y_fin) + MARGEN_FILAS)
+        return primero, ultimo
+
+    def _corregir_alturas(self, filas: List[FilaMensaje]) -> bool:
+        """Sustituye la altura estimada por la real. Devuelve True si alguna cambió."""
+        self.canvas.update_idletasks()
+        cambio = False
+        for fila in filas:
+            indice = fila.indice
+            if self._medidas[indice]:
+                continue
+            self._medidas[indice] = self._vigentes[indice] = True
+            altura = fila.frame.winfo_reqheight() + 2 * PADY_FILA
+            if altura != self._alturas[indice]:
+                self._alturas[indice] = altura
+                cambio = True
+        if cambio:
+            self._offsets = [0, *itertools.accumulate(self._alturas)]
+        return cambio
+
+    def _desmontar_filas(self) -> None:
+        """Oculta todas las filas montadas y las devuelve al pool."""
+        for fila in self._filas_montadas.values():
+            self.canvas.itemconfigure(fila.item, state='hidden')
+            fila.indice = None
+            self._pool.append(fila)
+        self._filas_montadas.clear()
+
+    def _on_configure(self, evento: tk.Event) -> None:
+        """Re-renderiza al cambiar el tamaño y, si cambió el ancho, programa recolocar el texto."""
+        if evento.width != self._ancho:
+            if self._ancho is None:
+                # Primer tamaño del canvas: recolocar ya, aún no hay nada a la vista
+                self._reajustar()
+            elif self._reajuste_pendiente is None:
+                # Mientras se arrastra el borde llegan muchos eventos: recolocar una vez
+                self._reajuste_pendiente = self.canvas.after(RETARDO_REAJUSTE_MS, self._reajustar)
+        self.programar_render()
+
+    def _reajustar(self) -> None:
+        """
+        Adapta las alturas al ancho actual del canvas y monta de nuevo las
+        filas visibles, manteniendo a la vista el mismo mensaje. Solo se
+        miden las filas cercanas a la vista; las demás escalan su número de
+        líneas con el ancho, sin medir el texto.
+        """
+        self._reajuste_pendiente = None
+        ancho = self.canvas.winfo_width()
+        if ancho == self._ancho:
+            return
+        ancho_anterior, self._ancho = self._ancho, ancho
+        if not self.mensajes:
+            return
+        al_final = self.canvas.yview()[1] >= 1.0
+        y_visible = self.canvas.canvasy(0)
+        primero = max(0, bisect.bisect_right(self._offsets, y_visible) - 1)
+        desplazamiento = y_visible - self._offsets[primero]
+
+        factor = self._ancho_texto(ancho_anterior) / self._ancho_texto(ancho)
+        fijo = 4 + 2 * PADY_FILA
+        self._alturas = [
+            max(1, round((altura - fijo) / self._alto_linea * factor)) * self._alto_linea + fijo
+            for altura in self._alturas
+        ]
+        self._medidas = [False] * len(self.mensajes)
+        self._vigentes = [False] * len(self.mensajes)
+        if not self._reestimar(primero - MARGEN_REESTIMAR, primero + MARGEN_REESTIMAR):
+            self._offsets = [0, *itertools.accumulate(self._alturas)]
+        self._desmontar_filas()
+        self._actualizar_scrollregion()
+
+        if al_final:
+            self.canvas.yview_moveto(1.0)
+        else:
+            desplazamiento = min(desplazamiento, self._alturas[primero])
+            self.canvas.yview_moveto((self._offsets[primero] + desplazamiento) / max(self.altura_total(), 1))
+        self.render()
+
+    def _reestimar(self, desde: int, hasta: int) -> bool:
+        """
+        Estima con el ancho actual las alturas desfasadas de las filas
+        [desde, hasta). Devuelve True si alguna cambió.
+        """
+        cambio = False
+        for indice in range(max(desde, 0), min(hasta, len(self.mensajes))):
+            if self._vigentes[indice]:
+                continue
+            self._vigentes[indice] = True
+            altura = self._estimar_altura(self.mensajes[indice])
+            if altura != self._alturas[indice]:
+                self._alturas[indice] = altura
+                cambio = True
+        if cambio:
+            self._offsets = [0, *itertools.accumulate(self._alturas)]
+        return cambio
+
+    @staticmethod
+    def _ancho_texto(ancho_canvas: Optional[int]) -> int:
+        """Ancho aproximado del texto de una fila, sin contar el remitente, para escalar alturas."""
+        if ancho_canvas is None:
+            return WRAPLENGTH
+        return max(ancho_canvas - MARGEN_HORIZONTAL_FILA, WRAPLENGTH_MINIMO)
+
+    def _ancho_contenido(self, remitente: str) -> int:
+        """Ancho al que se parte el contenido de una fila, según el canvas y el remitente."""
+        if self._ancho is None:
+            return WRAPLENGTH
+        ancho = self._ancho - MARGEN_HORIZONTAL_FILA - self._font_negrita.measure(f"{remitente}: ")
+        return max(ancho, WRAPLENGTH_MINIMO)
+
+    def _estimar_altura(self, mensaje: Mensaje) -> int:
+        """Estima la altura de una fila a partir del número de líneas del contenido."""
+        lineas = self._contar_lineas(mensaje.contenido, self._ancho_contenido(mensaje.remitente))
+        return lineas * self._alto_linea + 4 + 2 * PADY_FILA
+
+    def _contar_lineas(self, texto: str, ancho_maximo: int) -> int:
+        """Cuenta las líneas que ocupará el texto con el salto de línea por palabras de Tk."""
+        lineas = 0
+        for parrafo in texto.split("\n"):
+            if self._font.measure(parrafo) <= ancho_maximo:
+                lineas += 1
+                continue
+            ancho = 0
+            lineas += 1
+            espacio = self._font.measure(" ")
+            for palabra in parrafo.split(" "):
+                ancho_palabra = self._font.measure(palabra)
+                if ancho and ancho + espacio + ancho_palabra > ancho_maximo:
+                    lineas += 1
+                    ancho = ancho_palabra
+                else:
+                    ancho += (espacio if ancho else 0) + ancho_palabra
+                # Palabras más largas que la línea se parten en varias
+                while ancho > ancho_maximo:
+                    lineas += 1
+                    ancho -= ancho_maximo
+        return max(lineas, 1)
+
+    def _actualizar_scrollregion(self) -> None:
+        """Ajusta la región desplazable a la altura total de los mensajes."""
+        ancho = max(self.canvas.winfo_width(), 1)
+        self.canvas.configure(scrollregion=(0, 0, ancho, self.altura_total()))
+
+    def _on_yscroll(self, primero: str, ultimo: str) -> None:
+        """Reenvía la posición a la scrollbar y re-renderiza las filas visibles."""
+        if self._yscrollcommand:
+            self._yscrollcommand(primero, ultimo)
+        self.programar_render()
+        # Al llegar arriba del todo, pedir la página anterior (una sola vez por llegada)
+        if (self._al_llegar_arriba and float(primero) <= 0.0 and float(ultimo) < 1.0
+                and not self._carga_pendiente):
+            self._carga_pendiente = True
+            self.canvas.after_idle(self._cargar, self._al_llegar_arriba)
+        # Y al llegar abajo, la siguiente (si la vista no llega al final del historial)
+        elif (self._al_llegar_abajo and float(ultimo) >= 1.0 and float(primero) > 0.0
+                and not self._carga_pendiente):
+            self._carga_pendiente = True
+            self.canvas.after_idle(self._cargar, self._al_llegar_abajo)
+
+    def _cargar(self, callback: Callable[[], None]) -> None:
+        """Llama a un callback de carga de mensajes antiguos o recientes."""
+        try:
+            callback()
+        finally:
+            self._carga_pendiente = False
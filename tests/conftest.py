@@ -0,0 +1,12 @@
+# tests/conftest.py
+"""
+Los módulos de la aplicación se importan por nombre desde scr/ (como hace
+IcoChat.py) y los servidores de prueba desde herramientas/.
+"""
+
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / "herramientas"))
+sys.path.insert(0, str(RAIZ / "scr"))
@@ -0,0 +1,54 @@
+# tests/test_bandeja_salida.py
+
+import shutil
+
+import pytest
+
+from bandeja_salida import BandejaSalida
+
+
+def textos(bandeja):
+    return [mensaje.texto for mensaje in bandeja.pendientes()]
+
+
+def test_guarda_en_orden_y_sobrevive_al_reinicio(tmp_path):
+    bandeja = BandejaSalida(tmp_path / "bandeja")
+    for i in range(12):
+        bandeja.agregar(f"mensaje {i}")
+    assert len(bandeja) == 12
+    assert textos(bandeja) == [f"mensaje {i}" for i in range(12)]
+
+    reabierta = BandejaSalida(tmp_path / "bandeja")
+    assert textos(reabierta) == textos(bandeja)
+    assert [m.id for m in reabierta.pendientes()] == [m.id for m in bandeja.pendientes()]
+    # La secuencia sigue donde se quedó
+    assert reabierta.agregar("otro").secuencia == 13
+
+
+def test_confirmar_borra_el_mensaje(tmp_path):
+    bandeja = BandejaSalida(tmp_path / "bandeja")
+    primero = bandeja.agregar("uno")
+    bandeja.agregar("dos")
+    assert bandeja.confirmar(primero.id)
+    assert not bandeja.confirmar(primero.id)  # Confirmación repetida
+    assert textos(bandeja) == ["dos"]
+    assert len(list((tmp_path / "bandeja").glob("*.json"))) == 1
+    assert textos(BandejaSalida(tmp_path / "bandeja")) == ["dos"]
+
+
+def test_agregar_falla_si_no_se_puede_guardar(tmp_path):
+    bandeja = BandejaSalida(tmp_path / "bandeja")
+    bandeja.agregar("guardado")
+    shutil.rmtree(tmp_path / "bandeja")
+    with pytest.raises(OSError):
+        bandeja.agregar("perdido")
+    assert textos(bandeja) == ["guardado"]
+
+
+def test_descarta_mensajes_ilegibles(tmp_path):
+    bandeja = BandejaSalida(tmp_path / "bandeja")
+    bandeja.agregar("bueno")
+    roto = tmp_path / "bandeja" / "000000000002-roto.json"
+    roto.write_text("{no es json", encoding="utf-8")
+    assert textos(BandejaSalida(tmp_path / "bandeja")) == ["bueno"]
+    assert not roto.exists()
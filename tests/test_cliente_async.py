@@ -0,0 +1,115 @@
+# tests/test_cliente_async.py
+"""
+Bandeja de salida y reconexión del cliente contra el servidor de referencia,
+arrancado en un bucle propio para poder cortar conexiones desde la prueba.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bandeja_salida import BandejaSalida
+from cliente_async import ClienteAsync, EstadoConexion
+from servidor_inestable import ServidorInestable
+from servidor_referencia import ServidorReferencia, servir
+
+
+@pytest.fixture
+def arrancar():
+    """Arranca un servidor en un hilo y devuelve (bucle, puerto)."""
+    bucles = []
+
+    def arrancar(servidor):
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name="servidor-prueba", daemon=True).start()
+        srv = asyncio.run_coroutine_threadsafe(servir(servidor, "127.0.0.1", 0), loop).result(5)
+        bucles.append(loop)
+        return loop, srv.sockets[0].getsockname()[1]
+
+    yield arrancar
+    for loop in bucles:
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def esperar(condicion, timeout=30.0):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        assert time.monotonic() < limite, "la condición no se cumplió a tiempo"
+        time.sleep(0.02)
+
+
+def test_la_bandeja_se_vacia_sin_duplicados_pese_a_los_cortes(tmp_path, arrancar):
+    servidor = ServidorInestable(tmp_path / "servidor", prob_corte=0.3, prob_corrupcion=0.0, semilla=4)
+    _, puerto = arrancar(servidor)
+    recibidos = []
+    recibir_mensaje = servidor.recibir_mensaje
+
+    def registrar(conexion, id_mensaje, texto):
+        antes = servidor.mensajes_recibidos
+        recibir_mensaje(conexion, id_mensaje, texto)
+        if servidor.mensajes_recibidos > antes:
+            recibidos.append(texto)
+
+    servidor.recibir_mensaje = registrar
+    cliente = ClienteAsync(
+        "127.0.0.1", puerto, lambda frame: None, bandeja=BandejaSalida(tmp_path / "bandeja"), reconectar=True
+    )
+    try:
+        # Escritos sin conexión: quedan en la bandeja hasta presentarse
+        for i in range(40):
+            cliente.ejecutar(cliente.enviar_chat(f"mensaje {i}")).result(5)
+        assert cliente.mensajes_pendientes() == 40
+        cliente.ejecutar(cliente.connect("ana")).result(10)
+        esperar(lambda: cliente.mensajes_pendientes() == 0)
+    finally:
+        cliente.cerrar()
+    assert servidor.estadisticas()["cortes"] > 0
+    assert recibidos == [f"mensaje {i}" for i in range(40)]
+    assert list((tmp_path / "bandeja").glob("*.json")) == []
+
+
+def test_sesion_rechazada_al_reconectar_cierra_la_conexion(tmp_path, arrancar):
+    servidor = ServidorReferencia(tmp_path / "servidor", iteraciones_pbkdf2=1000)
+    loop, puerto = arrancar(servidor)
+    estados = []
+    cliente = ClienteAsync("127.0.0.1", puerto, lambda frame: None, reconectar=True, al_cambiar_estado=estados.append)
+
+    async def caducar_sesiones():
+        servidor.sesiones.clear()
+        for conexion in list(servidor.conexiones):
+            conexion.transporte.abort()
+
+    try:
+        cliente.ejecutar(cliente.iniciar_sesion("ana@example.com", "clave")).result(10)
+        cliente.ejecutar(cliente.presentarse("ana")).result(5)
+        assert cliente.token_sesion and estados == [EstadoConexion.CONECTADO]
+
+        asyncio.run_coroutine_threadsafe(caducar_sesiones(), loop).result(5)
+        esperar(lambda: EstadoConexion.SESION_CADUCADA in estados, 10)
+        # No se pasa por DESCONECTADO ni se sigue reintentando
+        assert estados == [EstadoConexion.CONECTADO, EstadoConexion.RECONECTANDO, EstadoConexion.SESION_CADUCADA]
+        assert not cliente.conectado
+        esperar(lambda: not servidor.conexiones, 5)
+
+        # Con la contraseña se vuelve a entrar
+        cliente.ejecutar(cliente.iniciar_sesion("ana@example.com", "clave")).result(10)
+        assert cliente.conectado and estados[-1] is EstadoConexion.CONECTADO
+    finally:
+        cliente.cerrar()
+
+
+def test_enviar_chat_guarda_en_orden_los_mensajes_simultaneos(tmp_path):
+    bandeja = BandejaSalida(tmp_path / "bandeja")
+    cliente = ClienteAsync("127.0.0.1", 1, lambda frame: None, bandeja=bandeja)
+
+    async def enviar_varios():
+        await asyncio.gather(*(cliente.enviar_chat(f"mensaje {i}") for i in range(50)))
+
+    try:
+        cliente.ejecutar(enviar_varios()).result(10)
+    finally:
+        cliente.cerrar()
+    assert [m.texto for m in bandeja.pendientes()] == [f"mensaje {i}" for i in range(50)]
+    assert [m.texto for m in BandejaSalida(tmp_path / "bandeja").pendientes()] == [f"mensaje {i}" for i in range(50)]
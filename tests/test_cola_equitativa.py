@@ -0,0 +1,86 @@
+# tests/test_cola_equitativa.py
+
+import asyncio
+
+import pytest
+
+from cola_equitativa import ColaEquitativa
+
+
+def sacar_todo(cola):
+    frames = []
+    while not cola.vacia():
+        frames.append(cola.sacar())
+    return frames
+
+
+def test_reparte_los_bytes_entre_canales():
+    async def prueba():
+        cola = ColaEquitativa(cupo=1000, max_por_canal=100)
+        # Canal 1 con frames pequeños y canal 2 con frames grandes
+        for i in range(40):
+            await cola.poner(1, (1, i, 100), 100)
+        for i in range(4):
+            await cola.poner(2, (2, i, 1000), 1000)
+        return sacar_todo(cola)
+
+    frames = asyncio.run(prueba())
+    assert len(frames) == 44
+    # Dentro de cada canal, en orden
+    assert [f[1] for f in frames if f[0] == 1] == list(range(40))
+    assert [f[1] for f in frames if f[0] == 2] == list(range(4))
+    # Mientras los dos tienen frames, ninguno se adelanta al otro más de un cupo
+    enviados = {1: 0, 2: 0}
+    for canal, _, tamano in frames:
+        enviados[canal] += tamano
+        if enviados[2] < 4000:
+            assert abs(enviados[1] - enviados[2]) <= 1000
+
+
+def test_canal_sin_frames_no_acumula_deficit():
+    async def prueba():
+        cola = ColaEquitativa(cupo=1000, max_por_canal=100)
+        # Al canal 1 le sobrarían 900 bytes de su turno si los guardase
+        await cola.poner(1, "a1", 100)
+        assert sacar_todo(cola) == ["a1"]
+        for i in range(3):
+            await cola.poner(1, f"a{i + 2}", 500)
+            await cola.poner(2, f"b{i + 1}", 500)
+        return sacar_todo(cola)
+
+    assert asyncio.run(prueba()) == ["b1", "b2", "a2", "a3", "b3", "a4"]
+
+
+def test_poner_espera_si_el_canal_esta_lleno():
+    async def prueba():
+        cola = ColaEquitativa(cupo=100, max_por_canal=2)
+        await cola.poner(1, "f1", 10)
+        await cola.poner(1, "f2", 10)
+        tercero = asyncio.ensure_future(cola.poner(1, "f3", 10))
+        await asyncio.sleep(0)
+        assert not tercero.done()
+        # Otro canal no se ve frenado
+        await asyncio.wait_for(cola.poner(2, "g1", 10), 1)
+        assert {cola.sacar(), cola.sacar()} == {"f1", "g1"}
+        await asyncio.wait_for(tercero, 1)
+        return len(cola), sacar_todo(cola)
+
+    assert asyncio.run(prueba()) == (2, ["f2", "f3"])
+
+
+def test_descartar_y_vaciar():
+    async def prueba():
+        cola = ColaEquitativa(cupo=100, max_por_canal=1)
+        await cola.poner(1, "f1", 10)
+        await cola.poner(2, "g1", 10)
+        await cola.poner(3, "h1", 10)
+        assert cola.descartar(2) == ["g1"]
+        assert cola.descartar(2) == []
+        esperando = asyncio.ensure_future(cola.poner(1, "f2", 10))
+        await asyncio.sleep(0)
+        pendientes = cola.vaciar(ConnectionError("cortada"))
+        with pytest.raises(ConnectionError):
+            await esperando
+        return pendientes, cola.vacia(), len(cola)
+
+    assert asyncio.run(prueba()) == (["f1", "h1"], True, 0)
@@ -0,0 +1,73 @@
+# tests/test_compresion.py
+
+import os
+
+import pytest
+
+from compresion import Descompresor, comprimir, descomprimir, elegir_algoritmo, es_comprimible
+from protocolo import FLAG_LZMA, FLAG_ZLIB, ErrorProtocolo
+
+TEXTO = b"".join(b"%06d INFO usuario conectado desde 10.0.0.%d\n" % (i, i % 255) for i in range(20000))
+
+
+def test_elegir_algoritmo():
+    assert elegir_algoritmo(["brotli", "lzma", "zlib"]) == "lzma"
+    assert elegir_algoritmo(["zlib", "lzma"]) == "zlib"
+    assert elegir_algoritmo(["brotli", ""]) is None
+
+
+@pytest.mark.parametrize("algoritmo, flag", [("zlib", FLAG_ZLIB), ("lzma", FLAG_LZMA)])
+def test_ida_y_vuelta(algoritmo, flag):
+    comprimido, flags = comprimir(TEXTO, algoritmo)
+    assert flags == flag
+    assert len(comprimido) < len(TEXTO) // 4
+    assert descomprimir(comprimido, flags) == TEXTO
+
+
+@pytest.mark.parametrize("algoritmo", ["zlib", "lzma"])
+def test_no_comprime_lo_que_no_ahorra(algoritmo):
+    assert comprimir(os.urandom(64 * 1024), algoritmo) is None
+
+
+@pytest.mark.parametrize("algoritmo", ["zlib", "lzma"])
+def test_descompresor_por_trozos(algoritmo):
+    comprimido, flags = comprimir(TEXTO, algoritmo)
+    descompresor = Descompresor(flags)
+    salida = b"".join(descompresor.descomprimir(comprimido[i:i + 777]) for i in range(0, len(comprimido), 777))
+    descompresor.terminar()
+    assert salida == TEXTO
+
+
+def test_descompresor_limita_el_tamano():
+    comprimido, flags = comprimir(bytes(1024 * 1024), "zlib")
+    with pytest.raises(ErrorProtocolo):
+        descomprimir(comprimido, flags, limite=1024 * 1024 - 1)
+    assert len(descomprimir(comprimido, flags, limite=1024 * 1024)) == 1024 * 1024
+
+
+def test_descompresor_detecta_datos_incompletos_o_de_mas():
+    comprimido, flags = comprimir(TEXTO, "zlib")
+    with pytest.raises(ErrorProtocolo):
+        descomprimir(comprimido[:-10], flags)
+    with pytest.raises(ErrorProtocolo):
+        descomprimir(comprimido + b"resto", flags)
+    with pytest.raises(ErrorProtocolo):
+        descomprimir(b"no es zlib" * 10, flags)
+    with pytest.raises(ErrorProtocolo):
+        Descompresor(0)
+
+
+def test_es_comprimible(tmp_path):
+    texto = tmp_path / "registro.log"
+    texto.write_bytes(TEXTO)
+    aleatorio = tmp_path / "datos.bin"
+    aleatorio.write_bytes(os.urandom(512 * 1024))
+    zip_de_texto = tmp_path / "registro.zip"
+    zip_de_texto.write_bytes(TEXTO)
+    pequeno = tmp_path / "nota.txt"
+    pequeno.write_bytes(b"hola" * 10)
+    assert es_comprimible(texto)
+    assert not es_comprimible(aleatorio)
+    assert not es_comprimible(zip_de_texto)  # Por la extensión, sin mirar el contenido
+    assert not es_comprimible(pequeno)
+
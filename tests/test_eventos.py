@@ -0,0 +1,52 @@
+# tests/test_eventos.py
+
+import logging
+
+from eventos import ColaEventos
+
+
+class RaizFalsa:
+    """Sustituye al root de Tk: guarda el callback de after() para llamarlo a mano."""
+
+    def __init__(self):
+        self.pendiente = None
+
+    def after(self, ms, callback):
+        self.pendiente = callback
+        return "after"
+
+    def after_cancel(self, id_after):
+        self.pendiente = None
+
+
+def test_el_desborde_esta_acotado_y_cuenta_lo_perdido():
+    cola = ColaEventos(max_eventos=2, max_desborde=3)
+    for i in range(6):
+        cola.publicar("mensaje", i)
+    cola.publicar("aviso", "x", descartable=True)
+    assert cola.profundidad() == 5
+    assert cola.descartados == {"mensaje": 1, "aviso": 1}
+
+    lotes = []
+    raiz = RaizFalsa()
+    cola.iniciar(raiz, lotes.append)
+    raiz.pendiente()
+    # En orden: primero la cola y después el desborde
+    assert [evento.datos for evento in lotes[0]] == [0, 1, 2, 3, 4]
+    assert cola.profundidad() == 0
+
+
+def test_un_error_del_manejador_se_registra_con_traza(caplog):
+    cola = ColaEventos()
+    cola.publicar("mensaje", 1)
+
+    def manejador(lote):
+        raise ValueError("evento roto")
+
+    raiz = RaizFalsa()
+    cola.iniciar(raiz, manejador)
+    with caplog.at_level(logging.ERROR, logger="eventos"):
+        raiz.pendiente()
+    assert caplog.records[0].exc_info is not None
+    # La cola sigue drenándose
+    assert raiz.pendiente is not None
@@ -0,0 +1,139 @@
+# tests/test_historial.py
+
+import json
+import os
+
+import pytest
+
+import historial as modulo_historial
+from historial import HistorialChat
+
+
+@pytest.fixture
+def abrir(tmp_path):
+    abiertos = []
+
+    def abrir(**opciones):
+        historial = HistorialChat(tmp_path / "historial", intervalo_flush_ms=10, **opciones)
+        abiertos.append(historial)
+        return historial
+
+    yield abrir
+    for historial in abiertos:
+        historial.cerrar()
+
+
+def ids(registros):
+    return [registro["id"] for registro in registros]
+
+
+def test_agregar_y_leer(abrir):
+    historial = abrir()
+    for i in range(10):
+        assert historial.agregar(f"mensaje {i}", "self" if i % 2 else "other") == i + 1
+    assert historial.flush(5)
+    registros = list(historial.leer_todos())
+    assert ids(registros) == list(range(1, 11))
+    assert registros[3]["message"] == "mensaje 3" and registros[3]["sender"] == "self"
+
+
+def test_rotacion_y_paginas(abrir):
+    historial = abrir(max_bytes_segmento=500)
+    for i in range(100):
+        historial.agregar(f"mensaje número {i}")
+    assert historial.flush(5)
+    segmentos = historial.segmentos()
+    assert len(segmentos) > 1
+    # Cada segmento se llama como el id de su primer registro
+    for segmento in segmentos:
+        primera = json.loads(segmento.read_text(encoding="utf-8").splitlines()[0])
+        assert int(segmento.stem) == primera["id"]
+    assert ids(historial.leer_todos()) == list(range(1, 101))
+    assert ids(historial.leer_pagina(cantidad=15)) == list(range(86, 101))
+    assert ids(historial.leer_pagina(antes_de=40, cantidad=15)) == list(range(25, 40))
+    assert ids(historial.leer_pagina(antes_de=5, cantidad=15)) == [1, 2, 3, 4]
+
+
+def test_reabrir_continua_los_ids(abrir):
+    historial = abrir()
+    for i in range(5):
+        historial.agregar(f"mensaje {i}")
+    historial.cerrar()
+    historial = abrir()
+    assert historial.ultimo_id() == 5
+    assert historial.agregar("otro") == 6
+
+
+@pytest.mark.parametrize("cola", [
+    b'{"id": 6, "message": "cort',      # Registro cortado a medias
+    b'{"id": 6, "message": "x"}',       # Registro completo pero sin salto de línea
+    b'basura\n{"id": 6, "mes',          # Línea ilegible y después un registro cortado
+    b'\n\n{"id": 6\n',                  # Líneas vacías y un registro roto con salto
+])
+def test_recupera_un_final_roto(abrir, cola):
+    historial = abrir()
+    for i in range(5):
+        historial.agregar(f"mensaje {i}")
+    historial.cerrar()
+    ultimo = historial.segmentos()[-1]
+    bueno = ultimo.read_bytes()
+    with ultimo.open("ab") as archivo:
+        archivo.write(cola)
+
+    historial = abrir()
+    assert ultimo.read_bytes() == bueno
+    assert historial.ultimo_id() == 5
+    assert historial.agregar("después del corte") == 6
+    assert historial.flush(5)
+    registros = list(historial.leer_todos())
+    assert ids(registros) == [1, 2, 3, 4, 5, 6]
+    assert registros[-1]["message"] == "después del corte"
+
+
+def test_recupera_un_segmento_sin_registros_validos(abrir):
+    historial = abrir(max_bytes_segmento=200)
+    for i in range(20):
+        historial.agregar(f"mensaje {i}")
+    historial.cerrar()
+    # Un segmento recién rotado cuyo único registro quedó cortado
+    roto = historial.directorio / "000000000021.jsonl"
+    roto.write_bytes(b'{"id": 21, "message": "cor')
+
+    historial = abrir(max_bytes_segmento=200)
+    assert historial.ultimo_id() == 20
+    assert roto.read_bytes() == b""
+    assert historial.agregar("siguiente") == 21
+    assert historial.flush(5)
+    assert ids(historial.leer_todos()) == list(range(1, 22))
+
+
+def test_reintenta_un_volcado_fallido(abrir, monkeypatch):
+    historial = abrir(fsync=True)
+    fallos = [OSError(28, "No queda espacio en el dispositivo")]
+    fsync = os.fsync
+
+    def fsync_que_falla(descriptor):
+        if fallos:
+            raise fallos.pop()
+        fsync(descriptor)
+
+    monkeypatch.setattr(modulo_historial.os, "fsync", fsync_que_falla)
+    monkeypatch.setattr(modulo_historial, "INTERVALO_REINTENTO_S", 0.05)
+    for i in range(5):
+        historial.agregar(f"mensaje {i}")
+    assert not historial.flush(5)
+    assert historial.error is not None
+    # El lote no se da por escrito: se reintenta sin duplicar lo ya escrito
+    assert historial.flush(5)
+    assert historial.error is None
+    assert ids(historial.leer_todos()) == [1, 2, 3, 4, 5]
+
+
+def test_observadores_reciben_los_lotes(abrir):
+    historial = abrir()
+    lotes = []
+    historial.suscribir(lotes.append)
+    for i in range(30):
+        historial.agregar(f"mensaje {i}")
+    assert historial.flush(5)
+    assert ids(r for lote in lotes for r in lote) == list(range(1, 31))
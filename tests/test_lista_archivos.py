@@ -0,0 +1,74 @@
+# tests/test_lista_archivos.py
+
+import json
+
+import pytest
+
+from lista_archivos import InfoArchivo, ListaArchivos, ListaDesincronizada
+from servidor_referencia import ServidorReferencia
+
+
+def archivo(nombre, tamano=1):
+    return {"nombre": nombre, "tamano": tamano, "fecha": 1700000000.0}
+
+
+def delta(desde, version, agregados=(), eliminados=()):
+    return "ARCHIVOS_DELTA:" + json.dumps({
+        "desde": desde, "version": version, "agregados": list(agregados), "eliminados": list(eliminados)
+    })
+
+
+def test_lista_completa_y_cambios():
+    lista = ListaArchivos()
+    lista.aplicar("ARCHIVOS:" + json.dumps({"version": 3, "archivos": [archivo("a.txt"), archivo("b.txt")]}))
+    lista.aplicar(delta(3, 4, [archivo("c.txt")]))
+    lista.aplicar(delta(4, 6, [archivo("a.txt", 99)], ["b.txt"]))
+    cambios, archivos = lista.instantanea()
+    assert cambios == 3 and lista.version == 6
+    assert archivos == {
+        "a.txt": InfoArchivo("a.txt", 99, 1700000000.0),
+        "c.txt": InfoArchivo("c.txt", 1, 1700000000.0),
+    }
+    lista.aplicar("SIN_CAMBIOS:6")
+    assert lista.instantanea()[0] == 3
+
+
+def test_delta_que_no_parte_de_la_version_local():
+    lista = ListaArchivos()
+    lista.aplicar("ARCHIVOS:" + json.dumps({"version": 2, "archivos": []}))
+    with pytest.raises(ListaDesincronizada):
+        lista.aplicar(delta(1, 3, [archivo("x")]))
+    assert lista.version == 2 and lista.instantanea()[1] == {}
+
+
+def test_servidor_sin_versiones():
+    lista = ListaArchivos()
+    lista.reemplazar(["a.txt", archivo("b.txt", 5)])
+    assert lista.instantanea() == (1, {"a.txt": InfoArchivo("a.txt"), "b.txt": InfoArchivo("b.txt", 5, 1700000000.0)})
+    # Sin cambios reales no se vuelve a dibujar
+    lista.reemplazar(["a.txt", archivo("b.txt", 5)])
+    assert lista.instantanea()[0] == 1
+    with pytest.raises(ValueError):
+        lista.aplicar("ERROR:algo")
+
+
+def test_cambios_agregados_del_servidor(tmp_path):
+    """Un cliente que se quedó en una versión antigua recibe un delta equivalente a la lista completa."""
+    servidor = ServidorReferencia(tmp_path)
+    servidor.cambiar_lista([archivo("a"), archivo("b")], [])
+    local = ListaArchivos()
+    local.aplicar(servidor.cambios_desde(0))
+    assert local.version == 1
+
+    servidor.cambiar_lista([archivo("c")], ["a"])
+    servidor.cambiar_lista([archivo("a", 7)], ["b"])
+    servidor.cambiar_lista([], ["c"])
+    respuesta = servidor.cambios_desde(1)
+    assert respuesta.startswith("ARCHIVOS_DELTA:")
+    local.aplicar(respuesta)
+
+    completa = ListaArchivos()
+    completa.aplicar(servidor.cambios_desde(0))
+    assert local.version == completa.version == 4
+    assert local.instantanea()[1] == completa.instantanea()[1] == {"a": InfoArchivo("a", 7, 1700000000.0)}
+    assert servidor.cambios_desde(4) == "SIN_CAMBIOS:4"
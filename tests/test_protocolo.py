@@ -0,0 +1,113 @@
+# tests/test_protocolo.py
+
+import random
+import zlib
+
+import pytest
+
+from protocolo import (
+    CABECERA, CABECERA_BLOQUE, FLAG_BLOQUE, MAX_PAYLOAD, TAMANO_LECTURA, DecodificadorFrames, ErrorProtocolo,
+    Frame, TipoFrame, codificar_bloque, codificar_control, codificar_frame, codificar_texto
+)
+
+FRAMES = [
+    Frame(TipoFrame.CONTROL, 0, 0, "ana".encode()),
+    Frame(TipoFrame.TEXTO, 0, 0, "ana: hola, ¿qué tal?".encode()),
+    Frame(TipoFrame.DATOS, 0, 3, b""),
+    Frame(TipoFrame.DATOS, FLAG_BLOQUE, 7, bytes(range(256)) * 1100),  # Más grande que TAMANO_LECTURA
+    Frame(TipoFrame.CONTROL, 0, 2**32 - 1, b"LISTA_ARCHIVOS"),
+]
+FLUJO = b"".join(codificar_frame(f.tipo, f.payload, f.canal, f.flags) for f in FRAMES)
+
+
+def decodificar_en_trozos(flujo: bytes, tamanos) -> list:
+    decodificador = DecodificadorFrames()
+    frames = []
+    inicio = 0
+    for tamano in tamanos:
+        frames += decodificador.alimentar(flujo[inicio:inicio + tamano])
+        inicio += tamano
+    frames += decodificador.alimentar(flujo[inicio:])
+    assert decodificador.pendientes() == 0
+    return frames
+
+
+@pytest.mark.parametrize("tamano", [1, 3, CABECERA.size, CABECERA.size + 1, 4096, TAMANO_LECTURA + 5, len(FLUJO)])
+def test_decodificador_con_trozos_fijos(tamano):
+    assert decodificar_en_trozos(FLUJO, [tamano] * (len(FLUJO) // tamano)) == FRAMES
+
+
+def test_decodificador_con_trozos_al_azar():
+    azar = random.Random(1)
+    for _ in range(50):
+        tamanos = [azar.randint(1, 20000) for _ in range(40)]
+        assert decodificar_en_trozos(FLUJO, tamanos) == FRAMES
+
+
+def test_frame_incompleto_espera_al_resto():
+    decodificador = DecodificadorFrames()
+    datos = codificar_texto("hola")
+    assert decodificador.alimentar(datos[:-1]) == []
+    assert decodificador.pendientes() == len(datos) - 1
+    assert decodificador.alimentar(datos[-1:]) == [Frame(TipoFrame.TEXTO, 0, 0, b"hola")]
+
+
+def test_frame_demasiado_grande():
+    decodificador = DecodificadorFrames()
+    with pytest.raises(ErrorProtocolo):
+        decodificador.alimentar(CABECERA.pack(TipoFrame.DATOS, 0, 1, MAX_PAYLOAD + 1))
+
+
+def test_leer_directamente_en_el_buffer():
+    decodificador = DecodificadorFrames(tamano_inicial=16)
+    frames = []
+    for inicio in range(0, len(FLUJO), 5000):
+        trozo = FLUJO[inicio:inicio + 5000]
+        with decodificador.obtener_buffer(len(trozo)) as buffer:
+            buffer[:len(trozo)] = trozo
+        frames += decodificador.confirmar(len(trozo))
+    assert frames == FRAMES
+
+
+def test_sumidero_recibe_el_payload_de_su_canal():
+    datos = bytes(random.Random(2).getrandbits(8) for _ in range(150_000))
+    flujo = (
+        codificar_control("DESDE:0", 5)
+        + codificar_bloque(5, 0, datos)
+        + codificar_texto("bob: entre medias")
+        + codificar_frame(TipoFrame.DATOS, b"", 5)
+    )
+    recibido = bytearray()
+    restantes = []
+    decodificador = DecodificadorFrames()
+
+    def sumidero(trozo, restante, flags):
+        assert flags == FLAG_BLOQUE
+        recibido.extend(trozo)
+        restantes.append(restante)
+
+    frames = []
+    for inicio in range(0, len(flujo), 1000):
+        trozo = flujo[inicio:inicio + 1000]
+        with decodificador.obtener_buffer(len(trozo)) as buffer:
+            buffer[:len(trozo)] = trozo
+        # Como el servidor: el sumidero se registra al ver DESDE, antes de decodificar el bloque
+        for frame in decodificador.iterar_frames(len(trozo)):
+            frames.append(frame)
+            if frame.tipo == TipoFrame.CONTROL:
+                decodificador.sumideros[5] = sumidero
+
+    offset, crc = CABECERA_BLOQUE.unpack_from(recibido)
+    assert offset == 0 and crc == zlib.crc32(datos)
+    assert bytes(recibido[CABECERA_BLOQUE.size:]) == datos
+    assert restantes[-1] == 0 and restantes == sorted(restantes, reverse=True)
+    # El frame vacío que cierra la subida y los de otros canales siguen llegando como frames
+    assert [f.tipo for f in frames] == [TipoFrame.CONTROL, TipoFrame.TEXTO, TipoFrame.DATOS]
+    assert frames[-1].payload == b""
+
+
+def test_codificar_bloque():
+    frame, = DecodificadorFrames().alimentar(codificar_bloque(9, 4096, b"abc"))
+    assert (frame.tipo, frame.flags, frame.canal) == (TipoFrame.DATOS, FLAG_BLOQUE, 9)
+    assert CABECERA_BLOQUE.unpack_from(frame.payload) == (4096, zlib.crc32(b"abc"))
+    assert frame.payload[CABECERA_BLOQUE.size:] == b"abc"
@@ -0,0 +1,127 @@
+# tests/test_transferencias.py
+"""
+Transferencias reanudables contra el servidor de referencia con fallos
+inyectados (herramientas/servidor_inestable.py), en el mismo proceso.
+"""
+
+import asyncio
+import os
+import random
+
+import pytest
+
+from cliente_async import ClienteAsync, DescargaArchivo
+from protocolo import ErrorProtocolo, Frame, TipoFrame
+from servidor_inestable import ServidorInestable, con_reintentos
+from servidor_referencia import TAMANO_BLOQUE_DESCARGA, ServidorReferencia, iniciar_en_hilo
+from transferencias import RegistroTransferencias
+
+MIB = 1024 * 1024
+
+
+def crear_archivo(ruta, mib, comprimible):
+    azar = random.Random(mib)
+    with ruta.open("wb") as f:
+        for i in range(mib):
+            if comprimible:
+                lineas = "".join(f"{i:04d}.{n:06d} INFO bloque {azar.getrandbits(32):08x}\n" for n in range(25000))
+                f.write(lineas.encode()[:MIB])
+            else:
+                f.write(os.urandom(MIB))
+    return ruta.read_bytes()
+
+
+@pytest.mark.parametrize("comprimible", [False, True], ids=["binario", "comprimible"])
+def test_subida_y_descarga_con_cortes(tmp_path, comprimible):
+    origen = tmp_path / ("origen.log" if comprimible else "origen.bin")
+    datos = crear_archivo(origen, 6, comprimible)
+    servidor = ServidorInestable(tmp_path / "servidor", prob_corte=0.1, prob_corrupcion=0.0, semilla=1)
+    puerto = iniciar_en_hilo(servidor)
+    registro = RegistroTransferencias(tmp_path / "estado")
+
+    intentos_subida = con_reintentos(puerto, registro, lambda c: c.upload(origen))
+    destino = tmp_path / "descargado.bin"
+    intentos_descarga = con_reintentos(puerto, registro, lambda c: c.download(origen.name, destino))
+
+    assert (tmp_path / "servidor" / origen.name).read_bytes() == datos
+    assert destino.read_bytes() == datos
+    assert not (tmp_path / "descargado.bin.parcial").exists()
+    assert registro.pendientes() == []
+    estadisticas = servidor.estadisticas()
+    assert estadisticas["cortes"] > 0 and intentos_subida > 1
+    # Cada bloque subido se verifica una sola vez: las reanudaciones no empiezan de cero
+    assert estadisticas["bytes_subidos"] == len(datos)
+    assert estadisticas["bytes_descargados"] <= len(datos) + intentos_descarga * TAMANO_BLOQUE_DESCARGA
+
+
+def test_descarga_con_bloques_corrompidos(tmp_path):
+    servidor = ServidorInestable(tmp_path / "servidor", prob_corte=0.0, prob_corrupcion=0.5, semilla=2)
+    datos = crear_archivo(tmp_path / "servidor" / "archivo.bin", 16, False)
+    puerto = iniciar_en_hilo(servidor)
+    registro = RegistroTransferencias(tmp_path / "estado")
+
+    destino = tmp_path / "descargado.bin"
+    intentos = con_reintentos(puerto, registro, lambda c: c.download("archivo.bin", destino))
+
+    assert destino.read_bytes() == datos
+    assert servidor.corrupciones > 0 and intentos > 1
+    assert registro.pendientes() == []
+
+
+@pytest.mark.parametrize("comando", [
+    "TAMANO:muchos",
+    "TAMANO:-1",
+    "DESCARGA_INFO:{no es json",
+    'DESCARGA_INFO:{"tamano": 10, "etag": "x"}',
+    'DESCARGA_INFO:{"tamano": "10", "etag": "x", "desde": 0}',
+    "DESCARGA_INFO:[]",
+])
+def test_anuncio_mal_formado_hace_fallar_la_descarga(tmp_path, comando):
+    async def prueba():
+        descarga = DescargaArchivo(tmp_path / "descarga.bin", asyncio.get_running_loop().create_future())
+        descarga.procesar(Frame(TipoFrame.CONTROL, 0, 1, comando.encode()))
+        return descarga.hecho
+
+    hecho = asyncio.run(prueba())
+    assert isinstance(hecho.exception(), ErrorProtocolo)
+    assert not (tmp_path / "descarga.bin").exists()
+
+
+def test_reanudar_una_subida_pendiente(tmp_path):
+    origen = tmp_path / "origen.bin"
+    datos = crear_archivo(origen, 4, False)
+    servidor = ServidorInestable(tmp_path / "servidor", prob_corte=0.2, prob_corrupcion=0.0, semilla=3)
+    puerto = iniciar_en_hilo(servidor)
+    registro = RegistroTransferencias(tmp_path / "estado")
+
+    # Primer intento hasta el primer corte: la subida queda pendiente en el registro
+    cliente = ClienteAsync("127.0.0.1", puerto, lambda frame: None, registro=registro)
+    try:
+        cliente.ejecutar(cliente.connect("prueba")).result(10)
+        with pytest.raises(ConnectionError):
+            cliente.ejecutar(cliente.upload(origen)).result(30)
+    finally:
+        cliente.cerrar()
+    pendiente, = registro.pendientes()
+    assert (pendiente.tipo, pendiente.nombre) == ("subida", origen.name)
+
+    # La aplicación la continúa al volver a conectar
+    con_reintentos(puerto, registro, lambda c: c.reanudar(pendiente))
+    assert (tmp_path / "servidor" / origen.name).read_bytes() == datos
+    assert registro.pendientes() == []
+    assert servidor.bytes_subidos == len(datos)
+
+
+def test_lista_de_archivos_tras_subir(tmp_path):
+    origen = tmp_path / "nota.txt"
+    origen.write_bytes(b"hola\n" * 1000)
+    servidor = ServidorReferencia(tmp_path / "servidor")
+    puerto = iniciar_en_hilo(servidor)
+    cliente = ClienteAsync("127.0.0.1", puerto, lambda frame: None)
+    try:
+        cliente.ejecutar(cliente.connect("prueba")).result(10)
+        assert cliente.ejecutar(cliente.upload(origen)).result(30) == 5000
+        archivos = cliente.ejecutar(cliente.list_files()).result(10)
+    finally:
+        cliente.cerrar()
+    assert [(a["nombre"], a["tamano"]) for a in archivos] == [("nota.txt", 5000)]